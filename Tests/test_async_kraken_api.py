@@ -0,0 +1,129 @@
+import unittest
+from unittest.mock import patch
+import asyncio
+import os
+
+from aiohttp import web
+
+# Set dummy env vars for testing BEFORE importing the class
+os.environ['KRAKEN_API_KEY'] = 'dummy_key'
+os.environ['KRAKEN_API_SECRET'] = 'ZHVtbXlzZWNyZXQ=' # b64encode(b'dummysecret')
+
+from bot.kraken_api import KrakenAPI, KrakenAPIError
+from bot.async_kraken_api import AsyncKrakenAPI
+
+
+class TestAsyncKrakenAPI(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for AsyncKrakenAPI against a local fake Kraken REST server."""
+
+    async def asyncSetUp(self):
+        self.nonces = []
+        self.order_polls = 0
+
+        async def ticker(request):
+            pairs = request.query['pair'].split(',')
+            return web.json_response({'error': [], 'result': {p: {'c': ['100.5', '1']} for p in pairs}})
+
+        async def balance(request):
+            form = await request.post()
+            self.nonces.append(int(form['nonce']))
+            self.assertIn('API-Sign', request.headers)
+            await asyncio.sleep(0.01)  # widen the window for out-of-order arrival
+            return web.json_response({'error': [], 'result': {'ZUSD': '25.0', 'XXBT': '0.5', 'XXDG': '0.000000001'}})
+
+        async def query_orders(request):
+            self.order_polls += 1
+            status = 'closed' if self.order_polls >= 2 else 'open'
+            return web.json_response({'error': [], 'result': {'TX1': {'status': status}}})
+
+        async def add_order(request):
+            return web.json_response({'error': ['EOrder:Insufficient funds']})
+
+        app = web.Application()
+        app.router.add_get('/0/public/Ticker', ticker)
+        app.router.add_post('/0/private/Balance', balance)
+        app.router.add_post('/0/private/QueryOrders', query_orders)
+        app.router.add_post('/0/private/AddOrder', add_order)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        with patch.object(KrakenAPI, '_fetch_asset_pairs', return_value={}):
+            sync_api = KrakenAPI(pair_cache_path='')
+        sync_api.base_url = f"http://127.0.0.1:{port}"
+        self.api = AsyncKrakenAPI(sync_api)
+
+    async def asyncTearDown(self):
+        await self.api.close()
+        await self.runner.cleanup()
+
+    async def test_concurrent_public_and_private_calls(self):
+        """Test that balance and ticker requests overlap and parse like the sync client."""
+        balance, prices = await asyncio.gather(
+            self.api.get_account_balance(),
+            self.api.get_ticker_prices(['XXBTZUSD', 'XETHZUSD']),
+        )
+        self.assertEqual(balance, {'USD': 25.0, 'XBT': 0.5})
+        self.assertEqual(prices, {'XXBTZUSD': {'price': 100.5}, 'XETHZUSD': {'price': 100.5}})
+
+    async def test_private_requests_arrive_in_nonce_order(self):
+        """Test that concurrent private calls are serialized so nonces arrive strictly increasing."""
+        await asyncio.gather(*(self.api.get_account_balance() for _ in range(5)))
+        self.assertEqual(len(self.nonces), 5)
+        self.assertEqual(self.nonces, sorted(self.nonces))
+        self.assertEqual(len(set(self.nonces)), 5)
+
+    async def test_private_calls_wait_for_sync_private_requests(self):
+        """Test that an async private call waits while the sync client holds its private-request lock."""
+        lock = self.api.sync._private_request_lock
+        lock.acquire()
+        # A sync private call draws its nonce while holding the lock
+        sync_nonce = self.api.sync._get_nonce()
+        call = asyncio.create_task(self.api.get_account_balance())
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.nonces, [])
+        self.assertFalse(call.done())
+
+        lock.release()
+        await call
+        self.assertEqual(len(self.nonces), 1)
+        self.assertGreater(self.nonces[0], int(sync_nonce))
+        self.assertTrue(lock.acquire(blocking=False))
+        lock.release()
+
+    async def test_wait_for_orders_closed_polls_without_blocking(self):
+        """Test that waiting for order closure polls asynchronously and invalidates the portfolio snapshot."""
+        self.api.sync._portfolio_snapshot = object()
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticker_task = asyncio.create_task(ticker())
+        status = await self.api.wait_for_orders_closed(['TX1'], timeout_seconds=5, poll_interval=0.05)
+        ticker_task.cancel()
+
+        self.assertEqual(status, {'TX1': 'closed'})
+        self.assertGreater(ticks, 1)
+        self.assertIsNone(self.api.sync._portfolio_snapshot)
+
+    async def test_validate_order_reports_errors(self):
+        """Test that validation errors are returned rather than raised."""
+        ok, errors = await self.api.validate_order('XXBTZUSD', 'buy', 0.1)
+        self.assertFalse(ok)
+        self.assertIn('EOrder:Insufficient funds', errors[0])
+
+    async def test_api_error_raises_kraken_error(self):
+        """Test that API errors surface as KrakenAPIError after retries."""
+        with patch('bot.async_kraken_api.asyncio.sleep', return_value=None):
+            with self.assertRaises(KrakenAPIError):
+                await self.api.place_order('XXBTZUSD', 'buy', 0.1, validate=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import threading
+import unittest
+
+from bot.cash_ledger import CashLedger
+
+
+class TestCashLedger(unittest.TestCase):
+    """Unit tests for the per-phase cash reservation ledger."""
+
+    def test_reserve_release_commit(self):
+        """Test that holds reduce availability, release restores it and commit spends it."""
+        ledger = CashLedger.from_portfolio({'cash_balance': 100.0})
+
+        self.assertTrue(ledger.reserve('a', 60.0))
+        self.assertFalse(ledger.reserve('b', 50.0))
+        self.assertAlmostEqual(ledger.available, 40.0)
+
+        # Re-reserving a key resizes its hold rather than stacking it
+        self.assertTrue(ledger.reserve('a', 90.0))
+        self.assertAlmostEqual(ledger.reserved, 90.0)
+        self.assertEqual(ledger.release('a'), 90.0)
+        self.assertAlmostEqual(ledger.available, 100.0)
+
+        ledger.reserve('b', 30.0)
+        self.assertEqual(ledger.commit('b'), 30.0)
+        self.assertAlmostEqual(ledger.cash, 70.0)
+        self.assertEqual(ledger.release('b'), 0.0)
+
+        ledger.credit(25.0)
+        self.assertAlmostEqual(ledger.available, 95.0)
+
+    def test_reseed_replaces_cash_and_keeps_holds(self):
+        """Test that a fresh balance read replaces the running cash figure without dropping holds."""
+        ledger = CashLedger(100.0)
+        ledger.reserve('a', 40.0)
+
+        ledger.reseed(250.0)
+
+        self.assertAlmostEqual(ledger.cash, 250.0)
+        self.assertAlmostEqual(ledger.available, 210.0)
+        ledger.reseed(-5.0)
+        self.assertEqual(ledger.cash, 0.0)
+
+    def test_tolerance(self):
+        """Test that costs within the relative tolerance of available cash are accepted."""
+        ledger = CashLedger(100.0, tolerance=0.001)
+        self.assertTrue(ledger.can_afford(100.09))
+        self.assertFalse(ledger.can_afford(100.2))
+        self.assertTrue(ledger.reserve('a', 100.05))
+        self.assertEqual(ledger.available, 0.0)
+
+    def test_concurrent_reservations_never_oversubscribe(self):
+        """Test that parallel reserve() calls cannot hold more than the ledger's cash."""
+        ledger = CashLedger(1000.0, tolerance=0.0)
+        granted = []
+
+        def worker(i):
+            if ledger.reserve(i, 10.0):
+                granted.append(i)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(200)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(granted), 100)
+        self.assertAlmostEqual(ledger.reserved, 1000.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
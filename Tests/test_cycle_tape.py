@@ -0,0 +1,164 @@
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import httpx
+import requests
+
+from bot.async_kraken_api import AsyncKrakenAPI
+from bot.cycle_tape import CycleTape, TapeMissError, redact_url, request_keys
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    """Answers every request with a running counter, so replays are distinguishable from live calls."""
+    calls = 0
+
+    def _reply(self):
+        CountingHandler.calls += 1
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        payload = json.dumps({'call': CountingHandler.calls, 'path': self.path, 'body': body}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', f'"v{CountingHandler.calls}"')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestCycleTape(unittest.TestCase):
+    """Unit tests for recording and replaying outbound calls."""
+
+    def setUp(self):
+        CountingHandler.calls = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), CountingHandler)
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'tapes', 'cycle.json.gz')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_record_then_replay_offline(self):
+        """Test that recorded requests/httpx responses are served back without the server."""
+        with CycleTape(self.path, 'record'):
+            live = [
+                requests.get(f"{self.base}/feed.xml", timeout=5).json(),
+                requests.post(f"{self.base}/0/private/Balance", data={'nonce': 1}, timeout=5).json(),
+                httpx.Client().post(f"{self.base}/v1/chat/completions", json={'model': 'm', 'prompt': 'hi'}).json(),
+            ]
+        self.server.shutdown()
+        self.server.server_close()
+
+        with CycleTape(self.path, 'replay') as tape:
+            feed = requests.get(f"{self.base}/feed.xml", timeout=5)
+            replayed = [
+                feed.json(),
+                requests.post(f"{self.base}/0/private/Balance", data={'nonce': 2}, timeout=5).json(),
+                httpx.Client().post(f"{self.base}/v1/chat/completions", json={'prompt': 'hi', 'model': 'm'}).json(),
+            ]
+            self.assertEqual(feed.headers['ETag'], '"v1"')
+            with self.assertRaises(TapeMissError):
+                requests.get(f"{self.base}/never-recorded", timeout=5)
+
+        self.assertEqual(replayed, live)
+        self.assertEqual(tape.summary(), {'mode': 'replay', 'calls': 3, 'exact': 3, 'in_order': 0, 'unused': 0})
+        # Hooks are removed again on exit
+        with self.assertRaises(requests.ConnectionError):
+            requests.get(f"{self.base}/feed.xml", timeout=1)
+
+    def test_keys_ignore_nonces_and_timestamps_and_secrets_are_not_stored(self):
+        """Test that volatile fields do not change the match key and secrets never reach the bundle."""
+        key, endpoint = request_keys('http', 'POST', 'https://api.kraken.com/0/private/Balance', 'nonce=1&asset=XBT',
+                                     'application/x-www-form-urlencoded')
+        self.assertEqual(key, request_keys('http', 'POST', 'https://api.kraken.com/0/private/Balance', 'asset=XBT&nonce=99',
+                                           'application/x-www-form-urlencoded')[0])
+        self.assertEqual(endpoint, 'http POST api.kraken.com/0/private/Balance')
+        prompt = {'messages': [{'content': 'Now: 2025-08-01T07:00:03.123 MST'}]}
+        later = {'messages': [{'content': 'Now: 2025-08-02 07:05 MST'}]}
+        self.assertEqual(request_keys('http', 'POST', 'https://x/v1', json.dumps(prompt), 'application/json'),
+                         request_keys('http', 'POST', 'https://x/v1', json.dumps(later), 'application/json'))
+
+        with CycleTape(self.path, 'record'):
+            requests.post(f"{self.base}/botSECRET123/sendMessage", json={'text': 'hi'}, timeout=5)
+            requests.get(f"{self.base}/simple/price?ids=bitcoin&x_cg_demo_api_key=CGSECRET", timeout=5)
+        self.assertEqual(redact_url('https://api.coingecko.com/simple/price?ids=bitcoin&x_cg_demo_api_key=CGSECRET'),
+                         'https://api.coingecko.com/simple/price?ids=bitcoin')
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            entries = json.load(f)['entries']
+        self.assertEqual([e['endpoint'] for e in entries],
+                         [f"http POST 127.0.0.1:{self.server.server_port}/bot<redacted>/sendMessage",
+                          f"http GET 127.0.0.1:{self.server.server_port}/simple/price"])
+
+    def test_changed_requests_are_served_in_recorded_order(self):
+        """Test the per-endpoint fallback and the async Kraken hook."""
+        async def fake_request_json(api, method_type, url_path, data, headers):
+            return {'error': [], 'result': {'echo': data['pair']}}
+
+        with patch.object(AsyncKrakenAPI, '_request_json', fake_request_json):
+            api = AsyncKrakenAPI.__new__(AsyncKrakenAPI)
+            api.base_url = 'https://api.kraken.com'
+            with CycleTape(self.path, 'record'):
+                requests.post(f"{self.base}/v1/chat", json={'prompt': 'a'}, timeout=5)
+                requests.post(f"{self.base}/v1/chat", json={'prompt': 'b'}, timeout=5)
+                recorded = asyncio.run(api._request_json('public', '/0/public/Ticker', {'pair': 'XBTUSD'}, {}))
+
+            with CycleTape(self.path, 'replay') as tape:
+                first = requests.post(f"{self.base}/v1/chat", json={'prompt': 'changed'}, timeout=5).json()
+                second = requests.post(f"{self.base}/v1/chat", json={'prompt': 'b'}, timeout=5).json()
+                replayed = asyncio.run(api._request_json('public', '/0/public/Ticker', {'pair': 'XBTUSD'}, {}))
+
+        self.assertEqual((first['call'], second['call']), (1, 2))
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(tape.summary()['in_order'], 1)
+        self.assertEqual(CountingHandler.calls, 2)
+
+    def test_recorded_cycle_includes_asset_pairs_despite_disk_cache(self):
+        """Test that a taped cycle fetches AssetPairs over HTTP even when a fresh disk cache exists."""
+        import scheduler_multiagent
+
+        cache_path = os.path.join(self.tmp, 'pairs.json')
+        pairs = {'XXBTZUSD': {'altname': 'XBTUSD', 'base': 'XXBT', 'quote': 'ZUSD'}}
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'base_url': 'https://api.kraken.com', 'fetched_at': time.time(), 'asset_pairs': pairs}, f)
+
+        def fake_send(adapter, request, **kwargs):
+            response = requests.Response()
+            response.status_code = 200
+            response._content = json.dumps({'error': [], 'result': pairs}).encode('utf-8')
+            response.headers['Content-Type'] = 'application/json'
+            response.url = request.url
+            response.request = request
+            return response
+
+        env = {'KRAKEN_PAIR_CACHE_PATH': cache_path, 'KRAKEN_API_KEY': 'dummy_key', 'KRAKEN_API_SECRET': 'ZHVtbXlzZWNyZXQ='}
+        with patch.dict(os.environ, env), \
+                patch('requests.adapters.HTTPAdapter.send', fake_send), \
+                patch.object(scheduler_multiagent, 'SupervisorAgent'), \
+                patch.object(scheduler_multiagent, 'run_multiagent_trading_cycle'):
+            scheduler_multiagent.run_taped_cycle('record', self.path)
+
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            endpoints = [e['endpoint'] for e in json.load(f)['entries']]
+        self.assertTrue(any(endpoint.endswith('/0/public/AssetPairs') for endpoint in endpoints), endpoints)
+
+
+if __name__ == '__main__':
+    unittest.main()
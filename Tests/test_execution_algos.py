@@ -0,0 +1,280 @@
+import unittest
+
+from bot.execution_algos import (
+    ParentOrder,
+    PostOnlyChaser,
+    SlicedOrderScheduler,
+    child_limit_price,
+    participation_cap,
+    slice_schedule,
+)
+from bot.market_data import PriceQuote
+from bot.pair_specs import PairSpec
+from bot.sim_exchange import SimMatchingEngine
+
+
+class FakeAsyncKrakenAPI:
+    """In-memory stand-in for AsyncKrakenAPI: limit children fill `limit_fill` of their volume."""
+
+    def __init__(self, limit_fill: float = 1.0, book: dict | None = None):
+        self.limit_fill = limit_fill
+        self.book = book
+        self.orders = {}
+        self.placed = []
+        self.canceled = []
+
+    def get_pair_spec(self, pair):
+        return PairSpec(pair, {'wsname': 'XBT/USD', 'lot_decimals': 4, 'ordermin': '0.0001', 'tick_size': '0.1'})
+
+    def get_live_price(self, pair, max_age=None):
+        return PriceQuote('XBT/USD', 100.0, 99.9, 100.1, 100.0, 0.0, False, 0.0, False)
+
+    def get_live_book(self, pair):
+        return self.book
+
+    async def get_ticker_prices(self, pairs):
+        return {pairs[0]: {'price': 100.0}}
+
+    async def place_order(self, pair, order_type, volume, ordertype='market', validate=False, price=None):
+        txid = f"TX{len(self.placed) + 1}"
+        fill = volume if ordertype == 'market' else round(volume * self.limit_fill, 4)
+        self.orders[txid] = fill
+        self.placed.append({'type': order_type, 'volume': volume, 'ordertype': ordertype, 'price': price})
+        return {'txid': [txid]}
+
+    async def wait_for_orders_closed(self, txids, timeout_seconds=45, poll_interval=2.0, any_closed=False):
+        return {tx: 'closed' if self.orders[tx] >= self.placed[int(tx[2:]) - 1]['volume'] else 'open' for tx in txids}
+
+    async def cancel_order(self, txid):
+        self.canceled.append(txid)
+        return {'count': 1}
+
+    async def query_orders(self, txids):
+        return {tx: {'vol_exec': str(self.orders[tx])} for tx in txids}
+
+
+async def no_sleep(seconds):
+    return None
+
+
+class EngineAsyncKrakenAPI:
+    """AsyncKrakenAPI surface over a SimMatchingEngine, quoting the engine's own book."""
+
+    def __init__(self, engine: SimMatchingEngine):
+        self.engine = engine
+        self.placed = []
+        self.query_calls = 0
+
+    def get_pair_spec(self, pair):
+        return PairSpec(pair, {'lot_decimals': 4, 'ordermin': '0.0001', 'tick_size': '0.1'})
+
+    def get_live_price(self, pair, max_age=None):
+        bid, ask = self.engine.best_bid(pair), self.engine.best_ask(pair)
+        return PriceQuote(pair, (bid + ask) / 2, bid, ask, (bid + ask) / 2, 0.0, False, 0.0, False)
+
+    async def place_order(self, pair, order_type, volume, ordertype='market', validate=False, price=None, post_only=False):
+        self.placed.append({'volume': volume, 'ordertype': ordertype, 'price': price, 'post_only': post_only})
+        return {'txid': [self.engine.add_order(pair, order_type, volume, ordertype, price, post_only)]}
+
+    async def cancel_order(self, txid):
+        return {'count': int(self.engine.cancel(txid))}
+
+    async def query_orders(self, txids):
+        self.query_calls += 1
+        return self.engine.query(txids)
+
+    async def wait_for_orders_closed(self, txids, timeout_seconds=45, poll_interval=2.0, any_closed=False):
+        return {tx: info['status'] for tx, info in self.engine.query(txids).items()}
+
+
+class RestOnlyEngineAPI(EngineAsyncKrakenAPI):
+    """No live board: quotes come from a REST Ticker read whose last trade is `last`."""
+
+    def __init__(self, engine: SimMatchingEngine, last: float, with_sides: bool = True):
+        super().__init__(engine)
+        self.last = last
+        self.with_sides = with_sides
+        self.ticker_calls = 0
+
+    def get_live_price(self, pair, max_age=None):
+        return None
+
+    async def get_ticker_prices(self, pairs):
+        self.ticker_calls += 1
+        ticker = {'price': self.last}
+        if self.with_sides:
+            ticker.update(bid=self.engine.best_bid(pairs[0]), ask=self.engine.best_ask(pairs[0]))
+        return {pairs[0]: ticker}
+
+
+class MarketScript:
+    """Fake clock whose sleep() advances time and moves the engine's book to the next scripted state."""
+
+    def __init__(self, engine: SimMatchingEngine, pair: str, books: list):
+        self.engine = engine
+        self.pair = pair
+        self.books = list(books)
+        self.now = 0.0
+
+    def clock(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+        if self.books:
+            bids, asks = self.books.pop(0)
+            self.engine.set_book(self.pair, bids, asks)
+
+
+class TestExecutionAlgos(unittest.IsolatedAsyncioTestCase):
+    """Unit tests for the TWAP / participation child-order scheduler and the post-only chaser."""
+
+    def test_slice_schedule(self):
+        """Test that cumulative targets are even, truncated to lots and end at the full volume."""
+        self.assertEqual(slice_schedule(1.0, 4, 4), [0.25, 0.5, 0.75, 1.0])
+        self.assertEqual(slice_schedule(1.0, 3, 4), [0.3333, 0.6666, 1.0])
+        # Slices that would fall below ordermin are merged
+        self.assertEqual(slice_schedule(0.25, 5, 4, ordermin=0.1), [0.125, 0.25])
+
+    def test_limit_price_and_participation(self):
+        """Test that children cross at the touch but never outside the slippage band."""
+        self.assertEqual(child_limit_price('buy', 99.9, 100.1, 100.0, 0.005), 100.1)
+        self.assertAlmostEqual(child_limit_price('buy', 99.9, 101.0, 100.0, 0.005), 100.5)
+        self.assertAlmostEqual(child_limit_price('sell', 99.0, 100.1, 100.0, 0.005), 99.5)
+        book = {'asks': [(100.1, 2.0), (100.3, 3.0), (101.0, 50.0)], 'bids': [(99.9, 1.0)]}
+        self.assertAlmostEqual(participation_cap(book, 'buy', 100.5, 0.2), 1.0)
+        self.assertAlmostEqual(participation_cap(book, 'sell', 99.5, 0.5), 0.5)
+
+    async def test_twap_places_even_limit_children(self):
+        """Test that a fully filling TWAP sends one limit child per slice at the ask."""
+        api = FakeAsyncKrakenAPI()
+        scheduler = SlicedOrderScheduler(api, sleep=no_sleep)
+        result = await scheduler.execute(ParentOrder('XXBTZUSD', 'buy', 1.0, slices=4, duration_seconds=0))
+
+        self.assertEqual(result.status, 'filled')
+        self.assertAlmostEqual(result.filled_volume, 1.0)
+        self.assertEqual([o['volume'] for o in api.placed], [0.25, 0.25, 0.25, 0.25])
+        self.assertEqual({o['ordertype'] for o in api.placed}, {'limit'})
+        self.assertEqual({o['price'] for o in api.placed}, {100.1})
+        self.assertEqual(api.canceled, [])
+
+    async def test_unfilled_children_are_canceled_and_replaced(self):
+        """Test that a child's unfilled rest is canceled, caught up next slice and swept at the end."""
+        api = FakeAsyncKrakenAPI(limit_fill=0.5)
+        scheduler = SlicedOrderScheduler(api, sleep=no_sleep)
+        result = await scheduler.execute(ParentOrder('XXBTZUSD', 'sell', 1.0, slices=2, duration_seconds=0))
+
+        # Slice 1: 0.5 -> fills 0.25; slice 2 catches up 0.75 -> fills 0.375; market sweeps 0.375
+        self.assertEqual([o['volume'] for o in api.placed], [0.5, 0.75, 0.375])
+        self.assertEqual([o['ordertype'] for o in api.placed], ['limit', 'limit', 'market'])
+        self.assertEqual(api.canceled, ['TX1', 'TX2'])
+        self.assertEqual(result.txids, ['TX1', 'TX2', 'TX3'])
+        self.assertEqual(result.status, 'filled')
+
+    async def test_failed_wait_cancels_child_and_keeps_its_fills(self):
+        """Test that a child is canceled and its partial fill counted when waiting on it raises."""
+        api = FakeAsyncKrakenAPI(limit_fill=0.4)
+
+        async def failing_wait(txids, **kwargs):
+            raise ConnectionError("stream and REST both down")
+
+        api.wait_for_orders_closed = failing_wait
+        scheduler = SlicedOrderScheduler(api, sleep=no_sleep)
+        result = await scheduler.execute(ParentOrder('XXBTZUSD', 'buy', 1.0, slices=4, duration_seconds=0))
+
+        self.assertEqual(result.status, 'partial')
+        self.assertIn("both down", result.error)
+        self.assertEqual(api.canceled, ['TX1'])
+        self.assertAlmostEqual(result.filled_volume, 0.1)
+        self.assertEqual(len(api.placed), 1)
+
+    async def test_participation_caps_child_size(self):
+        """Test that participation mode sizes children from displayed depth within the limit."""
+        book = {'asks': [(100.1, 0.5), (105.0, 100.0)], 'bids': []}
+        api = FakeAsyncKrakenAPI(book=book)
+        scheduler = SlicedOrderScheduler(api, sleep=no_sleep)
+        parent = ParentOrder('XXBTZUSD', 'buy', 1.0, mode='participation', slices=2, participation=0.2,
+                             duration_seconds=0, finish_with_market=False)
+        result = await scheduler.execute(parent)
+
+        self.assertEqual([o['volume'] for o in api.placed], [0.1, 0.1])
+        self.assertEqual(result.status, 'partial')
+        self.assertAlmostEqual(result.filled_volume, 0.2)
+
+    async def test_parents_run_concurrently(self):
+        """Test that run() works several parents and returns results in input order."""
+        api = FakeAsyncKrakenAPI()
+        scheduler = SlicedOrderScheduler(api, max_concurrent=2, sleep=no_sleep)
+        parents = [ParentOrder('XXBTZUSD', side, 0.5, slices=2, duration_seconds=0) for side in ('buy', 'sell', 'buy')]
+        results = await scheduler.run(parents)
+
+        self.assertEqual([r.parent.side for r in results], ['buy', 'sell', 'buy'])
+        self.assertTrue(all(r.status == 'filled' for r in results))
+        self.assertEqual(len(api.placed), 6)
+
+    async def test_chaser_follows_the_touch_and_fills_as_maker(self):
+        """Test that the chaser reprices post-only orders as the touch moves and fills without taking."""
+        engine = SimMatchingEngine(maker_fee=0.0016, taker_fee=0.0026)
+        engine.set_book('XBTUSD', bids=[(100.0, 5.0)], asks=[(100.2, 5.0)])
+        market = MarketScript(engine, 'XBTUSD', [
+            ([(100.1, 5.0)], [(100.3, 5.0)]),              # bid steps up: reprice to 100.1
+            ([(99.9, 5.0)], [(100.1, 0.4), (100.2, 5.0)]),  # 0.4 trades through 100.1, bid drops: reprice rest to 99.9
+            ([(99.8, 5.0)], [(99.9, 5.0)]),                 # rest fills at 99.9
+        ])
+        api = EngineAsyncKrakenAPI(engine)
+        chaser = PostOnlyChaser(api, order_states=engine.order_states, check_interval=1.0, clock=market.clock, sleep=market.sleep)
+        result = await chaser.execute(ParentOrder('XBTUSD', 'buy', 1.0, mode='passive', duration_seconds=30))
+
+        self.assertEqual(result.status, 'filled')
+        self.assertAlmostEqual(result.filled_volume, 1.0)
+        self.assertEqual([(o['price'], o['volume']) for o in api.placed], [(100.0, 1.0), (100.1, 1.0), (99.9, 0.6)])
+        self.assertTrue(all(o['post_only'] for o in api.placed))
+        fees = sum(engine.order(tx).fee for tx in result.txids)
+        self.assertAlmostEqual(fees, (0.4 * 100.1 + 0.6 * 99.9) * 0.0016)
+        # Every fill and cancel was read from the in-memory order table
+        self.assertEqual(api.query_calls, 0)
+
+    async def test_chaser_sweeps_at_market_after_deadline(self):
+        """Test that an unfilled chase is canceled at the deadline and the rest taken at market."""
+        engine = SimMatchingEngine()
+        engine.set_book('XBTUSD', bids=[(100.0, 5.0)], asks=[(100.2, 5.0)])
+        market = MarketScript(engine, 'XBTUSD', [])
+        api = EngineAsyncKrakenAPI(engine)
+        chaser = PostOnlyChaser(api, order_states=engine.order_states, check_interval=1.0, clock=market.clock, sleep=market.sleep)
+        result = await chaser.execute(ParentOrder('XBTUSD', 'sell', 0.5, mode='passive', duration_seconds=3))
+
+        self.assertEqual([o['ordertype'] for o in api.placed], ['limit', 'market'])
+        self.assertEqual(engine.order(result.txids[0]).status, 'canceled')
+        self.assertEqual(result.status, 'filled')
+        self.assertAlmostEqual(engine.order(result.txids[1]).cost, 0.5 * 100.0)
+
+
+    async def test_chaser_rests_on_rest_bid_not_last_trade(self):
+        """Test that without a live board the chaser rests at the Ticker bid, not the last trade price."""
+        engine = SimMatchingEngine()
+        engine.set_book('XBTUSD', bids=[(100.0, 5.0)], asks=[(100.2, 5.0)])
+        market = MarketScript(engine, 'XBTUSD', [])
+        api = RestOnlyEngineAPI(engine, last=100.2)
+        chaser = PostOnlyChaser(api, order_states=engine.order_states, check_interval=0.5, reprice_seconds=10.0,
+                                clock=market.clock, sleep=market.sleep)
+        await chaser.execute(ParentOrder('XBTUSD', 'buy', 0.5, mode='passive', duration_seconds=5, finish_with_market=False))
+
+        self.assertEqual([(o['price'], o['post_only']) for o in api.placed], [(100.0, True)])
+
+    async def test_chaser_steps_passive_after_post_only_reject(self):
+        """Test that a crossing post-only order is re-sent one tick passive instead of at the same price."""
+        engine = SimMatchingEngine()
+        engine.set_book('XBTUSD', bids=[(100.0, 5.0)], asks=[(100.2, 5.0)])
+        market = MarketScript(engine, 'XBTUSD', [])
+        # Ticker without book sides: the last trade (at the ask) is all there is to price from
+        api = RestOnlyEngineAPI(engine, last=100.2, with_sides=False)
+        chaser = PostOnlyChaser(api, order_states=engine.order_states, check_interval=0.5, reprice_seconds=10.0,
+                                clock=market.clock, sleep=market.sleep)
+        await chaser.execute(ParentOrder('XBTUSD', 'buy', 0.5, mode='passive', duration_seconds=10, finish_with_market=False))
+
+        self.assertEqual([o['price'] for o in api.placed], [100.2, 100.1])
+        self.assertLessEqual(api.ticker_calls, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
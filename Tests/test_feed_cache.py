@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from bot.feed_cache import FeedCache
+
+URL = 'https://feeds.example.com/rss'
+
+
+def parsed_feed(*titles):
+    """feedparser-shaped result with one entry per title."""
+    published = time.gmtime(1_700_000_000)
+    return SimpleNamespace(bozo=False, entries=[
+        SimpleNamespace(title=t, link=f'https://example.com/{i}', published_parsed=published) for i, t in enumerate(titles)
+    ])
+
+
+class TestFeedCache(unittest.TestCase):
+    """Unit tests for the conditional-GET RSS feed cache."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'rss_feed_cache.json')
+        self.now = 1000.0
+        self.cache = FeedCache(self.path, fresh_seconds=60, clock=lambda: self.now)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_freshness_window_and_validators(self):
+        """Test that recent checks skip the request and stale ones send the validators."""
+        self.assertIsNone(self.cache.fresh(URL))
+        self.assertEqual(self.cache.validators(URL), {})
+
+        body = b'<rss>v1</rss>'
+        self.cache.store(URL, body, {'ETag': '"abc"', 'Last-Modified': 'Wed, 01 Oct 2025 07:00:00 GMT'}, parsed_feed('a', 'b', 'c'), 2)
+
+        self.now += 30
+        feed = self.cache.fresh(URL)
+        self.assertEqual([e.title for e in feed.entries], ['a', 'b'])
+        self.assertEqual(tuple(feed.entries[0].published_parsed), tuple(time.gmtime(1_700_000_000)))
+
+        self.now += 60
+        self.assertIsNone(self.cache.fresh(URL))
+        self.assertEqual(self.cache.validators(URL), {'If-None-Match': '"abc"', 'If-Modified-Since': 'Wed, 01 Oct 2025 07:00:00 GMT'})
+        self.assertIsNotNone(self.cache.not_modified(URL, {'ETag': '"abd"'}))
+        self.assertEqual(self.cache.validators(URL)['If-None-Match'], '"abd"')
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['lookups'], stats['hit_ratio'], stats['bytes_saved']), (3, 0.667, 2 * len(body)))
+
+    def test_body_hash_detects_unchanged_and_new_content(self):
+        """Test that identical bodies hit the cache and changed bodies miss it."""
+        self.cache.store(URL, b'<rss>v1</rss>', {}, parsed_feed('a'), 15)
+
+        self.assertIsNotNone(self.cache.unchanged(URL, b'<rss>v1</rss>'))
+        self.assertIsNone(self.cache.unchanged(URL, b'<rss>v2</rss>'))
+        self.assertIsNone(self.cache.unchanged('https://other.example.com/rss', b'<rss>v1</rss>'))
+
+    def test_records_persist(self):
+        """Test that validators and entries survive a restart."""
+        self.cache.store(URL, b'<rss>v1</rss>', {'ETag': '"abc"'}, parsed_feed('a'), 15)
+        self.cache.save()
+
+        reloaded = FeedCache(self.path, fresh_seconds=0)
+        self.assertEqual(reloaded.validators(URL), {'If-None-Match': '"abc"'})
+        self.assertEqual([e.title for e in reloaded.not_modified(URL).entries], ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
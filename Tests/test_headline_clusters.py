@@ -0,0 +1,63 @@
+import unittest
+
+from bot.headline_clusters import HeadlineClusterer, cluster_headlines, dedupe_headline_lists
+
+BTC_HIGH = [
+    "- [Cointelegraph.Com] Bitcoin hits new all-time high above $120K ([Link](http://a/1))",
+    "- [Decrypt.Co] Bitcoin Hits New All-Time High Above $120K as ETF Inflows Surge ([Link](http://b/1))",
+    "- [U.Today] Bitcoin hits all-time high above $120K, ETF inflows surge ([Link](http://c/1))",
+]
+SOL_ETF = [
+    "- [Cointelegraph.Com] SEC delays decision on Solana ETF ([Link](http://a/2))",
+    "- [Coindesk.Com] SEC Delays Decision on Solana ETFs Again ([Link](http://d/2))",
+]
+FUSAKA = "- [Decrypt.Co] Ethereum developers schedule Fusaka upgrade ([Link](http://b/2))"
+
+
+class TestHeadlineClusters(unittest.TestCase):
+    """Unit tests for near-duplicate headline clustering."""
+
+    def test_collapses_near_duplicates_and_ranks_by_sources(self):
+        """Test that copies of a story from other outlets fold into one line, most-carried story first."""
+        headlines = cluster_headlines([FUSAKA, SOL_ETF[0], BTC_HIGH[0], SOL_ETF[1], BTC_HIGH[1], BTC_HIGH[2]])
+
+        self.assertEqual(headlines, [
+            BTC_HIGH[0] + " [also: Decrypt.Co, U.Today]",
+            SOL_ETF[0] + " [also: Coindesk.Com]",
+            FUSAKA,
+        ])
+        # Clustering already-clustered output changes nothing
+        self.assertEqual(cluster_headlines(headlines), headlines)
+
+    def test_distinct_stories_stay_apart(self):
+        """Test that headlines sharing only a couple of words are not merged."""
+        headlines = [
+            "- [A] Bitcoin miners 1",
+            "- [B] Bitcoin whales 1",
+            "- [C] Bitcoin ETF inflows hit record",
+            "- [D] Ethereum ETF outflows hit record",
+        ]
+        self.assertEqual(cluster_headlines(headlines), headlines)
+
+    def test_add_reports_new_and_collapsed(self):
+        """Test that add() tells new stories from copies and counts every source once."""
+        clusterer = HeadlineClusterer()
+
+        cluster, is_new = clusterer.add(BTC_HIGH[0])
+        self.assertTrue(is_new)
+        self.assertIs(clusterer.add(BTC_HIGH[1])[0], cluster)
+        self.assertFalse(clusterer.add(BTC_HIGH[1].replace("http://b/1", "http://b/9"))[1])
+        self.assertEqual((cluster.source_count, cluster.copies, clusterer.collapsed), (2, 3, 2))
+
+    def test_dedupe_across_lists_keeps_story_in_first_list(self):
+        """Test that a macro copy of a crypto story is dropped from macro and credited to the crypto line."""
+        crypto, macro = dedupe_headline_lists(
+            [SOL_ETF[0], FUSAKA],
+            ["- [Npr.Org] SEC delays decision on Solana ETF", "- [Npr.Org] Fed holds rates steady"],
+        )
+        self.assertEqual(crypto, [SOL_ETF[0] + " [also: Npr.Org]", FUSAKA])
+        self.assertEqual(macro, ["- [Npr.Org] Fed holds rates steady"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from bot.keyword_matcher import KeywordMatcher, keyword_matcher
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    """Unit tests for the compiled whole-word keyword matcher."""
+
+    def test_whole_word_matching(self):
+        """Test that keywords inside longer words do not match."""
+        matcher = keyword_matcher(['eth', 'sec', 'up'])
+
+        self.assertFalse(matcher.search("A new method for second-quarter updates"))
+        self.assertTrue(matcher.search("ETH rallies as SEC signs off"))
+        self.assertTrue(matcher.search("Bitcoin is up 5%"))
+        self.assertEqual(matcher.matches("ETH rallies as SEC signs off; eth/btc up"), {'eth', 'sec', 'up'})
+
+    def test_plurals_and_overlapping_phrases(self):
+        """Test that plural endings match and a phrase also reports the keywords it contains."""
+        matcher = keyword_matcher(['surge', 'etf', 'btc', 'btc etf', 'fed', 'fed chair'])
+
+        self.assertEqual(matcher.hits("Stocks surges, ETFs too"), ['surge', 'etf'])
+        self.assertEqual(matcher.hits("BTC ETF flows"), ['btc etf', 'btc', 'etf'])
+        self.assertEqual(matcher.hits("Fed  Chair Powell"), ['fed chair', 'fed'])
+        self.assertEqual(matcher.hits("Federal budget"), [])
+
+    def test_scan_counts_groups(self):
+        """Test that one pass tallies hits for every group a keyword belongs to."""
+        matcher = KeywordMatcher({
+            'positive': ['rally', 'adoption'],
+            'negative': ['hack'],
+            'theme:bitcoin': ['bitcoin', 'btc'],
+            'theme:adoption': ['adoption'],
+        })
+
+        counts = matcher.scan("Bitcoin rally continues as BTC adoption grows despite exchange hack")
+        self.assertEqual(counts['positive'], 2)
+        self.assertEqual(counts['negative'], 1)
+        self.assertEqual(counts['theme:bitcoin'], 2)
+        self.assertEqual(counts['theme:adoption'], 1)
+
+    def test_shared_matcher_per_keyword_set(self):
+        """Test that the same keyword set is compiled once regardless of order and case."""
+        self.assertIs(keyword_matcher(['BTC', 'eth']), keyword_matcher(['eth', 'btc']))
+        self.assertFalse(keyword_matcher([]).search("anything"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import os
+import json
+import time
+import shutil
+import tempfile
 import requests
 
 # Set dummy env vars for testing BEFORE importing the class
@@ -15,7 +19,7 @@ class TestKrakenAPI(unittest.TestCase):
 
     def setUp(self):
         """Set up a new KrakenAPI instance for each test."""
-        self.kraken_api = KrakenAPI()
+        self.kraken_api = KrakenAPI(pair_cache_path='')
 
     @patch('bot.kraken_api.KrakenAPI._query_api')
     def test_get_account_balance_success(self, mock_query_api):
@@ -61,6 +65,21 @@ class TestKrakenAPI(unittest.TestCase):
         self.assertEqual(prices, expected_prices)
         mock_query_api.assert_called_once_with('public', '/0/public/Ticker', {'pair': 'XXBTZUSD,XETHZUSD'})
 
+    @patch('bot.kraken_api.KrakenAPI._query_api')
+    def test_plan_prices_fall_back_per_pair(self, mock_query_api):
+        """Test that a rejected plan batch is re-priced pair by pair and unknown pairs are omitted."""
+        mock_query_api.side_effect = [
+            KrakenAPIError("EQuery:Unknown asset pair"),
+            {'XXBTZUSD': {'c': ['65000.00', '0.1']}},
+            KrakenAPIError("EQuery:Unknown asset pair"),
+        ]
+
+        prices = self.kraken_api.get_plan_prices(['XXBTZUSD', 'FAKEUSD', 'XXBTZUSD'])
+
+        self.assertEqual(prices, {'XXBTZUSD': {'price': 65000.00}})
+        self.assertEqual([c.args[2]['pair'] for c in mock_query_api.call_args_list],
+                         ['XXBTZUSD,FAKEUSD', 'XXBTZUSD', 'FAKEUSD'])
+
     def test_get_ticker_prices_invalid_input(self):
         """Test that get_ticker_prices raises error on invalid input."""
         with self.assertRaises(ValueError):
@@ -141,6 +160,286 @@ class TestKrakenAPI(unittest.TestCase):
             mock_sleep.assert_any_call(1) # 2**0
             mock_sleep.assert_any_call(2) # 2**1
 
+    def test_pooled_session_reused_across_calls(self):
+        """Test that public calls go through one pooled adapter and report connection reuse."""
+        body = json.dumps({'error': [], 'result': {'XXBTZUSD': {'c': ['65000.0', '0.1']}}}).encode()
+        sent = []
+
+        def fake_send(adapter, request, **kwargs):
+            sent.append((adapter, kwargs))
+            pool = adapter.poolmanager.connection_from_url(request.url)
+            if len(sent) == 1:
+                pool.num_connections += 1  # first request opens the keep-alive connection
+            response = requests.Response()
+            response.status_code = 200
+            response._content = body
+            response.url = request.url
+            response.request = request
+            return response
+
+        public_session = self.kraken_api._sessions['public']
+        public_adapter = public_session.get_adapter(self.kraken_api.base_url)
+        before = self.kraken_api.get_transport_stats()
+        with patch('requests.adapters.HTTPAdapter.send', autospec=True, side_effect=fake_send):
+            self.kraken_api.get_ticker_prices(['XXBTZUSD'])
+            self.kraken_api.get_ticker_prices(['XXBTZUSD'])
+
+        self.assertEqual(len(sent), 2)
+        self.assertIs(sent[0][0], public_adapter)
+        self.assertIs(sent[1][0], public_adapter)
+        self.assertIsNot(self.kraken_api._sessions['private'].get_adapter(self.kraken_api.base_url), public_adapter)
+        stats = self.kraken_api.get_transport_stats()
+        self.assertEqual(stats['public']['requests'] - before['public']['requests'], 2)
+        self.assertEqual(stats['public']['new_connections'] - before['public']['new_connections'], 1)
+        self.assertEqual(stats['public']['reused_connections'] - before['public']['reused_connections'], 1)
+        self.assertEqual(stats['private']['requests'], before['private']['requests'])
+        self.assertEqual(sent[0][1]['timeout'], self.kraken_api.timeout)
+
+    @patch('bot.kraken_api.KrakenAPI.get_ticker_prices')
+    @patch('bot.kraken_api.KrakenAPI.get_account_balance')
+    def test_portfolio_snapshot_shared_within_ttl(self, mock_balance, mock_prices):
+        """Test that repeated portfolio reads share one snapshot until it expires or is invalidated."""
+        mock_balance.return_value = {'USD': 100.0, 'ETH': 1.0}
+        mock_prices.return_value = {'XETHZUSD': {'price': 2000.0}}
+        self.kraken_api.asset_to_usd_pair_map = {'ETH': 'XETHZUSD'}
+
+        first = self.kraken_api.get_comprehensive_portfolio_context()
+        first['raw_balances']['ETH'] = 0.0  # callers get private copies
+        second = self.kraken_api.get_comprehensive_portfolio_context()
+
+        self.assertEqual(mock_balance.call_count, 1)
+        self.assertEqual(second['total_equity'], 2100.0)
+        self.assertEqual(second['raw_balances']['ETH'], 1.0)
+
+        # Forcing a refresh bypasses the snapshot
+        self.kraken_api.get_comprehensive_portfolio_context(max_age=0)
+        self.assertEqual(mock_balance.call_count, 2)
+
+    @patch('bot.kraken_api.KrakenAPI._query_api')
+    def test_live_order_invalidates_portfolio_snapshot(self, mock_query_api):
+        """Test that live orders drop the cached snapshot while validate-only orders keep it."""
+        mock_query_api.return_value = {'txid': ['ORDER_ID_123']}
+        self.kraken_api._portfolio_snapshot = MagicMock()
+
+        self.kraken_api.place_order('XBTUSD', 'buy', 0.1, validate=True)
+        self.assertIsNotNone(self.kraken_api._portfolio_snapshot)
+
+        self.kraken_api.place_order('XBTUSD', 'buy', 0.1)
+        self.assertIsNone(self.kraken_api._portfolio_snapshot)
+
+    def test_place_order_batch(self):
+        """Test the AddOrderBatch payload and per-order result mapping."""
+        api = self._api_with_pairs({'XXBTZUSD': {'altname': 'XBTUSD', 'wsname': 'XBT/USD', 'base': 'XXBT', 'quote': 'ZUSD',
+                                                 'lot_decimals': 8, 'tick_size': '0.1'}})
+        api._portfolio_snapshot = MagicMock()
+
+        with patch.object(KrakenAPI, '_query_api', return_value={'orders': [
+            {'txid': 'OA-1', 'descr': {'order': 'sell 0.10000000 XBTUSD @ market'}},
+            {'error': 'EOrder:Insufficient funds'},
+        ]}) as mock_query_api:
+            results = api.place_order_batch('XBTUSD', [
+                {'type': 'sell', 'volume': 0.1},
+                {'type': 'sell', 'volume': 0.25, 'ordertype': 'limit', 'price': 61000.04},
+            ])
+
+        mock_query_api.assert_called_once_with('private', '/0/private/AddOrderBatch', {
+            'pair': 'XBTUSD',
+            'orders[0][type]': 'sell', 'orders[0][ordertype]': 'market', 'orders[0][volume]': '0.10000000',
+            # Sell limit prices snap up to the tick grid
+            'orders[1][type]': 'sell', 'orders[1][ordertype]': 'limit', 'orders[1][volume]': '0.25000000',
+            'orders[1][price]': '61000.1',
+        })
+        self.assertEqual(results[0]['txid'], ['OA-1'])
+        self.assertEqual(results[1], {'error': ['EOrder:Insufficient funds']})
+        self.assertIsNone(api._portfolio_snapshot)
+        with self.assertRaises(ValueError):
+            api.place_order_batch('XBTUSD', [{'type': 'sell', 'volume': 0.1}])
+
+    def test_order_volumes_truncated_to_lot_decimals(self):
+        """Test that validate and live payloads carry the same safely truncated volume."""
+        api = self._api_with_pairs({'XETHZUSD': {'altname': 'ETHUSD', 'base': 'XETH', 'quote': 'ZUSD', 'lot_decimals': 4}})
+
+        with patch.object(KrakenAPI, '_query_api', return_value={}) as mock_query_api:
+            api.validate_order('ETHUSD', 'sell', 0.29999)
+            api.place_order('ETHUSD', 'sell', 0.29999)
+
+        volumes = [c.args[2]['volume'] if len(c.args) > 2 else c.kwargs['data']['volume'] for c in mock_query_api.call_args_list]
+        self.assertEqual(volumes, ['0.2999', '0.2999'])
+
+    def test_limit_orders_and_cancel(self):
+        """Test that limit prices are snapped to the tick on the safe side, post-only sets oflags and cancels hit CancelOrder."""
+        api = self._api_with_pairs({'XXBTZUSD': {'altname': 'XBTUSD', 'base': 'XXBT', 'quote': 'ZUSD', 'tick_size': '0.1'}})
+
+        with patch.object(KrakenAPI, '_query_api', return_value={}) as mock_query_api:
+            api.place_order('XBTUSD', 'buy', 0.01, ordertype='limit', price=61000.19)
+            api.place_order('XBTUSD', 'sell', 0.01, ordertype='limit', price=61000.11, post_only=True)
+            api.cancel_order('TX-1')
+
+        payloads = [c.args[2] for c in mock_query_api.call_args_list]
+        self.assertEqual([(p['ordertype'], p['price']) for p in payloads[:2]], [('limit', '61000.1'), ('limit', '61000.2')])
+        self.assertEqual([p.get('oflags') for p in payloads[:2]], [None, 'post'])
+        self.assertEqual(mock_query_api.call_args_list[2].args[1:], ('/0/private/CancelOrder', {'txid': 'TX-1'}))
+
+    @patch('bot.kraken_api.KrakenAPI.get_account_balance')
+    def test_failed_portfolio_build_is_not_cached(self, mock_balance):
+        """Test that an API failure returns the error context and is retried on the next read."""
+        mock_balance.side_effect = [Exception("EService:Unavailable"), {'USD': 50.0}]
+
+        failed = self.kraken_api.get_comprehensive_portfolio_context()
+        self.assertEqual(failed['total_equity'], 0.0)
+        self.assertIn("Error retrieving portfolio data", failed['portfolio_summary'])
+
+        recovered = self.kraken_api.get_comprehensive_portfolio_context()
+        self.assertEqual(recovered['cash_balance'], 50.0)
+
+    @patch('bot.kraken_api.requests.Session.post')
+    def test_rate_limit_exceeded_is_governor_feedback(self, mock_post):
+        """Test that EAPI:Rate limit exceeded paces the retry by counter decay instead of fixed backoff."""
+        limited_response = MagicMock()
+        limited_response.json.return_value = {'error': ['EAPI:Rate limit exceeded']}
+        limited_response.raise_for_status.return_value = None
+
+        success_response = MagicMock()
+        success_response.json.return_value = {'error': [], 'result': {'ZUSD': '100'}}
+        success_response.raise_for_status.return_value = None
+
+        mock_post.side_effect = [limited_response, success_response]
+
+        with patch('time.sleep') as mock_sleep:
+            balance = self.kraken_api.get_account_balance()
+            self.assertEqual(balance, {'USD': 100.0})
+            self.assertEqual(mock_post.call_count, 2)
+            mock_sleep.assert_called_once()
+            paced = mock_sleep.call_args[0][0]
+            self.assertGreater(paced, 0)
+            self.assertLessEqual(paced, 1 / self.kraken_api.rate_limiter.decay_per_second + 0.01)
+        self.assertEqual(self.kraken_api.rate_limiter.snapshot()['rate_limit_hits'], 1)
+
+    def test_asset_pairs_loaded_from_fresh_disk_cache(self):
+        """Test that a fresh pair cache avoids the AssetPairs download entirely."""
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        cache_path = os.path.join(cache_dir, 'pairs.json')
+        pairs = {'XETHZUSD': {'altname': 'ETHUSD', 'base': 'XETH', 'quote': 'ZUSD'}}
+
+        with patch.object(KrakenAPI, '_fetch_asset_pairs', return_value=pairs) as mock_fetch:
+            first = KrakenAPI(pair_cache_path=cache_path)
+            second = KrakenAPI(pair_cache_path=cache_path)
+
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.assertEqual(second.asset_pairs, pairs)
+        self.assertEqual(second.asset_to_usd_pair_map, {'ETH': 'XETHZUSD'})
+        self.assertEqual(first.asset_to_usd_pair_map, second.asset_to_usd_pair_map)
+
+    def test_stale_cache_survives_failed_refresh(self):
+        """Test that a stale cache is served immediately and kept when the background refresh fails."""
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        cache_path = os.path.join(cache_dir, 'pairs.json')
+        pairs = {'XXBTZUSD': {'altname': 'XBTUSD', 'base': 'XXBT', 'quote': 'ZUSD'}}
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'base_url': 'https://api.kraken.com', 'fetched_at': time.time() - 10 ** 6, 'asset_pairs': pairs}, f)
+
+        with patch.object(KrakenAPI, '_fetch_asset_pairs', side_effect=Exception("network down")):
+            api = KrakenAPI(pair_cache_path=cache_path)
+            api._pair_refresh_thread.join(timeout=5)
+
+        self.assertEqual(api.asset_pairs, pairs)
+        self.assertEqual(api.asset_to_usd_pair_map, {'XBT': 'XXBTZUSD'})
+
+    def test_stale_cache_refreshed_in_background(self):
+        """Test that a successful background refresh swaps in new pairs and rewrites the cache."""
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        cache_path = os.path.join(cache_dir, 'pairs.json')
+        old_pairs = {'XXBTZUSD': {'altname': 'XBTUSD', 'base': 'XXBT', 'quote': 'ZUSD'}}
+        new_pairs = dict(old_pairs, SOLUSD={'altname': 'SOLUSD', 'base': 'SOL', 'quote': 'ZUSD'})
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'base_url': 'https://api.kraken.com', 'fetched_at': 0, 'asset_pairs': old_pairs}, f)
+
+        with patch.object(KrakenAPI, '_fetch_asset_pairs', return_value=new_pairs):
+            api = KrakenAPI(pair_cache_path=cache_path)
+            api._pair_refresh_thread.join(timeout=5)
+
+        self.assertIn('SOL', api.asset_to_usd_pair_map)
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            self.assertIn('SOLUSD', json.load(f)['asset_pairs'])
+
+    def test_empty_pair_cache_path_disables_disk_cache(self):
+        """Test that pair_cache_path='' always fetches AssetPairs and never touches the default cache."""
+        pairs = {'XETHZUSD': {'altname': 'ETHUSD', 'base': 'XETH', 'quote': 'ZUSD'}}
+
+        with patch.object(KrakenAPI, '_fetch_asset_pairs', return_value=pairs) as mock_fetch, \
+                patch('bot.kraken_api.open', create=True) as mock_open:
+            api = KrakenAPI(pair_cache_path='')
+            KrakenAPI(pair_cache_path='')
+
+        self.assertEqual(api.pair_cache_path, '')
+        self.assertEqual(mock_fetch.call_count, 2)
+        mock_open.assert_not_called()
+        self.assertEqual(api.asset_pairs, pairs)
+
+    def _api_with_pairs(self, pairs: dict) -> KrakenAPI:
+        """Build a client whose AssetPairs come from `pairs`, cached in a throwaway directory."""
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        with patch.object(KrakenAPI, '_fetch_asset_pairs', return_value=pairs):
+            return KrakenAPI(pair_cache_path=os.path.join(cache_dir, 'pairs.json'))
+
+    def test_pair_specs_parsed_once_and_indexed(self):
+        """Test that pair rules are pre-parsed and resolvable by pair name, altname and wsname."""
+        pairs = {
+            'XXBTZUSD': {'altname': 'XBTUSD', 'wsname': 'XBT/USD', 'base': 'XXBT', 'quote': 'ZUSD',
+                         'ordermin': '0.0001', 'costmin': '0.5', 'lot_decimals': 8, 'pair_decimals': 1, 'tick_size': '0.1'},
+            'XTZUSD': {'altname': 'XTZUSD', 'wsname': 'XTZ/USD', 'base': 'XTZ', 'quote': 'ZUSD',
+                       'ordermin': '5', 'lot_decimals': 8, 'pair_decimals': 4},
+            'XXBTZEUR': {'altname': 'XBTEUR', 'wsname': 'XBT/EUR', 'base': 'XXBT', 'quote': 'ZEUR', 'ordermin': '0.0001'},
+        }
+        api = self._api_with_pairs(pairs)
+
+        spec = api.get_pair_spec('XBT/USD')
+        self.assertIs(spec, api.get_pair_spec('XXBTZUSD'))
+        self.assertIs(spec, api.get_pair_spec('XBTUSD'))
+        self.assertEqual((spec.ordermin, spec.costmin, spec.lot_decimals, spec.tick_size), (0.0001, 0.5, 8, 0.1))
+        self.assertEqual(spec.clean_base, 'XBT')
+        self.assertIs(api.pair_specs.for_base('XBT'), spec)
+        # Three-letter codes keep their leading X, matching balance keys
+        self.assertEqual(api.get_pair_spec('XTZUSD').clean_base, 'XTZ')
+        self.assertAlmostEqual(api.get_pair_spec('XTZUSD').tick_size, 0.0001)
+        self.assertIsNone(api.get_pair_spec('NOPEUSD'))
+
+        rules = api.get_all_usd_trading_rules()
+        self.assertEqual(set(rules), {'XXBTZUSD', 'XTZUSD'})
+        self.assertEqual(rules['XTZUSD']['base_asset'], 'XTZ')
+        self.assertEqual(rules['XTZUSD']['costmin'], 0.5)  # default when Kraken omits costmin
+
+    def test_normalize_pair_alias_index(self):
+        """Test that LLM/CoinGecko spellings resolve to official Kraken pairs through one alias index."""
+        pairs = {
+            'XXBTZUSD': {'altname': 'XBTUSD', 'wsname': 'XBT/USD', 'base': 'XXBT', 'quote': 'ZUSD'},
+            'XXBTZEUR': {'altname': 'XBTEUR', 'wsname': 'XBT/EUR', 'base': 'XXBT', 'quote': 'ZEUR'},
+            'XDGUSD': {'altname': 'XDGUSD', 'wsname': 'XDG/USD', 'base': 'XXDG', 'quote': 'ZUSD'},
+            'XETHZUSD': {'altname': 'ETHUSD', 'wsname': 'ETH/USD', 'base': 'XETH', 'quote': 'ZUSD'},
+            'SOLUSD': {'altname': 'SOLUSD', 'wsname': 'SOL/USD', 'base': 'SOL', 'quote': 'ZUSD'},
+            'ARUSD': {'altname': 'ARUSD', 'wsname': 'AR/USD', 'base': 'AR', 'quote': 'ZUSD'},
+        }
+        api = self._api_with_pairs(pairs)
+
+        for spelling in ('btc/usd', 'BTC-USD', 'XBTUSD', 'XBT/USD', 'XXBTZUSD', 'BTC'):
+            self.assertEqual(api.normalize_pair(spelling), 'XXBTZUSD', spelling)
+        self.assertEqual(api.normalize_pair('BTC/EUR'), 'XXBTZEUR')
+        self.assertEqual(api.normalize_pair('doge/usd'), 'XDGUSD')
+        self.assertEqual(api.normalize_pair('eth-usd'), 'XETHZUSD')
+        self.assertEqual(api.normalize_pair('solusd'), 'SOLUSD')
+        self.assertEqual(api.get_pair_spec('XDGUSD').symbol, 'DOGE')
+        # Fuzzy fallback catches typos but never guesses unrelated assets
+        self.assertEqual(api.normalize_pair('ETHUSDD'), 'XETHZUSD')
+        self.assertIsNone(api.normalize_pair('FAKEUSD'))
+        # A close spelling of a different coin is only a suggestion, never a resolution
+        self.assertIsNone(api.normalize_pair('ARBUSD'))
+        self.assertIn('ARUSD', api.suggest_pairs('ARBUSD'))
+        self.assertIn('SOLUSD', api.suggest_pairs('SOLUSDT'))
+
     def test_signature_generation(self):
         """
         Test the signature generation against a known example.
@@ -0,0 +1,64 @@
+import unittest
+
+from bot.kraken_rate_limiter import KrakenRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestKrakenRateLimiter(unittest.TestCase):
+    """Unit tests for the Kraken private call counter governor."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = KrakenRateLimiter(tier='starter', clock=self.clock)
+
+    def test_burst_within_limit_is_not_paced(self):
+        """Test that calls up to the tier maximum go out immediately."""
+        delays = [self.limiter.reserve('/0/private/Balance') for _ in range(15)]
+        self.assertEqual(delays, [0.0] * 15)
+
+    def test_calls_past_limit_wait_for_decay(self):
+        """Test that overflowing calls are queued at the decay rate."""
+        for _ in range(15):
+            self.limiter.reserve('/0/private/Balance')
+        first = self.limiter.reserve('/0/private/Balance')
+        second = self.limiter.reserve('/0/private/Balance')
+        self.assertAlmostEqual(first, 1 / 0.33)
+        self.assertAlmostEqual(second, 2 / 0.33)
+
+        # After the counter decays, calls fit again
+        self.clock.now += 60
+        self.assertEqual(self.limiter.reserve('/0/private/Balance'), 0.0)
+
+    def test_endpoint_costs(self):
+        """Test that history calls cost 2 and order placement is not counted."""
+        self.assertEqual(KrakenRateLimiter.cost('/0/private/Ledgers'), 2)
+        self.assertEqual(KrakenRateLimiter.cost('/0/private/TradesHistory'), 2)
+        self.assertEqual(KrakenRateLimiter.cost('/0/private/AddOrder'), 0)
+        self.assertEqual(KrakenRateLimiter.cost('/0/private/Balance'), 1)
+        for _ in range(20):
+            self.assertEqual(self.limiter.reserve('/0/private/AddOrder'), 0.0)
+        self.assertEqual(self.limiter.snapshot()['counter'], 0.0)
+
+    def test_rate_limit_feedback_pins_counter(self):
+        """Test that an exceeded response makes the next call wait for decay."""
+        self.limiter.on_rate_limited()
+        self.assertAlmostEqual(self.limiter.reserve('/0/private/Balance'), 1 / 0.33)
+        self.assertEqual(self.limiter.snapshot()['rate_limit_hits'], 1)
+
+    def test_tier_limits(self):
+        """Test that pro accounts get a larger, faster-decaying counter."""
+        pro = KrakenRateLimiter(tier='pro', clock=self.clock)
+        self.assertEqual((pro.max_counter, pro.decay_per_second), (20, 1.0))
+        unknown = KrakenRateLimiter(tier='platinum', clock=self.clock)
+        self.assertEqual(unknown.tier, 'starter')
+
+
+if __name__ == '__main__':
+    unittest.main()
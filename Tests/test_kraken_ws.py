@@ -0,0 +1,268 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from aiohttp import web
+
+# Set dummy env vars for testing BEFORE importing the class
+os.environ['KRAKEN_API_KEY'] = 'dummy_key'
+os.environ['KRAKEN_API_SECRET'] = 'ZHVtbXlzZWNyZXQ=' # b64encode(b'dummysecret')
+
+from bot.kraken_api import KrakenAPI
+from bot.kraken_ws import KrakenExecutionsFeed, KrakenWebSocketFeed, OrderStateTable
+
+
+class FakeExecutionsServer:
+    """Local stand-in for ws-auth.kraken.com: acks the subscription, then plays scripted messages."""
+
+    def __init__(self):
+        self.script: list[tuple[float, dict]] = []
+        self.subscriptions: list[dict] = []
+        self.drop_after_script = False
+        self.rejections: list[str] = []  # errors returned to the first subscribes, one per connection
+        self._ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    async def _handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscribe = await ws.receive_json()
+        self.subscriptions.append(subscribe)
+        if self.rejections:
+            await ws.send_json({'method': 'subscribe', 'success': False, 'error': self.rejections.pop(0)})
+            async for _ in ws:
+                pass
+            return ws
+        await ws.send_json({'method': 'subscribe', 'success': True, 'result': {'channel': 'executions'}})
+        for delay, message in self.script:
+            await asyncio.sleep(delay)
+            await ws.send_json(message)
+        if self.drop_after_script:
+            await ws.close()
+            return ws
+        async for _ in ws:
+            pass
+        return ws
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get('/v2', self._handler)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        self._loop.run_until_complete(site.start())
+        self.url = f"ws://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/v2"
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait(5)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+
+def execution(txid: str, status: str) -> dict:
+    return {'channel': 'executions', 'type': 'update', 'data': [{'order_id': txid, 'order_status': status, 'exec_type': 'trade'}]}
+
+
+class TestKrakenExecutionsFeed(unittest.TestCase):
+    """Unit tests for the executions WebSocket feed and event-driven order waits."""
+
+    def setUp(self):
+        self.server = FakeExecutionsServer()
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def _feed(self) -> KrakenExecutionsFeed:
+        feed = KrakenExecutionsFeed(lambda: 'token-123', url=self.server.url, reconnect_delay=0.05)
+        self.addCleanup(feed.stop)
+        return feed
+
+    def test_base_feed_is_abstract(self):
+        """Test that a feed without _subscriptions() cannot be built."""
+        with self.assertRaises(TypeError):
+            KrakenWebSocketFeed(self.server.url)
+
+    def test_stream_updates_order_table(self):
+        """Test that the subscription carries the token and pushed fills wake waiters immediately."""
+        self.server.script = [(0.05, execution('TX1', 'new')), (0.05, execution('TX1', 'filled'))]
+        feed = self._feed()
+
+        self.assertTrue(feed.start(wait_seconds=5))
+        started = time.monotonic()
+        statuses = feed.table.wait_for_closed(['TX1'], timeout_seconds=5, still_live=lambda: feed.is_live)
+
+        self.assertEqual(statuses, {'TX1': 'closed'})
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(self.server.subscriptions[0]['params']['channel'], 'executions')
+        self.assertEqual(self.server.subscriptions[0]['params']['token'], 'token-123')
+
+    def test_rejected_subscribe_reconnects_with_new_token(self):
+        """Test that a rejected subscribe closes the socket and resubscribes with a freshly fetched token."""
+        self.server.rejections = ['ESession:Invalid session']
+        calls = []
+
+        def token_provider(max_age=None):
+            calls.append(max_age)
+            return f"token-{len(calls)}"
+
+        feed = KrakenExecutionsFeed(token_provider, url=self.server.url, reconnect_delay=0.05)
+        self.addCleanup(feed.stop)
+
+        self.assertTrue(feed.start(wait_seconds=5))
+        self.assertEqual([sub['params']['token'] for sub in self.server.subscriptions], ['token-1', 'token-2'])
+        self.assertEqual(calls, [None, 0])
+
+    def test_permanent_subscribe_error_disables_stream(self):
+        """Test that a permission error stops the stream instead of reconnecting."""
+        self.server.rejections = ['EGeneral:Permission denied', 'EGeneral:Permission denied']
+        feed = self._feed()
+
+        self.assertFalse(feed.start(wait_seconds=0.5))
+        feed._thread.join(5)
+        self.assertFalse(feed._thread.is_alive())
+        self.assertEqual(len(self.server.subscriptions), 1)
+        self.assertFalse(feed.is_live)
+
+    def test_wait_for_orders_closed_uses_live_feed(self):
+        """Test that KrakenAPI waits on stream events, checking QueryOrders only once for unseen orders."""
+        self.server.script = [(0.1, execution('TX1', 'filled')), (0.0, execution('TX2', 'canceled'))]
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        with patch.object(KrakenAPI, '_fetch_asset_pairs', return_value={}):
+            api = KrakenAPI(pair_cache_path=os.path.join(cache_dir, 'pairs.json'))
+        api.executions_ws_url = self.server.url
+        self.addCleanup(api.close)
+
+        with patch.object(KrakenAPI, 'get_websockets_token', return_value='token-123'), \
+             patch.object(KrakenAPI, 'query_orders', return_value={}) as mock_query:
+            self.assertTrue(api.start_executions_feed(wait_seconds=5))
+            statuses = api.wait_for_orders_closed(['TX1', 'TX2'], timeout_seconds=5, poll_interval=0.01)
+
+        self.assertEqual(statuses, {'TX1': 'closed', 'TX2': 'canceled'})
+        mock_query.assert_called_once_with(['TX1', 'TX2'])
+
+    def test_start_executions_feed_does_not_block(self):
+        """Test that an unreachable stream is started once without blocking and waits poll immediately."""
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        with patch.object(KrakenAPI, '_fetch_asset_pairs', return_value={}):
+            api = KrakenAPI(pair_cache_path=os.path.join(cache_dir, 'pairs.json'))
+        api.executions_ws_url = 'ws://127.0.0.1:1/v2'
+        self.addCleanup(api.close)
+
+        with patch.object(KrakenAPI, 'get_websockets_token', return_value='token-123'), \
+             patch.object(KrakenAPI, 'query_orders', return_value={'TX1': {'status': 'closed'}}) as mock_query:
+            started = time.monotonic()
+            self.assertFalse(api.start_executions_feed())
+            feed = api.executions_feed
+            self.assertFalse(api.start_executions_feed())
+            statuses = api.wait_for_orders_closed(['TX1'], timeout_seconds=5, poll_interval=0.01)
+
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertIs(api.executions_feed, feed)
+        self.assertEqual(statuses, {'TX1': 'closed'})
+        mock_query.assert_called_once()
+
+    def test_websockets_token_reused_within_ttl(self):
+        """Test that stream reconnects reuse a fresh token unless max_age forces a new one."""
+        with patch.object(KrakenAPI, '_fetch_asset_pairs', return_value={}):
+            api = KrakenAPI(pair_cache_path='')
+
+        with patch.object(KrakenAPI, 'get_websockets_token', side_effect=['token-1', 'token-2', 'token-3']) as mock_token:
+            self.assertEqual(api._websockets_token(), 'token-1')
+            self.assertEqual(api._websockets_token(), 'token-1')
+            self.assertEqual(api._websockets_token(max_age=0), 'token-2')
+            api.ws_token_ttl = 0
+            self.assertEqual(api._websockets_token(), 'token-3')
+
+        self.assertEqual(mock_token.call_count, 3)
+
+    def test_dropped_stream_falls_back_to_polling(self):
+        """Test that a stream drop mid-wait reconciles order status through QueryOrders."""
+        self.server.script = [(0.05, execution('TX1', 'new'))]
+        self.server.drop_after_script = True
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        with patch.object(KrakenAPI, '_fetch_asset_pairs', return_value={}):
+            api = KrakenAPI(pair_cache_path=os.path.join(cache_dir, 'pairs.json'))
+        api.executions_feed = self._feed()
+        self.assertTrue(api.executions_feed.start(wait_seconds=5))
+
+        with patch.object(KrakenAPI, 'query_orders', return_value={'TX1': {'status': 'closed'}}) as mock_query:
+            statuses = api.wait_for_orders_closed(['TX1'], timeout_seconds=5, poll_interval=0.01)
+
+        self.assertEqual(statuses, {'TX1': 'closed'})
+        mock_query.assert_called()
+
+    def test_orders_unseen_by_live_feed_reconciled_via_rest(self):
+        """Test that an order that finished before the subscription is confirmed over REST, not waited out."""
+        with patch.object(KrakenAPI, '_fetch_asset_pairs', return_value={}):
+            api = KrakenAPI(pair_cache_path='')
+        api.executions_feed = MagicMock(is_live=True, connection_id=1, table=OrderStateTable())
+
+        started = time.monotonic()
+        with patch.object(KrakenAPI, 'query_orders', return_value={'TX1': {'status': 'closed', 'vol_exec': '0.5'}}) as mock_query:
+            statuses = api.wait_for_orders_closed(['TX1'], timeout_seconds=3)
+
+        self.assertEqual(statuses, {'TX1': 'closed'})
+        self.assertLess(time.monotonic() - started, 1)
+        mock_query.assert_called_once_with(['TX1'])
+        self.assertEqual(api.executions_feed.table.filled('TX1'), 0.5)
+
+    def test_open_orders_rechecked_via_rest_on_timeout(self):
+        """Test that orders still open when a live wait times out are re-checked with QueryOrders."""
+        with patch.object(KrakenAPI, '_fetch_asset_pairs', return_value={}):
+            api = KrakenAPI(pair_cache_path='')
+        table = OrderStateTable()
+        table.update('TX1', 'open')
+        api.executions_feed = MagicMock(is_live=True, connection_id=1, table=table)
+
+        with patch.object(KrakenAPI, 'query_orders', return_value={'TX1': {'status': 'closed'}}) as mock_query:
+            statuses = api.wait_for_orders_closed(['TX1'], timeout_seconds=0.1)
+
+        self.assertEqual(statuses, {'TX1': 'closed'})
+        mock_query.assert_called_once_with(['TX1'])
+
+    def test_table_forgets_oldest_finished_orders(self):
+        """Test that only the most recent finished orders are kept, while open ones stay."""
+        table = OrderStateTable(max_terminal=2)
+        table.update('OPEN', 'open')
+        for txid in ('TX1', 'TX2', 'TX3'):
+            table.update(txid, 'closed', 1.0)
+
+        self.assertEqual(table.snapshot(['OPEN', 'TX1', 'TX2', 'TX3']),
+                         {'OPEN': 'open', 'TX1': 'unknown', 'TX2': 'closed', 'TX3': 'closed'})
+        self.assertEqual(table.filled('TX1'), 0.0)
+
+    def test_wait_for_any_closed(self):
+        """Test that an any_closed wait returns on the first terminal order."""
+        table = OrderStateTable()
+        table.update('TX1', 'open')
+        threading.Timer(0.05, table.update, args=('TX2', 'closed')).start()
+        started = time.monotonic()
+        statuses = table.wait_for_closed(['TX1', 'TX2'], timeout_seconds=5, any_closed=True)
+        self.assertEqual(statuses, {'TX1': 'open', 'TX2': 'closed'})
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_terminal_status_is_not_overwritten(self):
+        """Test that a late 'open' echo cannot resurrect a finished order."""
+        table = OrderStateTable()
+        table.update('TX1', 'closed')
+        table.update('TX1', 'open')
+        self.assertEqual(table.snapshot(['TX1', 'TX2']), {'TX1': 'closed', 'TX2': 'unknown'})
+
+
+if __name__ == '__main__':
+    unittest.main()
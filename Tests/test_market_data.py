@@ -0,0 +1,211 @@
+import unittest
+from unittest.mock import patch
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from aiohttp import web
+
+# Set dummy env vars for testing BEFORE importing the class
+os.environ['KRAKEN_API_KEY'] = 'dummy_key'
+os.environ['KRAKEN_API_SECRET'] = 'ZHVtbXlzZWNyZXQ=' # b64encode(b'dummysecret')
+
+from bot.kraken_api import KrakenAPI
+from bot.kraken_ws import KrakenSubscriptionError
+from bot.market_data import KrakenMarketDataFeed, OrderBook, PriceBoard
+
+PAIRS = {
+    'XXBTZUSD': {'altname': 'XBTUSD', 'wsname': 'XBT/USD', 'base': 'XXBT', 'quote': 'ZUSD'},
+    'XETHZUSD': {'altname': 'ETHUSD', 'wsname': 'ETH/USD', 'base': 'XETH', 'quote': 'ZUSD'},
+}
+
+# Recorded-style v2 messages replayed per (channel, symbol) after each subscribe
+REPLAY = {
+    ('ticker', 'XBT/USD'): [
+        {'channel': 'ticker', 'type': 'snapshot', 'data': [{'symbol': 'XBT/USD', 'last': 60010.0, 'bid': 60000.0, 'ask': 60020.0}]},
+    ],
+    ('book', 'XBT/USD'): [
+        {'channel': 'book', 'type': 'snapshot', 'data': [{'symbol': 'XBT/USD',
+            'bids': [{'price': 60000.0, 'qty': 1.0}, {'price': 59990.0, 'qty': 2.0}],
+            'asks': [{'price': 60020.0, 'qty': 1.5}, {'price': 60030.0, 'qty': 3.0}]}]},
+        {'channel': 'book', 'type': 'update', 'data': [{'symbol': 'XBT/USD',
+            'bids': [{'price': 60005.0, 'qty': 0.5}], 'asks': [{'price': 60020.0, 'qty': 0.0}]}]},
+    ],
+    ('ticker', 'ETH/USD'): [
+        {'channel': 'ticker', 'type': 'snapshot', 'data': [{'symbol': 'ETH/USD', 'last': 4000.0, 'bid': 3999.0, 'ask': 4001.0}]},
+    ],
+}
+
+
+class ReplayMarketDataServer:
+    """Local stand-in for ws.kraken.com/v2 that replays canned ticker/book messages on subscribe."""
+
+    def __init__(self):
+        self.subscriptions: list[dict] = []
+        self._ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    async def _handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            subscribe = msg.json()
+            self.subscriptions.append(subscribe)
+            params = subscribe['params']
+            await ws.send_json({'method': 'subscribe', 'success': True, 'result': {'channel': params['channel']}})
+            for symbol in params['symbol']:
+                for message in REPLAY.get((params['channel'], symbol), []):
+                    await ws.send_json(message)
+        return ws
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get('/v2', self._handler)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        self._loop.run_until_complete(site.start())
+        self.url = f"ws://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/v2"
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait(5)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+
+def wait_until(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestOrderBook(unittest.TestCase):
+    """Unit tests for the in-memory L2 book."""
+
+    def test_updates_and_depth_trim(self):
+        """Test snapshot/update application, zero-qty removal and depth trimming."""
+        book = OrderBook(depth=2)
+        book.apply([{'price': 10, 'qty': 1}, {'price': 9, 'qty': 1}, {'price': 8, 'qty': 1}],
+                   [{'price': 11, 'qty': 1}, {'price': 12, 'qty': 1}], snapshot=True)
+        self.assertEqual(sorted(book.bids), [9.0, 10.0])
+        book.apply([{'price': 10, 'qty': 0}], [{'price': 10.5, 'qty': 2}])
+        self.assertEqual(book.best_bid, 9.0)
+        self.assertEqual(book.best_ask, 10.5)
+        self.assertAlmostEqual(book.mid, 9.75)
+
+
+class TestPriceBoard(unittest.TestCase):
+    """Unit tests for merged ticker/book quotes."""
+
+    def test_staleness_tracked_per_field(self):
+        """Test that a fresh book does not make an old last trade look fresh, and vice versa."""
+        board = PriceBoard()
+        now = [100.0]
+        with patch('bot.market_data.time.monotonic', side_effect=lambda: now[0]):
+            board.update_ticker('XBT/USD', last=60000.0, bid=59990.0, ask=60010.0)
+            now[0] = 110.0
+            board.update_book('XBT/USD', [{'price': 60100, 'qty': 1}], [{'price': 60110, 'qty': 1}], snapshot=True)
+            now[0] = 111.0
+            quote = board.quote('XBT/USD', max_age=5.0)
+
+        self.assertEqual(quote.price, 60000.0)
+        self.assertEqual((quote.age, quote.touch_age), (11.0, 1.0))
+        self.assertTrue(quote.stale)
+        self.assertEqual((quote.bid, quote.ask), (60100.0, 60110.0))
+        self.assertFalse(quote.touch_stale)
+
+        with patch('bot.market_data.time.monotonic', return_value=111.0):
+            book_only = PriceBoard()
+            book_only.update_book('ETH/USD', [{'price': 3999, 'qty': 1}], [{'price': 4001, 'qty': 1}], snapshot=True)
+            quote = book_only.quote('ETH/USD', max_age=5.0)
+        # Without a trade the price is the book mid and ages with the book
+        self.assertEqual((quote.price, quote.age, quote.stale), (4000.0, 0.0, False))
+
+
+class TestKrakenMarketDataFeed(unittest.TestCase):
+    """Tests for the market-data feed and KrakenAPI's local pricing against a replay server."""
+
+    def setUp(self):
+        self.server = ReplayMarketDataServer()
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def _api(self) -> KrakenAPI:
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        with patch.object(KrakenAPI, '_fetch_asset_pairs', return_value=PAIRS):
+            api = KrakenAPI(pair_cache_path=os.path.join(cache_dir, 'pairs.json'))
+        api.market_data_url = self.server.url
+        self.addCleanup(api.close)
+        return api
+
+    def test_price_board_from_ticker_and_book(self):
+        """Test that the board merges last trade with book top-of-book and tracks symbols while live."""
+        feed = KrakenMarketDataFeed(url=self.server.url, max_age=5.0, reconnect_delay=0.05)
+        self.addCleanup(feed.stop)
+        feed.track(['XBT/USD'])
+        self.assertTrue(feed.start(wait_seconds=5))
+        self.assertTrue(wait_until(lambda: (feed.board.book('XBT/USD') or {}).get('bids', [(0,)])[0][0] == 60005.0))
+
+        quote = feed.get_price('XBT/USD')
+        self.assertEqual(quote.price, 60010.0)
+        self.assertEqual((quote.bid, quote.ask), (60005.0, 60030.0))
+        self.assertFalse(quote.stale)
+        self.assertIsNone(feed.get_price('ETH/USD'))
+
+        feed.track(['ETH/USD'])
+        self.assertTrue(wait_until(lambda: feed.get_price('ETH/USD') is not None))
+        self.assertEqual(feed.get_price('ETH/USD').price, 4000.0)
+        self.assertTrue(feed.get_price('ETH/USD', max_age=0).stale)
+
+    def test_ticker_prices_served_from_board(self):
+        """Test that fresh board quotes replace the REST Ticker call and stale ones fall back to it."""
+        api = self._api()
+        self.assertTrue(api.start_market_data(['XBTUSD']))
+        self.assertTrue(wait_until(lambda: api.get_live_price('XBTUSD') is not None))
+
+        with patch.object(KrakenAPI, '_query_api') as mock_query:
+            prices = api.get_ticker_prices(['XBTUSD'])
+        self.assertEqual(prices['XXBTZUSD']['price'], 60010.0)
+        self.assertEqual(set(prices['XXBTZUSD']), {'price', 'bid', 'ask'})
+        mock_query.assert_not_called()
+
+        api.market_data.max_age = 0.0
+        with patch.object(KrakenAPI, '_query_api', return_value={'XETHZUSD': {'c': ['4000.5', '1']}}) as mock_query:
+            prices = api.get_ticker_prices(['ETHUSD'])
+        self.assertEqual(prices, {'XETHZUSD': {'price': 4000.5}})
+        mock_query.assert_called_once()
+        # REST-priced pairs are streamed from then on
+        self.assertIn('ETH/USD', api.market_data.symbols)
+
+    def test_unsupported_symbol_dropped_without_reconnect(self):
+        """Test that a symbol Kraken does not list is untracked while other rejections still reconnect."""
+        feed = KrakenMarketDataFeed(url=self.server.url)
+        feed.track(['XBT/USD', 'BAD/USD'])
+
+        feed._handle_message({'method': 'subscribe', 'success': False, 'symbol': 'BAD/USD',
+                              'error': 'Currency pair not supported BAD/USD'})
+        self.assertEqual(feed.symbols, {'XBT/USD'})
+
+        with self.assertRaises(KrakenSubscriptionError):
+            feed._handle_message({'method': 'subscribe', 'success': False, 'error': 'EGeneral:Internal error'})
+        self.assertEqual(feed.symbols, {'XBT/USD'})
+
+
+
+if __name__ == '__main__':
+    unittest.main()
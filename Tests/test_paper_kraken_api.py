@@ -0,0 +1,109 @@
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from bot.kraken_api import KrakenAPI
+from bot.paper_kraken_api import PaperKrakenAPI
+from bot.trade_executor import TradeExecutor
+
+ASSET_PAIRS = {
+    'XXBTZUSD': {'altname': 'XBTUSD', 'wsname': 'XBT/USD', 'base': 'XXBT', 'quote': 'ZUSD',
+                 'ordermin': '0.0001', 'costmin': '0.5', 'lot_decimals': 8, 'pair_decimals': 1, 'tick_size': '0.1'},
+    'XETHZUSD': {'altname': 'ETHUSD', 'wsname': 'ETH/USD', 'base': 'XETH', 'quote': 'ZUSD',
+                 'ordermin': '0.002', 'costmin': '0.5', 'lot_decimals': 8, 'pair_decimals': 2, 'tick_size': '0.01'},
+}
+
+
+class TestPaperKrakenAPI(unittest.TestCase):
+    """Unit tests for the in-process paper exchange."""
+
+    def setUp(self):
+        self.api = PaperKrakenAPI(ASSET_PAIRS, balances={'ZUSD': 1000.0}, maker_fee=0.001, taker_fee=0.002, spread_bps=0)
+        self.api.set_book('XBTUSD', bids=[(59990.0, 1.0)], asks=[(60000.0, 1.0)], last=59995.0)
+
+    def test_constructed_through_kraken_api_init_without_network(self):
+        """Test that the paper client runs KrakenAPI.__init__ without credentials, fetches or feeds."""
+        with patch.dict(os.environ, {'KRAKEN_API_KEY': '', 'KRAKEN_API_SECRET': '', 'KRAKEN_WS_EXECUTIONS': '1'}), \
+             patch.object(KrakenAPI, '_fetch_asset_pairs') as mock_fetch:
+            api = PaperKrakenAPI(ASSET_PAIRS)
+
+        mock_fetch.assert_not_called()
+        self.assertEqual(api._sessions, {})
+        self.assertFalse(api.start_executions_feed())
+        self.assertFalse(api.start_market_data())
+        self.assertEqual(api.get_pair_spec('XBT/USD').name, 'XXBTZUSD')
+
+    def test_market_order_settles_balances_and_portfolio(self):
+        """Test that a market buy fills at the ask, pays the taker fee and shows up in the portfolio."""
+        response = self.api.place_order('XBTUSD', 'buy', 0.01)
+        txid = response['txid'][0]
+
+        self.assertEqual(self.api.wait_for_orders_closed([txid], timeout_seconds=1), {txid: 'closed'})
+        balances = self.api.get_balances()
+        self.assertAlmostEqual(balances['XBT'], 0.01)
+        self.assertAlmostEqual(balances['USD'], 1000.0 - 600.0 - 1.2)
+
+        ctx = self.api.get_comprehensive_portfolio_context()
+        self.assertAlmostEqual(ctx['cash_balance'], 398.8)
+        self.assertAlmostEqual(ctx['usd_values']['XBT']['value'], 0.01 * 59995.0)
+
+    def test_orders_checked_like_kraken(self):
+        """Test that ordermin, costmin and funds are enforced and validate=true places nothing."""
+        self.assertEqual(self.api.validate_order('XBTUSD', 'buy', 0.01), (True, []))
+        self.assertEqual(self.api.engine.open_orders(), {})
+
+        cases = [
+            (0.00001, 'EOrder:Order minimum not met'),
+            (0.1, 'EOrder:Insufficient funds'),
+        ]
+        for volume, error in cases:
+            ok, errors = self.api.validate_order('XBTUSD', 'buy', volume)
+            self.assertFalse(ok)
+            self.assertIn(error, errors[0])
+        ok, errors = self.api.validate_order('XBTUSD', 'sell', 0.001)
+        self.assertIn('EOrder:Insufficient funds', errors[0])
+        with self.assertRaises(Exception):
+            self.api.place_order('DOGEUSD', 'buy', 100)
+
+    def test_candle_fills_resting_limit_as_maker(self):
+        """Test that an OHLC candle trading through a resting limit fills it at its price."""
+        txid = self.api.place_order('XBTUSD', 'buy', 0.01, ordertype='limit', price=59000.0)['txid'][0]
+        self.assertEqual(self.api.query_orders([txid])[txid]['status'], 'open')
+        # The hold makes the order's cash unavailable to other orders
+        self.assertFalse(self.api.validate_order('XBTUSD', 'buy', 0.0075)[0])
+
+        self.api.apply_candle('XBTUSD', 59995.0, 60100.0, 58900.0, 59500.0)
+
+        info = self.api.query_orders([txid])[txid]
+        self.assertEqual((info['status'], info['vol_exec']), ('closed', '0.01000000'))
+        self.assertAlmostEqual(self.api.get_balances()['USD'], 1000.0 - 590.0 - 0.59)
+        self.assertEqual(self.api.get_ticker_prices(['XBTUSD']), {'XXBTZUSD': {'price': 59500.0, 'bid': 59500.0, 'ask': 59500.0}})
+
+    def test_unknown_books_seeded_from_price_source(self):
+        """Test that pairs without a book are priced once from price_source."""
+        source = MagicMock(return_value={'XETHZUSD': {'price': 4000.0}})
+        api = PaperKrakenAPI(ASSET_PAIRS, balances={'USD': 100.0}, price_source=source)
+
+        self.assertEqual(api.get_ticker_prices(['ETHUSD']), {'XETHZUSD': {'price': 4000.0, 'bid': 3998.0, 'ask': 4002.0}})
+        api.get_ticker_prices(['ETHUSD'])
+        source.assert_called_once_with(['XETHZUSD'])
+
+    def test_trade_executor_runs_against_paper_exchange(self):
+        """Test a full two-phase execution cycle end to end without network access."""
+        self.api.set_book('ETHUSD', bids=[(3999.0, 10.0)], asks=[(4000.0, 10.0)], last=4000.0)
+        executor = TradeExecutor(self.api)
+
+        results = executor.execute_trades({'trades': [
+            {'pair': 'ETH/USD', 'action': 'buy', 'volume': 0.1, 'reasoning': 'test'},
+            {'pair': 'BTC/USD', 'action': 'buy', 'volume': 0.005, 'reasoning': 'test'},
+        ]})
+
+        self.assertEqual([r['status'] for r in results], ['success', 'success'])
+        balances = self.api.get_balances()
+        self.assertAlmostEqual(balances['ETH'], 0.1)
+        self.assertAlmostEqual(balances['XBT'], 0.005)
+        self.assertAlmostEqual(self.api.fees_paid, (400.0 + 300.0) * 0.002)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from bot.pair_specs import PairSpec
+from bot.plan_sizing import size_plan, size_trades
+
+
+class TestPlanSizing(unittest.TestCase):
+    """Unit tests for the vectorized plan sizing engine."""
+
+    def test_allocations_and_volumes_in_one_pass(self):
+        """Test volume, notional and rounding for mixed allocation/volume trades."""
+        sizing = size_plan(
+            ['XXBTZUSD', 'XETHZUSD', 'SOLUSD'],
+            ['buy', 'sell', 'buy'],
+            prices=[50000.0, 2500.0, 0.0],
+            lot_decimals=[8, 4, 8],
+            ordermin=[0.0001, 0.002, 0.02],
+            costmin=[0.5, 0.5, 0.5],
+            portfolio_value=1000.0,
+            allocations=[0.2, None, 0.1],
+            volumes=[None, 0.123456, None],
+        )
+
+        np.testing.assert_allclose(sizing.volumes, [0.004, 0.1234, 0.0])
+        np.testing.assert_allclose(sizing.notional, [200.0, 308.5, 0.0])
+        self.assertEqual(sizing.priced.tolist(), [True, True, False])
+        self.assertEqual(sizing.row(1)['action'], 'sell')
+        self.assertEqual(sizing.micro_threshold, 50.0)
+
+    def test_minimums_micro_and_uplift_flags(self):
+        """Test min-size violations, micro-trade flags and which BUYs can be uplifted."""
+        sizing = size_plan(
+            ['A', 'B', 'C', 'D'],
+            ['buy', 'buy', 'sell', 'buy'],
+            prices=[100.0, 100.0, 100.0, 100.0],
+            lot_decimals=[8, 8, 8, 8],
+            ordermin=[0.5, 5.0, 0.5, 0.1],
+            costmin=[0.0, 0.0, 0.0, 60.0],
+            portfolio_value=1000.0,
+            allocations=[0.01, 0.01, 0.01, 0.05],
+            available_cash=100.0,
+        )
+
+        self.assertEqual(sizing.below_ordermin.tolist(), [True, True, True, False])
+        self.assertEqual(sizing.below_min_usd.tolist(), [True, True, True, True])
+        self.assertEqual(sizing.micro.tolist(), [True, True, True, False])
+        # B needs $500 (> cash), C is a sell, D needs its $60 costmin
+        self.assertEqual(sizing.upliftable.tolist(), [True, False, False, True])
+        np.testing.assert_allclose(sizing.effective_min_usd, [50.0, 500.0, 50.0, 60.0])
+
+    def test_specs_supply_rules(self):
+        """Test that size_trades reads lot precision and minimums from PairSpecs."""
+        spec = PairSpec('XXBTZUSD', {'ordermin': '0.0001', 'costmin': '0.5', 'lot_decimals': 3})
+        sizing = size_trades(['XXBTZUSD', 'NEWUSD'], ['buy', 'buy'], [spec, None], [60000.0, 1.0],
+                             portfolio_value=100.0, allocations=[0.7, 0.5])
+        np.testing.assert_allclose(sizing.volumes, [0.001, 50.0])
+        np.testing.assert_allclose(sizing.ordermin, [0.0001, 0.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
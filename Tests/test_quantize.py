@@ -0,0 +1,41 @@
+import unittest
+from decimal import Decimal
+
+import numpy as np
+
+from bot.quantize import format_price, format_volume, quantize_price, quantize_volume, quantize_volumes
+
+
+class TestQuantize(unittest.TestCase):
+    """Unit tests for exact order volume and price quantization."""
+
+    def test_volume_truncates_toward_zero(self):
+        """Test that volumes never round up past what was sized and carry no float noise."""
+        self.assertEqual(quantize_volume(0.123456789, 8), Decimal('0.12345678'))
+        self.assertEqual(quantize_volume(0.99999, 4), Decimal('0.9999'))
+        self.assertEqual(quantize_volume(0.29, 2), Decimal('0.29'))
+        self.assertEqual(quantize_volume(-1.5, 3), Decimal('0.000'))
+        self.assertEqual(format_volume(0.1, 8), '0.10000000')
+        self.assertEqual(format_volume(12, 0), '12')
+
+    def test_price_rounds_to_safe_side_of_tick(self):
+        """Test that buys snap down and sells snap up to the tick grid."""
+        self.assertEqual(quantize_price(61000.07, 0.1, 'buy'), Decimal('61000.0'))
+        self.assertEqual(quantize_price(61000.01, 0.1, 'sell'), Decimal('61000.1'))
+        self.assertEqual(quantize_price(0.123456, 0.00025, 'buy'), Decimal('0.12325'))
+        self.assertEqual(format_price(2500.5, 0.5, 'sell'), '2500.5')
+
+    def test_bulk_matches_scalar(self):
+        """Test that the vectorized path agrees with the Decimal path, including float-noise cases."""
+        rng = np.random.default_rng(7)
+        volumes = np.concatenate([rng.uniform(0, 100, 2000), [0.29, 0.57, 1.005, 2.675, 0.0]])
+        lots = np.resize([0, 2, 4, 5, 8], len(volumes))
+
+        bulk = quantize_volumes(volumes, lots)
+
+        expected = [float(quantize_volume(v, d)) for v, d in zip(volumes.tolist(), lots.tolist())]
+        self.assertEqual(bulk.tolist(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+
+import numpy as np
+
+from bot.rebalance import plan_rebalance
+
+
+def rebalance(**overrides):
+    params = dict(
+        pairs=['XXBTZUSD', 'XETHZUSD', 'SOLUSD', 'XDGUSD'],
+        holdings=[0.01, 1.0, 0.0, 1000.0],
+        prices=[50000.0, 2000.0, 100.0, 0.1],
+        target_weights=[0.3, 0.2, 0.2, 0.0],
+        cash=2400.0,
+        lot_decimals=[8, 8, 8, 2],
+        ordermin=[0.0001, 0.002, 0.02, 50.0],
+        costmin=[0.5, 0.5, 0.5, 0.5],
+        min_trade_usd=20.0,
+    )
+    params.update(overrides)
+    return plan_rebalance(**params)
+
+
+class TestRebalance(unittest.TestCase):
+    """Unit tests for the target-weight rebalance engine."""
+
+    def test_minimal_orders_toward_targets(self):
+        """Test drift inside the band is left alone, exits sell everything and sells come first."""
+        # Equity $5000: BTC 10% -> 30%, ETH 40% -> 20%, SOL 0% -> 20%, DOGE 2% -> exit (inside the band)
+        plan = rebalance()
+
+        self.assertAlmostEqual(plan.equity, 5000.0)
+        np.testing.assert_allclose(plan.volumes, [0.02, -0.5, 10.0, -1000.0])
+        trades = plan.trades()
+        self.assertEqual([t['action'] for t in trades], ['sell', 'sell', 'buy', 'buy'])
+        self.assertEqual({t['pair'] for t in trades[:2]}, {'XETHZUSD', 'XDGUSD'})
+        self.assertEqual(plan.buy_scale, 1.0)
+
+        # BTC at 29% of equity is within the 2-point band: no order
+        plan = rebalance(target_weights=[0.11, 0.2, 0.2, 0.0])
+        self.assertEqual(plan.volumes[0], 0.0)
+
+    def test_orders_below_minimums_are_not_emitted(self):
+        """Test that orders under min_trade_usd or ordermin are dropped instead of churned."""
+        # ETH +$50 is under the $150 floor; SOL +$200 clears it
+        plan = rebalance(target_weights=[0.1, 0.41, 0.04, 0.02], band=0.001, min_trade_usd=150.0)
+        np.testing.assert_allclose(plan.volumes, [0.0, 0.0, 2.0, 0.0])
+        self.assertEqual(len(plan.trades()), 1)
+
+    def test_buys_scaled_to_cash_fees_and_buffer(self):
+        """Test that buys shrink together when cash plus proceeds cannot fund them."""
+        plan = rebalance(holdings=[0.0, 0.0, 0.0, 0.0], cash=1000.0, target_weights=[0.6, 0.4, 0.0, 0.0],
+                         fee_rate=0.01, cash_buffer=0.05)
+        # Targets sum to 1.0 > 0.95 investable, then $950 of buys need $959.50 with fees
+        self.assertAlmostEqual(plan.target_weights.sum(), 0.95)
+        self.assertLess(plan.buy_scale, 1.0)
+        spent = float((plan.volumes * plan.prices).sum()) * 1.01
+        self.assertLessEqual(spent, 950.0 + 1e-9)
+
+    def test_weights_are_fractions_of_total_equity(self):
+        """Test that holdings outside the targets count toward equity."""
+        # $1000 cash + $5000 of ETH (not targeted): 50% BTC is $3000, not half the cash
+        plan = plan_rebalance(['XXBTZUSD'], [0.0], [50000.0], [0.5], 1000.0, [8], [0.0001], [0.5],
+                              min_trade_usd=20.0, equity=6000.0)
+
+        self.assertAlmostEqual(plan.equity, 6000.0)
+        self.assertAlmostEqual(plan.current_weights[0], 0.0)
+        # Cash ($1000 less the 1% buffer on $6000) caps the $3000 buy
+        self.assertAlmostEqual(plan.buy_scale, 940.0 / (3000.0 * 1.0026))
+        self.assertAlmostEqual(plan.volumes[0], 0.0188, places=4)
+
+        # Without it only cash counts and the buy is sized on $1000
+        self.assertAlmostEqual(plan_rebalance(['XXBTZUSD'], [0.0], [50000.0], [0.5], 1000.0, [8], [0.0001], [0.5],
+                                              min_trade_usd=20.0).equity, 1000.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,12 +2,17 @@ import unittest
 import os
 import tempfile
 import shutil
+import sqlite3
 import json
+import time
+import feedparser
+import requests
 from unittest.mock import patch, Mock, MagicMock
 from datetime import datetime, timedelta
 import xml.etree.ElementTree as ET
 
-from bot.research_agent import ResearchAgent, ResearchAgentError
+from bot.research_agent import HostThrottle, ResearchAgent, ResearchAgentError
+from bot.url_dedup import UrlDedupStore
 
 
 class TestResearchAgent(unittest.TestCase):
@@ -19,6 +24,7 @@ class TestResearchAgent(unittest.TestCase):
     
     def tearDown(self):
         """Clean up test fixtures."""
+        self.research_agent.close()
         shutil.rmtree(self.test_dir, ignore_errors=True)
     
     def test_initialization(self):
@@ -34,11 +40,11 @@ class TestResearchAgent(unittest.TestCase):
     def test_load_cache_empty(self):
         """Test loading cache when no cache file exists."""
         cache = self.research_agent._load_cache()
-        self.assertIsInstance(cache, set)
+        self.assertIsInstance(cache, UrlDedupStore)
         self.assertEqual(len(cache), 0)
     
     def test_load_cache_existing(self):
-        """Test loading cache from existing file."""
+        """Test that URLs from a legacy research_cache.json are imported into the dedup store."""
         # Create a test cache file
         cache_data = {
             'processed_urls': ['http://example.com/1', 'http://example.com/2'],
@@ -52,13 +58,29 @@ class TestResearchAgent(unittest.TestCase):
         agent = ResearchAgent(logs_dir=self.test_dir)
         cache = agent._load_cache()
         
-        self.assertIsInstance(cache, set)
+        self.assertIsInstance(cache, UrlDedupStore)
+        self.assertFalse(os.path.exists(cache_path))
         self.assertEqual(len(cache), 2)
         self.assertIn('http://example.com/1', cache)
         self.assertIn('http://example.com/2', cache)
     
+    def test_load_cache_reuses_one_connection(self):
+        """Test that the agent owns a single dedup store and close() releases it."""
+        store = self.research_agent.processed_urls
+
+        with patch('bot.research_agent.UrlDedupStore') as mock_store:
+            self.assertIs(self.research_agent._load_cache(), store)
+            self.assertIs(self.research_agent._load_cache(), store)
+        mock_store.assert_not_called()
+
+        self.research_agent.close()
+        self.assertIsNone(self.research_agent.processed_urls)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            len(store)
+        self.research_agent.close()  # idempotent
+
     def test_save_cache(self):
-        """Test saving cache to file."""
+        """Test that processed URLs persist across agents."""
         # Add some URLs to the cache
         self.research_agent.processed_urls.add('http://example.com/1')
         self.research_agent.processed_urls.add('http://example.com/2')
@@ -66,18 +88,13 @@ class TestResearchAgent(unittest.TestCase):
         # Save cache
         self.research_agent._save_cache()
         
-        # Verify file exists and contains correct data
-        cache_path = os.path.join(self.test_dir, 'research_cache.json')
-        self.assertTrue(os.path.exists(cache_path))
-        
-        with open(cache_path, 'r', encoding='utf-8') as f:
-            cache_data = json.load(f)
+        # Verify the store exists and a new agent sees the same URLs
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, 'research_urls.sqlite3')))
         
-        self.assertIn('processed_urls', cache_data)
-        self.assertIn('last_updated', cache_data)
-        self.assertEqual(len(cache_data['processed_urls']), 2)
-        self.assertIn('http://example.com/1', cache_data['processed_urls'])
-        self.assertIn('http://example.com/2', cache_data['processed_urls'])
+        cache = ResearchAgent(logs_dir=self.test_dir).processed_urls
+        self.assertEqual(len(cache), 2)
+        self.assertIn('http://example.com/1', cache)
+        self.assertIn('http://example.com/2', cache)
     
     def test_is_recent_article_true(self):
         """Test recent article detection with recent date."""
@@ -241,6 +258,103 @@ class TestResearchAgent(unittest.TestCase):
         self.assertIn("temporarily unavailable", report)
         self.assertIn("Market data available", report)
     
+    def test_fetch_from_rss_runs_feeds_concurrently(self):
+        """Test that feeds download in parallel and keep the per-feed headline limit."""
+        topics = {'feed0': 'miners', 'feed1': 'whales', 'feed2': 'options', 'feed3': 'treasuries'}
+
+        def slow_feed(feed_url, headers=None):
+            time.sleep(0.3)
+            topic = topics[feed_url.split('//')[1].split('.')[0]]
+            items = "".join(
+                f"<item><title>Bitcoin {topic} {i}</title><link>{feed_url}/{i}</link></item>" for i in range(5)
+            )
+            return 200, {}, f'<?xml version="1.0"?><rss version="2.0"><channel>{items}</channel></rss>'.encode('utf-8')
+
+        feeds = [f"http://feed{i}.example.com/rss" for i in range(4)]
+        with patch.object(ResearchAgent, '_download_feed', side_effect=slow_feed):
+            started = time.monotonic()
+            headlines = self.research_agent._fetch_from_rss(feeds, ['bitcoin'], 'test news')
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 0.9)
+        self.assertEqual(len(headlines), 4 * 3)
+        for i in range(4):
+            self.assertEqual(sum(f"feed{i}.example.com/rss/" in h for h in headlines), 3)
+
+    def test_fetch_from_rss_collapses_near_duplicates_across_feeds(self):
+        """Test that one story carried by several feeds becomes one headline without using up a slot."""
+        stories = [
+            ('http://a.example.com/rss', ["Bitcoin hits all-time high above $120K"]),
+            ('http://b.example.com/rss', ["Bitcoin Hits New All-Time High Above $120K as ETF Inflows Surge",
+                                          "Miners sell record BTC reserves", "Coinbase lists DeFi tokens",
+                                          "Ethereum developers schedule Fusaka upgrade"]),
+        ]
+        feeds = []
+        for feed_url, titles in stories:
+            items = "".join(f"<item><title>{t}</title><link>{feed_url}/{i}</link></item>" for i, t in enumerate(titles))
+            feed = feedparser.parse(f'<?xml version="1.0"?><rss version="2.0"><channel>{items}</channel></rss>')
+            feeds.append((feed_url, feed_url.split('//')[1].split('/')[0], feed))
+
+        with patch.object(ResearchAgent, '_iter_feeds', return_value=iter(feeds)):
+            headlines = self.research_agent._fetch_from_rss([url for url, _ in stories], ['bitcoin', 'btc', 'defi', 'ethereum'], 'test news')
+
+        self.assertEqual(headlines[0], '- [A.Example.Com] Bitcoin hits all-time high above $120K '
+                                       '([Link](http://a.example.com/rss/0)) [also: B.Example.Com]')
+        self.assertEqual(len(headlines), 4)
+        self.assertIn("Fusaka", headlines[-1])
+
+    def test_host_throttle_spaces_requests_per_host(self):
+        """Test that one host's requests are spaced out while other hosts go straight through."""
+        clock = Mock(return_value=100.0)
+        throttle = HostThrottle(1.0, clock=clock)
+
+        self.assertEqual(throttle.reserve('feeds.npr.org'), 0.0)
+        self.assertEqual(throttle.reserve('feeds.npr.org'), 1.0)
+        self.assertEqual(throttle.reserve('feeds.npr.org'), 2.0)
+        self.assertEqual(throttle.reserve('reason.com'), 0.0)
+        clock.return_value = 103.5
+        self.assertEqual(throttle.reserve('feeds.npr.org'), 0.0)
+
+    def test_download_feed_enforces_deadline(self):
+        """Test that a feed still trickling in after its deadline is abandoned."""
+        response = MagicMock(status_code=200, headers={'ETag': '"v1"'})
+        response.__enter__.return_value = response
+        response.iter_content.return_value = iter([b"<rss>", b"</rss>"])
+        session = Mock()
+        session.get.return_value = response
+
+        with patch.object(self.research_agent, '_get_feed_session', return_value=session):
+            with self.assertRaises(requests.exceptions.Timeout):
+                self.research_agent._download_feed('http://slow.example.com/rss', deadline_seconds=-1)
+            response.iter_content.return_value = iter([b"<rss>", b"</rss>"])
+            self.assertEqual(self.research_agent._download_feed('http://slow.example.com/rss'),
+                             (200, {'ETag': '"v1"'}, b"<rss></rss>"))
+
+    def test_unchanged_feeds_come_from_the_feed_cache(self):
+        """Test that 304s and identical bodies reuse the cached entries without parsing."""
+        body = b'<?xml version="1.0"?><rss version="2.0"><channel><item><title>Bitcoin rallies</title><link>http://x/1</link></item></channel></rss>'
+        responses = [(200, {'ETag': '"v1"'}, body), (304, {}, b''), (200, {}, body)]
+        download = Mock(side_effect=lambda url, headers=None: responses.pop(0))
+        self.research_agent.feed_cache.fresh_seconds = -1  # force a request on every lookup
+
+        with patch.object(self.research_agent, '_download_feed', download), \
+                patch('bot.research_agent.feedparser.parse', wraps=feedparser.parse) as parse:
+            for _ in range(3):
+                headlines = self.research_agent._fetch_from_rss(['http://feed.example.com/rss'], ['bitcoin'], 'test', bypass_cache=True)
+                self.assertEqual(headlines, ['- [Feed.Example.Com] Bitcoin rallies ([Link](http://x/1))'])
+
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(download.call_args_list[1].kwargs['headers'], {'If-None-Match': '"v1"'})
+        stats = self.research_agent.feed_cache_stats()
+        self.assertEqual(stats['feeds']['http://feed.example.com/rss']['not_modified'], 1)
+        self.assertEqual(stats['feeds']['http://feed.example.com/rss']['unchanged'], 1)
+        self.assertEqual(stats['bytes_saved'], len(body))
+        self.assertAlmostEqual(stats['hit_ratio'], 0.667)
+        # Validators and entries persist for the next agent
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, 'rss_feed_cache.json')))
+        self.assertEqual(ResearchAgent(logs_dir=self.test_dir).feed_cache.validators('http://feed.example.com/rss'),
+                         {'If-None-Match': '"v1"'})
+
     def test_fetch_market_summary(self):
         """Test market summary fetching (placeholder method)."""
         summary = self.research_agent._fetch_market_summary()
@@ -24,6 +24,7 @@ import json
 import time
 from datetime import datetime
 from bot.research_agent import ResearchAgent, ResearchAgentError
+from bot.url_dedup import UrlDedupStore
 
 
 class LiveResearchAgentTest(unittest.TestCase):
@@ -87,7 +88,7 @@ class LiveResearchAgentTest(unittest.TestCase):
         
         # Test empty cache
         initial_cache = self.research_agent._load_cache()
-        self.assertIsInstance(initial_cache, set)
+        self.assertIsInstance(initial_cache, UrlDedupStore)
         print(f"✅ Empty cache loaded: {len(initial_cache)} URLs")
         
         # Add some test URLs
@@ -111,11 +112,9 @@ class LiveResearchAgentTest(unittest.TestCase):
         print(f"✅ Cache reloaded: {len(reloaded_cache)} URLs found")
         
         # Show cache file
-        cache_path = os.path.join(self.test_dir, 'research_cache.json')
+        cache_path = os.path.join(self.test_dir, 'research_urls.sqlite3')
         if os.path.exists(cache_path):
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-            print(f"📄 Cache file size: {len(json.dumps(cache_data))} bytes")
+            print(f"📄 Cache file size: {os.path.getsize(cache_path)} bytes")
     
     def test_03_date_filtering(self):
         """Test date filtering functionality."""
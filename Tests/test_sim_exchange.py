@@ -0,0 +1,56 @@
+import unittest
+
+from bot.sim_exchange import POST_ONLY_REJECT, SimMatchingEngine
+
+
+class TestSimMatchingEngine(unittest.TestCase):
+    """Unit tests for the in-process matching engine."""
+
+    def setUp(self):
+        self.engine = SimMatchingEngine(maker_fee=0.001, taker_fee=0.002)
+        self.engine.set_book('XBTUSD', bids=[(99.0, 1.0), (98.0, 5.0)], asks=[(101.0, 1.0), (102.0, 5.0)])
+
+    def test_market_order_walks_the_book(self):
+        """Test that market orders take level by level and pay the taker fee."""
+        txid = self.engine.add_order('XBTUSD', 'buy', 2.0)
+        order = self.engine.order(txid)
+
+        self.assertEqual(order.status, 'closed')
+        self.assertAlmostEqual(order.cost, 101.0 + 102.0)
+        self.assertAlmostEqual(order.fee, 203.0 * 0.002)
+        self.assertEqual(self.engine.book('XBTUSD')['asks'], [(102.0, 4.0)])
+        self.assertEqual(self.engine.query([txid])[txid]['vol_exec'], '2.00000000')
+
+    def test_post_only_rejected_when_crossing(self):
+        """Test that a post-only order that would take liquidity is canceled on arrival."""
+        txid = self.engine.add_order('XBTUSD', 'buy', 1.0, ordertype='limit', price=101.0, post_only=True)
+
+        self.assertEqual(self.engine.order(txid).status, 'canceled')
+        self.assertEqual(self.engine.order(txid).reason, POST_ONLY_REJECT)
+        self.assertEqual(self.engine.order_states.get(txid), 'canceled')
+
+    def test_resting_order_fills_as_maker_when_crossed(self):
+        """Test that a resting limit fills at its own price once the book trades through it."""
+        txid = self.engine.add_order('XBTUSD', 'sell', 1.5, ordertype='limit', price=100.0, post_only=True)
+        self.assertEqual(self.engine.order(txid).status, 'open')
+
+        self.engine.set_book('XBTUSD', bids=[(100.5, 1.0)], asks=[(101.0, 1.0)])
+        self.assertEqual(self.engine.order_states.get(txid), 'open')
+        self.assertEqual(self.engine.order_states.filled(txid), 1.0)
+
+        self.engine.set_book('XBTUSD', bids=[(100.0, 3.0)], asks=[(100.5, 1.0)])
+        order = self.engine.order(txid)
+        self.assertEqual(order.status, 'closed')
+        self.assertAlmostEqual(order.cost, 150.0)
+        self.assertAlmostEqual(order.fee, 150.0 * 0.001)
+
+    def test_cancel(self):
+        """Test that only open orders can be canceled."""
+        txid = self.engine.add_order('XBTUSD', 'buy', 1.0, ordertype='limit', price=95.0)
+        self.assertTrue(self.engine.cancel(txid))
+        self.assertFalse(self.engine.cancel(txid))
+        self.assertEqual(self.engine.open_orders(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
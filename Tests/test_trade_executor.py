@@ -1,8 +1,11 @@
 import unittest
 from unittest.mock import patch, MagicMock, call
 
+from bot.cash_ledger import CashLedger
+from bot.execution_algos import ParentResult
 from bot.trade_executor import TradeExecutor
 from bot.kraken_api import KrakenAPI, KrakenAPIError
+from bot.pair_specs import PairSpec
 
 class TestTradeExecutor(unittest.TestCase):
     """Unit tests for the TradeExecutor class."""
@@ -10,6 +13,10 @@ class TestTradeExecutor(unittest.TestCase):
     def setUp(self):
         """Set up a mock KrakenAPI and a new TradeExecutor instance for each test."""
         self.mock_kraken_api = MagicMock(spec=KrakenAPI)
+        # Pairs unknown to the (empty) alias and spec indexes
+        self.mock_kraken_api.normalize_pair.return_value = None
+        self.mock_kraken_api.get_pair_spec.return_value = None
+        self.mock_kraken_api.market_data_max_age = 5.0
         self.executor = TradeExecutor(self.mock_kraken_api)
 
     def test_normalize_pair(self):
@@ -19,6 +26,39 @@ class TestTradeExecutor(unittest.TestCase):
         self.assertEqual(self.executor._normalize_pair("solusd"), "SOLUSD")
         self.assertEqual(self.executor._normalize_pair("XBTUSD"), "XBTUSD")
 
+    def test_plan_priced_in_single_ticker_request(self):
+        """Test that all plan pairs are priced with one plan-pricing call and reused afterwards."""
+        self.mock_kraken_api.get_plan_prices.return_value = {
+            'XBTUSD': {'price': 60000.0},
+            'ETHUSD': {'price': 4000.0},
+        }
+        trades = [
+            {'pair': 'BTC/USD', 'action': 'buy', 'allocation_percentage': 0.2},
+            {'pair': 'ETH-USD', 'action': 'sell', 'volume': 1.0},
+            {'pair': 'BTC/USD', 'action': 'sell', 'volume': 0.01},
+        ]
+
+        self.executor._price_plan(trades)
+
+        self.mock_kraken_api.get_plan_prices.assert_called_once_with(['XBTUSD', 'ETHUSD'])
+        self.assertEqual(self.executor._get_price('XBTUSD'), 60000.0)
+        self.assertEqual(self.executor._get_price('ETHUSD'), 4000.0)
+        self.mock_kraken_api.get_ticker_prices.assert_not_called()
+
+    def test_unpriced_plan_pairs_are_cached_as_misses(self):
+        """Test that pairs the plan pricing could not quote are not re-requested."""
+        self.mock_kraken_api.get_plan_prices.return_value = {'XBTUSD': {'price': 60000.0}}
+        trades = [
+            {'pair': 'BTC/USD', 'action': 'buy', 'volume': 0.1},
+            {'pair': 'FAKE/USD', 'action': 'buy', 'volume': 1.0},
+        ]
+
+        self.executor._price_plan(trades)
+
+        self.assertEqual(self.executor._get_price('XBTUSD'), 60000.0)
+        self.assertEqual(self.executor._get_price('FAKEUSD'), 0.0)
+        self.mock_kraken_api.get_ticker_prices.assert_not_called()
+
     def test_successful_two_phase_execution(self):
         """Test a successful trade plan where validation and execution both pass."""
         trade_plan = {
@@ -111,6 +151,270 @@ class TestTradeExecutor(unittest.TestCase):
         self.assertEqual(results[1]['status'], 'execution_failed')
         self.assertIn("Internal error", results[1]['error'])
 
+    def test_same_pair_orders_sent_as_one_batch(self):
+        """Test that same-pair orders are validated and placed with one AddOrderBatch each."""
+        self.mock_kraken_api.place_order_batch.return_value = [{'txid': []}, {'error': ['EOrder:Invalid volume']}]
+        prechecked = [
+            {'pair': 'XBTUSD', 'action': 'sell', 'volume': 0.1, 'original_trade': {'id': 1}},
+            {'pair': 'XBTUSD', 'action': 'sell', 'volume': 0.2, 'original_trade': {'id': 2}},
+        ]
+        results = []
+
+        validated = self.executor._validate_orders(prechecked, results)
+
+        self.mock_kraken_api.place_order_batch.assert_called_once_with('XBTUSD', [
+            {'type': 'sell', 'volume': 0.1, 'ordertype': 'market'},
+            {'type': 'sell', 'volume': 0.2, 'ordertype': 'market'},
+        ], validate=True)
+        self.assertEqual(validated, prechecked[:1])
+        self.assertEqual(results, [{'status': 'validation_failed', 'trade': {'id': 2}, 'error': 'EOrder:Invalid volume'}])
+
+        # Two surviving legs for one pair go out in a single live batch
+        self.mock_kraken_api.place_order_batch.reset_mock()
+        self.mock_kraken_api.place_order_batch.return_value = [{'txid': ['TX-1']}, {'txid': ['TX-2']}]
+        results = []
+        txids = self.executor._submit_orders(prechecked, results)
+
+        self.assertEqual(txids, ['TX-1', 'TX-2'])
+        self.mock_kraken_api.place_order_batch.assert_called_once()
+        self.assertEqual(self.mock_kraken_api.place_order_batch.call_args.kwargs, {'validate': False})
+        self.mock_kraken_api.place_order.assert_not_called()
+        self.assertEqual([r['status'] for r in results], ['success', 'success'])
+
+    def test_large_orders_worked_by_execution_algo(self):
+        """Test that orders above the algo threshold are sliced and small ones stay market orders."""
+        executor = TradeExecutor(self.mock_kraken_api, execution_algo='twap', algo_min_order_usd=1000.0)
+        self.mock_kraken_api.get_ticker_prices.return_value = {'XBTUSD': {'price': 60000.0}}
+        self.mock_kraken_api.place_order.return_value = {'txid': ['TX-SMALL']}
+        prechecked = [
+            {'pair': 'XBTUSD', 'action': 'buy', 'volume': 0.5, 'original_trade': {'id': 1}},    # $30,000
+            {'pair': 'XBTUSD', 'action': 'buy', 'volume': 0.001, 'original_trade': {'id': 2}},  # $60
+        ]
+
+        async def fake_run(parents):
+            self.assertEqual([(p.pair, p.side, p.volume, p.mode) for p in parents], [('XBTUSD', 'buy', 0.5, 'twap')])
+            return [ParentResult(parents[0], filled_volume=0.4, txids=['C1', 'C2'])]
+
+        results = []
+        with patch.object(executor, '_run_parents', side_effect=fake_run):
+            txids = executor._submit_orders(prechecked, results)
+
+        self.assertEqual(txids, ['C2', 'TX-SMALL'])
+        self.mock_kraken_api.place_order.assert_called_once_with(pair='XBTUSD', order_type='buy', volume=0.001, validate=False)
+        sliced = results[0]
+        self.assertEqual((sliced['status'], sliced['execution'], sliced['txids']), ('success', 'partial', ['C1', 'C2']))
+        # The reported volume is what actually filled; the reservation key is unchanged
+        self.assertEqual(sliced['trade']['volume'], 0.4)
+        self.assertIs(sliced['trade']['original_trade'], prechecked[0]['original_trade'])
+
+    def test_buys_released_as_sells_close(self):
+        """Test that each buy is released once cash on hand plus closed-sell proceeds cover it."""
+        buys = [
+            {'pair': 'BTC/USD', 'action': 'buy', 'allocation_percentage': 0.08},  # funded by cash
+            {'pair': 'ETH/USD', 'action': 'buy', 'allocation_percentage': 0.2},   # needs S1
+            {'pair': 'SOL/USD', 'action': 'buy', 'allocation_percentage': 0.4},   # needs S2
+        ]
+        self.mock_kraken_api.wait_for_orders_closed.side_effect = [
+            {'S1': 'closed', 'S2': 'open'},
+            {'S2': 'closed'},
+        ]
+        released = []
+
+        def process(trades, trade_type, cash_ledger):
+            released.append([t['pair'] for t in trades])
+            for t in trades:
+                cash_ledger.reserve(id(t), t['allocation_percentage'] * 1000.0)
+                cash_ledger.commit(id(t))
+            return [{'status': 'success', 'trade': {'original_trade': t}, 'txid': 'B'} for t in trades]
+
+        with patch.object(self.executor, '_process_trades', side_effect=process):
+            results = self.executor._pipeline_buys(buys, {'S1': 200.0, 'S2': 500.0}, CashLedger(100.0), portfolio_value=1000.0)
+
+        self.assertEqual(released, [['BTC/USD'], ['ETH/USD'], ['SOL/USD']])
+        self.assertEqual(len(results), 3)
+        self.assertEqual(self.mock_kraken_api.wait_for_orders_closed.call_count, 2)
+        self.assertTrue(self.mock_kraken_api.wait_for_orders_closed.call_args.kwargs['any_closed'])
+
+    def test_buys_released_when_sells_stall(self):
+        """Test that unfunded buys are released against a live cash re-read once waiting stops paying off."""
+        self.mock_kraken_api.wait_for_orders_closed.return_value = {'S1': 'open'}
+        self.mock_kraken_api.get_portfolio_snapshot.return_value = MagicMock(cash_balance=600.0)
+        released = []
+
+        def process(trades, trade_type, cash_ledger):
+            released.append((len(trades), cash_ledger.available))
+            return []
+
+        with patch.object(self.executor, '_process_trades', side_effect=process):
+            self.executor._pipeline_buys(
+                [{'pair': 'BTC/USD', 'action': 'buy', 'allocation_percentage': 0.5}], {'S1': 500.0},
+                CashLedger(0.0), portfolio_value=1000.0
+            )
+
+        # The sell filled but its status never arrived; the fresh balance funds the buy
+        self.assertEqual(released, [(1, 600.0)])
+        self.mock_kraken_api.wait_for_orders_closed.assert_called_once()
+        self.mock_kraken_api.get_portfolio_snapshot.assert_called_once_with(max_age=0)
+
+    def test_failed_cash_reread_keeps_ledger(self):
+        """Test that a failed Balance re-read leaves the ledger as it was."""
+        self.mock_kraken_api.wait_for_orders_closed.return_value = {'S1': 'unknown'}
+        self.mock_kraken_api.get_portfolio_snapshot.side_effect = KrakenAPIError("EAPI:Rate limit exceeded")
+        ledger = CashLedger(100.0)
+
+        with patch.object(self.executor, '_process_trades', return_value=[]) as mock_process:
+            self.executor._pipeline_buys(
+                [{'pair': 'BTC/USD', 'action': 'buy', 'allocation_percentage': 0.5}], {'S1': 500.0},
+                ledger, portfolio_value=1000.0
+            )
+
+        mock_process.assert_called_once()
+        self.assertEqual(ledger.cash, 100.0)
+
+    def test_sell_proceeds_credited_net_of_fees(self):
+        """Test that buys are funded with sell proceeds after the taker fee."""
+        self.mock_kraken_api.get_comprehensive_portfolio_context.return_value = {
+            'cash_balance': 0.0, 'total_equity': 1000.0, 'crypto_value': 1000.0,
+        }
+        self.mock_kraken_api.get_plan_prices.return_value = {'XBTUSD': {'price': 1000.0}}
+        sell = {'pair': 'XBTUSD', 'action': 'sell', 'volume': 0.5}
+        buy = {'pair': 'XBTUSD', 'action': 'buy', 'volume': 0.1}
+
+        with patch.object(self.executor, '_consolidate_trades', return_value=([sell], [buy])), \
+             patch.object(self.executor, '_process_trades',
+                          return_value=[{'status': 'success', 'trade': sell, 'txid': 'S1'}]), \
+             patch.object(self.executor, '_pipeline_buys', return_value=[]) as mock_pipeline:
+            self.executor.execute_trades({'trades': [sell, buy]})
+
+        sell_proceeds = mock_pipeline.call_args.args[1]
+        self.assertAlmostEqual(sell_proceeds['S1'], 500.0 * (1 - self.executor.fee_rate))
+
+    def test_buy_reservations_use_one_portfolio_snapshot(self):
+        """Test that BUY cash checks run against a ledger seeded once instead of re-fetching balances."""
+        self.mock_kraken_api.get_comprehensive_portfolio_context.return_value = {
+            'total_equity': 1000.0, 'cash_balance': 500.0, 'crypto_value': 500.0,
+            'allocation_percentages': {}, 'usd_values': {}, 'raw_balances': {},
+        }
+        self.mock_kraken_api.get_pair_spec.side_effect = lambda pair: PairSpec(pair, {'ordermin': '0.0001', 'costmin': '0.5'})
+        self.mock_kraken_api.normalize_pair.side_effect = lambda pair: pair
+        self.mock_kraken_api.is_pair_tradeable.return_value = (True, '')
+        self.mock_kraken_api.place_order.return_value = {'txid': ['TX']}
+        self.executor._store_quotes({'XBTUSD': {'price': 100.0}, 'ETHUSD': {'price': 100.0}, 'SOLUSD': {'price': 100.0}})
+        trades = [
+            {'pair': 'XBTUSD', 'action': 'buy', 'volume': 3.0},
+            {'pair': 'ETHUSD', 'action': 'buy', 'volume': 3.0},  # $300 > $200 left
+            {'pair': 'SOLUSD', 'action': 'buy', 'volume': 1.5},
+        ]
+        ledger = CashLedger(500.0)
+
+        results = self.executor._process_trades(trades, 'buy', ledger)
+
+        self.assertEqual([r['status'] for r in results], ['insufficient_cash', 'success', 'success'])
+        self.assertAlmostEqual(ledger.cash, 50.0)
+        self.assertEqual(ledger.reserved, 0.0)
+        # One snapshot read for the batch header; none per BUY
+        self.assertLessEqual(self.mock_kraken_api.get_comprehensive_portfolio_context.call_count, 2)
+
+    def test_stale_plan_quotes_requoted_before_buys(self):
+        """Test that BUYs re-quote plan prices older than the feed's max_age and reject pairs left unpriced."""
+        self.mock_kraken_api.get_comprehensive_portfolio_context.return_value = {
+            'total_equity': 1000.0, 'cash_balance': 1000.0, 'crypto_value': 0.0,
+            'allocation_percentages': {}, 'usd_values': {}, 'raw_balances': {},
+        }
+        self.mock_kraken_api.get_pair_spec.side_effect = lambda pair: PairSpec(pair, {'ordermin': '0.0001', 'costmin': '0.5'})
+        self.mock_kraken_api.normalize_pair.side_effect = lambda pair: pair
+        self.mock_kraken_api.is_pair_tradeable.return_value = (True, '')
+        self.mock_kraken_api.place_order.return_value = {'txid': ['TX']}
+        self.executor._store_quotes({'XBTUSD': {'price': 100.0}, 'ETHUSD': {'price': 100.0}, 'SOLUSD': {'price': 100.0}})
+        for pair in ('XBTUSD', 'ETHUSD'):
+            self.executor._quotes[pair]['ts'] -= 30
+        # BTC moved while sells settled; ETH can no longer be priced
+        self.mock_kraken_api.get_plan_prices.return_value = {'XBTUSD': {'price': 200.0}}
+        trades = [
+            {'pair': 'XBTUSD', 'action': 'buy', 'volume': 1.0},
+            {'pair': 'ETHUSD', 'action': 'buy', 'volume': 1.0},
+            {'pair': 'SOLUSD', 'action': 'buy', 'volume': 1.0},
+        ]
+        ledger = CashLedger(1000.0)
+
+        results = self.executor._process_trades(trades, 'buy', ledger)
+
+        self.mock_kraken_api.get_plan_prices.assert_called_once_with(['XBTUSD', 'ETHUSD'])
+        self.assertEqual([r['status'] for r in results], ['micro_trade_blocked', 'success', 'success'])
+        self.assertAlmostEqual(ledger.cash, 700.0)
+
+    def test_consolidation_sizes_plan_in_one_pass(self):
+        """Test that allocation trades are sized together and opposing legs are netted."""
+        self.mock_kraken_api.get_pair_spec.side_effect = lambda pair: PairSpec(pair, {'lot_decimals': 4})
+        self.mock_kraken_api.normalize_pair.side_effect = lambda pair: pair.replace('/', '')
+        self.executor._store_quotes({'XBTUSD': {'price': 50000.0}, 'ETHUSD': {'price': 2500.0}})
+        trades = [
+            {'pair': 'XBT/USD', 'action': 'buy', 'allocation_percentage': 0.3},
+            {'pair': 'XBT/USD', 'action': 'sell', 'volume': 0.001},
+            {'pair': 'ETH/USD', 'action': 'sell', 'allocation_percentage': 0.25},
+            {'pair': 'NOPE/USD', 'action': 'buy', 'allocation_percentage': 0.1},  # unpriced
+            {'pair': 'XBT/USD', 'action': 'buy'},  # malformed
+        ]
+
+        with patch.object(self.executor, '_convert_percentage_to_volume') as mock_convert:
+            sells, buys = self.executor._consolidate_trades(trades, 1000.0)
+
+        mock_convert.assert_not_called()
+        self.assertEqual(sells, [{'pair': 'ETHUSD', 'action': 'sell', 'volume': 0.1, 'estimated_price': 2500.0}])
+        self.assertEqual(buys, [{'pair': 'XBTUSD', 'action': 'buy', 'volume': 0.005, 'estimated_price': 50000.0}])
+
+    def _setup_rebalance(self):
+        """Portfolio of $5000 equity: $2400 cash, 0.01 BTC ($500), 1 ETH ($2000), 1000 DOGE ($100)."""
+        specs = {
+            'XXBTZUSD': PairSpec('XXBTZUSD', {'base': 'XXBT', 'quote': 'ZUSD', 'ordermin': '0.0001', 'costmin': '0.5'}),
+            'XETHZUSD': PairSpec('XETHZUSD', {'base': 'XETH', 'quote': 'ZUSD', 'ordermin': '0.002', 'costmin': '0.5'}),
+            'SOLUSD': PairSpec('SOLUSD', {'base': 'SOL', 'quote': 'ZUSD', 'ordermin': '20', 'costmin': '0.5'}),
+            'XDGUSD': PairSpec('XDGUSD', {'base': 'XXDG', 'quote': 'ZUSD', 'ordermin': '50', 'costmin': '0.5',
+                                          'lot_decimals': 2}),
+        }
+        self.mock_kraken_api.get_pair_spec.side_effect = specs.get
+        self.mock_kraken_api.normalize_pair.side_effect = lambda pair: pair
+        self.mock_kraken_api.get_comprehensive_portfolio_context.return_value = {
+            'cash_balance': 2400.0, 'total_equity': 5000.0, 'crypto_value': 2600.0,
+            'raw_balances': {'XBT': 0.01, 'ETH': 1.0, 'XDG': 1000.0},
+        }
+        self.mock_kraken_api.get_plan_prices.return_value = {
+            'XXBTZUSD': {'price': 50000.0}, 'XETHZUSD': {'price': 2000.0},
+            'SOLUSD': {'price': 100.0}, 'XDGUSD': {'price': 0.1},
+        }
+        return {'XXBTZUSD': 0.3, 'XETHZUSD': 0.2, 'SOLUSD': 0.2, 'XDGUSD': 0.0, 'FAKEUSD': 0.1}
+
+    def test_rebalance_to_targets_emits_minimal_volume_orders(self):
+        """Test that target weights become sells-first volume orders, without sub-minimum or dust orders."""
+        targets = self._setup_rebalance()
+        self.executor._price_plan([{'pair': pair} for pair in targets])
+
+        trades = self.executor._rebalance_to_targets(targets)
+
+        # SOL's $1000 buy is 10 SOL, under its 20 SOL ordermin; the $100 DOGE exit is under the
+        # $250 micro-trade floor; FAKEUSD has no pair rules
+        self.assertEqual([(t['pair'], t['action']) for t in trades], [('XETHZUSD', 'sell'), ('XXBTZUSD', 'buy')])
+        self.assertAlmostEqual(trades[0]['volume'], 0.5)
+        self.assertAlmostEqual(trades[1]['volume'], 0.02)
+        self.assertTrue(all('allocation_percentage' not in t for t in trades))
+        self.assertEqual(trades[1]['estimated_price'], 50000.0)
+
+    def test_target_weights_executed_sells_before_buys(self):
+        """Test that execute_trades turns target weights into a SELL phase followed by a BUY phase."""
+        targets = self._setup_rebalance()
+        sell_result = {'status': 'success', 'trade': {'pair': 'XETHZUSD', 'volume': 0.5}, 'txid': 'S1'}
+
+        with patch.object(self.executor, '_process_trades', return_value=[sell_result]) as mock_sells, \
+             patch.object(self.executor, '_pipeline_buys', return_value=[]) as mock_buys:
+            self.executor.execute_trades({'trades': [], 'target_weights': targets})
+
+        sells = mock_sells.call_args.args[0]
+        buys = mock_buys.call_args.args[0]
+        self.assertEqual([(t['pair'], t['action'], t['volume']) for t in sells], [('XETHZUSD', 'sell', 0.5)])
+        self.assertEqual([(t['pair'], t['action']) for t in buys], [('XXBTZUSD', 'buy')])
+        self.assertAlmostEqual(buys[0]['volume'], 0.02)
+        self.assertIn('S1', mock_buys.call_args.args[1])
+
     def test_empty_trade_plan(self):
         """Test that the executor handles an empty trade plan gracefully."""
         results = self.executor.execute_trades({'trades': []})
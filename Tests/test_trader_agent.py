@@ -0,0 +1,61 @@
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from agents.trader_agent import TraderAgent
+
+
+class TestTargetWeightValidation(unittest.TestCase):
+    """Unit tests for TraderAgent's optional target_weights validation."""
+
+    def setUp(self):
+        logs_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, logs_dir, ignore_errors=True)
+        with patch('agents.trader_agent.OpenAI'):
+            self.agent = TraderAgent(logs_dir=logs_dir)
+
+    def test_missing_targets_are_empty(self):
+        """Test that absent or empty target_weights validate to no targets."""
+        self.assertEqual(self.agent._validate_target_weights(None), {})
+        self.assertEqual(self.agent._validate_target_weights({}), {})
+
+    def test_targets_normalized_and_partial_sum_allowed(self):
+        """Test that pairs are upper-cased and weights under 100% leave the rest in cash."""
+        targets = self.agent._validate_target_weights({' xbtusd ': '0.4', 'ETHUSD': 0.2})
+        self.assertEqual(targets, {'XBTUSD': 0.4, 'ETHUSD': 0.2})
+
+    def test_targets_summing_above_one_rejected(self):
+        """Test that weights totalling more than 100% of equity reject the targets."""
+        with self.assertRaises(ValueError):
+            self.agent._validate_target_weights({'XBTUSD': 0.7, 'ETHUSD': 0.4})
+        # Exactly 100% is allowed
+        self.assertEqual(self.agent._validate_target_weights({'XBTUSD': 0.6, 'ETHUSD': 0.4}),
+                         {'XBTUSD': 0.6, 'ETHUSD': 0.4})
+
+    def test_negative_and_invalid_weights_dropped(self):
+        """Test that negative, above-one and non-numeric weights are skipped."""
+        targets = self.agent._validate_target_weights(
+            {'XBTUSD': -0.1, 'ETHUSD': 1.5, 'SOLUSD': 'lots', 'ADAUSD': None, 'DOTUSD': 0.1})
+        self.assertEqual(targets, {'DOTUSD': 0.1})
+
+    def test_unknown_pair_names_pass_through_to_executor(self):
+        """Test that pair names are not resolved here; empty names are dropped and the rest kept as given."""
+        targets = self.agent._validate_target_weights({'': 0.1, 'NOTAPAIR': 0.2})
+        self.assertEqual(targets, {'NOTAPAIR': 0.2})
+
+    def test_non_mapping_targets_rejected(self):
+        """Test that target_weights must be an object mapping pairs to weights."""
+        with self.assertRaises(ValueError):
+            self.agent._validate_target_weights([['XBTUSD', 0.5]])
+
+    def test_targets_returned_from_parsed_response(self):
+        """Test that validated target_weights are returned alongside trades."""
+        response = ('{"trades": [], "thesis": "Rotate into BTC", '
+                    '"target_weights": {"XBTUSD": 0.5, "ETHUSD": -0.2}}')
+        decision = self.agent._parse_ai_response({'content': response})
+        self.assertEqual(decision['target_weights'], {'XBTUSD': 0.5})
+
+
+if __name__ == '__main__':
+    unittest.main()
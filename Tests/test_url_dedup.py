@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from bot.url_dedup import UrlDedupStore, normalize_url
+
+
+class TestUrlDedupStore(unittest.TestCase):
+    """Unit tests for the sliding-window URL dedup store."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'urls.sqlite3')
+        self.now = 1_000_000.0
+        self.store = UrlDedupStore(self.path, ttl_seconds=3600, clock=lambda: self.now)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_add_is_check_and_insert_within_window(self):
+        """Test that a URL is new once per window and its first-seen time is kept."""
+        self.assertTrue(self.store.add('https://news.example.com/a'))
+        self.now += 1800
+        self.assertFalse(self.store.add('https://news.example.com/a'))
+        self.assertIn('https://news.example.com/a', self.store)
+        self.assertEqual(self.store.first_seen('https://news.example.com/a'), 1_000_000.0)
+
+        # The window slides from first sight: after the TTL the URL is new again
+        self.now += 1801
+        self.assertNotIn('https://news.example.com/a', self.store)
+        self.assertTrue(self.store.add('https://news.example.com/a'))
+        self.assertEqual(self.store.first_seen('https://news.example.com/a'), self.now)
+
+    def test_normalization(self):
+        """Test that tracking parameters, fragments and host case do not defeat dedup."""
+        self.assertEqual(normalize_url(' HTTPS://News.Example.com/a?id=1&utm_source=x#top '), 'https://news.example.com/a?id=1')
+        self.store.add('https://news.example.com/a?id=1&utm_medium=rss')
+        self.assertIn('https://NEWS.example.com/a?id=1', self.store)
+        self.assertNotIn('https://news.example.com/a?id=2', self.store)
+
+    def test_eviction_bounds_the_table(self):
+        """Test that expired rows are deleted and the store reopens with its live entries."""
+        for i in range(10):
+            self.store.add(f'https://news.example.com/{i}')
+        self.now += 1800
+        self.store.add('https://news.example.com/late')
+        self.now += 2000
+        self.assertEqual(self.store.evict(), 10)
+        self.assertEqual(len(self.store), 1)
+
+        reopened = UrlDedupStore(self.path, ttl_seconds=3600, clock=lambda: self.now)
+        self.assertIn('https://news.example.com/late', reopened)
+        reopened.close()
+
+    def test_concurrent_adds_claim_each_url_once(self):
+        """Test that concurrent fetchers never both see the same URL as new."""
+        claims = []
+
+        def worker():
+            claims.extend(url for url in (f'https://news.example.com/{i}' for i in range(50)) if self.store.add(url))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(sorted(claims), sorted(f'https://news.example.com/{i}' for i in range(50)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,14 +9,55 @@ that provides transparent reasoning about market conditions.
 """
 
 import logging
+from collections import Counter
+from functools import lru_cache
 from typing import Dict, Any
 from datetime import datetime
 
 from .base_agent import BaseAgent
+from bot.keyword_matcher import KeywordMatcher
 from bot.research_agent import ResearchAgent, ResearchAgentError
 
 # logger = logging.getLogger(__name__)
 
+# Simple sentiment keywords (can be enhanced with ML in the future)
+POSITIVE_KEYWORDS = [
+    'surge', 'rally', 'bullish', 'gains', 'up', 'rise', 'boost', 'positive',
+    'adoption', 'approval', 'breakthrough', 'milestone', 'record', 'high'
+]
+
+NEGATIVE_KEYWORDS = [
+    'crash', 'dump', 'bearish', 'decline', 'fall', 'drop', 'sell-off',
+    'negative', 'concern', 'risk', 'warning', 'ban', 'restriction', 'hack'
+]
+
+# Common crypto themes to track
+THEME_KEYWORDS = {
+    "bitcoin": ["bitcoin", "btc", "xbt"],
+    "ethereum": ["ethereum", "eth", "ether"],
+    "regulation": ["sec", "regulation", "regulatory", "compliance", "legal"],
+    "institutional": ["institutional", "etf", "grayscale", "blackrock", "corporate"],
+    "defi": ["defi", "decentralized finance", "uniswap", "compound"],
+    "fed_policy": ["fed", "federal reserve", "interest rate", "monetary policy"],
+    "inflation": ["inflation", "cpi", "pce", "prices"],
+    "market_structure": ["market", "trading", "volume", "liquidity"]
+}
+
+
+@lru_cache(maxsize=16)
+def _headline_matcher(priority_keywords: tuple) -> KeywordMatcher:
+    """
+    One matcher for sentiment and theme hits: groups are 'positive', 'negative' and
+    'theme:<name>'. Priority keywords become themes of their own (replacing a built-in theme of
+    the same name).
+    """
+    groups = {"positive": POSITIVE_KEYWORDS, "negative": NEGATIVE_KEYWORDS}
+    themes = dict(THEME_KEYWORDS)
+    for keyword in priority_keywords:
+        themes[keyword] = [keyword]
+    groups.update({f"theme:{theme}": keywords for theme, keywords in themes.items()})
+    return KeywordMatcher(groups)
+
 class AnalystAgent(BaseAgent):
     """
     The Analyst-AI specializes in market intelligence gathering.
@@ -139,6 +180,7 @@ class AnalystAgent(BaseAgent):
             "status": "success",
             "crypto_headlines": crypto or [],
             "macro_headlines": macro or [],
+            "feed_cache": self.research_engine.feed_cache_stats(),
             "timestamp": datetime.now().isoformat(),
             "research_focus": research_focus,
         }
@@ -149,6 +191,7 @@ class AnalystAgent(BaseAgent):
         try:
             crypto = prefetch_result.get("crypto_headlines", [])
             macro = prefetch_result.get("macro_headlines", [])
+            # Cross-feed near-duplicates are folded together inside synthesize_market_context
             summary = self.research_engine.synthesize_market_context(coingecko_result, crypto, macro)
             # Build a full markdown report and persist to the canonical path for downstream use
             now_utc = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
@@ -361,9 +404,10 @@ class AnalystAgent(BaseAgent):
         # Parse the report sections
         sections = self._parse_report_sections(raw_report)
         
-        # Analyze sentiment and key themes
-        sentiment_analysis = self._analyze_market_sentiment(sections)
-        key_themes = self._extract_key_themes(sections, keywords)
+        # Analyze sentiment and key themes from a single keyword pass per headline
+        hits = self._scan_sections(sections, keywords)
+        sentiment_analysis = self._analyze_market_sentiment(sections, hits)
+        key_themes = self._extract_key_themes(sections, keywords, hits)
         
         return {
             "crypto_headlines": sections.get("crypto_news", []),
@@ -414,48 +458,44 @@ class AnalystAgent(BaseAgent):
         
         return sections
     
-    def _analyze_market_sentiment(self, sections: Dict[str, Any]) -> Dict[str, Any]:
+    def _scan_sections(self, sections: Dict[str, Any], priority_keywords: list) -> Dict[str, Any]:
+        """
+        Scan every headline (and the market summary) once for sentiment and theme keywords.
+        
+        Args:
+            sections: Parsed report sections
+            priority_keywords: Keywords tracked as themes of their own
+            
+        Returns:
+            Per-group hit counts: {"headlines": [Counter per headline], "summary": Counter}
+        """
+        matcher = _headline_matcher(tuple(dict.fromkeys(k.lower() for k in priority_keywords or [])))
+        headlines = sections.get("crypto_news", []) + sections.get("macro_news", [])
+        return {
+            "headlines": [matcher.scan(headline) for headline in headlines],
+            "summary": matcher.scan(sections.get("market_summary", "")),
+        }
+    
+    def _analyze_market_sentiment(self, sections: Dict[str, Any], hits: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Analyze overall market sentiment from news headlines.
         
         Args:
             sections: Parsed report sections
+            hits: Keyword hits from _scan_sections (scanned here if not given)
             
         Returns:
             Sentiment analysis results
         """
-        # Simple sentiment keywords (can be enhanced with ML in the future)
-        positive_keywords = [
-            'surge', 'rally', 'bullish', 'gains', 'up', 'rise', 'boost', 'positive',
-            'adoption', 'approval', 'breakthrough', 'milestone', 'record', 'high'
-        ]
-        
-        negative_keywords = [
-            'crash', 'dump', 'bearish', 'decline', 'fall', 'drop', 'sell-off',
-            'negative', 'concern', 'risk', 'warning', 'ban', 'restriction', 'hack'
-        ]
-        
-        all_headlines = sections.get("crypto_news", []) + sections.get("macro_news", [])
-        total_headlines = len(all_headlines)
+        headline_hits = (hits or self._scan_sections(sections, []))["headlines"]
+        total_headlines = len(headline_hits)
         
         if total_headlines == 0:
             return {"sentiment": "neutral", "confidence": 0.0, "reasoning": "No headlines to analyze"}
         
-        positive_count = 0
-        negative_count = 0
-        
-        for headline in all_headlines:
-            headline_lower = headline.lower()
-            
-            for keyword in positive_keywords:
-                if keyword in headline_lower:
-                    positive_count += 1
-                    break
-            
-            for keyword in negative_keywords:
-                if keyword in headline_lower:
-                    negative_count += 1
-                    break
+        # At most one signal of each polarity per headline
+        positive_count = sum(1 for counts in headline_hits if counts["positive"])
+        negative_count = sum(1 for counts in headline_hits if counts["negative"])
         
         # Calculate sentiment
         sentiment_score = (positive_count - negative_count) / total_headlines
@@ -478,49 +518,32 @@ class AnalystAgent(BaseAgent):
             "reasoning": f"Analyzed {total_headlines} headlines: {positive_count} positive, {negative_count} negative signals"
         }
     
-    def _extract_key_themes(self, sections: Dict[str, Any], priority_keywords: list) -> list:
+    def _extract_key_themes(self, sections: Dict[str, Any], priority_keywords: list, hits: Dict[str, Any] = None) -> list:
         """
         Extract key themes and topics from the intelligence report.
         
         Args:
             sections: Parsed report sections
             priority_keywords: Keywords to prioritize
+            hits: Keyword hits from _scan_sections (scanned here if not given)
             
         Returns:
             List of key themes found in the intelligence
         """
-        # Common crypto themes to track
-        theme_keywords = {
-            "bitcoin": ["bitcoin", "btc", "xbt"],
-            "ethereum": ["ethereum", "eth", "ether"],
-            "regulation": ["sec", "regulation", "regulatory", "compliance", "legal"],
-            "institutional": ["institutional", "etf", "grayscale", "blackrock", "corporate"],
-            "defi": ["defi", "decentralized finance", "uniswap", "compound"],
-            "fed_policy": ["fed", "federal reserve", "interest rate", "monetary policy"],
-            "inflation": ["inflation", "cpi", "pce", "prices"],
-            "market_structure": ["market", "trading", "volume", "liquidity"]
-        }
-        
-        # Add priority keywords as their own themes
-        for keyword in priority_keywords:
-            theme_keywords[keyword.lower()] = [keyword.lower()]
-        
-        all_text = " ".join(sections.get("crypto_news", []) + sections.get("macro_news", []) + [sections.get("market_summary", "")])
-        all_text_lower = all_text.lower()
+        hits = hits or self._scan_sections(sections, priority_keywords)
+        totals = sum(hits["headlines"], Counter()) + hits["summary"]
         
         detected_themes = []
         
-        for theme, keywords in theme_keywords.items():
-            mentions = 0
-            for keyword in keywords:
-                mentions += all_text_lower.count(keyword)
-            
-            if mentions > 0:
-                detected_themes.append({
-                    "theme": theme,
-                    "mentions": mentions,
-                    "relevance": "high" if mentions >= 3 else "medium" if mentions >= 2 else "low"
-                })
+        for theme in dict.fromkeys(list(THEME_KEYWORDS) + [k.lower() for k in priority_keywords or []]):
+            mentions = totals[f"theme:{theme}"]
+            if mentions <= 0:
+                continue
+            detected_themes.append({
+                "theme": theme,
+                "mentions": mentions,
+                "relevance": "high" if mentions >= 3 else "medium" if mentions >= 2 else "low"
+            })
         
         # Sort by number of mentions
         detected_themes.sort(key=lambda x: x["mentions"], reverse=True)
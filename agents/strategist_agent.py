@@ -444,11 +444,8 @@ class StrategistAgent(BaseAgent):
             sorted_pairs = sorted(usd_pairs.items(), key=lambda x: x[1]['base'])
             
             for pair_name, pair_info in sorted_pairs:
-                base_asset = pair_info['base']
                 ordermin = float(pair_info['ordermin'])
-                
-                # Clean base asset name for display
-                clean_base = base_asset[1:] if base_asset.startswith(('X', 'Z')) and len(base_asset) > 1 else base_asset
+                clean_base = pair_info['base_asset']
                 
                 rules_text += f"✅ {pair_name} ({clean_base}/USD)\n"
                 rules_text += f"   - Minimum order size: {ordermin:.8f} {clean_base}\n"
@@ -493,8 +490,7 @@ class StrategistAgent(BaseAgent):
 
                     effective_mins = []
                     for pair_name, pair_info in usd_pairs.items():
-                        base_asset_code = pair_info.get('base', '')
-                        clean_base = base_asset_code[1:] if base_asset_code.startswith(('X','Z')) and len(base_asset_code) > 1 else base_asset_code
+                        clean_base = pair_info.get('base_asset', '')
                         ordermin = float(pair_info.get('ordermin', 0))
                         costmin = float(pair_info.get('costmin', 0) or 0.0)
                         price = prices.get(pair_name, {}).get('price', 0.0)
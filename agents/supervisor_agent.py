@@ -27,6 +27,7 @@ from .reflection_agent import ReflectionAgent
 from bot.kraken_api import KrakenAPI
 from bot.trade_executor import TradeExecutor
 from bot.performance_tracker import PerformanceTracker
+from bot.plan_sizing import size_trades
 from bot.telegram_alerter import notify_trade_update, TELEGRAM_TRADE_ALERTS, TELEGRAM_ALERTS_INCLUDE_HOLD, TELEGRAM_ALERTS_PARSE_MODE, TELEGRAM_ALERTS_SILENT
 from zoneinfo import ZoneInfo
 
@@ -762,30 +763,10 @@ class SupervisorAgent(BaseAgent):
         Returns:
             A standardized, valid Kraken pair name or None if not found.
         """
-        # Clean the input
-        clean_pair = pair.upper().replace('/', '').replace('-', '')
-        
-        # Handle specific asset mappings like BTC -> XBT
-        if clean_pair.startswith('BTC'):
-            clean_pair = 'XBT' + clean_pair[3:]
-
-        # For pairs ending in USD, try to find the exact Kraken pair name
-        if clean_pair.endswith('USD'):
-            base_asset = clean_pair[:-3] # Remove 'USD'
-            
-            # Check for direct mapping (e.g., 'ETH' -> 'XETHZUSD')
-            # Note: asset_to_usd_pair_map uses clean asset names (without X/Z prefixes)
-            if base_asset in self.kraken_api.asset_to_usd_pair_map:
-                return self.kraken_api.asset_to_usd_pair_map[base_asset]
-            
-            # Fallback: check for prefixed versions (e.g., 'XETH' -> 'XETHZUSD')
-            for prefix in ['X', 'Z']:
-                if base_asset.startswith(prefix) and base_asset[1:] in self.kraken_api.asset_to_usd_pair_map:
-                    return self.kraken_api.asset_to_usd_pair_map[base_asset[1:]]
-
-        # If it's already a valid pair name, return it
-        if pair in self.kraken_api.asset_pairs:
-            return pair
+        # Shared alias index: Kraken pairs, altnames, wsnames and BTC/DOGE-style symbols
+        normalized = self.kraken_api.normalize_pair(pair)
+        if normalized:
+            return normalized
             
         self.logger.warning(f"Could not normalize or find pair: {pair}")
         return None
@@ -837,28 +818,40 @@ class SupervisorAgent(BaseAgent):
         except Exception:
             live_cash_balance = 0.0
             live_raw_balances = {}
+        # Resolve and price every plan pair once; shared by the proceeds estimate and check 6
+        plan_pairs = [self._normalize_pair(t.get('pair', '')) if isinstance(t, dict) else None for t in trades]
+        plan_specs = [self.kraken_api.get_pair_spec(p) if p else None for p in plan_pairs]
+        plan_prices = self._get_plan_prices([p for p in plan_pairs if p])
         # Estimate sell proceeds in USD to approximate available cash post-sells
         expected_sell_proceeds_usd = 0.0
         try:
-            for t in trading_plan.get('trades', []):
-                if t.get('action') == 'sell' and 'allocation_percentage' in t:
-                    normalized_pair = self._normalize_pair(t.get('pair', ''))
-                    if not normalized_pair:
-                        continue
-                    pair_details = self.kraken_api.get_pair_details(normalized_pair) or {}
-                    base_asset = pair_details.get('base', '')
-                    if base_asset.startswith(('X','Z')) and len(base_asset) > 1:
-                        base_asset = base_asset[1:]
+            for t, normalized_pair, spec in zip(trades, plan_pairs, plan_specs):
+                if t.get('action') == 'sell' and 'allocation_percentage' in t and normalized_pair:
+                    base_asset = spec.clean_base if spec else ''
                     holding_amt = float(live_raw_balances.get(base_asset, 0.0))
                     alloc = float(t.get('allocation_percentage', 0.0))
-                    try:
-                        px = self.kraken_api.get_ticker_prices([normalized_pair]).get(normalized_pair, {}).get('price', 0)
-                    except Exception:
-                        px = 0
+                    px = plan_prices.get(normalized_pair, 0.0)
                     expected_sell_proceeds_usd += max(0.0, holding_amt * alloc * px)
         except Exception:
             expected_sell_proceeds_usd = expected_sell_proceeds_usd
 
+        # Size every percentage trade in one pass (same engine the executor uses)
+        sized_index = [i for i, t in enumerate(trades) if isinstance(t, dict) and 'confidence_score' in t and plan_specs[i]]
+        try:
+            sizing = size_trades(
+                [plan_pairs[i] for i in sized_index],
+                [trades[i].get('action', '') for i in sized_index],
+                [plan_specs[i] for i in sized_index],
+                [plan_prices.get(plan_pairs[i], 0.0) for i in sized_index],
+                portfolio_value,
+                allocations=[float(trades[i].get('allocation_percentage', 0) or 0) for i in sized_index],
+                available_cash=live_cash_balance + expected_sell_proceeds_usd,
+            )
+            sized_rows = {i: sizing.row(j) for j, i in enumerate(sized_index)}
+        except Exception as e:
+            self.logger.warning(f"Could not size trading plan for volume pre-validation: {e}")
+            sized_rows = {}
+
         # Check 5: Confidence-based validation for new percentage trades
         for i, trade in enumerate(trades):
             if 'confidence_score' in trade:
@@ -901,80 +894,39 @@ class SupervisorAgent(BaseAgent):
         
                 # Check 6: Pre-execution volume validation
                 try:
-                    normalized_pair = self._normalize_pair(trade.get('pair', ''))
+                    normalized_pair = plan_pairs[i]
                     if not normalized_pair:
                         validation_issues.append(f"Trade {i+1}: Invalid or unknown pair '{trade.get('pair')}'")
                         continue
  
-                    pair_details = self.kraken_api.get_pair_details(normalized_pair)
-                    if not pair_details:
+                    if not plan_specs[i]:
                         validation_issues.append(f"Trade {i+1}: Could not fetch trading rules for pair '{normalized_pair}'")
                         continue
-                     
-                    min_volume = float(pair_details.get('ordermin', 0))
-                    costmin = float(pair_details.get('costmin', 0) or 0.0)
-                     
-                    # Calculate expected volume from allocation, treating buys and sells consistently
-                    try:
-                        prices = self.kraken_api.get_ticker_prices([normalized_pair])
-                        if not prices or normalized_pair not in prices:
-                            validation_warnings.append(f"Could not get price for {trade.get('pair')}, skipping volume validation.")
-                            continue
-                        current_price = prices[normalized_pair]['price']
-                        usd_amount = portfolio_value * allocation
-                        calculated_volume = usd_amount / current_price if current_price > 0 else 0
-                    except Exception as e:
-                        validation_warnings.append(f"Could not calculate volume for {trade.get('pair')}: {e}")
-                        continue # Skip validation for this trade if price is unavailable
 
-                    if calculated_volume < min_volume:
-                        # Determine if this BUY can be auto-uplifted at execution given post-sell cash
-                        if trade.get('action') == 'buy':
-                            try:
-                                prices = self.kraken_api.get_ticker_prices([normalized_pair])
-                                price_for_min = prices.get(normalized_pair, {}).get('price', 0)
-                            except Exception:
-                                price_for_min = 0
-                            required_usd = max(costmin, min_volume * price_for_min if price_for_min else 0.0)
-                            cap_pct = 0.99 if portfolio_value >= 50 else 0.95
-                            cap_usd = cap_pct * portfolio_value
-                            effective_available = live_cash_balance + expected_sell_proceeds_usd
-                            if required_usd > 0 and required_usd <= cap_usd * 1.001 and required_usd <= effective_available * 1.001:
-                                validation_warnings.append(
-                                    f"Trade {i+1}: Volume below minimum but upliftable at execution to ordermin {min_volume:.8f} given available funds"
-                                )
-                            else:
-                                validation_issues.append(f"Trade {i+1}: Volume below minimum. Calculated {calculated_volume:.8f}, requires {min_volume:.8f} for {trade.get('pair')}")
+                    sized = sized_rows.get(i)
+                    if not sized or not sized['priced']:
+                        validation_warnings.append(f"Could not get price for {trade.get('pair')}, skipping volume validation.")
+                        continue
+
+                    # Uplift candidates: BUYs whose minimum fits the cash cap and post-sell cash
+                    if sized['below_ordermin']:
+                        if sized['upliftable']:
+                            validation_warnings.append(
+                                f"Trade {i+1}: Volume below minimum but upliftable at execution to ordermin {sized['ordermin']:.8f} given available funds"
+                            )
                         else:
-                            validation_issues.append(f"Trade {i+1}: Volume below minimum. Calculated {calculated_volume:.8f}, requires {min_volume:.8f} for {trade.get('pair')}")
+                            validation_issues.append(f"Trade {i+1}: Volume below minimum. Calculated {sized['volume']:.8f}, requires {sized['ordermin']:.8f} for {trade.get('pair')}")
  
-                    # Effective USD minimum check using live price
-                    try:
-                        prices = self.kraken_api.get_ticker_prices([normalized_pair])
-                        price_for_min = prices.get(normalized_pair, {}).get('price', 0)
-                        trade_usd_value = calculated_volume * price_for_min if price_for_min else 0.0
-                        effective_min_usd = max(costmin, min_volume * price_for_min if price_for_min else 0.0)
-                        if effective_min_usd > 0 and trade_usd_value < effective_min_usd:
-                            # same uplift tolerance as above
-                            if trade.get('action') == 'buy':
-                                required_usd = effective_min_usd
-                                cap_pct = 0.99 if portfolio_value >= 50 else 0.95
-                                cap_usd = cap_pct * portfolio_value
-                                effective_available = live_cash_balance + expected_sell_proceeds_usd
-                                if required_usd <= cap_usd * 1.001 and required_usd <= effective_available * 1.001:
-                                    validation_warnings.append(
-                                        f"Trade {i+1}: USD notional below minimum but upliftable at execution to ${required_usd:.2f}"
-                                    )
-                                else:
-                                    validation_issues.append(
-                                        f"Trade {i+1}: USD value below effective minimum. Calculated ${trade_usd_value:.2f}, requires ${effective_min_usd:.2f} for {trade.get('pair')}"
-                                    )
-                            else:
-                                validation_issues.append(
-                                    f"Trade {i+1}: USD value below effective minimum. Calculated ${trade_usd_value:.2f}, requires ${effective_min_usd:.2f} for {trade.get('pair')}"
-                                )
-                    except Exception:
-                        pass
+                    # Effective USD minimum check (costmin or ordermin * price)
+                    if sized['below_min_usd']:
+                        if sized['upliftable']:
+                            validation_warnings.append(
+                                f"Trade {i+1}: USD notional below minimum but upliftable at execution to ${sized['effective_min_usd']:.2f}"
+                            )
+                        else:
+                            validation_issues.append(
+                                f"Trade {i+1}: USD value below effective minimum. Calculated ${sized['notional']:.2f}, requires ${sized['effective_min_usd']:.2f} for {trade.get('pair')}"
+                            )
  
                 except Exception as e:
                     validation_warnings.append(f"Trade {i+1}: Could not perform volume pre-validation: {e}")
@@ -997,6 +949,15 @@ class SupervisorAgent(BaseAgent):
             "thesis_quality": thesis_quality
         }
     
+    def _get_plan_prices(self, pairs: List[str]) -> Dict[str, float]:
+        """Plan pair -> USD price via KrakenAPI.get_plan_prices; unpriceable pairs are omitted."""
+        prices = {}
+        for pair, info in (self.kraken_api.get_plan_prices(pairs) or {}).items():
+            price = float(info.get('price') or 0.0)
+            if price > 0:
+                prices[pair] = price
+        return prices
+
     def _get_portfolio_value(self) -> float:
         """
         Get the current portfolio value in USD using the canonical method.
@@ -1107,7 +1068,7 @@ class SupervisorAgent(BaseAgent):
             
             self.logger.info("🚀 Executing approved trading plan")
             # Guard: approved but empty plan → treat as hold, do not execute
-            if not isinstance(trading_plan, dict) or not trading_plan.get("trades"):
+            if not isinstance(trading_plan, dict) or not (trading_plan.get("trades") or trading_plan.get("target_weights")):
                 self.logger.info("Plan approved but contains no trades. Treating as HOLD; no execution performed.")
                 result = {
                     "executed": False,
@@ -1218,17 +1179,8 @@ class SupervisorAgent(BaseAgent):
                     # Helper to map Kraken base assets to CoinGecko symbols
                     def _to_cg_symbol_from_pair(p: str) -> str | None:
                         try:
-                            details = self.kraken_api.get_pair_details(p) or {}
-                            base = details.get('base')
-                            if not base:
-                                return None
-                            # Clean X/Z prefixes
-                            if base.startswith(('X','Z')) and len(base) > 1:
-                                base = base[1:]
-                            # Kraken-specific symbol remaps
-                            remaps = {"XBT": "BTC", "XDG": "DOGE"}
-                            base = remaps.get(base, base)
-                            return base.upper()
+                            spec = self.kraken_api.get_pair_spec(p)
+                            return spec.symbol.upper() if spec and spec.symbol else None
                         except Exception:
                             return None
 
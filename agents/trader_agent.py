@@ -247,6 +247,9 @@ class TraderAgent(BaseAgent):
                 if validated_trade is not None:  # Skip None trades (0% allocations)
                     validated_trades.append(validated_trade)
             
+            # Optional: target weights, turned into a minimal order set by the executor
+            target_weights = self._validate_target_weights(decision.get('target_weights'))
+
             # Validate thesis
             thesis = decision.get('thesis', '')
             if not isinstance(thesis, str) or not thesis.strip():
@@ -295,6 +298,7 @@ class TraderAgent(BaseAgent):
 
             return {
                 "trades": validated_trades,
+                "target_weights": target_weights,
                 "holds": validated_holds,
                 "thesis": thesis.strip(),
                 "raw_decision": decision,
@@ -309,6 +313,31 @@ class TraderAgent(BaseAgent):
             self.logger.error(f"Failed to parse AI response: {e}")
             raise ValueError(f"AI response validation failed: {e}")
     
+    def _validate_target_weights(self, raw_targets: Any) -> Dict[str, float]:
+        """
+        Validate optional {pair: weight} targets (fractions of total equity).
+        Invalid entries are dropped with a warning; a total above 100% rejects the targets.
+        """
+        if not raw_targets:
+            return {}
+        if not isinstance(raw_targets, dict):
+            raise ValueError("'target_weights' must be an object mapping pairs to weights")
+        targets = {}
+        for pair, weight in raw_targets.items():
+            pair = str(pair).upper().strip()
+            try:
+                weight = float(weight)
+            except (TypeError, ValueError):
+                self.logger.warning(f"Skipping target weight for {pair}: invalid value {weight!r}")
+                continue
+            if not pair or not (0.0 <= weight <= 1.0):
+                self.logger.warning(f"Skipping target weight for {pair}: {weight} is outside 0-1")
+                continue
+            targets[pair] = weight
+        if sum(targets.values()) > 1.0 + 1e-6:
+            raise ValueError(f"'target_weights' sum to {sum(targets.values())*100:.1f}% (must be at most 100%)")
+        return targets
+
     def _extract_portfolio_value_from_context(self) -> float:
         """
         Extract portfolio value from the current prompt context.
@@ -0,0 +1,282 @@
+import asyncio
+import time
+import aiohttp
+from bot.kraken_api import (
+    MAX_BATCH_ORDERS,
+    RATE_LIMIT_ERROR,
+    KrakenAPI,
+    KrakenAPIError,
+    _batch_order_data,
+    _clean_balances,
+    _parse_batch_results,
+    _parse_ticker_prices,
+    _statuses_from_open_orders,
+)
+from bot.logger import get_logger
+
+logger = get_logger(__name__)
+
+class AsyncKrakenAPI:
+    """
+    asyncio-native counterpart of KrakenAPI for overlapping exchange I/O with LLM and news I/O.
+
+    Wraps a (sync) KrakenAPI instance, which stays available as the `sync` facade for existing
+    callers and supplies the credentials, pair metadata, request signing and the shared nonce
+    sequence. Private requests hold the sync client's private-request lock from nonce to response,
+    like its own private calls, so nonces reach Kraken in order across both clients; the lock is
+    taken in an executor thread so the event loop never blocks on it.
+
+    Usage:
+        async with AsyncKrakenAPI(kraken_api) as api:
+            balance, prices = await asyncio.gather(api.get_account_balance(), api.get_ticker_prices(['XXBTZUSD']))
+    """
+    def __init__(self, kraken_api: KrakenAPI | None = None, session: aiohttp.ClientSession | None = None):
+        """
+        Initializes the async client.
+
+        Args:
+            kraken_api: Sync client to share metadata, signing and nonces with. Created if omitted.
+            session: Optional aiohttp session to reuse; otherwise one is created lazily on first use.
+        """
+        self.sync = kraken_api or KrakenAPI()
+        self.base_url = self.sync.base_url
+        self._session = session
+        self._owns_session = session is None
+        self._private_lock: asyncio.Lock | None = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # --- Metadata shared with the sync client ---
+    @property
+    def asset_pairs(self) -> dict:
+        return self.sync.asset_pairs
+
+    @property
+    def asset_to_usd_pair_map(self) -> dict:
+        return self.sync.asset_to_usd_pair_map
+
+    def get_pair_details(self, pair: str) -> dict:
+        """In-memory pair lookup; identical to KrakenAPI.get_pair_details."""
+        return self.sync.get_pair_details(pair)
+
+    def get_pair_spec(self, pair: str):
+        """Pre-parsed pair rules; identical to KrakenAPI.get_pair_spec."""
+        return self.sync.get_pair_spec(pair)
+
+    def normalize_pair(self, pair: str):
+        """Pair normalization; identical to KrakenAPI.normalize_pair."""
+        return self.sync.normalize_pair(pair)
+
+    def get_live_price(self, pair: str, max_age: float | None = None):
+        """Price-board read; identical to KrakenAPI.get_live_price."""
+        return self.sync.get_live_price(pair, max_age)
+
+    def get_live_book(self, pair: str) -> dict | None:
+        """Streamed book levels; identical to KrakenAPI.get_live_book."""
+        return self.sync.get_live_book(pair)
+
+    # --- Transport ---
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connect_timeout, read_timeout = self.sync.timeout
+            connector = aiohttp.TCPConnector(limit=self.sync.pool_maxsize + self.sync.private_pool_maxsize, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(connect=connect_timeout, sock_read=read_timeout),
+                headers={'User-Agent': 'chatgpt-kraken-bot/1.0'},
+            )
+            self._owns_session = True
+        return self._session
+
+    def _get_private_lock(self) -> asyncio.Lock:
+        # Created lazily so the lock binds to the loop that actually runs the requests
+        if self._private_lock is None:
+            self._private_lock = asyncio.Lock()
+        return self._private_lock
+
+    async def _acquire_sync_private_lock(self):
+        """Take KrakenAPI._private_request_lock without blocking the event loop."""
+        lock = self.sync._private_request_lock
+        if lock.acquire(blocking=False):
+            return
+        acquired = asyncio.get_running_loop().run_in_executor(None, lock.acquire)
+        try:
+            await asyncio.shield(acquired)
+        except asyncio.CancelledError:
+            # The executor still gets the lock eventually; hand it straight back
+            acquired.add_done_callback(lambda _: lock.release())
+            raise
+
+    async def close(self):
+        """Close the underlying aiohttp session if this client created it."""
+        if self._session is not None and self._owns_session and not self._session.closed:
+            await self._session.close()
+
+    async def _request_json(self, method_type: str, url_path: str, data: dict, headers: dict) -> dict:
+        session = self._get_session()
+        full_url = self.base_url + url_path
+        started = time.perf_counter()
+        if method_type == 'public':
+            resp_ctx = session.get(full_url, params=data)
+        else:
+            resp_ctx = session.post(full_url, data=data, headers=headers)
+        async with resp_ctx as resp:
+            resp.raise_for_status()
+            payload = await resp.json(content_type=None)
+        logger.debug(f"async {method_type.upper()} {url_path}: {(time.perf_counter() - started) * 1000:.0f}ms")
+        return payload
+
+    async def _query_api(self, method_type: str, url_path: str, data: dict | None = None, max_retries: int = 3):
+        """
+        Async equivalent of KrakenAPI._query_api: same retry/backoff policy and the same rate
+        governor (shared with the sync client), but waits with asyncio.sleep and raises
+        KrakenAPIError on API errors.
+        """
+        data = data or {}
+        if self.sync.paper:
+            # In-process exchange: answers immediately, nothing to sign, pace or retry
+            return self.sync._query_api(method_type, url_path, data)
+        last_error: Exception | None = None
+        attempt = 0
+        rate_limit_retries = 0
+        while attempt < max_retries:
+            try:
+                local_data = dict(data)
+                if method_type == 'private':
+                    await self.sync.rate_limiter.acquire_async(url_path)
+                    # Nonce generation and send happen under the sync client's lock so requests from
+                    # both clients arrive in nonce order; the asyncio lock queues this client's
+                    # coroutines so only one of them waits on an executor thread at a time
+                    async with self._get_private_lock():
+                        await self._acquire_sync_private_lock()
+                        try:
+                            local_data['nonce'] = self.sync._get_nonce()
+                            headers = {
+                                'API-Key': self.sync.api_key,
+                                'API-Sign': self.sync._get_kraken_signature(url_path, local_data),
+                            }
+                            result = await self._request_json(method_type, url_path, local_data, headers)
+                        finally:
+                            self.sync._private_request_lock.release()
+                else:
+                    result = await self._request_json(method_type, url_path, local_data, {})
+
+                if not isinstance(result, dict):
+                    return {}
+                errors = result.get('error', [])
+                if errors:
+                    raise KrakenAPIError(f"API returned errors: {errors}")
+                return result.get('result', {})
+            except Exception as e:
+                last_error = e
+                # Do not retry on explicit permission denied
+                if 'Permission denied' in str(e) or 'Invalid key' in str(e):
+                    raise
+                if method_type == 'private' and RATE_LIMIT_ERROR in str(e) and rate_limit_retries < self.sync.max_rate_limit_retries:
+                    rate_limit_retries += 1
+                    self.sync.rate_limiter.on_rate_limited()
+                    continue
+                attempt += 1
+                if attempt < max_retries:
+                    await asyncio.sleep(1 * (2 ** (attempt - 1)))
+        raise KrakenAPIError(f"Failed to query API after {max_retries} retries: {last_error}")
+
+    # --- Account and market data ---
+    async def get_account_balance(self) -> dict:
+        """Async KrakenAPI.get_account_balance: {'ASSET': balance} without dust."""
+        balance = await self._query_api('private', '/0/private/Balance')
+        return _clean_balances(balance)
+
+    async def get_ticker_prices(self, pairs: list) -> dict:
+        """Async KrakenAPI.get_ticker_prices: {'PAIR': {'price': float}} for one request over all pairs."""
+        if not isinstance(pairs, list) or not pairs:
+            raise ValueError("Input must be a non-empty list of pairs.")
+        tickers = await self._query_api('public', '/0/public/Ticker', {'pair': ",".join(pairs)})
+        return _parse_ticker_prices(tickers)
+
+    # --- Orders ---
+    async def place_order(self, pair: str, order_type: str, volume: float, ordertype: str = 'market', validate: bool = False,
+                          price: float | None = None, post_only: bool = False) -> dict:
+        """Async KrakenAPI.place_order. Live orders invalidate the shared portfolio snapshot."""
+        data = self.sync._order_data(pair, order_type, volume, ordertype, validate, price, post_only)
+        if validate:
+            return await self._query_api('private', '/0/private/AddOrder', data)
+        try:
+            return await self._query_api('private', '/0/private/AddOrder', data)
+        finally:
+            self.sync.invalidate_portfolio_snapshot()
+
+    async def place_order_batch(self, pair: str, orders: list[dict], validate: bool = False) -> list[dict]:
+        """Async KrakenAPI.place_order_batch: one AddOrderBatch request, one result per order."""
+        if not 2 <= len(orders) <= MAX_BATCH_ORDERS:
+            raise ValueError(f"AddOrderBatch takes 2-{MAX_BATCH_ORDERS} orders, got {len(orders)}")
+        data = _batch_order_data(pair, orders, validate, self.sync.get_pair_spec(pair))
+        if validate:
+            return _parse_batch_results(await self._query_api('private', '/0/private/AddOrderBatch', data), len(orders))
+        try:
+            return _parse_batch_results(await self._query_api('private', '/0/private/AddOrderBatch', data), len(orders))
+        finally:
+            self.sync.invalidate_portfolio_snapshot()
+
+    async def validate_order(self, pair: str, order_type: str, volume: float, ordertype: str = 'market') -> tuple[bool, list]:
+        """Async KrakenAPI.validate_order: returns (ok, errors) and never raises."""
+        data = self.sync._order_data(pair, order_type, volume, ordertype, validate=True)
+        try:
+            await self._query_api('private', '/0/private/AddOrder', data, max_retries=1)
+            return True, []
+        except Exception as exc:
+            return False, [str(exc)]
+
+    async def cancel_order(self, txid: str) -> dict:
+        """Async KrakenAPI.cancel_order."""
+        try:
+            return await self._query_api('private', '/0/private/CancelOrder', {'txid': txid})
+        finally:
+            self.sync.invalidate_portfolio_snapshot()
+
+    async def get_open_orders(self) -> dict:
+        return await self._query_api('private', '/0/private/OpenOrders')
+
+    async def query_orders(self, txids: list[str]) -> dict:
+        if not txids:
+            return {}
+        return await self._query_api('private', '/0/private/QueryOrders', {'txid': ",".join(txids)})
+
+    async def wait_for_orders_closed(self, txids: list[str], timeout_seconds: int = 45, poll_interval: float = 2.0,
+                                     any_closed: bool = False) -> dict:
+        """
+        Async KrakenAPI.wait_for_orders_closed: polls with asyncio.sleep so other coroutines keep
+        running. Returns a dict of txid -> final_status (closed/canceled/open/unknown).
+        """
+        if not txids:
+            return {}
+        done = any if any_closed else all
+        try:
+            loop = asyncio.get_running_loop()
+            end_time = loop.time() + timeout_seconds
+            last_status: dict = {}
+            while loop.time() < end_time:
+                try:
+                    status = await self.query_orders(txids)
+                    last_status = {tx: status.get(tx, {}).get('status', 'unknown') for tx in txids}
+                    if done(s in ('closed', 'canceled') for s in last_status.values()):
+                        return last_status
+                except Exception as e:
+                    if 'Permission denied' in str(e):
+                        logger.info("API key lacks 'QueryOrders' permission. Attempting fallback with 'OpenOrders'.")
+                        try:
+                            return _statuses_from_open_orders(txids, await self.get_open_orders())
+                        except Exception as fallback_e:
+                            logger.warning(f"Fallback 'OpenOrders' failed: {fallback_e}")
+                            return {tx: 'unknown' for tx in txids}
+                    logger.warning(f"Polling for order status failed with a transient error: {e}. Retrying...")
+                await asyncio.sleep(poll_interval)
+
+            logger.warning(f"Timed out waiting for orders to close. Last known statuses: {last_status}")
+            return last_status or {tx: 'unknown' for tx in txids}
+        finally:
+            self.sync.invalidate_portfolio_snapshot()
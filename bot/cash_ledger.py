@@ -0,0 +1,97 @@
+import threading
+from typing import Hashable
+
+# Relative slack when comparing a cost against available cash (price drift between quote and fill)
+DEFAULT_CASH_TOLERANCE = 0.001
+
+
+class CashLedger:
+    """
+    Thread-safe USD cash accounting for one execution phase.
+
+    Seeded once from a portfolio snapshot, then kept current locally instead of re-reading
+    Balance/Ticker for every BUY:
+    - reserve(key, usd) holds cash for an order being validated (re-reserving a key resizes it)
+    - release(key) returns the hold when the order is skipped or rejected
+    - commit(key) spends the hold once the order has been submitted
+    - credit(usd) adds cash freed by a closed sell
+    - reseed(cash) replaces the running figure with a fresh balance read
+    """
+
+    def __init__(self, cash: float, tolerance: float = DEFAULT_CASH_TOLERANCE):
+        """
+        Args:
+            cash: Settled USD cash at the start of the phase.
+            tolerance: Relative slack allowed when checking affordability (0.001 = 0.1%).
+        """
+        self.tolerance = tolerance
+        self._cash = max(0.0, float(cash))
+        self._reserved: dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_portfolio(cls, portfolio_context: dict, tolerance: float = DEFAULT_CASH_TOLERANCE) -> 'CashLedger':
+        """Seed a ledger from get_comprehensive_portfolio_context() output."""
+        return cls(float(portfolio_context.get('cash_balance', 0.0) or 0.0), tolerance)
+
+    @property
+    def cash(self) -> float:
+        """Cash not yet spent by committed orders, including reserved cash."""
+        with self._lock:
+            return self._cash
+
+    @property
+    def reserved(self) -> float:
+        with self._lock:
+            return sum(self._reserved.values())
+
+    @property
+    def available(self) -> float:
+        """Cash neither spent nor reserved."""
+        with self._lock:
+            return self._available()
+
+    def _available(self, excluding: Hashable | None = None) -> float:
+        held = sum(amount for key, amount in self._reserved.items() if key != excluding)
+        return max(0.0, self._cash - held)
+
+    def can_afford(self, amount: float, key: Hashable | None = None) -> bool:
+        """True if amount fits in available cash (plus tolerance), counting key's own hold as free."""
+        with self._lock:
+            return amount <= self._available(key) * (1 + self.tolerance)
+
+    def reserve(self, key: Hashable, amount: float) -> bool:
+        """
+        Hold amount USD for key if it fits; an existing hold for key is replaced. Returns False
+        (leaving any previous hold untouched) when the cash is not there.
+        """
+        with self._lock:
+            if amount > self._available(key) * (1 + self.tolerance):
+                return False
+            self._reserved[key] = max(0.0, float(amount))
+            return True
+
+    def release(self, key: Hashable) -> float:
+        """Drop key's hold (order skipped or rejected); returns the amount released."""
+        with self._lock:
+            return self._reserved.pop(key, 0.0)
+
+    def commit(self, key: Hashable) -> float:
+        """Spend key's hold (order submitted); returns the amount debited."""
+        with self._lock:
+            amount = self._reserved.pop(key, 0.0)
+            self._cash = max(0.0, self._cash - amount)
+            return amount
+
+    def credit(self, amount: float):
+        """Add cash freed by a closed sell."""
+        with self._lock:
+            self._cash += max(0.0, float(amount))
+
+    def reseed(self, cash: float):
+        """
+        Replace the cash figure with a fresh Balance read (settled sells and filled buys
+        included); holds are kept.
+        """
+        with self._lock:
+            self._cash = max(0.0, float(cash))
@@ -0,0 +1,306 @@
+import base64
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import timedelta
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from bot.async_kraken_api import AsyncKrakenAPI
+from bot.logger import get_logger
+
+logger = get_logger(__name__)
+
+TAPE_MODES = ('record', 'replay')
+TAPE_VERSION = 1
+
+# Request fields that change on every run without changing what is asked for; they are left
+# out of the match key so a replayed Kraken call finds its recording despite a fresh nonce
+VOLATILE_PARAMS = {'nonce'}
+# Secrets that must never reach a bundle on disk
+REDACTED_PARAMS = {'x_cg_demo_api_key', 'x_cg_pro_api_key', 'api_key', 'key', 'token'}
+TELEGRAM_TOKEN_RE = re.compile(r'/bot[^/]+/')
+# Wall-clock stamps embedded in prompts and payloads ("2025-08-01T07:00:03", "2025-08-01 07:00")
+TIMESTAMP_RE = re.compile(r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?')
+# Response headers worth keeping; the rest (cookies, rate counters, tracing ids) is noise
+KEPT_HEADERS = ('content-type', 'etag', 'last-modified', 'cache-control', 'expires', 'retry-after')
+
+
+class TapeMissError(RuntimeError):
+    """A replayed cycle made a request the recording never saw."""
+
+
+def redact_url(url: str) -> str:
+    """URL with secrets removed: Telegram bot tokens and key-like query parameters."""
+    parts = urlsplit(TELEGRAM_TOKEN_RE.sub('/bot<redacted>/', url))
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k not in REDACTED_PARAMS and k not in VOLATILE_PARAMS]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+def _body_text(body, content_type: str) -> str:
+    """Canonical text of a request body: form bodies without volatile fields, JSON re-serialized."""
+    if body is None:
+        return ''
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', errors='replace')
+    elif not isinstance(body, str):
+        body = json.dumps(body, sort_keys=True, default=str)
+    if 'json' in content_type:
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True)
+        except ValueError:
+            pass
+    elif 'x-www-form-urlencoded' in content_type:
+        body = urlencode(sorted((k, v) for k, v in parse_qsl(body, keep_blank_values=True) if k not in VOLATILE_PARAMS))
+    return body
+
+
+def request_keys(channel: str, method: str, url: str, body, content_type: str = '') -> tuple[str, str]:
+    """
+    (exact key, endpoint key) for one request.
+
+    The exact key hashes the canonical body with timestamps masked, so a replayed cycle whose
+    prompts only differ in "now" still matches. The endpoint key (channel, method, URL path)
+    is the fallback: recordings for an endpoint are served in the order they were made.
+    """
+    url = redact_url(url)
+    text = TIMESTAMP_RE.sub('<ts>', _body_text(body, content_type.lower()))
+    digest = hashlib.sha256(f"{channel} {method.upper()} {url}\n{text}".encode('utf-8')).hexdigest()[:32]
+    parts = urlsplit(url)
+    return digest, f"{channel} {method.upper()} {parts.netloc}{parts.path}"
+
+
+def _encode_body(content: bytes) -> dict:
+    try:
+        return {'text': content.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'b64': base64.b64encode(content).decode('ascii')}
+
+
+def _decode_body(entry: dict) -> bytes:
+    if 'b64' in entry:
+        return base64.b64decode(entry['b64'])
+    return entry.get('text', '').encode('utf-8')
+
+
+def _kept_headers(headers) -> dict:
+    return {name: headers[name] for name in KEPT_HEADERS if name in headers}
+
+
+class CycleTape:
+    """
+    Record/replay of every outbound HTTP and LLM call made while the tape is active.
+
+    In 'record' mode the calls go out as usual and each response is captured; on exit the
+    captures are written to `path` as one gzip'd JSON bundle. In 'replay' mode nothing touches
+    the network: each call is answered from the bundle, matched first on its exact key and
+    otherwise served in recorded order per endpoint, and an unmatched call raises
+    TapeMissError. Secrets (auth headers, API keys, the Telegram token) are never stored.
+
+    Covered transports:
+        - requests.Session.send: Kraken REST, CoinGecko, RSS feeds, Telegram
+        - httpx.Client.send: OpenAI
+        - AsyncKrakenAPI._request_json: Kraken over aiohttp (execution algos)
+        - google.generativeai GenerativeModel.generate_content: Gemini (text only)
+
+    The hooks are process-wide, so only one tape may be active at a time.
+
+    Usage:
+        with CycleTape('logs/tapes/cycle.json.gz', 'record'):
+            supervisor.run(inputs)
+    """
+    _active: 'CycleTape | None' = None
+
+    def __init__(self, path: str, mode: str):
+        if mode not in TAPE_MODES:
+            raise ValueError(f"Unknown tape mode '{mode}'; expected one of {TAPE_MODES}")
+        self.path = path
+        self.mode = mode
+        self.entries: list[dict] = []
+        self.hits = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._exact: dict[str, deque] = defaultdict(deque)
+        self._by_endpoint: dict[str, deque] = defaultdict(deque)
+        self._restore: list[tuple[object, str, object]] = []
+        if mode == 'replay':
+            self._load()
+
+    # --- Bundle I/O ---
+    def _load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            bundle = json.load(f)
+        if bundle.get('version') != TAPE_VERSION:
+            raise ValueError(f"Unsupported tape version {bundle.get('version')} in {self.path}")
+        self.entries = bundle['entries']
+        for entry in self.entries:
+            self._exact[entry['key']].append(entry)
+            self._by_endpoint[entry['endpoint']].append(entry)
+        logger.info(f"Loaded {len(self.entries)} recorded calls from {self.path}")
+
+    def save(self):
+        """Atomically write the recorded calls to `path`."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump({'version': TAPE_VERSION, 'recorded_at': time.time(), 'entries': self.entries}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        logger.info(f"Recorded {len(self.entries)} calls to {self.path}")
+
+    # --- Matching ---
+    def _capture(self, channel: str, method: str, url: str, body, content_type: str, response: dict):
+        key, endpoint = request_keys(channel, method, url, body, content_type)
+        with self._lock:
+            self.entries.append({'key': key, 'endpoint': endpoint, 'seq': len(self.entries), **response})
+
+    def _lookup(self, channel: str, method: str, url: str, body, content_type: str = '') -> dict:
+        key, endpoint = request_keys(channel, method, url, body, content_type)
+        with self._lock:
+            queue = self._exact.get(key)
+            if queue:
+                entry = queue.popleft()
+                self._by_endpoint[endpoint].remove(entry)
+                self.hits += 1
+                return entry
+            queue = self._by_endpoint.get(endpoint)
+            if queue:
+                entry = queue.popleft()
+                self._exact[entry['key']].remove(entry)
+                self.fallbacks += 1
+                logger.debug(f"Tape: no exact match for {endpoint}; serving recording #{entry['seq']}")
+                return entry
+        raise TapeMissError(f"No recorded response left for {endpoint}")
+
+    def summary(self) -> dict:
+        """Counts for the log line at the end of a taped cycle."""
+        with self._lock:
+            unused = sum(len(q) for q in self._by_endpoint.values()) if self.mode == 'replay' else 0
+        return {'mode': self.mode, 'calls': len(self.entries), 'exact': self.hits,
+                'in_order': self.fallbacks, 'unused': unused}
+
+    # --- Hook installation ---
+    def __enter__(self):
+        if CycleTape._active is not None:
+            raise RuntimeError("Another CycleTape is already active")
+        CycleTape._active = self
+        self._patch(requests.Session, 'send', self._requests_send)
+        self._patch(httpx.Client, 'send', self._httpx_send)
+        self._patch(AsyncKrakenAPI, '_request_json', self._aiohttp_request_json)
+        try:
+            import google.generativeai as genai
+        except ImportError:
+            genai = None
+        if genai is not None:
+            self._patch(genai.GenerativeModel, 'generate_content', self._gemini_generate)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for owner, name, original in reversed(self._restore):
+            setattr(owner, name, original)
+        self._restore.clear()
+        CycleTape._active = None
+        if self.mode == 'record':
+            self.save()
+        logger.info(f"Cycle tape closed: {self.summary()}")
+
+    def _patch(self, owner, name: str, factory):
+        original = getattr(owner, name)
+        self._restore.append((owner, name, original))
+        setattr(owner, name, factory(original))
+
+    def _requests_send(self, original):
+        tape = self
+
+        def send(session, request, **kwargs):
+            content_type = request.headers.get('Content-Type', '')
+            if tape.mode == 'replay':
+                entry = tape._lookup('http', request.method, request.url, request.body, content_type)
+                response = requests.Response()
+                response.status_code = entry['status']
+                response.reason = http.client.responses.get(entry['status'], '')
+                response.headers = CaseInsensitiveDict(entry['headers'])
+                response._content = _decode_body(entry)
+                response._content_consumed = True
+                response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+                response.url = request.url
+                response.request = request
+                response.elapsed = timedelta(0)
+                return response
+            # Redirects re-enter send(); only the outermost call is the caller's request
+            if getattr(tape._local, 'in_send', False):
+                return original(session, request, **kwargs)
+            tape._local.in_send = True
+            try:
+                response = original(session, request, **kwargs)
+            finally:
+                tape._local.in_send = False
+            tape._capture('http', request.method, request.url, request.body, content_type, {
+                'status': response.status_code, 'headers': _kept_headers(response.headers), **_encode_body(response.content),
+            })
+            return response
+        return send
+
+    def _httpx_send(self, original):
+        tape = self
+
+        def send(client, request, **kwargs):
+            content_type = request.headers.get('content-type', '')
+            body = request.read()
+            if tape.mode == 'replay':
+                entry = tape._lookup('http', request.method, str(request.url), body, content_type)
+                return httpx.Response(entry['status'], headers=entry['headers'], content=_decode_body(entry), request=request)
+            response = original(client, request, **kwargs)
+            response.read()
+            tape._capture('http', request.method, str(request.url), body, content_type, {
+                'status': response.status_code, 'headers': _kept_headers(response.headers), **_encode_body(response.content),
+            })
+            return response
+        return send
+
+    def _aiohttp_request_json(self, original):
+        tape = self
+
+        async def request_json(api, method_type, url_path, data, headers):
+            url = api.base_url + url_path
+            form = urlencode(sorted(data.items()))
+            content_type = 'application/x-www-form-urlencoded'
+            if tape.mode == 'replay':
+                return json.loads(tape._lookup('kraken-async', method_type, url, form, content_type)['text'])
+            payload = await original(api, method_type, url_path, data, headers)
+            tape._capture('kraken-async', method_type, url, form, content_type, {
+                'status': 200, 'headers': {}, 'text': json.dumps(payload),
+            })
+            return payload
+        return request_json
+
+    def _gemini_generate(self, original):
+        tape = self
+
+        def generate_content(model, contents, *args, **kwargs):
+            url = f"gemini://{getattr(model, 'model_name', 'unknown')}"
+            if tape.mode == 'replay':
+                text = tape._lookup('gemini', 'POST', url, contents)['text']
+                return SimpleNamespace(text=text, candidates=[])
+            response = original(model, contents, *args, **kwargs)
+            try:
+                text = response.text or ''
+            except Exception:
+                # Blocked or empty candidates; replay reproduces them as an empty answer
+                text = ''
+            tape._capture('gemini', 'POST', url, contents, '', {'status': 200, 'headers': {}, 'text': text})
+            return response
+        return generate_content
@@ -0,0 +1,384 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from bot.async_kraken_api import AsyncKrakenAPI
+from bot.kraken_api import TERMINAL_STATUSES, KrakenAPIError
+from bot.kraken_ws import OrderStateTable
+from bot.quantize import quantize_price, quantize_volume, spec_lot_decimals
+from bot.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 'twap' spreads a parent evenly over time; 'participation' additionally caps each child at a
+# share of the displayed liquidity it would take; 'passive' rests post-only at the touch
+EXECUTION_MODES = ('twap', 'participation', 'passive')
+
+DEFAULT_SLICES = 5
+DEFAULT_DURATION_SECONDS = 300.0
+# Share of the opposite-side book depth (at or inside the child's limit) one child may take
+DEFAULT_PARTICIPATION = 0.25
+# Children never pay more (buys) or accept less (sells) than arrival price +/- this fraction
+DEFAULT_LIMIT_SLIPPAGE = 0.005
+# Parents worked at once; their REST calls still queue through the shared rate governor
+DEFAULT_MAX_CONCURRENT_PARENTS = 4
+# Upper bound on QueryOrders polling while a child is working
+CHILD_POLL_INTERVAL = 2.0
+
+# Passive mode: time a post-only order may chase the touch before the rest goes out at market
+DEFAULT_CHASE_DEADLINE_SECONDS = 120.0
+# How often the chaser re-reads the in-memory board and order state
+CHASE_CHECK_INTERVAL = 0.5
+# Without a live board, how often the chaser re-prices from a REST Ticker read
+DEFAULT_REPRICE_SECONDS = 10.0
+# How long to wait for the stream to confirm a cancel before asking QueryOrders
+CANCEL_CONFIRM_SECONDS = 5.0
+
+
+@dataclass
+class ParentOrder:
+    """One order to be worked by an execution algorithm instead of a single market order."""
+    pair: str
+    side: str  # 'buy' or 'sell'
+    volume: float
+    mode: str = 'twap'
+    duration_seconds: float = DEFAULT_DURATION_SECONDS  # schedule length; the chase deadline in passive mode
+    slices: int = DEFAULT_SLICES
+    participation: float = DEFAULT_PARTICIPATION
+    limit_slippage: float = DEFAULT_LIMIT_SLIPPAGE
+    finish_with_market: bool = True  # sweep whatever is left at the end with a market order
+
+
+@dataclass
+class ParentResult:
+    parent: ParentOrder
+    filled_volume: float = 0.0
+    txids: list = field(default_factory=list)
+    complete: bool = False
+    error: str | None = None
+
+    @property
+    def status(self) -> str:
+        """'filled', 'partial' or 'failed'."""
+        if self.complete:
+            return 'filled'
+        return 'partial' if self.filled_volume > 0 else 'failed'
+
+
+def slice_schedule(volume: float, slices: int, lot_decimals: int, ordermin: float = 0.0) -> list[float]:
+    """
+    Cumulative volume targets for an even TWAP: entry k is what should have been filled by the
+    end of slice k. Fewer slices are used when an even slice would fall below ordermin.
+    """
+    if ordermin > 0:
+        slices = min(slices, int(volume // ordermin))
+    slices = max(1, int(slices))
+    targets = [float(quantize_volume(volume * (k + 1) / slices, lot_decimals)) for k in range(slices)]
+    targets[-1] = float(quantize_volume(volume, lot_decimals))
+    return targets
+
+
+def child_limit_price(side: str, bid: float, ask: float, arrival_price: float, limit_slippage: float) -> float:
+    """
+    Marketable limit at the far touch (ask for buys, bid for sells), capped at the arrival price
+    plus/minus limit_slippage. When the touch is outside the band the child rests at the cap.
+    """
+    if side == 'buy':
+        cap = arrival_price * (1 + limit_slippage)
+        return min(ask, cap) if ask > 0 else cap
+    floor = arrival_price * (1 - limit_slippage)
+    return max(bid, floor) if bid > 0 else floor
+
+
+def participation_cap(book: dict, side: str, limit_price: float, participation: float) -> float:
+    """participation times the displayed quantity a child could take at or inside limit_price."""
+    if side == 'buy':
+        available = sum(qty for price, qty in book.get('asks', []) if price <= limit_price)
+    else:
+        available = sum(qty for price, qty in book.get('bids', []) if price >= limit_price)
+    return participation * available
+
+
+class SlicedOrderScheduler:
+    """
+    Works parent orders as timed limit children on an asyncio loop.
+
+    Each parent is split into evenly spaced slices (slice_schedule). At every slice boundary a
+    child for the volume still behind schedule is priced from the live book (child_limit_price),
+    optionally capped by displayed depth (participation mode), placed as a limit order and
+    given until the slice ends. Whatever it has not filled by then is canceled and rolls into
+    the next child at a fresh price (cancel/replace). Several parents run concurrently; every
+    private call goes through AsyncKrakenAPI and therefore the shared rate governor.
+    """
+    def __init__(self, api: AsyncKrakenAPI, max_concurrent: int = DEFAULT_MAX_CONCURRENT_PARENTS,
+                 clock=time.monotonic, sleep=asyncio.sleep):
+        """
+        Args:
+            api: Async client used for quotes, orders and order status.
+            max_concurrent: Parents worked at the same time.
+            clock, sleep: Monotonic time source and async sleep (injectable for tests).
+        """
+        self.api = api
+        self.max_concurrent = max(1, int(max_concurrent))
+        self._clock = clock
+        self._sleep = sleep
+
+    async def run(self, parents: list[ParentOrder]) -> list[ParentResult]:
+        """Work every parent, at most max_concurrent at a time; results are in input order."""
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        async def guarded(parent: ParentOrder) -> ParentResult:
+            async with semaphore:
+                return await self.execute(parent)
+
+        return list(await asyncio.gather(*(guarded(parent) for parent in parents)))
+
+    async def execute(self, parent: ParentOrder) -> ParentResult:
+        """Work one parent to completion (or until the schedule ends); never raises."""
+        result = ParentResult(parent)
+        spec = self.api.get_pair_spec(parent.pair)
+        lot_decimals = spec_lot_decimals(spec)
+        ordermin = spec.ordermin if spec else 0.0
+        targets = slice_schedule(parent.volume, parent.slices, lot_decimals, ordermin)
+        interval = max(0.0, parent.duration_seconds) / len(targets)
+        logger.info(
+            f"{parent.mode.upper()} {parent.side} {parent.volume} {parent.pair}: "
+            f"{len(targets)} slice(s) over {parent.duration_seconds:.0f}s"
+        )
+
+        try:
+            _, _, arrival_price = await self._quote(parent.pair)
+            started = self._clock()
+            for k, target in enumerate(targets):
+                slice_end = started + interval * (k + 1)
+                child = float(quantize_volume(target - result.filled_volume, lot_decimals))
+                bid, ask, _ = await self._quote(parent.pair)
+                limit_price = child_limit_price(parent.side, bid, ask, arrival_price, parent.limit_slippage)
+                if parent.mode == 'participation':
+                    book = self.api.get_live_book(parent.pair)
+                    if book:
+                        cap = participation_cap(book, parent.side, limit_price, parent.participation)
+                        child = min(child, float(quantize_volume(cap, lot_decimals)))
+                # Children below ordermin are not placeable; the shortfall rolls into the next slice
+                if child > 0 and child >= ordermin:
+                    result.filled_volume += await self._work_child(parent, child, limit_price, slice_end, result)
+                await self._sleep(max(0.0, slice_end - self._clock()))
+
+            remainder = float(quantize_volume(parent.volume - result.filled_volume, lot_decimals))
+            if remainder > 0 and remainder >= ordermin and parent.finish_with_market:
+                logger.info(f"{parent.pair}: sweeping {remainder} left after the last slice with a market order")
+                result.filled_volume += await self._sweep(parent, remainder, result)
+                remainder = float(quantize_volume(parent.volume - result.filled_volume, lot_decimals))
+            # A leftover below ordermin cannot be placed at all, so the parent is as done as it gets
+            result.complete = remainder <= 0 or remainder < ordermin
+        except Exception as e:
+            result.error = str(e)
+            logger.error(f"Sliced execution of {parent.side} {parent.volume} {parent.pair} stopped: {e}")
+            await self._reconcile_fills(result)
+
+        logger.info(f"{parent.pair}: {result.status}, {result.filled_volume} of {parent.volume} in {len(result.txids)} order(s)")
+        return result
+
+    async def _quote(self, pair: str) -> tuple[float, float, float]:
+        """(bid, ask, price) from the live board, or from a REST Ticker read (0.0 for missing sides)."""
+        quote = self.api.get_live_price(pair)
+        if quote is not None and not quote.stale and not quote.touch_stale and quote.price > 0:
+            return quote.bid, quote.ask, quote.price
+        prices = await self.api.get_ticker_prices([pair])
+        ticker = next(iter(prices.values()), {})
+        price = ticker.get('price', 0.0)
+        if price <= 0:
+            raise KrakenAPIError(f"No price available for {pair}")
+        return ticker.get('bid', 0.0), ticker.get('ask', 0.0), price
+
+    async def _work_child(self, parent: ParentOrder, volume: float, limit_price: float, slice_end: float,
+                          result: ParentResult) -> float:
+        """Place one limit child, wait until slice_end, cancel any unfilled rest; returns the volume filled."""
+        response = await self.api.place_order(parent.pair, parent.side, volume, ordertype='limit', price=limit_price)
+        txid = (response.get('txid') or [None])[0]
+        if not txid:
+            return 0.0
+        result.txids.append(txid)
+        time_left = max(0.0, slice_end - self._clock())
+        statuses = {}
+        try:
+            statuses = await self.api.wait_for_orders_closed(
+                [txid], timeout_seconds=time_left, poll_interval=min(CHILD_POLL_INTERVAL, max(time_left, 0.1))
+            )
+        finally:
+            # Also when the wait raised: no child may be left resting once this parent gives up
+            if statuses.get(txid) not in TERMINAL_STATUSES:
+                try:
+                    await self.api.cancel_order(txid)
+                except Exception as e:
+                    # Most often the child filled between the last poll and the cancel
+                    logger.warning(f"Cancel of child {txid} failed: {e}")
+        return await self._filled_volume(txid)
+
+    async def _sweep(self, parent: ParentOrder, volume: float, result: ParentResult) -> float:
+        response = await self.api.place_order(parent.pair, parent.side, volume)
+        txid = (response.get('txid') or [None])[0]
+        if not txid:
+            return 0.0
+        result.txids.append(txid)
+        await self.api.wait_for_orders_closed([txid], timeout_seconds=30, poll_interval=CHILD_POLL_INTERVAL)
+        return await self._filled_volume(txid)
+
+    async def _filled_volume(self, txid: str) -> float:
+        info = (await self.api.query_orders([txid])).get(txid, {})
+        return float(info.get('vol_exec') or 0.0)
+
+    async def _reconcile_fills(self, result: ParentResult):
+        """After a failure, recount filled_volume from vol_exec of every order placed for the parent."""
+        if not result.txids:
+            return
+        try:
+            info = await self.api.query_orders(result.txids)
+            result.filled_volume = sum(float(info.get(tx, {}).get('vol_exec') or 0.0) for tx in result.txids)
+        except Exception as e:
+            logger.warning(f"Could not reconcile fills of {result.parent.pair} orders {result.txids}: {e}")
+
+
+class PostOnlyChaser(SlicedOrderScheduler):
+    """
+    'passive' execution: keeps one post-only limit order resting at the near touch (bid for
+    buys, ask for sells) so fills pay the maker fee instead of the taker fee.
+
+    The touch is re-read from the in-memory price board every check_interval (or from REST
+    Ticker every reprice_seconds when the board is not live); when it moves, the order is
+    canceled and replaced at the new touch. Order status and filled quantity come from an
+    OrderStateTable (the executions stream), so the loop makes no QueryOrders round-trips while
+    the stream is live. A post-only order the exchange cancels for crossing is replaced one tick
+    further from the touch until the touch moves, so a stale quote does not re-send the same
+    crossing order every check.
+    When parent.duration_seconds runs out, the working order is canceled and the rest is swept
+    with a market order.
+    """
+    def __init__(self, api: AsyncKrakenAPI, order_states: OrderStateTable | None = None,
+                 reprice_seconds: float = DEFAULT_REPRICE_SECONDS, check_interval: float = CHASE_CHECK_INTERVAL,
+                 max_concurrent: int = DEFAULT_MAX_CONCURRENT_PARENTS, clock=time.monotonic, sleep=asyncio.sleep):
+        """
+        Args:
+            api: Async client used for quotes and orders.
+            order_states: Live order state (KrakenExecutionsFeed.table); None polls QueryOrders.
+            reprice_seconds: REST re-pricing period when the price board is not live.
+            check_interval: Seconds between checks of the board and the order state.
+            max_concurrent, clock, sleep: As for SlicedOrderScheduler.
+        """
+        super().__init__(api, max_concurrent, clock, sleep)
+        self.order_states = order_states
+        self.reprice_seconds = reprice_seconds
+        self.check_interval = check_interval
+
+    async def execute(self, parent: ParentOrder) -> ParentResult:
+        """Chase one parent until filled or its deadline; never raises."""
+        result = ParentResult(parent)
+        spec = self.api.get_pair_spec(parent.pair)
+        lot_decimals = spec_lot_decimals(spec)
+        ordermin = spec.ordermin if spec else 0.0
+        tick = spec.tick_size if spec else 0
+        deadline = self._clock() + max(0.0, parent.duration_seconds)
+        logger.info(f"PASSIVE {parent.side} {parent.volume} {parent.pair}: post-only at the touch for {parent.duration_seconds:.0f}s")
+
+        settled = 0.0  # filled by orders no longer working
+        working: dict | None = None  # {'txid', 'price'}
+        touch, priced_at = 0.0, None
+        rejected: dict | None = None  # {'price', 'touch'} of the last post-only reject
+        try:
+            while self._clock() < deadline:
+                if working is not None:
+                    status, filled = await self._order_state(working['txid'])
+                    if status in TERMINAL_STATUSES:
+                        settled += filled
+                        if status == 'canceled':
+                            # Canceled by the exchange: the post-only order would have crossed
+                            rejected = {'price': working['price'], 'touch': touch}
+                            priced_at = None
+                        working = None
+                to_fill = float(quantize_volume(parent.volume - settled, lot_decimals))
+                if working is None and (to_fill <= 0 or to_fill < ordermin):
+                    break
+
+                quote = self.api.get_live_price(parent.pair)
+                if quote is not None and not quote.touch_stale and quote.bid > 0 and quote.ask > 0:
+                    touch = quote.bid if parent.side == 'buy' else quote.ask
+                elif priced_at is None or self._clock() - priced_at >= self.reprice_seconds:
+                    bid, ask, last = await self._quote(parent.pair)
+                    near = bid if parent.side == 'buy' else ask
+                    touch = near if near > 0 else last
+                    priced_at = self._clock()
+
+                price = float(quantize_price(touch, tick, parent.side))
+                if rejected is not None:
+                    if touch != rejected['touch']:
+                        rejected = None
+                    else:
+                        # Same touch as the reject: rest one tick passive of the rejected price
+                        # instead of sending the same crossing order again
+                        # (half a tick, then snapped away from the touch, lands exactly one tick off)
+                        if parent.side == 'buy':
+                            price = min(price, float(quantize_price(rejected['price'] - tick / 2, tick, 'buy')))
+                        else:
+                            price = max(price, float(quantize_price(rejected['price'] + tick / 2, tick, 'sell')))
+                        if price == rejected['price']:
+                            # No tick size to step by: wait for the touch to move
+                            await self._sleep(self.check_interval)
+                            continue
+                if working is not None and working['price'] != price:
+                    settled += await self._cancel_working(working['txid'])
+                    working = None
+                    continue
+                if working is None and price > 0:
+                    response = await self.api.place_order(
+                        parent.pair, parent.side, to_fill, ordertype='limit', price=price, post_only=True
+                    )
+                    txid = (response.get('txid') or [None])[0]
+                    if txid:
+                        result.txids.append(txid)
+                        working = {'txid': txid, 'price': price}
+                await self._sleep(self.check_interval)
+
+            if working is not None:
+                settled += await self._cancel_working(working['txid'])
+            result.filled_volume = settled
+            remainder = float(quantize_volume(parent.volume - settled, lot_decimals))
+            if remainder > 0 and remainder >= ordermin and parent.finish_with_market:
+                logger.info(f"{parent.pair}: chase deadline reached; sweeping {remainder} with a market order")
+                result.filled_volume += await self._sweep(parent, remainder, result)
+                remainder = float(quantize_volume(parent.volume - result.filled_volume, lot_decimals))
+            result.complete = remainder <= 0 or remainder < ordermin
+        except Exception as e:
+            if working is not None:
+                # Do not leave the resting order behind once the chase gives up
+                try:
+                    settled += await self._cancel_working(working['txid'])
+                except Exception as cancel_error:
+                    logger.warning(f"Cancel of {working['txid']} after failure failed: {cancel_error}")
+            result.filled_volume = max(result.filled_volume, settled)
+            result.error = str(e)
+            logger.error(f"Passive execution of {parent.side} {parent.volume} {parent.pair} stopped: {e}")
+
+        logger.info(f"{parent.pair}: {result.status}, {result.filled_volume} of {parent.volume} in {len(result.txids)} order(s)")
+        return result
+
+    async def _order_state(self, txid: str) -> tuple[str, float]:
+        """(status, filled volume) from the stream's table, or from QueryOrders without one."""
+        if self.order_states is not None:
+            # Orders the stream has not reported yet are pending, not unknown
+            return self.order_states.get(txid) or 'pending', self.order_states.filled(txid)
+        info = (await self.api.query_orders([txid])).get(txid, {})
+        return info.get('status', 'unknown'), float(info.get('vol_exec') or 0.0)
+
+    async def _cancel_working(self, txid: str) -> float:
+        """Cancel the working order and return its final filled volume."""
+        try:
+            await self.api.cancel_order(txid)
+        except KrakenAPIError as e:
+            # Most often the order filled (or was rejected) just before the cancel
+            logger.warning(f"Cancel of {txid} failed: {e}")
+        if self.order_states is not None:
+            confirm_by = self._clock() + CANCEL_CONFIRM_SECONDS
+            while self._clock() < confirm_by:
+                if self.order_states.get(txid) in TERMINAL_STATUSES:
+                    return self.order_states.filled(txid)
+                await self._sleep(self.check_interval)
+        return await self._filled_volume(txid)
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from types import SimpleNamespace
+from bot.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_FEED_CACHE_PATH = os.path.join("logs", "rss_feed_cache.json")
+FEED_CACHE_VERSION = 1
+# Within this many seconds of the last check a feed is served from memory without any request,
+# so prefetch/refinement refetches in one cycle are near-instant
+DEFAULT_FRESH_SECONDS = float(os.getenv("RSS_CACHE_FRESH_SECONDS", "120"))
+
+
+@dataclass
+class FeedRecord:
+    """HTTP validators and the parsed entries of the last full download of one feed."""
+    etag: str | None
+    last_modified: str | None
+    content_hash: str
+    size: int  # body bytes of the last full download
+    entries: list[dict]  # {'title', 'link', 'published_parsed'} per entry, feed order
+    bozo: bool = False
+    checked_at: float = 0.0  # wall time of the last 200/304, for the freshness window
+
+
+@dataclass
+class FeedStats:
+    """Per-feed counters: how lookups were answered and the bytes that did not cross the wire."""
+    fresh: int = 0  # served from memory inside the freshness window, no request
+    not_modified: int = 0  # 304 answered from the cache
+    unchanged: int = 0  # 200 with a body identical to the cached one; parse skipped
+    downloads: int = 0  # 200 with new content, parsed
+    bytes_downloaded: int = 0
+    bytes_saved: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.fresh + self.not_modified + self.unchanged + self.downloads
+
+    @property
+    def hit_ratio(self) -> float:
+        return (self.lookups - self.downloads) / self.lookups if self.lookups else 0.0
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def compact_entries(feed, limit: int) -> list[dict]:
+    """The entry fields the research filter reads, for the first `limit` entries of a parsed feed."""
+    entries = []
+    for entry in getattr(feed, 'entries', [])[:limit]:
+        published = getattr(entry, 'published_parsed', None) or getattr(entry, 'updated_parsed', None)
+        entries.append({
+            'title': getattr(entry, 'title', ''),
+            'link': getattr(entry, 'link', ''),
+            'published_parsed': list(published) if published else None,
+        })
+    return entries
+
+
+def cached_feed(record: FeedRecord) -> SimpleNamespace:
+    """A feedparser-shaped view of a cached record (entries, bozo)."""
+    entries = [
+        SimpleNamespace(title=e['title'], link=e['link'],
+                        published_parsed=tuple(e['published_parsed']) if e['published_parsed'] else None)
+        for e in record.entries
+    ]
+    return SimpleNamespace(entries=entries, bozo=record.bozo, from_cache=True)
+
+
+class FeedCache:
+    """
+    Conditional-GET cache for RSS feeds.
+
+    Per feed it keeps the ETag / Last-Modified validators, a hash of the last body and the
+    entries parsed from it, on disk so restarts start warm. A lookup is answered, cheapest
+    first, from memory inside the freshness window, from a 304 Not Modified, or from a 200 whose
+    body hashes the same as before (servers without validators); only new content is parsed.
+    Thread-safe; feeds are fetched from a thread pool.
+    """
+    def __init__(self, path: str | None = DEFAULT_FEED_CACHE_PATH, fresh_seconds: float = DEFAULT_FRESH_SECONDS,
+                 clock=time.time):
+        """
+        Args:
+            path: JSON file the records persist to (None keeps the cache in memory only).
+            fresh_seconds: Seconds after a check during which a feed is served without a request.
+            clock: Wall time source (injectable for tests).
+        """
+        self.path = path
+        self.fresh_seconds = fresh_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._records: dict[str, FeedRecord] = self._load()
+        self._stats: dict[str, FeedStats] = {}
+
+    # --- Persistence ---
+    def _load(self) -> dict[str, FeedRecord]:
+        try:
+            if not self.path or not os.path.exists(self.path):
+                return {}
+            with open(self.path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get('version') != FEED_CACHE_VERSION:
+                return {}
+            return {url: FeedRecord(**record) for url, record in payload.get('feeds', {}).items()}
+        except Exception as e:
+            logger.warning(f"Could not load RSS feed cache: {e}")
+            return {}
+
+    def save(self):
+        """Atomically persist the records so concurrent readers never see a partial file."""
+        if not self.path:
+            return
+        with self._lock:
+            payload = {'version': FEED_CACHE_VERSION, 'feeds': {url: asdict(r) for url, r in self._records.items()}}
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not save RSS feed cache: {e}")
+
+    # --- Lookups ---
+    def _feed_stats(self, url: str) -> FeedStats:
+        return self._stats.setdefault(url, FeedStats())
+
+    def fresh(self, url: str):
+        """The cached feed if it was checked within the freshness window, else None."""
+        with self._lock:
+            record = self._records.get(url)
+            if record is None or self._clock() - record.checked_at > self.fresh_seconds:
+                return None
+            stats = self._feed_stats(url)
+            stats.fresh += 1
+            stats.bytes_saved += record.size
+        return cached_feed(record)
+
+    def validators(self, url: str) -> dict:
+        """Conditional request headers for `url` (empty if nothing is cached)."""
+        with self._lock:
+            record = self._records.get(url)
+        headers = {}
+        if record is not None:
+            if record.etag:
+                headers['If-None-Match'] = record.etag
+            if record.last_modified:
+                headers['If-Modified-Since'] = record.last_modified
+        return headers
+
+    def not_modified(self, url: str, headers: dict | None = None):
+        """Handle a 304: refresh the validators the server sent and return the cached feed."""
+        with self._lock:
+            record = self._records.get(url)
+            if record is None:
+                return None
+            headers = headers or {}
+            record.etag = headers.get('ETag') or record.etag
+            record.last_modified = headers.get('Last-Modified') or record.last_modified
+            record.checked_at = self._clock()
+            stats = self._feed_stats(url)
+            stats.not_modified += 1
+            stats.bytes_saved += record.size
+        return cached_feed(record)
+
+    def unchanged(self, url: str, body: bytes, headers: dict | None = None):
+        """Handle a 200: the cached feed if `body` is identical to the cached one, else None."""
+        digest = content_hash(body)
+        with self._lock:
+            record = self._records.get(url)
+            if record is None or record.content_hash != digest:
+                return None
+            headers = headers or {}
+            record.etag = headers.get('ETag') or record.etag
+            record.last_modified = headers.get('Last-Modified') or record.last_modified
+            record.checked_at = self._clock()
+            stats = self._feed_stats(url)
+            stats.unchanged += 1
+            stats.bytes_downloaded += len(body)
+        return cached_feed(record)
+
+    def store(self, url: str, body: bytes, headers: dict | None, feed, entry_limit: int):
+        """Record a freshly parsed feed (200 with new content)."""
+        headers = headers or {}
+        record = FeedRecord(
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'),
+            content_hash=content_hash(body),
+            size=len(body),
+            entries=compact_entries(feed, entry_limit),
+            bozo=bool(getattr(feed, 'bozo', False)),
+            checked_at=self._clock(),
+        )
+        with self._lock:
+            self._records[url] = record
+            stats = self._feed_stats(url)
+            stats.downloads += 1
+            stats.bytes_downloaded += len(body)
+
+    # --- Reporting ---
+    def stats(self) -> dict:
+        """Per-feed and total hit ratios and bytes saved since this cache was created."""
+        with self._lock:
+            per_feed = {url: {**asdict(s), 'hit_ratio': round(s.hit_ratio, 3)} for url, s in self._stats.items()}
+            lookups = sum(s.lookups for s in self._stats.values())
+            hits = sum(s.lookups - s.downloads for s in self._stats.values())
+            return {
+                'feeds': per_feed,
+                'lookups': lookups,
+                'hit_ratio': round(hits / lookups, 3) if lookups else 0.0,
+                'bytes_downloaded': sum(s.bytes_downloaded for s in self._stats.values()),
+                'bytes_saved': sum(s.bytes_saved for s in self._stats.values()),
+            }
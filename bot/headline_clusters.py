@@ -0,0 +1,177 @@
+import hashlib
+import os
+import random
+import re
+from dataclasses import dataclass, field
+from bot.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Two headlines are the same story when their word sets overlap at least this much (Jaccard)...
+NEAR_DUPLICATE_JACCARD = float(os.getenv("RESEARCH_NEAR_DUP_JACCARD", "0.5"))
+# ...and share at least this many words, so short titles like "Bitcoin miners 1" / "Bitcoin whales 1" stay apart
+MIN_SHARED_TOKENS = 3
+# MinHash signature length and LSH bands (2 rows each): headlines at Jaccard 0.5 share a band with
+# probability ~0.99, unrelated ones rarely do, so each lookup only compares against a few candidates
+MINHASH_PERMUTATIONS = 32
+MINHASH_BANDS = 16
+MINHASH_SEED = 0x5EED
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# "- [Source] Title ([Link](url)) [also: Other, Sources]" as built by ResearchAgent._fetch_from_rss
+HEADLINE_RE = re.compile(
+    r'^- \[(?P<source>[^\]]+)\] (?P<title>.*?)(?: \(\[Link\]\((?P<link>[^)\s]*)\)\))?(?: \[also: (?P<also>[^\]]*)\])?$'
+)
+TOKEN_RE = re.compile(r"[a-z0-9$]+(?:[.,'][a-z0-9]+)*")
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in', 'into', 'is', 'it',
+    'its', 'new', 'of', 'on', 'or', 's', 'says', 'than', 'that', 'the', 'this', 'to', 'was', 'will', 'with',
+})
+
+
+def headline_tokens(title: str) -> frozenset:
+    """Lower-cased content words of a title (stopwords and trailing possessives removed)."""
+    tokens = (t[:-2] if t.endswith("'s") else t for t in TOKEN_RE.findall(title.lower()))
+    return frozenset(t for t in tokens if t not in STOPWORDS)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+@dataclass
+class HeadlineCluster:
+    """One story: the first headline seen for it plus every source that carried a near-duplicate."""
+    source: str | None
+    title: str
+    link: str | None
+    tokens: frozenset
+    order: int  # position of the first headline, for stable ranking
+    also: list[str] = field(default_factory=list)  # other sources, first-seen order
+    copies: int = 1  # headlines collapsed into this story
+
+    @property
+    def source_count(self) -> int:
+        return (1 if self.source else 0) + len(self.also)
+
+    def add_source(self, source: str | None):
+        if source and source != self.source and source not in self.also:
+            self.also.append(source)
+
+    def format(self) -> str:
+        """The headline in the research report format, with the other sources appended."""
+        line = f"- [{self.source}] {self.title}" if self.source else f"- {self.title}"
+        if self.link:
+            line += f" ([Link]({self.link}))"
+        if self.also:
+            line += f" [also: {', '.join(self.also)}]"
+        return line
+
+
+class HeadlineClusterer:
+    """
+    Collapses near-duplicate headlines from different outlets into one story with a source count.
+
+    Titles are compared as sets of content words. Each headline gets a MinHash signature that is
+    split into LSH bands; only stories sharing a band bucket are compared exactly, so adding a
+    headline costs roughly constant time instead of a scan over every story seen so far. A match is
+    checked against the story's first headline (not the growing union) so clusters do not drift.
+    Input lines may already carry an "[also: ...]" suffix, so clustering clustered output is a no-op.
+    """
+    def __init__(self, threshold: float = NEAR_DUPLICATE_JACCARD, num_perm: int = MINHASH_PERMUTATIONS,
+                 bands: int = MINHASH_BANDS):
+        """
+        Args:
+            threshold: Minimum Jaccard similarity of two titles' word sets for them to be one story.
+            num_perm: MinHash signature length.
+            bands: LSH bands the signature is split into (num_perm must be a multiple).
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self._rows = num_perm // bands
+        rng = random.Random(MINHASH_SEED)
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(_MERSENNE_PRIME)) for _ in range(num_perm)]
+        self._buckets: list[dict[tuple, list[HeadlineCluster]]] = [{} for _ in range(bands)]
+        self.clusters: list[HeadlineCluster] = []
+        self.collapsed = 0  # headlines merged into an earlier story
+
+    def _signature(self, tokens: frozenset) -> list[int]:
+        hashes = [int.from_bytes(hashlib.blake2b(t.encode('utf-8'), digest_size=8).digest(), 'big') for t in tokens]
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms]
+
+    def _band_keys(self, tokens: frozenset) -> list[tuple]:
+        signature = self._signature(tokens)
+        return [tuple(signature[i:i + self._rows]) for i in range(0, len(signature), self._rows)]
+
+    def add(self, headline: str) -> tuple[HeadlineCluster, bool]:
+        """
+        Add one formatted headline. Returns its story and whether that story is new (False means
+        the headline was folded into an earlier one and only its source was recorded).
+        """
+        match = HEADLINE_RE.match(headline.strip())
+        if match:
+            source, title, link = match.group('source'), match.group('title'), match.group('link')
+            also = [s.strip() for s in (match.group('also') or '').split(',') if s.strip()]
+        else:
+            source, title, link, also = None, headline.strip().removeprefix('- '), None, []
+        tokens = headline_tokens(title)
+        band_keys = self._band_keys(tokens) if tokens else []
+
+        best, best_similarity = None, 0.0
+        seen = set()
+        for band, key in enumerate(band_keys):
+            for candidate in self._buckets[band].get(key, ()):
+                if candidate.order in seen:
+                    continue
+                seen.add(candidate.order)
+                similarity = jaccard(tokens, candidate.tokens)
+                if (similarity >= self.threshold and len(tokens & candidate.tokens) >= MIN_SHARED_TOKENS
+                        and similarity > best_similarity):
+                    best, best_similarity = candidate, similarity
+
+        if best is not None:
+            for other in [source, *also]:
+                best.add_source(other)
+            best.copies += 1 + len(also)
+            self.collapsed += 1
+            return best, False
+
+        cluster = HeadlineCluster(source=source, title=title, link=link, tokens=tokens, order=len(self.clusters))
+        for other in also:
+            cluster.add_source(other)
+        cluster.copies += len(also)
+        self.clusters.append(cluster)
+        for band, key in enumerate(band_keys):
+            self._buckets[band].setdefault(key, []).append(cluster)
+        return cluster, True
+
+    def ranked(self, clusters: list[HeadlineCluster] | None = None) -> list[HeadlineCluster]:
+        """Stories carried by the most sources first; ties keep first-seen order."""
+        return sorted(self.clusters if clusters is None else clusters, key=lambda c: (-c.source_count, -c.copies, c.order))
+
+
+def cluster_headlines(headlines: list[str], threshold: float = NEAR_DUPLICATE_JACCARD) -> list[str]:
+    """Near-duplicates collapsed into one line per story, most widely reported first."""
+    clusterer = HeadlineClusterer(threshold)
+    for headline in headlines:
+        clusterer.add(headline)
+    return [c.format() for c in clusterer.ranked()]
+
+
+def dedupe_headline_lists(*headline_lists: list[str], threshold: float = NEAR_DUPLICATE_JACCARD) -> list[list[str]]:
+    """
+    Cluster several headline lists against one index (e.g. crypto and macro news). A story stays
+    in the first list it appears in; copies in later lists only add their sources to it.
+    """
+    clusterer = HeadlineClusterer(threshold)
+    owned = [[] for _ in headline_lists]
+    for index, headlines in enumerate(headline_lists):
+        for headline in headlines or []:
+            cluster, is_new = clusterer.add(headline)
+            if is_new:
+                owned[index].append(cluster)
+    total = sum(len(h or []) for h in headline_lists)
+    if clusterer.collapsed:
+        logger.info(f"Collapsed {clusterer.collapsed} near-duplicate headlines: {total} -> {total - clusterer.collapsed} stories")
+    return [[c.format() for c in clusterer.ranked(clusters)] for clusters in owned]
@@ -0,0 +1,83 @@
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, Mapping
+
+# Optional plural ending accepted after every keyword ('surge' -> 'surges', 'etf' -> 'etfs')
+PLURAL_SUFFIX = r'(?:e?s)?'
+
+
+def _normalize(keyword: str) -> str:
+    return ' '.join(keyword.lower().split())
+
+
+class KeywordMatcher:
+    """
+    Whole-word, case-insensitive matcher for many keywords at once, compiled once per keyword set.
+
+    All keywords share one alternation (longest first) inside a zero-width lookahead, so a single
+    left-to-right pass over a text reports every occurrence of every keyword, overlapping ones
+    included ('btc etf' also yields 'etf'). Matches must start and end on a word boundary, so
+    'eth' does not hit 'method', 'sec' does not hit 'second' and 'up' does not hit 'update'; an
+    optional plural ending is allowed. Keywords are grouped under labels (a keyword may sit in
+    several groups) and scan() tallies hits per group.
+    """
+    def __init__(self, groups: Mapping[str, Iterable[str]]):
+        """
+        Args:
+            groups: Label -> keywords. Keywords are matched case-insensitively, whitespace-normalized.
+        """
+        self._groups_of: dict[str, set[str]] = {}
+        for label, keywords in groups.items():
+            for keyword in keywords:
+                keyword = _normalize(keyword)
+                if keyword:
+                    self._groups_of.setdefault(keyword, set()).add(label)
+        self.keywords = sorted(self._groups_of, key=lambda k: (-len(k), k))
+        # A match reports only the longest keyword starting at a position; shorter keywords that
+        # are whole-word prefixes of it ('fed' in 'fed chair') are hits too
+        self._implied = {
+            keyword: [k for k in self.keywords if len(k) < len(keyword) and keyword.startswith(k) and not keyword[len(k)].isalnum()]
+            for keyword in self.keywords
+        }
+        self._pattern = None
+        if self.keywords:
+            alternation = '|'.join(re.escape(k).replace(r'\ ', r'\s+') for k in self.keywords)
+            self._pattern = re.compile(rf'(?=(?<!\w)({alternation}){PLURAL_SUFFIX}(?!\w))', re.IGNORECASE)
+
+    def hits(self, text: str) -> list[str]:
+        """Every keyword occurrence in `text`, in order of position (repeats included)."""
+        if self._pattern is None or not text:
+            return []
+        found = []
+        for match in self._pattern.finditer(text):
+            keyword = _normalize(match.group(1))
+            found.append(keyword)
+            found.extend(self._implied[keyword])
+        return found
+
+    def search(self, text: str) -> bool:
+        """True if any keyword occurs in `text`; stops at the first hit."""
+        return self._pattern is not None and bool(text) and self._pattern.search(text) is not None
+
+    def matches(self, text: str) -> set[str]:
+        """The distinct keywords that occur in `text`."""
+        return set(self.hits(text))
+
+    def scan(self, text: str) -> Counter:
+        """Occurrences per group label in `text`."""
+        counts = Counter()
+        for keyword in self.hits(text):
+            for label in self._groups_of[keyword]:
+                counts[label] += 1
+        return counts
+
+
+@lru_cache(maxsize=32)
+def _compiled(keywords: tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher({'keywords': keywords})
+
+
+def keyword_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """Shared matcher for a flat keyword list; the same set (in any order) is compiled only once."""
+    return _compiled(tuple(sorted({_normalize(k) for k in keywords} - {''})))
@@ -1,52 +1,337 @@
 import os
+import copy
+import json
 import time
 import threading
 import base64
 import hashlib
 import hmac
 import requests
+from requests.adapters import HTTPAdapter
 import urllib.parse
 import logging
 from bot.logger import get_logger
-from typing import Dict, Any, List
+from bot.kraken_rate_limiter import KrakenRateLimiter
+from bot.quantize import format_price, format_volume, spec_lot_decimals
+from bot.pair_specs import PairSpec, PairSpecIndex
+from bot.kraken_ws import KrakenExecutionsFeed, TERMINAL_STATUSES, WS_AUTH_URL
+from bot.market_data import KrakenMarketDataFeed, PriceQuote, WS_PUBLIC_URL
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping
 
 logger = get_logger(__name__)
 
+RATE_LIMIT_ERROR = 'EAPI:Rate limit exceeded'
+
+# Kraken accepts 2-15 orders, all for the same pair, per AddOrderBatch request
+MAX_BATCH_ORDERS = 15
+
+# Bump when the on-disk AssetPairs cache layout changes; older files are ignored
+PAIR_CACHE_VERSION = 1
+DEFAULT_PAIR_CACHE_PATH = os.path.join("logs", "kraken_asset_pairs_cache.json")
+
 class KrakenAPIError(Exception):
     """Custom exception for Kraken API errors."""
     pass
 
+
+def _clean_balances(balance: dict) -> dict:
+    """
+    Normalize a raw Kraken Balance payload into {'ASSET': amount}, dropping dust.
+    Shared by the sync and async clients.
+    """
+    clean_balance = {}
+    if not balance:
+        return {}
+
+    for key, value in balance.items():
+        # Kraken uses prefixes like X for crypto (XXBT) and Z for fiat (ZUSD)
+        if len(key) > 3 and key.startswith(('X', 'Z')):
+            clean_key = key[1:]
+        else:
+            clean_key = key
+
+        amount = float(value)
+        if amount > 1e-8: # Filter out dust balances
+            clean_balance[clean_key] = amount
+    return clean_balance
+
+
+def _parse_ticker_prices(tickers: dict) -> dict:
+    """
+    Convert a raw Ticker payload into {'PAIR': {'price': last_trade_price, 'bid': ..., 'ask': ...}}.
+    bid/ask are included when the payload has them.
+    """
+    prices = {}
+    for pair, info in tickers.items():
+        prices[pair] = {
+            'price': float(info['c'][0]) # 'c' field is [last_trade_price, last_trade_volume]
+        }
+        # 'b' / 'a' are [price, whole_lot_volume, lot_volume] of the best bid / ask
+        for key, field in (('bid', 'b'), ('ask', 'a')):
+            if info.get(field):
+                prices[pair][key] = float(info[field][0])
+    return prices
+
+
+def _statuses_from_open_orders(txids: list[str], open_orders: dict) -> dict:
+    """
+    Fallback order status when QueryOrders is not permitted: an order is considered open
+    if its txid matches any open order's refid. This is a heuristic, as refid is not always
+    the original txid.
+    """
+    open_orders_dict = (open_orders or {}).get('open', {})
+    remaining_statuses = {}
+    for tx in txids:
+        is_open = any(tx in o.get('refid', '') for o in open_orders_dict.values())
+        remaining_statuses[tx] = 'open' if is_open else 'unknown'
+    return remaining_statuses
+
+def _batch_order_data(pair: str, orders: list[dict], validate: bool = False, spec: PairSpec | None = None) -> dict:
+    """
+    Build the form-encoded AddOrderBatch payload (orders[i][field]=value) shared by the sync
+    and async clients. Volumes and prices are quantized with the pair's rules, toward safety.
+    """
+    data = {'pair': pair}
+    lot_decimals = spec_lot_decimals(spec)
+    tick_size = spec.tick_size if spec else 0
+    for i, order in enumerate(orders):
+        data[f'orders[{i}][type]'] = order['type']
+        data[f'orders[{i}][ordertype]'] = order.get('ordertype', 'market')
+        data[f'orders[{i}][volume]'] = format_volume(order['volume'], lot_decimals)
+        if order.get('price') is not None:
+            data[f'orders[{i}][price]'] = format_price(order['price'], tick_size, order['type'])
+    if validate:
+        data['validate'] = 'true'
+    return data
+
+
+def _parse_batch_results(response: dict, expected: int) -> list[dict]:
+    """
+    Normalize an AddOrderBatch result into one place_order-shaped dict per submitted order.
+    Orders Kraken dropped carry {'error': [...]}; missing entries are reported as errors too.
+    """
+    results = []
+    entries = (response or {}).get('orders', []) if isinstance(response, dict) else []
+    for i in range(expected):
+        entry = entries[i] if i < len(entries) else {'error': 'No result returned for batch order'}
+        if entry.get('error'):
+            error = entry['error']
+            results.append({'error': error if isinstance(error, list) else [error]})
+            continue
+        txid = entry.get('txid')
+        results.append({'txid': txid if isinstance(txid, list) else ([txid] if txid else []), 'descr': entry.get('descr', {})})
+    return results
+
+
+@dataclass(frozen=True)
+class PortfolioSnapshot:
+    """
+    Immutable, timestamped view of the portfolio context built from one Balance + Ticker round-trip.
+    Shared by every caller within a trading phase until it expires or is invalidated.
+    """
+    context: Mapping[str, Any]
+    created_at: float  # time.monotonic() at build time
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was built."""
+        return time.monotonic() - self.created_at
+
+    def is_fresh(self, ttl: float) -> bool:
+        return self.age <= ttl
+
+    @property
+    def total_equity(self) -> float:
+        return float(self.context.get('total_equity', 0.0))
+
+    @property
+    def cash_balance(self) -> float:
+        return float(self.context.get('cash_balance', 0.0))
+
+    def to_context(self) -> dict:
+        """Return a private, mutable copy of the portfolio context dict."""
+        return copy.deepcopy(dict(self.context))
+
+
 class KrakenAPI:
     """
     A wrapper for the Kraken REST API.
     """
-    def __init__(self):
-        """Initializes the API client."""
-        self.api_key = os.getenv("KRAKEN_API_KEY")
-        self.api_secret = os.getenv("KRAKEN_API_SECRET")
-        self.base_url = "https://api.kraken.com"
+    # True for in-process backends (PaperKrakenAPI) whose _query_api never touches the network
+    paper = False
+
+    def __init__(self, pool_maxsize: int | None = None, private_pool_maxsize: int | None = None,
+                 connect_timeout: float | None = None, read_timeout: float | None = None,
+                 pair_cache_path: str | None = None, pair_cache_ttl: float | None = None,
+                 asset_pairs: dict | None = None, websocket_feeds: bool = True):
+        """
+        Initializes the API client.
+
+        Args:
+            pool_maxsize: Keep-alive connections kept for public endpoints (env KRAKEN_HTTP_POOL_SIZE, default 10).
+            private_pool_maxsize: Keep-alive connections kept for private endpoints (env KRAKEN_HTTP_PRIVATE_POOL_SIZE, default 2).
+                Private calls are serialized for nonce ordering, so a small pool is enough.
+            connect_timeout: TCP/TLS connect timeout in seconds (env KRAKEN_HTTP_CONNECT_TIMEOUT, default 5).
+            read_timeout: Response read timeout in seconds (env KRAKEN_HTTP_READ_TIMEOUT, default 20).
+            pair_cache_path: On-disk AssetPairs cache (env KRAKEN_PAIR_CACHE_PATH, default logs/kraken_asset_pairs_cache.json);
+                '' disables the cache so pairs are always fetched.
+            pair_cache_ttl: Cache age in seconds after which a background refresh runs (env KRAKEN_PAIR_CACHE_TTL, default 21600).
+            asset_pairs: AssetPairs payload to use as-is; skips the disk cache and the AssetPairs fetch.
+            websocket_feeds: False keeps the executions and market-data feeds off regardless of env.
+        """
+        self._init_transport(pool_maxsize, private_pool_maxsize, connect_timeout, read_timeout)
+        self._transport_stats_lock = threading.Lock()
+        self._transport_stats = {
+            kind: {'requests': 0, 'new_connections': 0, 'reused_connections': 0, 'total_ms': 0.0}
+            for kind in ('public', 'private')
+        }
 
-        if not self.api_key or not self.api_secret:
-            raise ValueError("KRAKEN_API_KEY and KRAKEN_API_SECRET must be set in the .env file.")
-        
         # --- FIX: Use a counter-based nonce to prevent API errors from rapid calls ---
         self.nonce = int(time.time() * 1000)
+        self._nonce_lock = threading.Lock()
         # Serialize private requests to preserve nonce ordering across threads
         self._private_request_lock = threading.Lock()
+        # Governor for Kraken's private call counter (tier from KRAKEN_VERIFICATION_TIER)
+        self.rate_limiter = KrakenRateLimiter()
+        self.max_rate_limit_retries = 5
         
-        # Fetch and cache all available asset pairs
-        self.asset_pairs = self._fetch_asset_pairs()
-        self.asset_to_usd_pair_map = self._build_asset_to_usd_map()
+        # Load asset pairs from the disk cache (refreshing in the background when stale), or fetch them
+        self.pair_cache_path = pair_cache_path if pair_cache_path is not None else os.getenv("KRAKEN_PAIR_CACHE_PATH", DEFAULT_PAIR_CACHE_PATH)
+        self.pair_cache_ttl = float(pair_cache_ttl if pair_cache_ttl is not None else os.getenv("KRAKEN_PAIR_CACHE_TTL", "21600"))
+        self._pair_refresh_thread: threading.Thread | None = None
+        stale = False
+        if asset_pairs is None:
+            asset_pairs, stale = self._load_asset_pairs()
+        self._set_asset_pairs(asset_pairs)
+        if stale:
+            self._start_pair_refresh()
         # Cache for pair tradability within this session: {pair: {"buy": (bool, reason), "sell": (bool, reason)}}
         self._pair_tradability_cache = {}
 
+        # Short-lived portfolio snapshot shared by all callers within a phase
+        self.portfolio_snapshot_ttl = float(os.getenv("KRAKEN_PORTFOLIO_SNAPSHOT_TTL", "10"))
+        self._portfolio_snapshot: PortfolioSnapshot | None = None
+        self._portfolio_snapshot_lock = threading.Lock()
+
+        # Optional executions WebSocket feed; when live, order waits block on pushed events
+        self.executions_ws_enabled = websocket_feeds and os.getenv("KRAKEN_WS_EXECUTIONS", "1") == "1"
+        self.executions_ws_url = os.getenv("KRAKEN_WS_AUTH_URL", WS_AUTH_URL)
+        self.executions_feed: KrakenExecutionsFeed | None = None
+        # Reconnects reuse a WebSocket token this young instead of spending a private call on a new one
+        self.ws_token_ttl = float(os.getenv("KRAKEN_WS_TOKEN_TTL", "600"))
+        self._ws_token: tuple[str, float] | None = None
+        self._ws_token_lock = threading.Lock()
+
+        # Optional public market-data feed; fresh board prices replace REST Ticker round-trips
+        self.market_data_enabled = websocket_feeds and os.getenv("KRAKEN_WS_MARKET_DATA", "1") == "1"
+        self.market_data_url = os.getenv("KRAKEN_WS_PUBLIC_URL", WS_PUBLIC_URL)
+        self.market_data_max_age = float(os.getenv("KRAKEN_WS_PRICE_MAX_AGE", "5"))
+        self.market_data: KrakenMarketDataFeed | None = None
+
+    def _init_transport(self, pool_maxsize: int | None, private_pool_maxsize: int | None,
+                        connect_timeout: float | None, read_timeout: float | None):
+        """
+        Set up credentials and the pooled HTTP transport (one long-lived keep-alive session per
+        endpoint class). Backends that serve _query_api without the network override this.
+        """
+        self.api_key = os.getenv("KRAKEN_API_KEY")
+        self.api_secret = os.getenv("KRAKEN_API_SECRET")
+        self.base_url = "https://api.kraken.com"
+
+        if not self.api_key or not self.api_secret:
+            raise ValueError("KRAKEN_API_KEY and KRAKEN_API_SECRET must be set in the .env file.")
+
+        self.pool_maxsize = int(pool_maxsize or os.getenv("KRAKEN_HTTP_POOL_SIZE", "10"))
+        self.private_pool_maxsize = int(private_pool_maxsize or os.getenv("KRAKEN_HTTP_PRIVATE_POOL_SIZE", "2"))
+        self.timeout = (
+            float(connect_timeout or os.getenv("KRAKEN_HTTP_CONNECT_TIMEOUT", "5")),
+            float(read_timeout or os.getenv("KRAKEN_HTTP_READ_TIMEOUT", "20")),
+        )
+        self._sessions = {
+            'public': self._build_session(self.pool_maxsize),
+            'private': self._build_session(self.private_pool_maxsize),
+        }
+
+    def _build_session(self, pool_maxsize: int) -> requests.Session:
+        """
+        Create a keep-alive session whose urllib3 pool is sized for this endpoint class.
+        Retries are handled by _query_api, so the adapter itself never retries.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_maxsize), max_retries=0, pool_block=False)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'User-Agent': 'chatgpt-kraken-bot/1.0',
+            'Connection': 'keep-alive',
+        })
+        return session
+
+    def _connections_opened(self, session: requests.Session, url: str) -> int:
+        """
+        Number of TCP connections the session's pool has opened so far for this URL's host.
+        Used to tell whether a request reused a kept-alive connection.
+        """
+        try:
+            adapter = session.get_adapter(url)
+            pool = adapter.poolmanager.connection_from_url(url)
+            return int(pool.num_connections)
+        except Exception:
+            return 0
+
+    def _record_transport(self, method_type: str, url_path: str, elapsed_ms: float, reused: bool):
+        """Accumulate per-endpoint-class connection reuse and latency statistics."""
+        with self._transport_stats_lock:
+            stats = self._transport_stats[method_type]
+            stats['requests'] += 1
+            stats['total_ms'] += elapsed_ms
+            if reused:
+                stats['reused_connections'] += 1
+            else:
+                stats['new_connections'] += 1
+        logger.debug(f"{method_type.upper()} {url_path}: {elapsed_ms:.0f}ms ({'reused' if reused else 'new'} connection)")
+
+    def get_transport_stats(self) -> dict:
+        """
+        Connection reuse and latency statistics for the pooled transport.
+
+        Returns:
+            {'public': {'requests', 'new_connections', 'reused_connections', 'reuse_ratio', 'avg_ms'}, 'private': {...}}
+        """
+        with self._transport_stats_lock:
+            report = {}
+            for kind, stats in self._transport_stats.items():
+                requests_made = stats['requests']
+                report[kind] = {
+                    'requests': requests_made,
+                    'new_connections': stats['new_connections'],
+                    'reused_connections': stats['reused_connections'],
+                    'reuse_ratio': (stats['reused_connections'] / requests_made) if requests_made else 0.0,
+                    'avg_ms': (stats['total_ms'] / requests_made) if requests_made else 0.0,
+                }
+            return report
+
+    def close(self):
+        """Close the pooled sessions (and any WebSocket feeds) and release their kept-alive connections."""
+        for feed in (self.executions_feed, self.market_data):
+            if feed is not None:
+                feed.stop()
+        for session in self._sessions.values():
+            try:
+                session.close()
+            except Exception:
+                pass
+
     def _get_nonce(self) -> str:
         """
         Get a unique, strictly increasing nonce for private API calls.
+        Thread-safe; also used by AsyncKrakenAPI so both clients share one nonce sequence per key.
         """
-        # This needs to be thread-safe if we ever run agents in parallel
-        self.nonce += 1
-        return str(self.nonce)
+        with self._nonce_lock:
+            self.nonce += 1
+            return str(self.nonce)
 
     def _get_kraken_signature(self, url_path, data):
         """
@@ -68,29 +353,32 @@ class KrakenAPI:
             data = {}
 
         full_url = self.base_url + url_path
+        session = self._sessions['public' if method_type == 'public' else 'private']
         headers = {}
-        
-        session = requests.Session()
-
-        headers = {
-            'User-Agent': 'chatgpt-kraken-bot/1.0',
-        }
 
         def _do_request_once(local_data, local_headers):
+            opened_before = self._connections_opened(session, full_url)
+            started = time.perf_counter()
             if method_type == 'public':
-                resp = session.get(self.base_url + url_path, params=local_data, timeout=20)
+                resp = session.get(full_url, params=local_data, timeout=self.timeout)
             else:
-                resp = session.post(self.base_url + url_path, data=local_data, headers=local_headers, timeout=20)
+                resp = session.post(full_url, data=local_data, headers=local_headers, timeout=self.timeout)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            reused = self._connections_opened(session, full_url) <= opened_before
+            self._record_transport('public' if method_type == 'public' else 'private', url_path, elapsed_ms, reused)
             resp.raise_for_status()
             return resp.json()
 
         # Serialize private requests to preserve nonce ordering and arrival
-        lock_ctx = self._private_request_lock if method_type == 'private' else None
-        for attempt in range(max_retries):
+        attempt = 0
+        rate_limit_retries = 0
+        while True:
             try:
                 local_data = dict(data) if data else {}
                 local_headers = dict(headers)
                 if method_type == 'private':
+                    # Pace against Kraken's call counter before taking the lock, so waiting never blocks other callers' sends
+                    self.rate_limiter.acquire(url_path)
                     # Entire private request is built and sent under lock
                     with self._private_request_lock:
                         local_data['nonce'] = self._get_nonce()
@@ -116,34 +404,137 @@ class KrakenAPI:
                 # Do not retry on explicit permission denied
                 if 'Permission denied' in str(e) or 'Invalid key' in str(e):
                     raise
-                if attempt < max_retries - 1:
-                    time.sleep(1 * (2 ** attempt))
+                # Counter overflow is feedback for the governor, not a generic failure:
+                # the next acquire() waits exactly as long as the counter needs to decay.
+                if method_type == 'private' and RATE_LIMIT_ERROR in str(e) and rate_limit_retries < self.max_rate_limit_retries:
+                    rate_limit_retries += 1
+                    self.rate_limiter.on_rate_limited()
+                    continue
+                attempt += 1
+                if attempt < max_retries:
+                    time.sleep(1 * (2 ** (attempt - 1)))
                     continue
                 raise Exception("Failed to query API after 3 retries.")
 
     def _fetch_asset_pairs(self):
         """
         Fetches all available asset pairs from Kraken's API.
-        Returns a dictionary of pair data.
+        Returns a dictionary of pair data. Raises on failure.
+        """
+        return self._query_api('public', '/0/public/AssetPairs')
+
+    def _set_asset_pairs(self, asset_pairs: dict):
+        """Install pair metadata and rebuild every structure derived from it."""
+        # Build derived maps first so readers never see new pairs with stale lookups
+        usd_map = self._build_asset_to_usd_map(asset_pairs)
+        pair_specs = PairSpecIndex(asset_pairs)
+        self.asset_pairs = asset_pairs
+        self.asset_to_usd_pair_map = usd_map
+        self.pair_specs = pair_specs
+
+    def _load_asset_pairs(self) -> tuple[dict, bool]:
+        """
+        Return (pair metadata, needs_background_refresh) for startup without blocking on the
+        network when possible.
+
+        - Fresh disk cache: used as-is.
+        - Stale disk cache: used immediately; the caller starts a background refresh.
+        - No usable cache: fetched synchronously and written to disk.
+        A failed fetch keeps whatever cache exists; with no cache at all the error is logged
+        loudly since pair normalization will not work.
         """
+        cached = self._read_pair_cache()
+        if cached is not None:
+            asset_pairs, fetched_at = cached
+            age = time.time() - fetched_at
+            stale = age > self.pair_cache_ttl
+            if stale:
+                logger.info(f"AssetPairs cache is {age / 3600:.1f}h old; refreshing in background")
+            return asset_pairs, stale
+
         try:
-            return self._query_api('public', '/0/public/AssetPairs')
+            asset_pairs = self._fetch_asset_pairs()
         except Exception as e:
-            # Fallback to empty dict if we can't fetch pairs
-            return {}
+            logger.error(f"Failed to fetch Kraken AssetPairs and no disk cache is available: {e}. Pair normalization will not work until a refresh succeeds.")
+            return {}, False
+        self._write_pair_cache(asset_pairs)
+        return asset_pairs, False
+
+    def _read_pair_cache(self) -> tuple[dict, float] | None:
+        """Return (asset_pairs, fetched_at) from the disk cache, or None if missing/invalid."""
+        try:
+            if not self.pair_cache_path or not os.path.exists(self.pair_cache_path):
+                return None
+            with open(self.pair_cache_path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get('version') != PAIR_CACHE_VERSION or payload.get('base_url') != self.base_url:
+                return None
+            asset_pairs = payload.get('asset_pairs')
+            if not isinstance(asset_pairs, dict) or not asset_pairs:
+                return None
+            return asset_pairs, float(payload.get('fetched_at', 0))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable AssetPairs cache {self.pair_cache_path}: {e}")
+            return None
+
+    def _write_pair_cache(self, asset_pairs: dict):
+        """Atomically persist pair metadata so concurrent readers never see a partial file."""
+        if not self.pair_cache_path or not asset_pairs:
+            return
+        try:
+            directory = os.path.dirname(self.pair_cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.pair_cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': PAIR_CACHE_VERSION,
+                    'base_url': self.base_url,
+                    'fetched_at': time.time(),
+                    'asset_pairs': asset_pairs,
+                }, f)
+            os.replace(tmp_path, self.pair_cache_path)
+        except Exception as e:
+            logger.warning(f"Failed to write AssetPairs cache: {e}")
+
+    def _start_pair_refresh(self):
+        """Refresh pair metadata on a daemon thread; at most one refresh runs at a time."""
+        if self._pair_refresh_thread is not None and self._pair_refresh_thread.is_alive():
+            return
+        self._pair_refresh_thread = threading.Thread(target=self.refresh_asset_pairs, name="kraken-pair-refresh", daemon=True)
+        self._pair_refresh_thread.start()
+
+    def refresh_asset_pairs(self) -> bool:
+        """
+        Re-download AssetPairs, swap it in and update the disk cache.
+        Returns False (keeping the current metadata) if the fetch fails.
+        """
+        try:
+            asset_pairs = self._fetch_asset_pairs()
+        except Exception as e:
+            logger.warning(f"AssetPairs refresh failed; keeping cached pair metadata: {e}")
+            return False
+        if not asset_pairs:
+            return False
+        self._set_asset_pairs(asset_pairs)
+        self._write_pair_cache(asset_pairs)
+        logger.info(f"AssetPairs refreshed: {len(asset_pairs)} pairs")
+        return True
 
-    def _build_asset_to_usd_map(self):
+    def _build_asset_to_usd_map(self, asset_pairs: dict | None = None):
         """
         Creates a mapping from cleaned asset names to their USD trading pairs.
         Only includes crypto assets, excludes forex pairs.
         Example: {'XBT': 'XXBTZUSD', 'ETH': 'XETHZUSD'}
         """
         asset_map = {}
+        if asset_pairs is None:
+            asset_pairs = self.asset_pairs
         
         # Forex currencies to exclude
         forex_assets = {'USD', 'EUR', 'GBP', 'CAD', 'JPY', 'CHF', 'AUD', 'SEK', 'NOK', 'DKK'}
         
-        for pair_name, pair_info in self.asset_pairs.items():
+        for pair_name, pair_info in asset_pairs.items():
             # Look for pairs that trade against USD/ZUSD
             if ('USD' in pair_name or 'ZUSD' in pair_name):
                 # Extract the base asset from the pair info
@@ -188,21 +579,7 @@ class KrakenAPI:
         Returns a dictionary of {'ASSET': balance}.
         """
         balance = self._query_api('private', '/0/private/Balance')
-        clean_balance = {}
-        if not balance:
-            return {}
-            
-        for key, value in balance.items():
-            # Kraken uses prefixes like X for crypto (XXBT) and Z for fiat (ZUSD)
-            if len(key) > 3 and key.startswith(('X', 'Z')):
-                clean_key = key[1:]
-            else:
-                clean_key = key
-            
-            amount = float(value)
-            if amount > 1e-8: # Filter out dust balances
-                clean_balance[clean_key] = amount
-        return clean_balance
+        return _clean_balances(balance)
 
     def get_ticker_prices(self, pairs):
         """
@@ -213,15 +590,106 @@ class KrakenAPI:
         if not isinstance(pairs, list) or not pairs:
             raise ValueError("Input must be a non-empty list of pairs.")
 
+        # Served from the live price board when every pair has a fresh quote
+        local_prices = self._board_ticker_prices(pairs)
+        if local_prices is not None:
+            return local_prices
+
         # Kraken's API expects comma-separated string for multiple pairs
         pair_string = ",".join(pairs)
         tickers = self._query_api('public', '/0/public/Ticker', {'pair': pair_string})
+        prices = _parse_ticker_prices(tickers)
+        if self.market_data is not None:
+            # Stream these pairs from now on so the next read is local
+            self.track_market_data(list(prices))
+        return prices
 
+    def get_plan_prices(self, pairs: list[str]) -> dict:
+        """
+        Price every pair of a trade plan with one Ticker request, falling back to one request
+        per pair when the batch is rejected (Kraken fails the whole request if any pair is
+        unknown or delisted). Pairs that cannot be priced are omitted.
+
+        Output: same shape as get_ticker_prices().
+        """
+        unique_pairs = list(dict.fromkeys(p for p in pairs if p))
+        if not unique_pairs:
+            return {}
+        try:
+            prices = self.get_ticker_prices(unique_pairs)
+            logger.info(f"Priced {len(unique_pairs)} plan pair(s) in one Ticker request")
+            return prices
+        except Exception as e:
+            logger.warning(f"Batched plan pricing failed ({e}); pricing pairs individually")
         prices = {}
-        for pair, info in tickers.items():
-            prices[pair] = {
-                'price': float(info['c'][0]) # 'c' field is [last_trade_price, last_trade_volume]
-            }
+        for pair in unique_pairs:
+            try:
+                prices.update(self.get_ticker_prices([pair]))
+            except Exception as pair_error:
+                logger.warning(f"Could not price {pair}: {pair_error}")
+        return prices
+
+    def start_market_data(self, pairs: list[str] | None = None, wait_seconds: float = 5.0) -> bool:
+        """
+        Start (or reuse) the public ticker/book WebSocket feed, tracking `pairs` plus every pair
+        later priced over REST. Returns True once connected; False if disabled
+        (KRAKEN_WS_MARKET_DATA=0) or unavailable, in which case prices keep coming from REST.
+        """
+        if not self.market_data_enabled:
+            return False
+        if self.market_data is None:
+            self.market_data = KrakenMarketDataFeed(url=self.market_data_url, max_age=self.market_data_max_age)
+        if pairs:
+            self.track_market_data(pairs)
+        if self.market_data.is_live:
+            return True
+        live = self.market_data.start(wait_seconds)
+        if not live:
+            logger.warning("Kraken market-data stream not available; prices will come from REST Ticker")
+        return live
+
+    def track_market_data(self, pairs: list[str]):
+        """Add pairs (any spelling get_pair_spec understands) to the market-data subscription."""
+        if self.market_data is None:
+            return
+        symbols = []
+        for pair in pairs:
+            spec = self.get_pair_spec(pair)
+            if spec and spec.wsname:
+                symbols.append(spec.wsname)
+        self.market_data.track(symbols)
+
+    def get_live_price(self, pair: str, max_age: float | None = None) -> PriceQuote | None:
+        """
+        Non-blocking price read from the market-data board, with staleness metadata.
+        Returns None if the feed is not running or has never quoted the pair.
+        """
+        spec = self.get_pair_spec(pair)
+        if self.market_data is None or spec is None or not spec.wsname:
+            return None
+        return self.market_data.get_price(spec.wsname, max_age)
+
+    def get_live_book(self, pair: str) -> dict | None:
+        """
+        Top-of-book levels from the market-data stream, {'bids': [(price, qty), ...], 'asks': [...]}.
+        Returns None if the feed is not running or has no book for the pair.
+        """
+        spec = self.get_pair_spec(pair)
+        if self.market_data is None or not self.market_data.is_live or spec is None or not spec.wsname:
+            return None
+        return self.market_data.board.book(spec.wsname)
+
+    def _board_ticker_prices(self, pairs: list[str]) -> dict | None:
+        """get_ticker_prices() answer from the price board, or None unless every pair is fresh."""
+        if self.market_data is None or not self.market_data.is_live:
+            return None
+        prices = {}
+        for pair in pairs:
+            quote = self.get_live_price(pair)
+            if quote is None or quote.stale or quote.touch_stale or quote.price <= 0:
+                return None
+            # Keyed by official pair name, as the REST Ticker response is
+            prices[self.get_pair_spec(pair).name] = {'price': quote.price, 'bid': quote.bid, 'ask': quote.ask}
         return prices
 
     def get_pair_details(self, pair: str) -> dict:
@@ -236,6 +704,30 @@ class KrakenAPI:
         """
         return self.asset_pairs.get(pair, {})
     
+    def get_pair_spec(self, pair: str) -> PairSpec | None:
+        """
+        Pre-parsed trading rules (ordermin, costmin, lot_decimals, tick_size, ...) for a pair.
+
+        Args:
+            pair: Kraken pair name, altname or wsname (e.g., 'XXBTZUSD', 'XBTUSD', 'XBT/USD')
+
+        Returns:
+            PairSpec, or None if the pair is unknown
+        """
+        return self.pair_specs.get(pair)
+
+    def normalize_pair(self, pair: str) -> str | None:
+        """
+        Resolve a free-form pair string to the official Kraken pair name in one lookup.
+        Input: 'btc/usd', 'BTC-USD', 'XBTUSD', 'XBT/USD' or 'BTC'
+        Output: 'XXBTZUSD' (None if no pair matches, even fuzzily)
+        """
+        return self.pair_specs.resolve(pair)
+
+    def suggest_pairs(self, pair: str, n: int = 5) -> list[str]:
+        """Closest known Kraken pair names for an unresolvable pair string."""
+        return self.pair_specs.suggest(pair, n)
+
     def get_all_usd_trading_rules(self) -> dict:
         """
         Get trading rules for all USD pairs including minimum order sizes.
@@ -244,29 +736,193 @@ class KrakenAPI:
             Dictionary with pair info including minimum order sizes
         """
         trading_rules = {}
+        for spec in self.pair_specs.usd_specs():
+            rules = spec.to_rules()
+            # Conservative defaults for pairs that omit limits
+            rules['ordermin'] = rules['ordermin'] or 0.0001
+            rules['costmin'] = rules['costmin'] or 0.5
+            trading_rules[spec.name] = rules
+        return trading_rules
+
+    def get_portfolio_snapshot(self, max_age: float | None = None) -> PortfolioSnapshot:
+        """
+        Return the cached PortfolioSnapshot, rebuilding it from Kraken when it is older than
+        max_age (default: portfolio_snapshot_ttl) or has been invalidated.
+        Concurrent callers wait for a single rebuild instead of each querying Kraken.
+        Raises on API failure; failed builds are never cached.
+        """
+        ttl = self.portfolio_snapshot_ttl if max_age is None else max_age
+        with self._portfolio_snapshot_lock:
+            snapshot = self._portfolio_snapshot
+            if snapshot is not None and snapshot.is_fresh(ttl):
+                return snapshot
+            context = self._build_portfolio_context()
+            snapshot = PortfolioSnapshot(context=MappingProxyType(copy.deepcopy(context)), created_at=time.monotonic())
+            self._portfolio_snapshot = snapshot
+            return snapshot
+
+    def invalidate_portfolio_snapshot(self):
+        """Drop the cached snapshot so the next portfolio read queries Kraken."""
+        with self._portfolio_snapshot_lock:
+            self._portfolio_snapshot = None
+
+    def _build_portfolio_context(self) -> dict:
+        """
+        Query Kraken for balances and prices and build the portfolio context dict.
+        Raises on API failure; use get_comprehensive_portfolio_context() for the cached, non-raising view.
+        """
+        # Get raw balances from Kraken
+        balance = self.get_account_balance()
         
-        for pair_name, pair_info in self.asset_pairs.items():
-            # Look for pairs that trade against USD/ZUSD
-            if 'USD' in pair_name or 'ZUSD' in pair_name:
-                base_asset = pair_info.get('base', '')
-                quote_asset = pair_info.get('quote', '')
+        if not balance:
+            return {
+                'portfolio_summary': "Portfolio is currently empty. No assets held.",
+                'raw_balances': {},
+                'usd_values': {},
+                'total_equity': 0.0,
+                'allocation_percentages': {},
+                'tradeable_assets': []
+            }
+        
+        # Separate cash and crypto assets
+        cash_assets = {'USDC', 'USD', 'USDT'}
+        forex_assets = {'CAD', 'EUR', 'GBP', 'JPY', 'CHF', 'AUD', 'SEK', 'NOK', 'DKK'}
+        
+        # Calculate total cash value
+        total_cash = 0.0
+        for cash_asset in cash_assets:
+            if cash_asset in balance:
+                total_cash += balance[cash_asset]
+        
+        # Normalize odd symbols (e.g., ETH.F -> ETH) commonly created by staking or fractional notations
+        normalized_balance = {}
+        for asset, amt in balance.items():
+            clean = asset
+            if asset.endswith('.F'):
+                clean = asset.split('.')[0]
+            normalized_balance[clean] = normalized_balance.get(clean, 0.0) + amt
+
+        balance = normalized_balance
+
+        # Identify crypto assets (excluding forex)
+        crypto_assets = [asset for asset in balance.keys() 
+                       if asset not in cash_assets and asset not in forex_assets]
+        
+        # Get USD prices for crypto assets
+        usd_values = {}
+        total_crypto_value = 0.0
+        tradeable_assets = []
+        
+        if crypto_assets:
+            valid_pairs = self.get_valid_usd_pairs_for_assets(crypto_assets)
+            if valid_pairs:
+                prices = self.get_ticker_prices(valid_pairs)
                 
-                # Check if this is a USD pair
-                if quote_asset in ['USD', 'ZUSD']:
-                    trading_rules[pair_name] = {
-                        'base': pair_info.get('base', ''),
-                        'quote': pair_info.get('quote', ''),
-                        'ordermin': pair_info.get('ordermin', '0.0001'),
-                        'costmin': pair_info.get('costmin', '0.5'),
-                        'tick_size': pair_info.get('tick_size', '0.01')
-                    }
+                for asset in crypto_assets:
+                    if asset in balance:
+                        amount = balance[asset]
+                        asset_pair = self.asset_to_usd_pair_map.get(asset)
+                        
+                        if asset_pair and asset_pair in prices:
+                            price = prices[asset_pair]['price']
+                            value = amount * price
+                            usd_values[asset] = {
+                                'amount': amount,
+                                'price': price,
+                                'value': value
+                            }
+                            total_crypto_value += value
+                            tradeable_assets.append(asset)
+                        else:
+                            usd_values[asset] = {
+                                'amount': amount,
+                                'price': 0.0,
+                                'value': 0.0
+                            }
+        
+        # Add cash to USD values
+        if total_cash > 0:
+            usd_values['USD'] = {
+                'amount': total_cash,
+                'price': 1.0,
+                'value': total_cash
+            }
+            tradeable_assets.append('USD')
+        
+        # Calculate total equity
+        total_equity = total_cash + total_crypto_value
+        
+        # Calculate allocation percentages
+        allocation_percentages = {}
+        if total_equity > 0:
+            for asset, data in usd_values.items():
+                allocation_percentages[asset] = (data['value'] / total_equity) * 100
+        
+        # Identify and filter out dust positions from all returned data structures
+        dust_assets = []
+        if total_equity > 0: # Only filter if we have a portfolio to evaluate against
+            # Iterate over a copy of crypto_assets to avoid modification issues
+            for asset in list(crypto_assets): 
+                if asset in usd_values:
+                    data = usd_values[asset]
+                    allocation = allocation_percentages.get(asset, 0)
+                    
+                    # Dust criteria: value < $0.01 AND allocation < 0.05%
+                    if data['value'] < 0.01 and allocation < 0.05:
+                        dust_assets.append(asset)
+
+        if dust_assets:
+            logger.info(f"Filtering out {len(dust_assets)} dust positions from AI context: {', '.join(dust_assets)}")
+            for asset in dust_assets:
+                usd_values.pop(asset, None)
+                balance.pop(asset, None)
+                allocation_percentages.pop(asset, None)
+                if asset in tradeable_assets:
+                    tradeable_assets.remove(asset)
+                if asset in crypto_assets:
+                    crypto_assets.remove(asset)
+
+        # Build formatted portfolio summary for AI prompt
+        portfolio_summary = f"Current cash balance: ${total_cash:,.2f} USD.\n"
+        
+        if crypto_assets:
+            portfolio_summary += "Current Holdings:\n"
+            for asset in sorted(crypto_assets, key=lambda x: usd_values.get(x, {}).get('value', 0), reverse=True):
+                if asset in usd_values:
+                    data = usd_values[asset]
+                    allocation = allocation_percentages.get(asset, 0)
+                    portfolio_summary += f"- {asset}: {data['amount']:.6f} (Value: ${data['value']:,.2f} @ ${data['price']:,.2f}) [{allocation:.1f}%]\n"
+        
+        portfolio_summary += f"\nTotal Portfolio Value: ${total_equity:,.2f} USD"
+        
+        if total_equity > 0:
+            cash_percentage = (total_cash / total_equity) * 100
+            crypto_percentage = (total_crypto_value / total_equity) * 100
+            portfolio_summary += f"\nAllocation: {cash_percentage:.1f}% Cash, {crypto_percentage:.1f}% Crypto"
+        
+        return {
+            'portfolio_summary': portfolio_summary,
+            'raw_balances': balance,
+            'usd_values': usd_values,
+            'total_equity': total_equity,
+            'allocation_percentages': allocation_percentages,
+            'tradeable_assets': tradeable_assets,
+            'cash_balance': total_cash,
+            'crypto_value': total_crypto_value
+        }
         
-        return trading_rules
 
-    def get_comprehensive_portfolio_context(self) -> dict:
+    def get_comprehensive_portfolio_context(self, max_age: float | None = None) -> dict:
         """
         Get comprehensive portfolio information including USD values, allocation percentages,
         and trading context for AI decision making.
+
+        Served from a short-lived PortfolioSnapshot so that callers within one phase share a
+        single Balance + Ticker round-trip. Each caller receives its own copy of the data.
+
+        Args:
+            max_age: Maximum acceptable snapshot age in seconds (default: portfolio_snapshot_ttl).
+                     Pass 0 to force a live refresh.
         
         Returns:
             Dictionary containing:
@@ -278,146 +934,7 @@ class KrakenAPI:
             - tradeable_assets: List of assets that can be traded to USD
         """
         try:
-            # Get raw balances from Kraken
-            balance = self.get_account_balance()
-            
-            if not balance:
-                return {
-                    'portfolio_summary': "Portfolio is currently empty. No assets held.",
-                    'raw_balances': {},
-                    'usd_values': {},
-                    'total_equity': 0.0,
-                    'allocation_percentages': {},
-                    'tradeable_assets': []
-                }
-            
-            # Separate cash and crypto assets
-            cash_assets = {'USDC', 'USD', 'USDT'}
-            forex_assets = {'CAD', 'EUR', 'GBP', 'JPY', 'CHF', 'AUD', 'SEK', 'NOK', 'DKK'}
-            
-            # Calculate total cash value
-            total_cash = 0.0
-            for cash_asset in cash_assets:
-                if cash_asset in balance:
-                    total_cash += balance[cash_asset]
-            
-            # Normalize odd symbols (e.g., ETH.F -> ETH) commonly created by staking or fractional notations
-            normalized_balance = {}
-            for asset, amt in balance.items():
-                clean = asset
-                if asset.endswith('.F'):
-                    clean = asset.split('.')[0]
-                normalized_balance[clean] = normalized_balance.get(clean, 0.0) + amt
-
-            balance = normalized_balance
-
-            # Identify crypto assets (excluding forex)
-            crypto_assets = [asset for asset in balance.keys() 
-                           if asset not in cash_assets and asset not in forex_assets]
-            
-            # Get USD prices for crypto assets
-            usd_values = {}
-            total_crypto_value = 0.0
-            tradeable_assets = []
-            
-            if crypto_assets:
-                valid_pairs = self.get_valid_usd_pairs_for_assets(crypto_assets)
-                if valid_pairs:
-                    prices = self.get_ticker_prices(valid_pairs)
-                    
-                    for asset in crypto_assets:
-                        if asset in balance:
-                            amount = balance[asset]
-                            asset_pair = self.asset_to_usd_pair_map.get(asset)
-                            
-                            if asset_pair and asset_pair in prices:
-                                price = prices[asset_pair]['price']
-                                value = amount * price
-                                usd_values[asset] = {
-                                    'amount': amount,
-                                    'price': price,
-                                    'value': value
-                                }
-                                total_crypto_value += value
-                                tradeable_assets.append(asset)
-                            else:
-                                usd_values[asset] = {
-                                    'amount': amount,
-                                    'price': 0.0,
-                                    'value': 0.0
-                                }
-            
-            # Add cash to USD values
-            if total_cash > 0:
-                usd_values['USD'] = {
-                    'amount': total_cash,
-                    'price': 1.0,
-                    'value': total_cash
-                }
-                tradeable_assets.append('USD')
-            
-            # Calculate total equity
-            total_equity = total_cash + total_crypto_value
-            
-            # Calculate allocation percentages
-            allocation_percentages = {}
-            if total_equity > 0:
-                for asset, data in usd_values.items():
-                    allocation_percentages[asset] = (data['value'] / total_equity) * 100
-            
-            # Identify and filter out dust positions from all returned data structures
-            dust_assets = []
-            if total_equity > 0: # Only filter if we have a portfolio to evaluate against
-                # Iterate over a copy of crypto_assets to avoid modification issues
-                for asset in list(crypto_assets): 
-                    if asset in usd_values:
-                        data = usd_values[asset]
-                        allocation = allocation_percentages.get(asset, 0)
-                        
-                        # Dust criteria: value < $0.01 AND allocation < 0.05%
-                        if data['value'] < 0.01 and allocation < 0.05:
-                            dust_assets.append(asset)
-
-            if dust_assets:
-                logger.info(f"Filtering out {len(dust_assets)} dust positions from AI context: {', '.join(dust_assets)}")
-                for asset in dust_assets:
-                    usd_values.pop(asset, None)
-                    balance.pop(asset, None)
-                    allocation_percentages.pop(asset, None)
-                    if asset in tradeable_assets:
-                        tradeable_assets.remove(asset)
-                    if asset in crypto_assets:
-                        crypto_assets.remove(asset)
-
-            # Build formatted portfolio summary for AI prompt
-            portfolio_summary = f"Current cash balance: ${total_cash:,.2f} USD.\n"
-            
-            if crypto_assets:
-                portfolio_summary += "Current Holdings:\n"
-                for asset in sorted(crypto_assets, key=lambda x: usd_values.get(x, {}).get('value', 0), reverse=True):
-                    if asset in usd_values:
-                        data = usd_values[asset]
-                        allocation = allocation_percentages.get(asset, 0)
-                        portfolio_summary += f"- {asset}: {data['amount']:.6f} (Value: ${data['value']:,.2f} @ ${data['price']:,.2f}) [{allocation:.1f}%]\n"
-            
-            portfolio_summary += f"\nTotal Portfolio Value: ${total_equity:,.2f} USD"
-            
-            if total_equity > 0:
-                cash_percentage = (total_cash / total_equity) * 100
-                crypto_percentage = (total_crypto_value / total_equity) * 100
-                portfolio_summary += f"\nAllocation: {cash_percentage:.1f}% Cash, {crypto_percentage:.1f}% Crypto"
-            
-            return {
-                'portfolio_summary': portfolio_summary,
-                'raw_balances': balance,
-                'usd_values': usd_values,
-                'total_equity': total_equity,
-                'allocation_percentages': allocation_percentages,
-                'tradeable_assets': tradeable_assets,
-                'cash_balance': total_cash,
-                'crypto_value': total_crypto_value
-            }
-            
+            return self.get_portfolio_snapshot(max_age=max_age).to_context()
         except Exception as e:
             logger.error(f"Error getting comprehensive portfolio context: {e}")
             return {
@@ -431,38 +948,75 @@ class KrakenAPI:
                 'crypto_value': 0.0
             }
 
-    def place_order(self, pair, order_type, volume, ordertype='market', validate=False):
+    def place_order(self, pair, order_type, volume, ordertype='market', validate=False, price=None, post_only=False):
         """
-        Submits a market buy or sell order.
+        Submits a market (or, with ordertype='limit' and a price, limit) buy or sell order.
         - pair: The trading pair, e.g., 'XBTUSD'
         - order_type: 'buy' or 'sell'
         - volume: The amount of asset to trade
         - validate: If True, test order without executing.
+        - price: Limit price; snapped to the pair's tick size on the safe side.
+        - post_only: Limit orders only; Kraken cancels the order instead of letting it take liquidity.
         """
+        data = self._order_data(pair, order_type, volume, ordertype, validate, price, post_only)
+        if validate:
+            return self._query_api('private', '/0/private/AddOrder', data)
+
+        try:
+            return self._query_api('private', '/0/private/AddOrder', data)
+        finally:
+            # A live order (even one whose response was lost) may change balances
+            self.invalidate_portfolio_snapshot()
+
+    def _order_data(self, pair: str, order_type: str, volume: float, ordertype: str = 'market',
+                    validate: bool = False, price: float | None = None, post_only: bool = False) -> dict:
+        """
+        Build the AddOrder form payload shared by place_order, validate_order and the async client.
+        The volume is truncated to the pair's lot_decimals (8 when unknown), so validation and live
+        orders send the same quantity.
+        """
+        spec = self.get_pair_spec(pair)
         data = {
             'pair': pair,
             'type': order_type,
             'ordertype': ordertype,
-            'volume': f"{volume:.8f}", # Format volume to 8 decimal places
+            'volume': format_volume(volume, spec_lot_decimals(spec)),
         }
+        if price is not None:
+            data['price'] = format_price(price, spec.tick_size if spec else 0, order_type)
+        if post_only:
+            data['oflags'] = 'post'
         if validate:
             data['validate'] = 'true'
-        
-        result = self._query_api('private', '/0/private/AddOrder', data)
-        return result
+        return data
+
+    def place_order_batch(self, pair: str, orders: list[dict], validate: bool = False) -> list[dict]:
+        """
+        Submit 2-15 orders for one pair in a single AddOrderBatch request.
+        - pair: The trading pair shared by every order, e.g., 'XBTUSD'
+        - orders: [{'type': 'buy'|'sell', 'volume': float, 'ordertype': 'market'}, ...]
+        - validate: If True, test the orders without executing.
+        Returns one result per order, in order, shaped like place_order's response:
+        {'txid': [...], 'descr': {...}} on success or {'error': [...]} if Kraken dropped it.
+        """
+        if not 2 <= len(orders) <= MAX_BATCH_ORDERS:
+            raise ValueError(f"AddOrderBatch takes 2-{MAX_BATCH_ORDERS} orders, got {len(orders)}")
+        data = _batch_order_data(pair, orders, validate, self.get_pair_spec(pair))
+        if validate:
+            response = self._query_api('private', '/0/private/AddOrderBatch', data)
+        else:
+            try:
+                response = self._query_api('private', '/0/private/AddOrderBatch', data)
+            finally:
+                self.invalidate_portfolio_snapshot()
+        return _parse_batch_results(response, len(orders))
 
     def validate_order(self, pair: str, order_type: str, volume: float, ordertype: str = 'market') -> tuple[bool, list]:
         """
         Perform a server-side dry-run validation of an order without executing it.
         Returns (ok, errors). When ok is False, errors contains Kraken error strings.
         """
-        data = {
-            'pair': pair,
-            'type': order_type,
-            'ordertype': ordertype,
-            'volume': f"{volume:.10f}",
-            'validate': 'true',
-        }
+        data = self._order_data(pair, order_type, volume, ordertype, validate=True)
         try:
             # One attempt is enough here; upstream caller will decide on retries
             response = self._query_api('private', '/0/private/AddOrder', data=data, max_retries=1)
@@ -488,8 +1042,8 @@ class KrakenAPI:
             return ok, reason
 
         try:
-            details = self.get_pair_details(pair)
-            min_volume = float(details.get('ordermin', 0) or 0.0)
+            spec = self.get_pair_spec(pair)
+            min_volume = spec.ordermin if spec else 0.0
         except Exception:
             min_volume = 0.0
 
@@ -528,13 +1082,112 @@ class KrakenAPI:
             # Let the caller handle logging with proper context
             raise e
 
-    def wait_for_orders_closed(self, txids: list[str], timeout_seconds: int = 45, poll_interval: float = 2.0) -> dict:
+    def cancel_order(self, txid: str) -> dict:
+        """Cancel one open order; returns {'count': n} with the number of orders canceled."""
+        try:
+            return self._query_api('private', '/0/private/CancelOrder', {'txid': txid})
+        finally:
+            # A partially filled order has already moved balances
+            self.invalidate_portfolio_snapshot()
+
+    def get_websockets_token(self) -> str:
+        """Fetch a short-lived token for Kraken's authenticated WebSocket API."""
+        result = self._query_api('private', '/0/private/GetWebSocketsToken')
+        token = result.get('token') if isinstance(result, dict) else None
+        if not token:
+            raise KrakenAPIError("GetWebSocketsToken returned no token")
+        return token
+
+    def _websockets_token(self, max_age: float | None = None) -> str:
+        """
+        GetWebSocketsToken, reusing a token younger than max_age (default ws_token_ttl; Kraken
+        accepts a token for 15 min). max_age=0 always fetches a new one.
+        """
+        max_age = self.ws_token_ttl if max_age is None else max_age
+        with self._ws_token_lock:
+            if self._ws_token is not None and time.monotonic() - self._ws_token[1] < max_age:
+                return self._ws_token[0]
+            token = self.get_websockets_token()
+            self._ws_token = (token, time.monotonic())
+            return token
+
+    def start_executions_feed(self, wait_seconds: float = 0.0) -> bool:
         """
-        Poll order status until all txids are 'closed' or 'canceled', or until timeout.
+        Start the executions WebSocket feed once so wait_for_orders_closed can block on order
+        events; later calls only report whether it is live. Does not block by default: until the
+        feed is subscribed (or if it is disabled with KRAKEN_WS_EXECUTIONS=0 or unavailable) this
+        returns False and order waits poll QueryOrders. The feed reconnects on its own with backoff.
+
+        Args:
+            wait_seconds: How long to wait for the first subscription ack (startup only).
+        """
+        if not self.executions_ws_enabled:
+            return False
+        if self.executions_feed is not None:
+            return self.executions_feed.is_live
+        self.executions_feed = KrakenExecutionsFeed(self._websockets_token, url=self.executions_ws_url)
+        live = self.executions_feed.start(wait_seconds)
+        if not live:
+            logger.info("Kraken executions stream not live yet; order waits poll QueryOrders until it is")
+        return live
+
+    def wait_for_orders_closed(self, txids: list[str], timeout_seconds: int = 45, poll_interval: float = 2.0,
+                               any_closed: bool = False) -> dict:
+        """
+        Wait until all txids are 'closed' or 'canceled', or until timeout.
+        With any_closed=True, return as soon as at least one of them is.
+        With a live executions feed this blocks on pushed order events, checking orders the
+        stream has not reported (and any still open at the timeout) with QueryOrders; otherwise
+        (or if the stream drops mid-wait) it polls QueryOrders.
         Returns a dict of txid -> final_status (closed/canceled/open/unknown).
         """
         if not txids:
             return {}
+        done = any if any_closed else all
+        try:
+            end_time = time.time() + timeout_seconds
+            feed = self.executions_feed
+            if feed is not None and feed.is_live:
+                # Events missed across a reconnect are not replayed, so any reconnect ends the wait
+                connection_id = feed.connection_id
+                still_live = lambda: feed.is_live and feed.connection_id == connection_id
+                # Orders that finished before the subscription (or a reconnect) are never reported:
+                # snap_orders only covers open orders, so ask REST about any the stream has not seen
+                self._reconcile_order_states(feed.table, [tx for tx in txids if feed.table.get(tx) is None])
+                statuses = feed.table.wait_for_closed(txids, timeout_seconds, still_live=still_live, any_closed=any_closed)
+                if done(s in TERMINAL_STATUSES for s in statuses.values()):
+                    return statuses
+                if still_live():
+                    # Timed out: confirm the stragglers over REST before reporting them open
+                    self._reconcile_order_states(feed.table, [tx for tx, s in statuses.items() if s not in TERMINAL_STATUSES])
+                    statuses = feed.table.snapshot(txids)
+                    if not done(s in TERMINAL_STATUSES for s in statuses.values()):
+                        logger.warning(f"Timed out waiting for orders to close. Last known statuses: {statuses}")
+                    return statuses
+                logger.warning("Kraken executions stream dropped while waiting; reconciling via QueryOrders")
+            # Always allow at least one reconciliation poll after a dropped stream
+            return self._wait_for_orders_closed(txids, max(poll_interval, end_time - time.time()), poll_interval, any_closed)
+        finally:
+            # Closed (or partially filled) orders have moved balances
+            self.invalidate_portfolio_snapshot()
+
+    def _reconcile_order_states(self, table, txids: list[str]):
+        """Feed QueryOrders statuses and filled volumes for txids into an OrderStateTable."""
+        if not txids:
+            return
+        try:
+            orders = self.query_orders(txids)
+        except Exception as e:
+            logger.warning(f"Could not reconcile order states via QueryOrders: {e}")
+            return
+        for txid in txids:
+            info = orders.get(txid) or {}
+            if info.get('status'):
+                table.update(txid, info['status'], float(info.get('vol_exec', 0.0) or 0.0))
+
+    def _wait_for_orders_closed(self, txids: list[str], timeout_seconds: float, poll_interval: float,
+                                any_closed: bool = False) -> dict:
+        done = any if any_closed else all
         end_time = time.time() + timeout_seconds
         last_status = {}
         permission_denied = False
@@ -543,7 +1196,7 @@ class KrakenAPI:
             try:
                 status = self.query_orders(txids)
                 last_status = {tx: status.get(tx, {}).get('status', 'unknown') for tx in txids}
-                if all(s in ('closed', 'canceled') for s in last_status.values()):
+                if done(s in ('closed', 'canceled') for s in last_status.values()):
                     return last_status # Success
             except Exception as e:
                 msg = str(e)
@@ -560,14 +1213,7 @@ class KrakenAPI:
             logger.info("API key lacks 'QueryOrders' permission. Attempting fallback with 'OpenOrders'.")
             logger.info("--> To enable precise order tracking, grant 'Query Open Orders & Trades' and 'Query Closed Orders & Trades' permissions to your API key.")
             try:
-                open_orders = self.get_open_orders()
-                open_orders_dict = open_orders.get('open', {})
-                remaining_statuses = {}
-                for tx in txids:
-                    # An order is considered open if its txid matches any open order's refid.
-                    # This is a heuristic, as refid is not always the original txid.
-                    is_open = any(tx in o.get('refid', '') for o in open_orders_dict.values())
-                    remaining_statuses[tx] = 'open' if is_open else 'unknown'
+                remaining_statuses = _statuses_from_open_orders(txids, self.get_open_orders())
                 logger.info("Fallback status check via OpenOrders complete.")
                 return remaining_statuses
             except Exception as fallback_e:
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import threading
+import time
+from bot.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Private API call counter limits per account verification tier: (max counter, decay per second)
+TIER_LIMITS = {
+    'starter': (15, 0.33),
+    'intermediate': (20, 0.5),
+    'pro': (20, 1.0),
+}
+
+# Ledger and trade-history queries cost 2; order placement/cancellation is governed by the
+# separate matching-engine limiter and does not touch the REST call counter.
+ENDPOINT_COSTS = {
+    '/0/private/Ledgers': 2,
+    '/0/private/QueryLedgers': 2,
+    '/0/private/TradesHistory': 2,
+    '/0/private/QueryTrades': 2,
+    '/0/private/AddOrder': 0,
+    '/0/private/AddOrderBatch': 0,
+    '/0/private/EditOrder': 0,
+    '/0/private/CancelOrder': 0,
+    '/0/private/CancelOrderBatch': 0,
+    '/0/private/CancelAll': 0,
+}
+DEFAULT_COST = 1
+
+
+class KrakenRateLimiter:
+    """
+    Token-bucket governor modeled on Kraken's private API call counter.
+
+    Each private call adds its cost to the counter, which decays continuously at the tier's
+    rate. Callers reserve capacity before sending: if the call would push the counter past the
+    tier maximum, the reservation returns how long to wait for enough decay. Reservations are
+    committed immediately, so concurrent callers are queued in order instead of all retrying
+    at once. An 'EAPI:Rate limit exceeded' response is fed back via on_rate_limited(), which
+    pins the counter at the maximum so subsequent calls pace themselves from there.
+    """
+    def __init__(self, tier: str | None = None, clock=time.monotonic):
+        """
+        Args:
+            tier: 'starter', 'intermediate' or 'pro' (env KRAKEN_VERIFICATION_TIER, default 'starter').
+            clock: Monotonic time source (injectable for tests).
+        """
+        tier = (tier or os.getenv("KRAKEN_VERIFICATION_TIER", "starter")).lower()
+        if tier not in TIER_LIMITS:
+            logger.warning(f"Unknown Kraken verification tier '{tier}'; using 'starter' limits")
+            tier = 'starter'
+        self.tier = tier
+        self.max_counter, self.decay_per_second = TIER_LIMITS[tier]
+        self._clock = clock
+        self._counter = 0.0
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+        self.total_wait_seconds = 0.0
+        self.rate_limit_hits = 0
+
+    @staticmethod
+    def cost(url_path: str) -> int:
+        """Counter cost of a private endpoint."""
+        return ENDPOINT_COSTS.get(url_path, DEFAULT_COST)
+
+    def _decay(self, now: float):
+        elapsed = max(0.0, now - self._updated_at)
+        self._counter = max(0.0, self._counter - elapsed * self.decay_per_second)
+        self._updated_at = now
+
+    def reserve(self, url_path: str) -> float:
+        """
+        Commit the cost of a call and return the seconds to wait before sending it (0.0 if it
+        fits under the limit now).
+        """
+        cost = self.cost(url_path)
+        with self._lock:
+            self._decay(self._clock())
+            if cost == 0:
+                return 0.0
+            excess = self._counter + cost - self.max_counter
+            self._counter += cost
+            delay = excess / self.decay_per_second if excess > 0 else 0.0
+            self.total_wait_seconds += delay
+            return delay
+
+    def acquire(self, url_path: str):
+        """Block the calling thread until the call fits under the counter limit."""
+        delay = self.reserve(url_path)
+        if delay > 0:
+            logger.info(f"Rate governor: pacing {url_path} by {delay:.2f}s (tier={self.tier})")
+            time.sleep(delay)
+
+    async def acquire_async(self, url_path: str):
+        """Event-loop friendly acquire() for AsyncKrakenAPI."""
+        delay = self.reserve(url_path)
+        if delay > 0:
+            logger.info(f"Rate governor: pacing {url_path} by {delay:.2f}s (tier={self.tier})")
+            await asyncio.sleep(delay)
+
+    def on_rate_limited(self):
+        """
+        Feedback from an 'EAPI:Rate limit exceeded' response: Kraken's view of the counter is at
+        the maximum (another process may share the key), so align ours with it.
+        """
+        with self._lock:
+            self._decay(self._clock())
+            self._counter = max(self._counter, float(self.max_counter))
+            self.rate_limit_hits += 1
+        logger.warning(f"Kraken rate limit exceeded; governor counter pinned at {self.max_counter} (tier={self.tier})")
+
+    def snapshot(self) -> dict:
+        """Current governor state for diagnostics."""
+        with self._lock:
+            self._decay(self._clock())
+            return {
+                'tier': self.tier,
+                'counter': self._counter,
+                'max_counter': self.max_counter,
+                'decay_per_second': self.decay_per_second,
+                'total_wait_seconds': self.total_wait_seconds,
+                'rate_limit_hits': self.rate_limit_hits,
+            }
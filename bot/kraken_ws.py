@@ -0,0 +1,316 @@
+import asyncio
+import json
+import threading
+import time
+from functools import partial
+from abc import ABC, abstractmethod
+from typing import Callable
+import aiohttp
+from bot.logger import get_logger
+
+logger = get_logger(__name__)
+
+WS_AUTH_URL = "wss://ws-auth.kraken.com/v2"
+
+# Kraken v2 executions order_status -> the REST QueryOrders vocabulary used everywhere else
+ORDER_STATUS_MAP = {
+    'pending_new': 'pending',
+    'new': 'open',
+    'partially_filled': 'open',
+    'filled': 'closed',
+    'canceled': 'canceled',
+    'expired': 'expired',
+}
+TERMINAL_STATUSES = frozenset({'closed', 'canceled', 'expired'})
+# Subscribe errors a reconnect cannot fix; the stream is disabled instead of retried
+PERMANENT_SUBSCRIBE_ERRORS = ('Permission denied',)
+# Finished orders remembered per table; the oldest are forgotten beyond this (open orders are always kept)
+MAX_TERMINAL_ORDERS = 1000
+
+
+class KrakenSubscriptionError(Exception):
+    """A subscribe request was rejected by Kraken."""
+
+
+class OrderStateTable:
+    """
+    Thread-safe txid -> order status (and filled quantity) table fed by the executions stream.
+
+    Waiters block on a condition variable and wake on every update, so an order's close is seen
+    at fill latency instead of at the next poll tick. Only the most recent `max_terminal`
+    finished orders are kept, so a long-running stream does not grow the table without bound.
+    """
+    def __init__(self, max_terminal: int = MAX_TERMINAL_ORDERS):
+        self.max_terminal = max_terminal
+        self._statuses: dict[str, str] = {}
+        self._filled: dict[str, float] = {}
+        self._terminal: dict[str, None] = {}  # finished txids, oldest first
+        self._cond = threading.Condition()
+
+    def update(self, txid: str, status: str, filled: float | None = None):
+        with self._cond:
+            if filled is not None:
+                # Cumulative quantity only grows; out-of-order events must not shrink it
+                self._filled[txid] = max(self._filled.get(txid, 0.0), filled)
+            # Never let a late 'open' echo resurrect an order we already saw finish
+            if self._statuses.get(txid) in TERMINAL_STATUSES and status not in TERMINAL_STATUSES:
+                return
+            self._statuses[txid] = status
+            if status in TERMINAL_STATUSES:
+                self._terminal[txid] = None
+                while len(self._terminal) > self.max_terminal:
+                    oldest = next(iter(self._terminal))
+                    del self._terminal[oldest]
+                    self._statuses.pop(oldest, None)
+                    self._filled.pop(oldest, None)
+            self._cond.notify_all()
+
+    def get(self, txid: str) -> str | None:
+        with self._cond:
+            return self._statuses.get(txid)
+
+    def filled(self, txid: str) -> float:
+        """Cumulative filled base quantity reported for txid (0.0 if none yet)."""
+        with self._cond:
+            return self._filled.get(txid, 0.0)
+
+    def snapshot(self, txids: list[str]) -> dict:
+        """Current statuses for txids ('unknown' for orders the stream has not reported)."""
+        with self._cond:
+            return {tx: self._statuses.get(tx, 'unknown') for tx in txids}
+
+    def wait_for_closed(self, txids: list[str], timeout_seconds: float, still_live: Callable[[], bool] | None = None,
+                        any_closed: bool = False) -> dict:
+        """
+        Block until every txid (or, with any_closed, at least one) reaches a terminal status,
+        the timeout expires, or still_live() turns False (stream dropped). Returns txid -> status
+        as currently known.
+        """
+        done = any if any_closed else all
+        deadline = time.monotonic() + timeout_seconds
+        with self._cond:
+            while True:
+                statuses = {tx: self._statuses.get(tx, 'unknown') for tx in txids}
+                if done(s in TERMINAL_STATUSES for s in statuses.values()):
+                    return statuses
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (still_live is not None and not still_live()):
+                    return statuses
+                # Bounded wait so a dropped stream is noticed even without updates
+                self._cond.wait(min(remaining, 0.5))
+
+    def notify(self):
+        """Wake waiters so they re-check liveness (used when the stream disconnects)."""
+        with self._cond:
+            self._cond.notify_all()
+
+
+class KrakenWebSocketFeed(ABC):
+    """
+    Base class for background Kraken v2 WebSocket subscribers.
+
+    Runs an aiohttp WebSocket client on its own thread and event loop and reconnects with
+    backoff, re-sending the subscriptions from _subscriptions() on every connect. A rejected
+    subscribe drops the connection so the next one resubscribes from scratch, unless the error
+    is one of PERMANENT_SUBSCRIBE_ERRORS, which disables the stream. Subclasses must implement
+    _subscriptions() and consume channel messages in _on_message(). Consumers should check
+    `is_live` and fall back to REST when it is False.
+    """
+    name = 'kraken'
+
+    def __init__(self, url: str, reconnect_delay: float = 1.0):
+        """
+        Args:
+            url: WebSocket endpoint.
+            reconnect_delay: Initial reconnect backoff in seconds (doubles up to 30s).
+        """
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+        self._subscribed = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._ws: aiohttp.ClientWebSocketResponse | None = None
+        self.messages_received = 0
+        # Bumped once per connection on the first subscribe ack; lets readers detect reconnects
+        self.connection_id = 0
+        self._acked = False
+
+    @property
+    def is_live(self) -> bool:
+        """True while subscribed; updates are only trustworthy in this state."""
+        return self._subscribed.is_set() and not self._stop.is_set()
+
+    def start(self, wait_seconds: float = 5.0) -> bool:
+        """Start the background thread and wait up to wait_seconds for the subscription ack."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-ws", daemon=True)
+            self._thread.start()
+        return self._subscribed.wait(wait_seconds)
+
+    def stop(self, timeout: float = 5.0):
+        """Close the socket and join the background thread."""
+        self._stop.set()
+        self._subscribed.clear()
+        loop, ws = self._loop, self._ws
+        if loop is not None and ws is not None and not loop.is_closed():
+            try:
+                asyncio.run_coroutine_threadsafe(ws.close(), loop)
+            except RuntimeError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._on_disconnect()
+
+    def send(self, payload: dict) -> bool:
+        """Send a message on the live socket from any thread; False if not connected."""
+        loop, ws = self._loop, self._ws
+        if loop is None or ws is None or ws.closed or loop.is_closed():
+            return False
+        try:
+            asyncio.run_coroutine_threadsafe(ws.send_json(payload), loop)
+            return True
+        except RuntimeError:
+            return False
+
+    @abstractmethod
+    async def _subscriptions(self) -> list[dict]:
+        """Subscribe requests to send after each connect."""
+
+    def _on_message(self, message: dict):
+        """Handle one channel message (subscribe acks are handled by the base class)."""
+
+    def _on_subscribe_rejected(self, message: dict):
+        """
+        Hook run on a subscribe ack with success false. The default raises
+        KrakenSubscriptionError, which closes the socket and reconnects with backoff.
+        """
+        raise KrakenSubscriptionError(f"Kraken {self.name} subscription rejected: {message.get('error')}")
+
+    def _on_subscribed(self):
+        """Hook run once per connection when the stream becomes live (on the stream thread)."""
+
+    def _on_disconnect(self):
+        """Hook run whenever the stream stops being live."""
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._consume_forever())
+        finally:
+            self._loop.close()
+
+    async def _consume_forever(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                await self._consume_once()
+                delay = self.reconnect_delay
+            except Exception as e:
+                if any(error in str(e) for error in PERMANENT_SUBSCRIBE_ERRORS):
+                    # e.g. the key lacks 'Access WebSockets API'; retrying would only burn private call budget
+                    logger.warning(f"Kraken {self.name} stream disabled: {e}")
+                    self._stop.set()
+                    break
+                logger.warning(f"Kraken {self.name} stream error: {e}")
+            finally:
+                self._subscribed.clear()
+                self._on_disconnect()
+            if self._stop.is_set():
+                break
+            logger.info(f"Reconnecting Kraken {self.name} stream in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    async def _consume_once(self):
+        subscriptions = await self._subscriptions()
+        self._acked = False
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(self.url, heartbeat=30) as ws:
+                self._ws = ws
+                for request in subscriptions:
+                    await ws.send_json(request)
+                if not subscriptions:
+                    # Nothing to subscribe to yet; the open socket is live for later subscribes
+                    self._mark_subscribed()
+                async for msg in ws:
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        if msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSE):
+                            break
+                        continue
+                    self._handle_message(json.loads(msg.data))
+                self._ws = None
+
+    def _mark_subscribed(self):
+        if self._acked:
+            return
+        self._acked = True
+        self.connection_id += 1
+        self._subscribed.set()
+        logger.info(f"Subscribed to Kraken {self.name} stream")
+        self._on_subscribed()
+
+    def _handle_message(self, message: dict):
+        self.messages_received += 1
+        if message.get('method') == 'subscribe':
+            if message.get('success'):
+                self._mark_subscribed()
+            else:
+                self._on_subscribe_rejected(message)
+            return
+        self._on_message(message)
+
+
+class KrakenExecutionsFeed(KrakenWebSocketFeed):
+    """
+    Background subscriber to Kraken's authenticated v2 'executions' channel.
+
+    Pushes order state changes into an OrderStateTable and fetches a fresh token on each
+    connect. A reconnect may skip transitions, so waiters treat a connection_id change as a
+    reason to reconcile over REST.
+    """
+    name = 'executions'
+
+    def __init__(self, token_provider: Callable[[], str], url: str = WS_AUTH_URL,
+                 table: OrderStateTable | None = None, reconnect_delay: float = 1.0):
+        """
+        Args:
+            token_provider: Returns a GetWebSocketsToken token (called on every (re)connect, with
+                max_age=0 after a rejected subscribe so a cached token is not reused).
+            url: Authenticated WebSocket endpoint.
+            table: Order state table to feed; created if omitted.
+            reconnect_delay: Initial reconnect backoff in seconds (doubles up to 30s).
+        """
+        super().__init__(url, reconnect_delay)
+        self.token_provider = token_provider
+        self.table = table or OrderStateTable()
+        self._token_rejected = False
+
+    async def _subscriptions(self) -> list[dict]:
+        # After a rejection the cached token may be the cause; ask the provider for a new one
+        provider = partial(self.token_provider, max_age=0) if self._token_rejected else self.token_provider
+        token = await asyncio.get_running_loop().run_in_executor(None, provider)
+        self._token_rejected = False
+        return [{
+            'method': 'subscribe',
+            'params': {'channel': 'executions', 'token': token, 'snap_orders': True, 'snap_trades': False},
+        }]
+
+    def _on_subscribe_rejected(self, message: dict):
+        self._token_rejected = True
+        super()._on_subscribe_rejected(message)
+
+    def _on_disconnect(self):
+        # Wake waiters so they notice the stream is gone
+        self.table.notify()
+
+    def _on_message(self, message: dict):
+        if message.get('channel') != 'executions':
+            return
+        for execution in message.get('data', []):
+            txid = execution.get('order_id')
+            status = ORDER_STATUS_MAP.get(execution.get('order_status', ''))
+            filled = execution.get('cum_qty')
+            if txid and status:
+                self.table.update(txid, status, float(filled) if filled is not None else None)
@@ -0,0 +1,223 @@
+import threading
+import time
+from dataclasses import dataclass
+from bot.kraken_ws import KrakenWebSocketFeed
+from bot.logger import get_logger
+
+logger = get_logger(__name__)
+
+WS_PUBLIC_URL = "wss://ws.kraken.com/v2"
+
+
+@dataclass(frozen=True)
+class PriceQuote:
+    """Point-in-time read of the price board for one symbol."""
+    symbol: str
+    price: float  # last trade when known, otherwise book mid
+    bid: float
+    ask: float
+    mid: float
+    age: float  # seconds since `price` last updated
+    stale: bool  # `price` older than the feed's max_age, or the stream is down
+    touch_age: float  # seconds since bid/ask (and mid) last updated
+    touch_stale: bool  # bid/ask older than the feed's max_age, or the stream is down
+
+
+class OrderBook:
+    """
+    Compact L2 book for one symbol: price -> qty per side, trimmed to `depth` levels.
+    Zero quantity removes a level, as in Kraken's v2 book updates.
+    """
+    __slots__ = ('depth', 'bids', 'asks', 'updated_at')
+
+    def __init__(self, depth: int = 10):
+        self.depth = depth
+        self.bids: dict[float, float] = {}
+        self.asks: dict[float, float] = {}
+        self.updated_at = 0.0
+
+    def apply(self, bids: list, asks: list, snapshot: bool = False):
+        if snapshot:
+            self.bids.clear()
+            self.asks.clear()
+        for side, levels in ((self.bids, bids), (self.asks, asks)):
+            for level in levels or []:
+                price, qty = float(level['price']), float(level['qty'])
+                if qty > 0:
+                    side[price] = qty
+                else:
+                    side.pop(price, None)
+        self._trim()
+        self.updated_at = time.monotonic()
+
+    def _trim(self):
+        if len(self.bids) > self.depth:
+            self.bids = dict(sorted(self.bids.items(), reverse=True)[:self.depth])
+        if len(self.asks) > self.depth:
+            self.asks = dict(sorted(self.asks.items())[:self.depth])
+
+    @property
+    def best_bid(self) -> float:
+        return max(self.bids) if self.bids else 0.0
+
+    @property
+    def best_ask(self) -> float:
+        return min(self.asks) if self.asks else 0.0
+
+    @property
+    def mid(self) -> float:
+        bid, ask = self.best_bid, self.best_ask
+        return (bid + ask) / 2 if bid and ask else 0.0
+
+    def levels(self) -> dict:
+        """Sorted copy of both sides: {'bids': [(price, qty), ...], 'asks': [...]}."""
+        return {
+            'bids': sorted(self.bids.items(), reverse=True),
+            'asks': sorted(self.asks.items()),
+        }
+
+
+class PriceBoard:
+    """Thread-safe last/bid/ask board plus L2 books, keyed by Kraken wsname ('XBT/USD')."""
+
+    def __init__(self, depth: int = 10):
+        self.depth = depth
+        self._tickers: dict[str, tuple[float, float, float, float]] = {}  # symbol -> (last, bid, ask, updated_at)
+        self._books: dict[str, OrderBook] = {}
+        self._lock = threading.Lock()
+
+    def update_ticker(self, symbol: str, last: float, bid: float, ask: float):
+        with self._lock:
+            self._tickers[symbol] = (last, bid, ask, time.monotonic())
+
+    def update_book(self, symbol: str, bids: list, asks: list, snapshot: bool = False):
+        with self._lock:
+            book = self._books.get(symbol)
+            if book is None:
+                book = self._books[symbol] = OrderBook(self.depth)
+            book.apply(bids, asks, snapshot)
+
+    def quote(self, symbol: str, max_age: float, live: bool = True) -> PriceQuote | None:
+        """Merge ticker and book state into a PriceQuote; None if the symbol was never seen."""
+        with self._lock:
+            ticker = self._tickers.get(symbol)
+            book = self._books.get(symbol)
+            if ticker is None and book is None:
+                return None
+            last, bid, ask, ticker_at = ticker if ticker else (0.0, 0.0, 0.0, 0.0)
+            touch_at = ticker_at
+            if book is not None and book.bids and book.asks:
+                # The book is the fresher top-of-book whenever it has both sides
+                bid, ask, touch_at = book.best_bid, book.best_ask, book.updated_at
+        mid = (bid + ask) / 2 if bid and ask else 0.0
+        # Each field is as old as the message that last set it: a busy book does not freshen `last`
+        now = time.monotonic()
+        age = now - (ticker_at if last else touch_at)
+        touch_age = now - touch_at
+        return PriceQuote(
+            symbol=symbol,
+            price=last or mid,
+            bid=bid,
+            ask=ask,
+            mid=mid,
+            age=age,
+            stale=(not live) or age > max_age,
+            touch_age=touch_age,
+            touch_stale=(not live) or touch_age > max_age,
+        )
+
+    def book(self, symbol: str) -> dict | None:
+        with self._lock:
+            book = self._books.get(symbol)
+            return book.levels() if book else None
+
+
+class KrakenMarketDataFeed(KrakenWebSocketFeed):
+    """
+    Background subscriber to Kraken's public v2 'ticker' and 'book' channels.
+
+    Maintains a PriceBoard for the tracked symbols so readers get prices from memory with
+    get_price() instead of a REST round-trip. Symbols can be added while running with track().
+    """
+    name = 'market-data'
+
+    def __init__(self, url: str = WS_PUBLIC_URL, depth: int = 10, max_age: float = 5.0,
+                 board: PriceBoard | None = None, reconnect_delay: float = 1.0):
+        """
+        Args:
+            url: Public WebSocket endpoint.
+            depth: Book levels kept per side (Kraken accepts 10, 25, 100, 500, 1000).
+            max_age: Seconds after which a symbol's quote is reported stale.
+            board: Price board to feed; created if omitted.
+            reconnect_delay: Initial reconnect backoff in seconds (doubles up to 30s).
+        """
+        super().__init__(url, reconnect_delay)
+        self.depth = depth
+        self.max_age = max_age
+        self.board = board or PriceBoard(depth)
+        self._symbols: set[str] = set()
+        self._sent_symbols: set[str] = set()  # subscribed on the current connection
+        self._symbols_lock = threading.Lock()
+
+    @property
+    def symbols(self) -> set[str]:
+        with self._symbols_lock:
+            return set(self._symbols)
+
+    def track(self, symbols: list[str]):
+        """Add symbols (wsnames) to the subscription; subscribes immediately when connected."""
+        with self._symbols_lock:
+            self._symbols.update(s for s in symbols if s)
+        if self.is_live:
+            self._subscribe_pending()
+
+    def _subscribe_pending(self):
+        # Symbols tracked after the connect-time subscribe went out are subscribed here
+        with self._symbols_lock:
+            pending = sorted(self._symbols - self._sent_symbols)
+            self._sent_symbols.update(pending)
+        if pending:
+            for request in self._subscribe_requests(pending):
+                self.send(request)
+
+    def get_price(self, symbol: str, max_age: float | None = None) -> PriceQuote | None:
+        """Non-blocking price read; check `stale` before trusting the value."""
+        return self.board.quote(symbol, self.max_age if max_age is None else max_age, live=self.is_live)
+
+    def _subscribe_requests(self, symbols: list[str]) -> list[dict]:
+        return [
+            {'method': 'subscribe', 'params': {'channel': 'ticker', 'symbol': symbols}},
+            {'method': 'subscribe', 'params': {'channel': 'book', 'symbol': symbols, 'depth': self.depth}},
+        ]
+
+    async def _subscriptions(self) -> list[dict]:
+        with self._symbols_lock:
+            symbols = sorted(self._symbols)
+            self._sent_symbols = set(symbols)
+        return self._subscribe_requests(symbols) if symbols else []
+
+    def _on_subscribed(self):
+        self._subscribe_pending()
+
+    def _on_subscribe_rejected(self, message: dict):
+        symbol = message.get('symbol')
+        if symbol and 'not supported' in str(message.get('error', '')):
+            # Reconnecting cannot fix an unlisted symbol; stop tracking it and keep the rest live
+            with self._symbols_lock:
+                self._symbols.discard(symbol)
+                self._sent_symbols.discard(symbol)
+            logger.warning(f"Kraken {self.name} dropped {symbol}: {message.get('error')}")
+            return
+        super()._on_subscribe_rejected(message)
+
+    def _on_message(self, message: dict):
+        channel = message.get('channel')
+        if channel == 'ticker':
+            for tick in message.get('data', []):
+                self.board.update_ticker(
+                    tick['symbol'], float(tick.get('last') or 0.0), float(tick.get('bid') or 0.0), float(tick.get('ask') or 0.0)
+                )
+        elif channel == 'book':
+            snapshot = message.get('type') == 'snapshot'
+            for update in message.get('data', []):
+                self.board.update_book(update['symbol'], update.get('bids', []), update.get('asks', []), snapshot)
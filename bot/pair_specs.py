@@ -0,0 +1,211 @@
+import difflib
+import threading
+from typing import Iterator
+
+# Quote assets that count as USD when indexing base assets
+USD_QUOTES = ('USD', 'ZUSD')
+
+# Kraken asset codes that differ from the symbols used by CoinGecko, the LLM and humans
+KRAKEN_TO_COMMON_SYMBOLS = {'XBT': 'BTC', 'XDG': 'DOGE'}
+COMMON_TO_KRAKEN_SYMBOLS = {common: kraken for kraken, common in KRAKEN_TO_COMMON_SYMBOLS.items()}
+
+# Minimum difflib similarity for a fuzzy pair match; high on purpose, a wrong match trades the wrong coin.
+# A fuzzy match must also keep the input's base asset, so only the quote part may be misspelled.
+FUZZY_PAIR_CUTOFF = 0.9
+
+
+def clean_asset_name(asset: str) -> str:
+    """
+    Strip Kraken's legacy X/Z prefix from a 4+ character asset code ('XXBT' -> 'XBT',
+    'ZUSD' -> 'USD'), using the same rule as the Balance payload so spec bases line up with
+    balance keys. Three-letter codes such as 'XTZ' are left alone.
+    """
+    if len(asset) > 3 and asset.startswith(('X', 'Z')):
+        return asset[1:]
+    return asset
+
+
+def alias_key(text: str) -> str:
+    """Canonical lookup key for a pair string: upper-case with separators removed ('eth/usd' -> 'ETHUSD')."""
+    return ''.join(ch for ch in str(text).upper() if ch.isalnum())
+
+
+def common_symbol(asset: str) -> str:
+    """Map a cleaned Kraken asset code to its common/CoinGecko symbol ('XBT' -> 'BTC')."""
+    return KRAKEN_TO_COMMON_SYMBOLS.get(asset, asset)
+
+
+def _to_float(value, default: float = 0.0) -> float:
+    try:
+        return float(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        return default
+
+
+def _to_int(value, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class PairSpec:
+    """
+    Pre-parsed trading rules for one Kraken pair.
+
+    Kraken's AssetPairs payload stores limits as strings; they are parsed once here so order
+    validation is plain attribute access. Missing limits parse to 0.0 (no minimum); tick_size
+    falls back to 10**-pair_decimals.
+    """
+    __slots__ = (
+        'name', 'altname', 'wsname', 'base', 'quote', 'clean_base', 'clean_quote', 'symbol',
+        'ordermin', 'costmin', 'tick_size', 'lot_decimals', 'pair_decimals', 'cost_decimals', 'status',
+    )
+
+    def __init__(self, name: str, info: dict):
+        self.name = name
+        self.altname = info.get('altname', '') or ''
+        self.wsname = info.get('wsname', '') or ''
+        self.base = info.get('base', '') or ''
+        self.quote = info.get('quote', '') or ''
+        self.clean_base = clean_asset_name(self.base)
+        self.clean_quote = clean_asset_name(self.quote)
+        self.symbol = common_symbol(self.clean_base)
+        self.ordermin = _to_float(info.get('ordermin'))
+        self.costmin = _to_float(info.get('costmin'))
+        lot_decimals = _to_int(info.get('lot_decimals'), 8)
+        # Guard against nonsense precision values; Kraken never exceeds 10 volume decimals
+        self.lot_decimals = lot_decimals if 0 <= lot_decimals <= 10 else 8
+        self.pair_decimals = _to_int(info.get('pair_decimals'), 8)
+        self.cost_decimals = _to_int(info.get('cost_decimals'), 8)
+        self.tick_size = _to_float(info.get('tick_size')) or 10 ** -self.pair_decimals
+        self.status = info.get('status', 'online') or 'online'
+
+    @property
+    def is_usd_quoted(self) -> bool:
+        return self.quote in USD_QUOTES
+
+    def to_rules(self) -> dict:
+        """Trading-rule view used by get_all_usd_trading_rules and the strategist prompt."""
+        return {
+            'base': self.base,
+            'quote': self.quote,
+            'base_asset': self.clean_base,
+            'symbol': self.symbol,
+            'ordermin': self.ordermin,
+            'costmin': self.costmin,
+            'tick_size': self.tick_size,
+            'lot_decimals': self.lot_decimals,
+        }
+
+    def __repr__(self) -> str:
+        return f"PairSpec({self.name!r}, ordermin={self.ordermin}, costmin={self.costmin}, lot_decimals={self.lot_decimals})"
+
+
+class PairSpecIndex:
+    """
+    Immutable lookup table of PairSpec objects built once per AssetPairs payload.
+
+    get() resolves a Kraken pair name, altname or wsname in one dict hit; for_base() resolves a
+    cleaned base asset ('XBT', 'ETH') to its USD-quoted pair. resolve() is the normalization
+    entry point for free-form pair strings: every spelling we expect from the LLM or CoinGecko
+    ('btc/usd', 'BTC-USD', 'XBTUSD', 'DOGEUSD', 'SOL') is precomputed into a single alias table,
+    with a conservative fuzzy fallback for typos in the quote ('ETHUSDD'); a base asset is never
+    guessed, so 'ARBUSD' does not become 'ARUSD'.
+    """
+    def __init__(self, asset_pairs: dict | None = None):
+        self._specs: dict[str, PairSpec] = {}
+        self._by_key: dict[str, PairSpec] = {}
+        self._usd_by_base: dict[str, PairSpec] = {}
+        for name, info in (asset_pairs or {}).items():
+            if not isinstance(info, dict):
+                continue
+            spec = PairSpec(name, info)
+            self._specs[name] = spec
+            for key in (name, spec.altname, spec.wsname):
+                # Canonical pair names win over altname/wsname collisions
+                if key and (key not in self._by_key or key == name):
+                    self._by_key[key] = spec
+            if spec.is_usd_quoted and spec.clean_base:
+                self._usd_by_base.setdefault(spec.clean_base, spec)
+        self._aliases = self._build_aliases()
+        self._fuzzy_cache: dict[str, str | None] = {}
+        self._fuzzy_lock = threading.Lock()
+
+    def _build_aliases(self) -> dict[str, str]:
+        """
+        Precompute alias_key -> pair name. Earlier tiers win on collisions:
+        exact Kraken spellings, then base/quote spellings (Kraken and common symbols), then bare
+        base assets, which resolve to the USD pair.
+        """
+        aliases: dict[str, str] = {}
+        for spec in self._specs.values():
+            for key in (spec.name, spec.altname, spec.wsname):
+                if key:
+                    aliases.setdefault(alias_key(key), spec.name)
+        # Prefer the USD pair the portfolio code already uses when several pairs share a spelling
+        specs = list(self._usd_by_base.values()) + list(self._specs.values())
+        for spec in specs:
+            for base in {spec.clean_base, spec.symbol, spec.base}:
+                for quote in {spec.clean_quote, common_symbol(spec.clean_quote), spec.quote}:
+                    if base and quote:
+                        aliases.setdefault(alias_key(base + quote), spec.name)
+        for base, spec in self._usd_by_base.items():
+            for key in (base, spec.symbol, spec.base):
+                aliases.setdefault(alias_key(key), spec.name)
+        return aliases
+
+    def get(self, pair: str) -> PairSpec | None:
+        """Spec for a Kraken pair name, altname or wsname; None if unknown."""
+        if not pair:
+            return None
+        return self._by_key.get(pair)
+
+    def for_base(self, asset: str) -> PairSpec | None:
+        """USD-quoted spec for a cleaned base asset; None if the asset has no USD market."""
+        return self._usd_by_base.get(asset)
+
+    def resolve(self, pair: str, fuzzy: bool = True) -> str | None:
+        """
+        Normalize a free-form pair string to the Kraken pair name ('btc/usd' -> 'XXBTZUSD').
+        Returns None when nothing matches; fuzzy matches are memoized per input.
+        """
+        key = alias_key(pair or '')
+        if not key:
+            return None
+        name = self._aliases.get(key)
+        if name is not None or not fuzzy:
+            return name
+        with self._fuzzy_lock:
+            if key in self._fuzzy_cache:
+                return self._fuzzy_cache[key]
+        matches = difflib.get_close_matches(key, self._aliases.keys(), n=5, cutoff=FUZZY_PAIR_CUTOFF)
+        name = next((self._aliases[m] for m in matches if self._same_base(key, self._specs[self._aliases[m]])), None)
+        with self._fuzzy_lock:
+            self._fuzzy_cache[key] = name
+        return name
+
+    @staticmethod
+    def _same_base(key: str, spec: PairSpec) -> bool:
+        """True if `key` spells spec's base asset followed by something starting with its quote."""
+        bases = {alias_key(b) for b in (spec.clean_base, spec.symbol, spec.base) if b}
+        quotes = {alias_key(q) for q in (spec.clean_quote, common_symbol(spec.clean_quote), spec.quote) if q}
+        return any(key.startswith(base) and key[len(base):].startswith(quote) for base in bases for quote in quotes)
+
+    def suggest(self, pair: str, n: int = 5) -> list[str]:
+        """Closest Kraken pair names for an unresolvable input, for error messages."""
+        matches = difflib.get_close_matches(alias_key(pair or ''), self._aliases.keys(), n=n * 3, cutoff=0.6)
+        return list(dict.fromkeys(self._aliases[m] for m in matches))[:n]
+
+    def usd_specs(self) -> list[PairSpec]:
+        """All USD-quoted specs in AssetPairs order."""
+        return [spec for spec in self._specs.values() if spec.is_usd_quoted]
+
+    def __contains__(self, pair: str) -> bool:
+        return pair in self._by_key
+
+    def __iter__(self) -> Iterator[PairSpec]:
+        return iter(self._specs.values())
+
+    def __len__(self) -> int:
+        return len(self._specs)
@@ -0,0 +1,283 @@
+import threading
+from typing import Callable
+from bot.kraken_api import KrakenAPI, KrakenAPIError
+from bot.pair_specs import PairSpec, clean_asset_name
+from bot.sim_exchange import DEFAULT_MAKER_FEE, DEFAULT_TAKER_FEE, SimMatchingEngine, SimOrder
+from bot.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Synthetic book built around a bare price: half-spread in basis points, levels per side and
+# the USD depth shown at each level
+DEFAULT_SPREAD_BPS = 5.0
+DEFAULT_BOOK_LEVELS = 5
+DEFAULT_LEVEL_DEPTH_USD = 50_000.0
+
+
+def synthetic_book(price: float, spread_bps: float = DEFAULT_SPREAD_BPS, levels: int = DEFAULT_BOOK_LEVELS,
+                   level_qty: float | None = None) -> tuple[list, list]:
+    """([(bid, qty), ...], [(ask, qty), ...]) around price, levels spaced one spread apart."""
+    half = price * spread_bps / 10_000
+    qty = level_qty if level_qty is not None else DEFAULT_LEVEL_DEPTH_USD / price
+    bids = [(price - half * (2 * k + 1), qty) for k in range(levels)]
+    asks = [(price + half * (2 * k + 1), qty) for k in range(levels)]
+    return bids, asks
+
+
+def _api_error(message: str) -> KrakenAPIError:
+    # Same wording as KrakenAPI._query_api, so callers matching on error text behave the same
+    return KrakenAPIError(f"API returned errors: {[message]}")
+
+
+class PaperKrakenAPI(KrakenAPI):
+    """
+    In-process paper exchange behind the full KrakenAPI interface.
+
+    Only the transport is simulated: _query_api serves each REST endpoint from local balances
+    and a SimMatchingEngine, so portfolio context, validation, batching, quantization and
+    order waits run the same code they run against Kraken. Orders are checked the way Kraken
+    checks them (ordermin, costmin, available funds net of open-order holds), fills move
+    balances net of maker/taker fees, and QueryOrders/OpenOrders report engine state.
+
+    Markets come from recorded books (set_book), bare prices (set_price) or OHLC candles
+    (apply_candle). With a price_source (e.g. a live client's get_ticker_prices), pairs
+    without a book get a synthetic one around the source's price on first use. Nothing
+    sleeps, opens sockets or starts threads, so a cycle costs only in-memory work.
+    """
+    paper = True
+
+    def __init__(self, asset_pairs: dict, balances: dict | None = None, maker_fee: float = DEFAULT_MAKER_FEE,
+                 taker_fee: float = DEFAULT_TAKER_FEE, price_source: Callable[[list], dict] | None = None,
+                 spread_bps: float = DEFAULT_SPREAD_BPS):
+        """
+        Args:
+            asset_pairs: AssetPairs payload (e.g. a live client's asset_pairs) defining the pair rules.
+            balances: Starting balances by asset ('USD', 'XBT' or Kraken codes such as 'ZUSD').
+            maker_fee, taker_fee: Fee rates charged on fills.
+            price_source: Optional pairs -> {'PAIR': {'price': float}} used to seed unknown books.
+            spread_bps: Half-spread of synthetic books.
+        """
+        # Same setup as a live client, minus the network: no credentials or HTTP sessions
+        # (_init_transport), no disk cache or AssetPairs fetch, and no WebSocket feeds
+        super().__init__(pair_cache_path='', pair_cache_ttl=float('inf'), asset_pairs=asset_pairs, websocket_feeds=False)
+        self.max_rate_limit_retries = 0
+        # Balances change in-process between any two reads, and rebuilding is cheap
+        self.portfolio_snapshot_ttl = 0.0
+
+        self.price_source = price_source
+        self.spread_bps = spread_bps
+        self.fees_paid = 0.0
+        self._balances: dict[str, float] = {}
+        for asset, amount in (balances or {}).items():
+            key = clean_asset_name(asset)
+            self._balances[key] = self._balances.get(key, 0.0) + float(amount)
+        self._last: dict[str, float] = {}
+        self._lock = threading.RLock()
+        self.engine = SimMatchingEngine(maker_fee, taker_fee, fill_listener=self._settle_fill)
+        self._handlers = {
+            '/0/public/AssetPairs': lambda data: self.asset_pairs,
+            '/0/public/Ticker': self._ticker,
+            '/0/private/Balance': self._balance,
+            '/0/private/AddOrder': self._add_order,
+            '/0/private/AddOrderBatch': self._add_order_batch,
+            '/0/private/CancelOrder': self._cancel_order,
+            '/0/private/QueryOrders': self._query_orders,
+            '/0/private/OpenOrders': lambda data: {'open': self.engine.open_orders()},
+        }
+
+    def _init_transport(self, pool_maxsize, private_pool_maxsize, connect_timeout, read_timeout):
+        self.api_key = 'paper'
+        self.api_secret = ''
+        self.base_url = 'paper://kraken'
+        self.pool_maxsize = 1
+        self.private_pool_maxsize = 1
+        self.timeout = (0.0, 0.0)
+        self._sessions = {}
+
+    # --- Market state ---
+    def set_book(self, pair: str, bids: list, asks: list, last: float | None = None):
+        """Install a recorded book snapshot; resting orders it crosses fill as maker."""
+        name = self._pair_name(pair)
+        with self._lock:
+            self.engine.set_book(name, bids, asks)
+            bid, ask = self.engine.best_bid(name), self.engine.best_ask(name)
+            self._last[name] = last if last is not None else ((bid + ask) / 2 if bid and ask else bid or ask)
+
+    def set_price(self, pair: str, price: float):
+        """Quote the pair with a synthetic book around price."""
+        bids, asks = synthetic_book(price, self.spread_bps)
+        self.set_book(pair, bids, asks, last=price)
+
+    def apply_candle(self, pair: str, open_: float, high: float, low: float, close: float, volume: float | None = None):
+        """
+        Advance the pair by one OHLC candle: resting buys at or above the low and resting sells
+        at or below the high fill (up to the candle's volume when given), then the book is
+        re-centred on the close.
+        """
+        name = self._pair_name(pair)
+        depth = volume if volume is not None else DEFAULT_BOOK_LEVELS * DEFAULT_LEVEL_DEPTH_USD / close
+        with self._lock:
+            self.engine.set_book(name, [], [(low, depth)])
+            self.engine.set_book(name, [(high, depth)], [])
+            self.set_price(name, close)
+
+    def get_balances(self) -> dict:
+        """Current balances by cleaned asset name."""
+        with self._lock:
+            return dict(self._balances)
+
+    # --- Transport ---
+    def _query_api(self, method_type, url_path, data=None, max_retries=3):
+        """Serve a REST call from the paper exchange; errors raise like Kraken's do."""
+        handler = self._handlers.get(url_path)
+        if handler is None:
+            raise _api_error('EGeneral:Unknown method')
+        with self._lock:
+            self._record_transport('public' if method_type == 'public' else 'private', url_path, 0.0, True)
+            return handler(dict(data or {}))
+
+    def _pair_name(self, pair: str) -> str:
+        spec = self.get_pair_spec(pair)
+        return spec.name if spec else pair
+
+    def _ensure_books(self, names: list[str]):
+        """Seed synthetic books for pairs never quoted, from price_source in one request."""
+        missing = [name for name in names if self.engine.best_bid(name) <= 0 and self.engine.best_ask(name) <= 0]
+        if not missing or self.price_source is None:
+            return
+        try:
+            prices = self.price_source(missing)
+        except Exception as e:
+            logger.warning(f"Paper exchange could not price {missing}: {e}")
+            return
+        for pair, info in prices.items():
+            if info.get('price', 0) > 0:
+                self.set_price(self._pair_name(pair), info['price'])
+
+    # --- Endpoint handlers ---
+    def _ticker(self, data: dict) -> dict:
+        specs = [self.get_pair_spec(pair) for pair in data.get('pair', '').split(',') if pair]
+        if not specs or any(spec is None for spec in specs):
+            raise _api_error('EQuery:Unknown asset pair')
+        self._ensure_books([spec.name for spec in specs])
+        tickers = {}
+        for spec in specs:
+            last = self._last.get(spec.name, 0.0)
+            if last <= 0:
+                raise _api_error('EQuery:Unknown asset pair')
+            tickers[spec.name] = {
+                'a': [str(self.engine.best_ask(spec.name)), '1', '1.000'],
+                'b': [str(self.engine.best_bid(spec.name)), '1', '1.000'],
+                'c': [str(last), '0'],
+            }
+        return tickers
+
+    def _balance(self, data: dict) -> dict:
+        return {asset: f"{amount:.10f}" for asset, amount in self._balances.items()}
+
+    def _add_order(self, data: dict) -> dict:
+        spec = self.get_pair_spec(data.get('pair', ''))
+        if spec is None:
+            raise _api_error('EQuery:Unknown asset pair')
+        order = {
+            'type': data.get('type'),
+            'ordertype': data.get('ordertype', 'market'),
+            'volume': data.get('volume'),
+            'price': data.get('price'),
+            'post_only': 'post' in str(data.get('oflags', '')).split(','),
+        }
+        error = self._check_order(spec, order)
+        if error:
+            raise _api_error(error)
+        return self._place(spec, order, validate=data.get('validate') == 'true')
+
+    def _add_order_batch(self, data: dict) -> dict:
+        spec = self.get_pair_spec(data.get('pair', ''))
+        if spec is None:
+            raise _api_error('EQuery:Unknown asset pair')
+        count = len({key.split(']')[0] for key in data if key.startswith('orders[')})
+        results = []
+        for i in range(count):
+            order = {
+                'type': data.get(f'orders[{i}][type]'),
+                'ordertype': data.get(f'orders[{i}][ordertype]', 'market'),
+                'volume': data.get(f'orders[{i}][volume]'),
+                'price': data.get(f'orders[{i}][price]'),
+                'post_only': False,
+            }
+            error = self._check_order(spec, order)
+            results.append({'error': error} if error else self._place(spec, order, validate=data.get('validate') == 'true'))
+        return {'orders': results}
+
+    def _cancel_order(self, data: dict) -> dict:
+        if not self.engine.cancel(data.get('txid', '')):
+            raise _api_error('EOrder:Unknown order')
+        return {'count': 1}
+
+    def _query_orders(self, data: dict) -> dict:
+        return self.engine.query([tx for tx in data.get('txid', '').split(',') if tx])
+
+    # --- Orders and balances ---
+    def _check_order(self, spec: PairSpec, order: dict) -> str | None:
+        """Kraken's admission checks; returns the error Kraken would send, or None."""
+        side, ordertype = order['type'], order['ordertype']
+        if side not in ('buy', 'sell') or ordertype not in ('market', 'limit'):
+            return 'EGeneral:Invalid arguments'
+        if ordertype == 'limit' and order['price'] is None:
+            return 'EGeneral:Invalid arguments:price'
+        try:
+            volume = float(order['volume'])
+        except (TypeError, ValueError):
+            return 'EGeneral:Invalid arguments:volume'
+        if volume <= 0 or volume < spec.ordermin:
+            return 'EOrder:Order minimum not met'
+
+        self._ensure_books([spec.name])
+        touch = self.engine.best_ask(spec.name) if side == 'buy' else self.engine.best_bid(spec.name)
+        price = float(order['price']) if order['price'] is not None else touch
+        if price <= 0:
+            return 'EService:Unavailable'
+        if volume * price < spec.costmin:
+            return 'EOrder:Cost minimum not met'
+        if side == 'buy':
+            needed, asset = volume * price * (1 + self.engine.taker_fee), spec.clean_quote
+        else:
+            needed, asset = volume, spec.clean_base
+        if needed > self._available(asset) * (1 + 1e-9):
+            return 'EOrder:Insufficient funds'
+        return None
+
+    def _place(self, spec: PairSpec, order: dict, validate: bool) -> dict:
+        price_text = f"limit {order['price']}" if order['ordertype'] == 'limit' else 'market'
+        descr = {'order': f"{order['type']} {order['volume']} {spec.altname or spec.name} @ {price_text}"}
+        if validate:
+            return {'descr': descr}
+        txid = self.engine.add_order(
+            spec.name, order['type'], float(order['volume']), order['ordertype'],
+            float(order['price']) if order['price'] is not None else None, order['post_only'],
+        )
+        return {'descr': descr, 'txid': [txid]}
+
+    def _available(self, asset: str) -> float:
+        """Balance not held by open orders (buys hold quote plus taker fee, sells hold base)."""
+        held = 0.0
+        for txid in self.engine.open_orders():
+            order = self.engine.order(txid)
+            spec = self.get_pair_spec(order.pair)
+            if spec is None:
+                continue
+            if order.side == 'buy' and spec.clean_quote == asset:
+                held += order.remaining * order.price * (1 + self.engine.taker_fee)
+            elif order.side == 'sell' and spec.clean_base == asset:
+                held += order.remaining
+        return self._balances.get(asset, 0.0) - held
+
+    def _settle_fill(self, order: SimOrder, price: float, qty: float, fee: float):
+        spec = self.get_pair_spec(order.pair)
+        if spec is None:
+            return
+        base, quote = spec.clean_base, spec.clean_quote
+        sign = 1 if order.side == 'buy' else -1
+        self._balances[base] = self._balances.get(base, 0.0) + sign * qty
+        self._balances[quote] = self._balances.get(quote, 0.0) - sign * price * qty - fee
+        self.fees_paid += fee
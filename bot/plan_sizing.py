@@ -0,0 +1,152 @@
+from dataclasses import dataclass
+import numpy as np
+from bot.pair_specs import PairSpec
+from bot.quantize import quantize_volumes, spec_lot_decimals
+
+# Micro-trade guard: trades below max($25, 5% of equity) are not worth the fees
+MICRO_TRADE_MIN_USD = 25.0
+MICRO_TRADE_EQUITY_PCT = 0.05
+
+# Relative slack when comparing an uplift against caps and available cash
+UPLIFT_TOLERANCE = 1.001
+
+
+def uplift_cap_pct(portfolio_value: float) -> float:
+    """Largest share of equity a minimum-size uplift may use (cash buffer policy)."""
+    return 0.95 if portfolio_value < 50 else 0.99
+
+
+def micro_trade_threshold(portfolio_value: float) -> float:
+    return max(MICRO_TRADE_MIN_USD, MICRO_TRADE_EQUITY_PCT * portfolio_value)
+
+
+@dataclass(frozen=True)
+class PlanSizing:
+    """
+    Column-wise sizing of a trade plan: one array entry per trade, in plan order.
+
+    Produced by size_plan(); row(i) gives a plain-dict view of one trade for logging and
+    messages.
+    """
+    pairs: tuple
+    is_buy: np.ndarray
+    prices: np.ndarray
+    volumes: np.ndarray  # truncated to each pair's lot_decimals
+    notional: np.ndarray  # volumes * prices
+    ordermin: np.ndarray
+    costmin: np.ndarray
+    effective_min_usd: np.ndarray  # max(costmin, ordermin * price): the USD size Kraken will accept
+    priced: np.ndarray
+    below_ordermin: np.ndarray
+    below_min_usd: np.ndarray
+    micro: np.ndarray
+    upliftable: np.ndarray  # BUY below a minimum that fits the uplift cap and available cash
+    micro_threshold: float
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def row(self, i: int) -> dict:
+        return {
+            'pair': self.pairs[i],
+            'action': 'buy' if self.is_buy[i] else 'sell',
+            'price': float(self.prices[i]),
+            'volume': float(self.volumes[i]),
+            'notional': float(self.notional[i]),
+            'ordermin': float(self.ordermin[i]),
+            'costmin': float(self.costmin[i]),
+            'effective_min_usd': float(self.effective_min_usd[i]),
+            'priced': bool(self.priced[i]),
+            'below_ordermin': bool(self.below_ordermin[i]),
+            'below_min_usd': bool(self.below_min_usd[i]),
+            'micro': bool(self.micro[i]),
+            'upliftable': bool(self.upliftable[i]),
+        }
+
+
+def size_plan(pairs: list[str], actions: list[str], prices, lot_decimals, ordermin, costmin,
+              portfolio_value: float, allocations=None, volumes=None, available_cash: float = 0.0) -> PlanSizing:
+    """
+    Size a whole plan in one vectorized pass.
+
+    Each trade is sized from its allocation (share of portfolio_value) when that entry is
+    finite, otherwise from its explicit volume. Volumes are truncated to lot_decimals, then
+    minimum-size violations, micro-trade flags and BUY uplift candidates are computed
+    against the same arrays the executor and the supervisor read.
+
+    Args:
+        pairs: Normalized pair per trade.
+        actions: 'buy' or 'sell' per trade.
+        prices: USD price per trade (0 when unknown).
+        lot_decimals, ordermin, costmin: Pair rules per trade.
+        portfolio_value: Total equity used for allocations and the micro-trade threshold.
+        allocations: Allocation fraction per trade, NaN/None where the trade has a volume.
+        volumes: Volume per trade, used where no allocation is given.
+        available_cash: Cash (including expected sell proceeds) an uplift may draw on.
+    """
+    n = len(pairs)
+    prices = np.asarray(prices, dtype=float).reshape(n)
+    lots = np.asarray(lot_decimals, dtype=float).reshape(n)
+    ordermin = np.asarray(ordermin, dtype=float).reshape(n)
+    costmin = np.asarray(costmin, dtype=float).reshape(n)
+    allocations = np.full(n, np.nan) if allocations is None else np.array(
+        [np.nan if a is None else a for a in allocations], dtype=float)
+    volumes = np.zeros(n) if volumes is None else np.array(
+        [0.0 if v is None else v for v in volumes], dtype=float)
+    is_buy = np.array([str(a).lower() == 'buy' for a in actions], dtype=bool)
+
+    priced = prices > 0
+    safe_prices = np.where(priced, prices, 1.0)
+    from_allocation = np.isfinite(allocations)
+    raw = np.where(from_allocation, np.where(priced, allocations * portfolio_value / safe_prices, 0.0), volumes)
+    sized = quantize_volumes(raw, lots)
+
+    notional = np.where(priced, sized * prices, 0.0)
+    effective_min = np.maximum(costmin, np.where(priced, ordermin * prices, 0.0))
+    below_ordermin = sized < ordermin
+    below_min_usd = (effective_min > 0) & (notional < effective_min)
+    threshold = micro_trade_threshold(portfolio_value)
+    micro = notional < threshold
+
+    cap_usd = uplift_cap_pct(portfolio_value) * portfolio_value
+    upliftable = (
+        is_buy
+        & (below_ordermin | below_min_usd)
+        & (effective_min > 0)
+        & (effective_min <= cap_usd * UPLIFT_TOLERANCE)
+        & (effective_min <= available_cash * UPLIFT_TOLERANCE)
+    )
+
+    return PlanSizing(
+        pairs=tuple(pairs),
+        is_buy=is_buy,
+        prices=prices,
+        volumes=sized,
+        notional=notional,
+        ordermin=ordermin,
+        costmin=costmin,
+        effective_min_usd=effective_min,
+        priced=priced,
+        below_ordermin=below_ordermin,
+        below_min_usd=below_min_usd,
+        micro=micro,
+        upliftable=upliftable,
+        micro_threshold=threshold,
+    )
+
+
+def size_trades(pairs: list[str], actions: list[str], specs: list[PairSpec | None], prices: list[float],
+                portfolio_value: float, allocations=None, volumes=None, available_cash: float = 0.0) -> PlanSizing:
+    """size_plan() with rule arrays taken from PairSpecs (unknown pairs: 8 lot decimals, no minimums)."""
+    return size_plan(
+        pairs,
+        actions,
+        prices,
+        [spec_lot_decimals(spec) for spec in specs],
+        [spec.ordermin if spec else 0.0 for spec in specs],
+        [spec.costmin if spec else 0.0 for spec in specs],
+        portfolio_value,
+        allocations=allocations,
+        volumes=volumes,
+        available_cash=available_cash,
+    )
@@ -0,0 +1,66 @@
+from decimal import ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, Decimal
+import numpy as np
+from bot.pair_specs import PairSpec
+
+# Volume precision used when a pair's lot_decimals is unknown (Kraken's common default)
+DEFAULT_LOT_DECIMALS = 8
+
+# Float ulps to step up before flooring to whole lots, absorbing product noise (0.29 * 100 == 28.999999999999996)
+_LOT_NOISE_ULPS = 2
+
+
+def _to_decimal(value) -> Decimal:
+    # str() gives the shortest repr of a float, so 0.1 becomes Decimal('0.1') rather than its binary expansion
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def quantize_volume(volume, lot_decimals: int = DEFAULT_LOT_DECIMALS) -> Decimal:
+    """
+    Truncate a volume to lot_decimals places, toward zero, so a quantized order never exceeds
+    the holdings or cash it was sized from. Negative volumes quantize to zero.
+    """
+    quantum = Decimal(1).scaleb(-int(lot_decimals))
+    volume = _to_decimal(volume)
+    if volume <= 0:
+        return Decimal(0).quantize(quantum)
+    return volume.quantize(quantum, rounding=ROUND_DOWN)
+
+
+def quantize_price(price, tick_size, side: str) -> Decimal:
+    """
+    Snap a limit price onto the pair's tick grid on the safe side: BUY prices round down (never
+    pay more than asked), SELL prices round up (never sell for less).
+    """
+    tick = _to_decimal(tick_size)
+    price = _to_decimal(price)
+    if tick <= 0:
+        return price
+    rounding = ROUND_FLOOR if side == 'buy' else ROUND_CEILING
+    ticks = (price / tick).to_integral_value(rounding=rounding)
+    return (ticks * tick).quantize(tick)
+
+
+def format_volume(volume, lot_decimals: int = DEFAULT_LOT_DECIMALS) -> str:
+    """Fixed-point volume string for order payloads ('0.10000000')."""
+    return f"{quantize_volume(volume, lot_decimals):f}"
+
+
+def format_price(price, tick_size, side: str) -> str:
+    return f"{quantize_price(price, tick_size, side):f}"
+
+
+def spec_lot_decimals(spec: PairSpec | None) -> int:
+    return spec.lot_decimals if spec else DEFAULT_LOT_DECIMALS
+
+
+def quantize_volumes(volumes, lot_decimals) -> np.ndarray:
+    """
+    Bulk quantize_volume() for whole plans: floors each volume to whole lots of its own
+    lot_decimals. Returns floats equal to the nearest double of the exact truncated value.
+    """
+    volumes = np.asarray(volumes, dtype=float)
+    scale = 10.0 ** np.asarray(lot_decimals, dtype=float)
+    scaled = volumes * scale
+    for _ in range(_LOT_NOISE_ULPS):
+        scaled = np.nextafter(scaled, np.inf)
+    return np.maximum(np.floor(scaled), 0.0) / scale
@@ -0,0 +1,130 @@
+from dataclasses import dataclass
+import numpy as np
+from bot.plan_sizing import micro_trade_threshold
+from bot.quantize import quantize_volumes
+
+# Kraken's base taker fee; market orders pay it on the USD notional
+DEFAULT_FEE_RATE = 0.0026
+# Positions within +/- this many weight points of target are left alone
+DEFAULT_TOLERANCE_BAND = 0.02
+# Share of equity kept in cash after buys
+DEFAULT_CASH_BUFFER = 0.01
+
+
+@dataclass(frozen=True)
+class RebalancePlan:
+    """
+    Result of plan_rebalance(): per-pair arrays over the target universe plus the order set.
+    volumes is signed (+ buy, - sell, 0 no order).
+    """
+    pairs: tuple
+    prices: np.ndarray
+    current_weights: np.ndarray
+    target_weights: np.ndarray
+    volumes: np.ndarray
+    notional: np.ndarray
+    equity: float
+    buy_scale: float  # below 1.0 when buys were shrunk to fit cash after fees and buffer
+
+    def trades(self) -> list[dict]:
+        """Orders in TradeExecutor's volume format, sells first so their proceeds fund the buys."""
+        order = sorted(np.flatnonzero(self.volumes), key=lambda i: self.volumes[i] > 0)
+        return [
+            {
+                'pair': self.pairs[i],
+                'action': 'buy' if self.volumes[i] > 0 else 'sell',
+                'volume': float(abs(self.volumes[i])),
+                'estimated_price': float(self.prices[i]),
+                'reasoning': (
+                    f"Rebalance {self.pairs[i]} from {self.current_weights[i]:.1%} "
+                    f"to target {self.target_weights[i]:.1%}"
+                ),
+            }
+            for i in order
+        ]
+
+
+def plan_rebalance(pairs: list[str], holdings, prices, target_weights, cash: float, lot_decimals, ordermin, costmin,
+                   band: float = DEFAULT_TOLERANCE_BAND, fee_rate: float = DEFAULT_FEE_RATE,
+                   cash_buffer: float = DEFAULT_CASH_BUFFER, min_trade_usd: float | None = None,
+                   equity: float | None = None) -> RebalancePlan:
+    """
+    Compute the smallest order set that moves the given pairs to their target weights.
+
+    At most one order per pair is emitted, and only for pairs whose weight drifted outside
+    the tolerance band. Orders below ordermin, costmin or min_trade_usd (default: the
+    executor's micro-trade threshold) are dropped rather than emitted for the guards to
+    reject. A target of 0 sells the whole holding, band or not. Buys are scaled down
+    together if cash plus sell proceeds, net of fees and the cash buffer, cannot cover
+    them. Volumes are truncated to lot_decimals.
+
+    Args:
+        pairs: Pair per target (the universe; holdings outside it are untouched but count toward equity).
+        holdings: Current base-asset amount per pair.
+        prices: USD price per pair (unpriced pairs are never traded).
+        target_weights: Target share of total equity per pair; scaled down if the sum
+            exceeds 1 - cash_buffer.
+        cash: USD cash balance.
+        lot_decimals, ordermin, costmin: Pair rules per pair.
+        band: Tolerance band in weight units (0.02 = 2 percentage points).
+        fee_rate: Fee charged on each order's notional.
+        cash_buffer: Share of equity to keep in cash.
+        min_trade_usd: Smallest order worth placing.
+        equity: Total portfolio equity, including holdings outside the universe. Weights,
+            drift, the cash buffer and the micro-trade floor are all relative to it. Defaults
+            to cash plus the universe's holdings (never less than that).
+    """
+    n = len(pairs)
+    holdings = np.maximum(np.asarray(holdings, dtype=float).reshape(n), 0.0)
+    prices = np.asarray(prices, dtype=float).reshape(n)
+    targets = np.clip(np.asarray(target_weights, dtype=float).reshape(n), 0.0, 1.0)
+    lots = np.asarray(lot_decimals, dtype=float).reshape(n)
+    ordermin = np.asarray(ordermin, dtype=float).reshape(n)
+    costmin = np.asarray(costmin, dtype=float).reshape(n)
+
+    priced = prices > 0
+    values = np.where(priced, holdings * prices, 0.0)
+    equity = max(float(cash + values.sum()), float(equity or 0.0))
+    if equity <= 0:
+        zeros = np.zeros(n)
+        return RebalancePlan(tuple(pairs), prices, zeros, targets, zeros, zeros, 0.0, 1.0)
+
+    investable = 1.0 - cash_buffer
+    if targets.sum() > investable:
+        targets = targets * (investable / targets.sum())
+    current = values / equity
+    drift = targets - current
+    exits = (targets == 0) & (holdings > 0)
+    delta_usd = np.where(priced & ((np.abs(drift) > band) | exits), drift * equity, 0.0)
+
+    safe_prices = np.where(priced, prices, 1.0)
+    floor_usd = micro_trade_threshold(equity) if min_trade_usd is None else min_trade_usd
+    min_usd = np.maximum(np.maximum(costmin, ordermin * prices), floor_usd)
+
+    def tradeable(volumes: np.ndarray) -> np.ndarray:
+        return np.where((volumes >= ordermin) & (volumes * prices >= min_usd), volumes, 0.0)
+
+    # Sells: never more than held; exits (target 0) sell everything
+    sell_raw = np.where(delta_usd < 0, np.minimum(-delta_usd / safe_prices, holdings), 0.0)
+    sell_raw = np.where((delta_usd < 0) & (targets == 0), holdings, sell_raw)
+    sells = tradeable(quantize_volumes(sell_raw, lots))
+    proceeds = float((sells * prices).sum()) * (1 - fee_rate)
+
+    # Buys: scale together to what cash, proceeds and the buffer allow
+    buy_usd = np.where(delta_usd > 0, delta_usd, 0.0)
+    budget = max(0.0, cash + proceeds - cash_buffer * equity)
+    needed = float(buy_usd.sum()) * (1 + fee_rate)
+    buy_scale = min(1.0, budget / needed) if needed > 0 else 1.0
+    buys = tradeable(quantize_volumes(buy_usd * buy_scale / safe_prices, lots))
+
+    volumes = buys - sells
+    return RebalancePlan(
+        pairs=tuple(pairs),
+        prices=prices,
+        current_weights=current,
+        target_weights=targets,
+        volumes=volumes,
+        notional=np.abs(volumes) * prices,
+        equity=equity,
+        buy_scale=buy_scale,
+    )
@@ -9,16 +9,60 @@ import requests
 from urllib.parse import urlparse
 from openai import OpenAI, APIError
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from bot.feed_cache import FeedCache
+from bot.headline_clusters import HeadlineClusterer, dedupe_headline_lists
+from bot.keyword_matcher import keyword_matcher
+from bot.url_dedup import UrlDedupStore
 from bot.logger import get_logger
 
 # Set up logging
 # logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = get_logger(__name__)
 
+# Per-feed limits: entries scanned, headlines kept
+RSS_ENTRIES_PER_FEED = 15
+RSS_HEADLINES_PER_FEED = 3
+# Concurrent feed downloads, wall-clock budget per download, and spacing between requests to one host
+RSS_MAX_WORKERS = int(os.getenv("RSS_MAX_WORKERS", "8"))
+RSS_FETCH_DEADLINE_SECONDS = float(os.getenv("RSS_FETCH_DEADLINE_SECONDS", "20"))
+RSS_HOST_INTERVAL_SECONDS = float(os.getenv("RSS_HOST_INTERVAL_SECONDS", "1"))
+RSS_CONNECT_TIMEOUT_SECONDS = 5
+# Use a standard browser User-Agent to avoid being blocked
+RSS_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
 class ResearchAgentError(Exception):
     """Custom exception for Research Agent errors."""
     pass
 
+class HostThrottle:
+    """
+    Per-host politeness for concurrent fetches: requests to the same host are spaced at least
+    `min_interval` seconds apart, requests to different hosts never wait on each other.
+    Slots are reserved under a lock, so concurrent callers for one host queue up in order.
+    """
+    def __init__(self, min_interval: float, clock=time.monotonic, sleep=time.sleep):
+        self.min_interval = min_interval
+        self._clock = clock
+        self._sleep = sleep
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, host: str) -> float:
+        """Claim the next slot for `host` and return the seconds to wait for it."""
+        with self._lock:
+            now = self._clock()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        return slot - now
+
+    def wait(self, host: str):
+        delay = self.reserve(host)
+        if delay > 0:
+            self._sleep(delay)
+
 class ResearchAgent:
     """
     AI Research Agent that gathers real-time market intelligence from multiple sources.
@@ -126,60 +170,53 @@ class ResearchAgent:
             'tesla', 'adoption', 'defi'
         ]
         
-        # Load cache for preventing duplicate processing
-        self.processed_urls = self._load_cache()
+        # Feed downloads share one pooled session, one per-host throttle and one conditional-GET cache across calls
+        self.feed_throttle = HostThrottle(RSS_HOST_INTERVAL_SECONDS)
+        self._feed_session: Optional[requests.Session] = None
+        self.feed_cache = FeedCache(os.path.join(logs_dir, "rss_feed_cache.json"))
         
-        # Clear old cache entries to ensure fresh data (keep only last 24 hours)
-        self._clean_old_cache_entries()
+        # Sliding-window store of already-processed article URLs (expired entries are evicted)
+        self.dedup_path = os.path.join(logs_dir, "research_urls.sqlite3")
+        self.processed_urls: Optional[UrlDedupStore] = None
+        self.processed_urls = self._load_cache()
     
-    def _load_cache(self) -> set:
-        """Load the cache of previously processed URLs."""
+    def _load_cache(self) -> UrlDedupStore:
+        """
+        Return the URL dedup store, opening it on first use (the agent owns this one connection
+        until close()), and import URLs from a legacy research_cache.json (as seen now) so an
+        upgrade does not reprocess them.
+        """
+        if self.processed_urls is None:
+            self.processed_urls = UrlDedupStore(self.dedup_path)
+        store = self.processed_urls
         try:
             if os.path.exists(self.cache_path):
                 with open(self.cache_path, 'r', encoding='utf-8') as f:
                     cache_data = json.load(f)
-                    return set(cache_data.get('processed_urls', []))
+                for url in cache_data.get('processed_urls', []):
+                    store.add(url)
+                os.remove(self.cache_path)
+                logger.info(f"Migrated {len(cache_data.get('processed_urls', []))} URLs from {self.cache_path} to {self.dedup_path}")
         except Exception as e:
-            logger.warning(f"Could not load research cache: {e}")
-        return set()
+            logger.warning(f"Could not import legacy research cache: {e}")
+        return store
     
+    def close(self):
+        """Close the URL dedup store and the pooled feed session."""
+        if self.processed_urls is not None:
+            self.processed_urls.close()
+            self.processed_urls = None
+        if self._feed_session is not None:
+            self._feed_session.close()
+            self._feed_session = None
+
     def _save_cache(self):
-        """Save the cache of processed URLs."""
+        """Evict expired URLs. Additions are written to the store as they happen."""
         try:
-            cache_data = {
-                'processed_urls': list(self.processed_urls),
-                'last_updated': datetime.utcnow().isoformat()
-            }
-            with open(self.cache_path, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, indent=2)
+            self.processed_urls.evict()
         except Exception as e:
             logger.warning(f"Could not save research cache: {e}")
     
-    def _clean_old_cache_entries(self):
-        """Remove cache entries older than 24 hours to ensure fresh data."""
-        try:
-            if os.path.exists(self.cache_path):
-                with open(self.cache_path, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                
-                last_updated_str = cache_data.get('last_updated')
-                if last_updated_str:
-                    last_updated = datetime.fromisoformat(last_updated_str.replace('Z', '+00:00').replace('+00:00', ''))
-                    hours_old = (datetime.utcnow() - last_updated).total_seconds() / 3600
-                    
-                    # Clear cache if older than 5 minutes to ensure fresh data for demo/testing
-                    if hours_old > 0.083:  # 5 minutes = 0.083 hours
-                        logger.info(f"Clearing cache ({hours_old:.1f} hours old) to ensure fresh data")
-                        self.processed_urls = set()
-                        # Delete the cache file to start fresh
-                        os.remove(self.cache_path)
-                    else:
-                        logger.debug(f"Cache is {hours_old:.1f} hours old, keeping entries")
-        except Exception as e:
-            logger.warning(f"Error cleaning cache: {e}")
-            # On error, clear cache to be safe
-            self.processed_urls = set()
-    
     def _is_recent_article(self, date_input: any, hours_threshold: int = 48) -> bool:
         """
         Check if an article was published recently.
@@ -236,15 +273,97 @@ class ResearchAgent:
             return True  # Default to including articles if date check fails
     
     def _contains_keywords(self, text: str, keywords: List[str]) -> bool:
-        """Check if text contains any of the specified keywords (case-insensitive)."""
-        text_lower = text.lower()
-        return any(keyword.lower() in text_lower for keyword in keywords)
+        """Check if text contains any of the specified keywords as whole words (case-insensitive)."""
+        return keyword_matcher(keywords).search(text)
     
+    def _get_feed_session(self) -> requests.Session:
+        if self._feed_session is None:
+            session = requests.Session()
+            session.headers.update(RSS_HEADERS)
+            adapter = requests.adapters.HTTPAdapter(pool_connections=RSS_MAX_WORKERS, pool_maxsize=RSS_MAX_WORKERS)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._feed_session = session
+        return self._feed_session
+
+    def _download_feed(self, feed_url: str, deadline_seconds: float = RSS_FETCH_DEADLINE_SECONDS,
+                       headers: Optional[Dict[str, str]] = None) -> tuple:
+        """
+        Download one feed within `deadline_seconds` of wall time and return
+        (status_code, response_headers, body). A read timeout alone only bounds the gap between
+        bytes, so the body is streamed and the deadline checked per chunk. `headers` carries the
+        conditional-GET validators; a 304 comes back with an empty body.
+        """
+        deadline = time.monotonic() + deadline_seconds
+        timeout = (RSS_CONNECT_TIMEOUT_SECONDS, max(deadline_seconds, 0.001))
+        with self._get_feed_session().get(feed_url, headers=headers, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            chunks = []
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                chunks.append(chunk)
+                if time.monotonic() > deadline:
+                    raise requests.exceptions.Timeout(f"{feed_url} exceeded the {deadline_seconds:.0f}s fetch deadline")
+        return response.status_code, response.headers, b"".join(chunks)
+
+    def _fetch_feed(self, feed_url: str, source_category: str):
+        """
+        Worker: answer one feed from the conditional-GET cache when it is unchanged, otherwise
+        wait for the host's slot, download and parse it.
+        """
+        source_name = urlparse(feed_url).netloc.replace('www.', '')
+        feed = self.feed_cache.fresh(feed_url)
+        if feed is not None:
+            logger.debug(f"{source_name}: served from feed cache (checked recently)")
+            return feed
+        self.feed_throttle.wait(urlparse(feed_url).netloc)
+        logger.info(f"Fetching {source_category} from {source_name}")
+        status, headers, body = self._download_feed(feed_url, headers=self.feed_cache.validators(feed_url))
+        if status == 304:
+            feed = self.feed_cache.not_modified(feed_url, headers)
+            if feed is not None:
+                logger.debug(f"{source_name}: 304 Not Modified")
+                return feed
+            # 304 without a cached copy (validators lost); fetch unconditionally
+            status, headers, body = self._download_feed(feed_url)
+        feed = self.feed_cache.unchanged(feed_url, body, headers)
+        if feed is not None:
+            logger.debug(f"{source_name}: body unchanged, parse skipped")
+            return feed
+        # Use feedparser for robust RSS/Atom parsing
+        feed = feedparser.parse(body)
+        self.feed_cache.store(feed_url, body, headers, feed, RSS_ENTRIES_PER_FEED)
+        return feed
+
+    def _iter_feeds(self, feed_urls: List[str], source_category: str):
+        """
+        Download and parse `feed_urls` on a bounded thread pool and yield
+        (feed_url, source_name, parsed_feed) as each feed completes. Failed feeds are logged
+        and skipped.
+        """
+        if not feed_urls:
+            return
+        with ThreadPoolExecutor(max_workers=min(RSS_MAX_WORKERS, len(feed_urls))) as pool:
+            futures = {pool.submit(self._fetch_feed, url, source_category): url for url in feed_urls}
+            for future in as_completed(futures):
+                feed_url = futures[future]
+                try:
+                    feed = future.result()
+                except requests.exceptions.RequestException as e:
+                    logger.error(f"Error fetching RSS from {feed_url}: {e}")
+                    continue
+                except Exception as e:
+                    logger.error(f"General error processing feed {feed_url}: {e}")
+                    continue
+                yield feed_url, urlparse(feed_url).netloc.replace('www.', ''), feed
+
     def _fetch_from_rss(self, feed_urls: List[str], keywords: List[str], 
                        source_category: str, bypass_cache: bool = False) -> List[str]:
         """
         Fetch and filter articles from RSS feeds using feedparser for robust parsing.
-        
+        Feeds are fetched concurrently (see _iter_feeds). Near-duplicate headlines from different
+        sources are collapsed into one story (see HeadlineClusterer) and do not use up a feed's
+        headline slots; stories carried by the most sources come first.
+
         Args:
             feed_urls: List of RSS feed URLs
             keywords: Keywords to filter content
@@ -254,28 +373,14 @@ class ResearchAgent:
         Returns:
             List of formatted headline strings
         """
-        headlines = []
+        clusterer = HeadlineClusterer()
         successful_feeds = 0
-        
-        # Use a standard browser User-Agent to avoid being blocked
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        for feed_url in feed_urls:
+        matcher = keyword_matcher(keywords) if keywords else None
+
+        # Feeds are downloaded concurrently and handed back here as each one completes, so the
+        # URL cache and the per-feed limits are only ever touched from this thread
+        for feed_url, source_name, feed in self._iter_feeds(feed_urls, source_category):
             try:
-                source_name = urlparse(feed_url).netloc.replace('www.', '')
-                logger.info(f"Fetching {source_category} from {source_name}")
-                
-                # Use a session object for potential connection pooling
-                with requests.Session() as s:
-                    s.headers.update(headers)
-                    response = s.get(feed_url, timeout=20)
-                    response.raise_for_status()
-                
-                # Use feedparser for robust RSS/Atom parsing
-                feed = feedparser.parse(response.content)
-                
                 # Check if feed was parsed successfully
                 if hasattr(feed, 'bozo') and feed.bozo:
                     logger.warning(f"Feed parsing issues for {source_name}: {getattr(feed, 'bozo_exception', 'Unknown error')}")
@@ -287,10 +392,10 @@ class ResearchAgent:
                 
                 feed_headlines = 0
                 processed_in_feed = 0
-                skipped_reasons = {'old': 0, 'no_keywords': 0, 'duplicate': 0, 'no_title': 0}
+                skipped_reasons = {'old': 0, 'no_keywords': 0, 'duplicate': 0, 'near_duplicate': 0, 'no_title': 0}
                 
-                # Process entries (limit to 15 most recent per feed)
-                for entry in feed.entries[:15]:
+                # Process entries (limit to the most recent per feed)
+                for entry in feed.entries[:RSS_ENTRIES_PER_FEED]:
                     processed_in_feed += 1
                     
                     try:
@@ -318,24 +423,33 @@ class ResearchAgent:
                             continue
                         
                         # Filter by keywords
-                        if keywords and not self._contains_keywords(title, keywords):
+                        if matcher and not matcher.search(title):
                             skipped_reasons['no_keywords'] += 1
                             logger.debug(f"Skipped (no keywords): '{title[:50]}...'")
                             continue
                         
+                        # Claim the URL atomically: a concurrent fetch may have taken it since the check above
+                        if link and not self.processed_urls.add(link) and not bypass_cache:
+                            skipped_reasons['duplicate'] += 1
+                            logger.debug(f"Skipped (duplicate): '{title[:50]}...'")
+                            continue
+                        
                         # Format headline
                         formatted_headline = f"- [{source_name.title()}] {title}"
                         if link:
                             formatted_headline += f" ([Link]({link}))"
                         
-                        headlines.append(formatted_headline)
-                        if link:
-                            self.processed_urls.add(link)
+                        # Another outlet's copy of a story already collected only adds its source
+                        if not clusterer.add(formatted_headline)[1]:
+                            skipped_reasons['near_duplicate'] += 1
+                            logger.debug(f"Collapsed (near-duplicate): '{title[:50]}...'")
+                            continue
+                        
                         feed_headlines += 1
                         
                         logger.debug(f"✅ Added: '{title[:60]}...'")
                         
-                        if feed_headlines >= 3:  # Limit headlines per feed
+                        if feed_headlines >= RSS_HEADLINES_PER_FEED:
                             break
                             
                     except Exception as e:
@@ -349,18 +463,18 @@ class ResearchAgent:
                 else:
                     logger.warning(f"❌ {source_name}: 0 headlines (skipped: {skipped_reasons})")
                 
-                # Rate limiting - be respectful
-                time.sleep(1)
-                
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Error fetching RSS from {feed_url}: {e}")
-                continue
             except Exception as e:
                 logger.error(f"General error processing feed {feed_url}: {e}")
                 continue
         
         logger.info(f"Successfully fetched from {successful_feeds}/{len(feed_urls)} feeds")
-        logger.info(f"Collected {len(headlines)} {source_category} headlines")
+        self.feed_cache.save()
+        cache_stats = self.feed_cache.stats()
+        logger.info(f"Feed cache: hit ratio {cache_stats['hit_ratio']:.0%} over {cache_stats['lookups']} lookups, "
+                    f"{cache_stats['bytes_saved'] / 1024:.0f} KiB saved")
+        headlines = [cluster.format() for cluster in clusterer.ranked()]
+        logger.info(f"Collected {len(headlines)} {source_category} headlines"
+                    f" ({clusterer.collapsed} near-duplicates collapsed)")
         
         # Log results for transparency
         if headlines:
@@ -733,6 +847,16 @@ Deliver as professional, flowing analysis text suitable for institutional mornin
         """Prefetch macro/regulatory headlines only (no file writes). Safe to run in parallel."""
         return self._fetch_from_rss(self.macro_rss_feeds, keywords or self.macro_keywords, "macro/regulatory news", bypass_cache=bypass_cache)
 
+    def feed_cache_stats(self) -> Dict[str, Any]:
+        """Per-feed and total conditional-GET cache hit ratios and bytes saved (see FeedCache.stats)."""
+        return self.feed_cache.stats()
+
     def synthesize_market_context(self, coingecko_data: Dict[str, Any], crypto_headlines: List[str], macro_headlines: List[str]) -> str:
-        """Synthesize AI market context from pre-fetched headlines and CoinGecko result."""
+        """
+        Synthesize AI market context from pre-fetched headlines and CoinGecko result.
+        Macro headlines that repeat a crypto story are folded into it, so each story reaches the
+        model once.
+        """
+        if crypto_headlines is not None and macro_headlines is not None:
+            crypto_headlines, macro_headlines = dedupe_headline_lists(crypto_headlines, macro_headlines)
         return self._fetch_market_summary(coingecko_data, crypto_headlines, macro_headlines)
\ No newline at end of file
@@ -0,0 +1,212 @@
+import itertools
+import threading
+from dataclasses import dataclass
+from typing import Callable
+from bot.kraken_ws import OrderStateTable
+
+# Kraken's base spot fee tier
+DEFAULT_MAKER_FEE = 0.0016
+DEFAULT_TAKER_FEE = 0.0026
+
+POST_ONLY_REJECT = 'Post only order'
+
+
+@dataclass
+class SimOrder:
+    txid: str
+    pair: str
+    side: str  # 'buy' or 'sell'
+    ordertype: str  # 'market' or 'limit'
+    volume: float
+    price: float | None = None
+    post_only: bool = False
+    status: str = 'open'
+    filled: float = 0.0
+    cost: float = 0.0
+    fee: float = 0.0
+    reason: str | None = None
+
+    @property
+    def remaining(self) -> float:
+        left = self.volume - self.filled
+        # Float residue from summing partial fills is not an open quantity
+        return left if left > self.volume * 1e-12 else 0.0
+
+    def to_query(self) -> dict:
+        """The order as a QueryOrders entry (numbers as strings, as Kraken sends them)."""
+        return {
+            'status': self.status,
+            'reason': self.reason,
+            'vol': f"{self.volume:.8f}",
+            'vol_exec': f"{self.filled:.8f}",
+            'cost': f"{self.cost:.8f}",
+            'fee': f"{self.fee:.8f}",
+            'price': f"{self.cost / self.filled if self.filled else 0.0:.8f}",
+            'oflags': 'post' if self.post_only else '',
+            'descr': {'pair': self.pair, 'type': self.side, 'ordertype': self.ordertype, 'price': f"{self.price or 0.0:.8f}"},
+        }
+
+
+class SimMatchingEngine:
+    """
+    In-process matching of our own orders against an externally driven L2 book per pair.
+
+    The book is market state set with set_book(); our resting orders are not inserted into it.
+    Market orders and the marketable part of limit orders take liquidity level by level (taker
+    fee). Resting limit orders fill at their limit price, as maker, when a later book crosses
+    them, up to the quantity shown at or through the limit. Post-only orders that would cross
+    on arrival are canceled, as Kraken does. Every status change is pushed into an
+    OrderStateTable, so code written against the executions stream can run unchanged.
+    """
+    def __init__(self, maker_fee: float = DEFAULT_MAKER_FEE, taker_fee: float = DEFAULT_TAKER_FEE,
+                 order_states: OrderStateTable | None = None,
+                 fill_listener: Callable[[SimOrder, float, float, float], None] | None = None):
+        """
+        Args:
+            maker_fee, taker_fee: Fee rates charged on each fill's notional.
+            order_states: Table receiving every status change; created if omitted.
+            fill_listener: Called as (order, price, qty, fee) on every fill, e.g. to settle balances.
+        """
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.order_states = order_states or OrderStateTable()
+        self.fill_listener = fill_listener
+        self._books: dict[str, dict[str, dict[float, float]]] = {}
+        self._orders: dict[str, SimOrder] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    # --- Market state ---
+    def set_book(self, pair: str, bids: list, asks: list):
+        """Replace the pair's book with [(price, qty), ...] per side, then fill crossed resting orders."""
+        with self._lock:
+            self._books[pair] = {
+                'bids': {float(p): float(q) for p, q in bids if float(q) > 0},
+                'asks': {float(p): float(q) for p, q in asks if float(q) > 0},
+            }
+            for order in [o for o in self._orders.values() if o.pair == pair and o.status == 'open']:
+                self._match_resting(order)
+
+    def book(self, pair: str) -> dict | None:
+        """Sorted copy of both sides, in PriceBoard.book() format."""
+        with self._lock:
+            book = self._books.get(pair)
+            if book is None:
+                return None
+            return {'bids': sorted(book['bids'].items(), reverse=True), 'asks': sorted(book['asks'].items())}
+
+    def best_bid(self, pair: str) -> float:
+        with self._lock:
+            bids = self._books.get(pair, {}).get('bids')
+            return max(bids) if bids else 0.0
+
+    def best_ask(self, pair: str) -> float:
+        with self._lock:
+            asks = self._books.get(pair, {}).get('asks')
+            return min(asks) if asks else 0.0
+
+    # --- Orders ---
+    def add_order(self, pair: str, side: str, volume: float, ordertype: str = 'market', price: float | None = None,
+                  post_only: bool = False) -> str:
+        """Accept an order and match what crosses now; returns its txid."""
+        with self._lock:
+            order = SimOrder(f"SIM-{next(self._ids):06d}", pair, side, ordertype, float(volume),
+                             float(price) if price is not None else None, post_only)
+            self._orders[order.txid] = order
+            if ordertype == 'market':
+                self._take(order, limit=None)
+                # Market orders never rest; whatever the book could not fill is dropped
+                self._finish(order, 'closed' if order.remaining <= 0 else 'canceled',
+                             None if order.remaining <= 0 else 'Insufficient liquidity')
+            elif self._crosses(order):
+                if post_only:
+                    self._finish(order, 'canceled', POST_ONLY_REJECT)
+                else:
+                    self._take(order, limit=order.price)
+                    if order.remaining <= 0:
+                        self._finish(order, 'closed')
+                    else:
+                        self._publish(order)
+            else:
+                self._publish(order)
+            return order.txid
+
+    def cancel(self, txid: str) -> bool:
+        """Cancel an open order; False if it is unknown or already finished."""
+        with self._lock:
+            order = self._orders.get(txid)
+            if order is None or order.status != 'open':
+                return False
+            self._finish(order, 'canceled', 'User requested')
+            return True
+
+    def order(self, txid: str) -> SimOrder | None:
+        with self._lock:
+            return self._orders.get(txid)
+
+    def query(self, txids: list[str]) -> dict:
+        """QueryOrders-shaped {txid: {...}} for the known txids."""
+        with self._lock:
+            return {tx: self._orders[tx].to_query() for tx in txids if tx in self._orders}
+
+    def open_orders(self) -> dict:
+        with self._lock:
+            return {tx: o.to_query() for tx, o in self._orders.items() if o.status == 'open'}
+
+    # --- Matching ---
+    def _crosses(self, order: SimOrder) -> bool:
+        if order.side == 'buy':
+            ask = self.best_ask(order.pair)
+            return ask > 0 and order.price >= ask
+        bid = self.best_bid(order.pair)
+        return bid > 0 and order.price <= bid
+
+    def _levels(self, order: SimOrder, limit: float | None) -> list[float]:
+        """Opposite-side prices the order may trade at, best first."""
+        book = self._books.get(order.pair, {'bids': {}, 'asks': {}})
+        if order.side == 'buy':
+            return [p for p in sorted(book['asks']) if limit is None or p <= limit]
+        return [p for p in sorted(book['bids'], reverse=True) if limit is None or p >= limit]
+
+    def _take(self, order: SimOrder, limit: float | None):
+        side = self._books.get(order.pair, {}).get('asks' if order.side == 'buy' else 'bids', {})
+        for price in self._levels(order, limit):
+            if order.remaining <= 0:
+                break
+            qty = min(order.remaining, side[price])
+            side[price] -= qty
+            if side[price] <= 0:
+                del side[price]
+            self._fill(order, price, qty, self.taker_fee)
+
+    def _match_resting(self, order: SimOrder):
+        side = self._books[order.pair]['asks' if order.side == 'buy' else 'bids']
+        for price in self._levels(order, order.price):
+            if order.remaining <= 0:
+                break
+            qty = min(order.remaining, side[price])
+            side[price] -= qty
+            if side[price] <= 0:
+                del side[price]
+            # The market traded through our level; a resting order fills at its own price
+            self._fill(order, order.price, qty, self.maker_fee)
+        if order.remaining <= 0:
+            self._finish(order, 'closed')
+        elif order.filled > 0:
+            self._publish(order)
+
+    def _fill(self, order: SimOrder, price: float, qty: float, fee_rate: float):
+        fee = price * qty * fee_rate
+        order.filled += qty
+        order.cost += price * qty
+        order.fee += fee
+        if self.fill_listener is not None:
+            self.fill_listener(order, price, qty, fee)
+
+    def _finish(self, order: SimOrder, status: str, reason: str | None = None):
+        order.status = status
+        order.reason = reason
+        self._publish(order)
+
+    def _publish(self, order: SimOrder):
+        self.order_states.update(order.txid, order.status, order.filled)
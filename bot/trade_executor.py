@@ -1,25 +1,146 @@
+import asyncio
 import logging
-from bot.kraken_api import KrakenAPI, KrakenAPIError
+import os
+import time
+from bot.async_kraken_api import AsyncKrakenAPI
+from bot.cash_ledger import CashLedger
+from bot.execution_algos import (
+    DEFAULT_CHASE_DEADLINE_SECONDS,
+    DEFAULT_DURATION_SECONDS,
+    EXECUTION_MODES,
+    ParentOrder,
+    ParentResult,
+    PostOnlyChaser,
+    SlicedOrderScheduler,
+)
+from bot.kraken_api import MAX_BATCH_ORDERS, TERMINAL_STATUSES, KrakenAPI, KrakenAPIError
+from bot.pair_specs import COMMON_TO_KRAKEN_SYMBOLS, PairSpec, alias_key
+from bot.plan_sizing import PlanSizing, size_trades
+from bot.quantize import quantize_volume, spec_lot_decimals
+from bot.rebalance import DEFAULT_FEE_RATE, plan_rebalance
 from bot.logger import get_logger
 
 # Set up logging
 # logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = get_logger(__name__)
 
+# Orders at least this large (USD) are worked by the execution algorithm when one is enabled
+DEFAULT_ALGO_MIN_ORDER_USD = 1000.0
+
 class TradeExecutor:
     """
     Handles the execution of trades based on a plan from the DecisionEngine.
     It uses a safer two-phase (validate, then execute) approach.
     Now supports percentage-based allocation for dynamic portfolio management.
     """
-    def __init__(self, kraken_api: KrakenAPI):
+    def __init__(self, kraken_api: KrakenAPI, execution_algo: str | None = None, algo_min_order_usd: float | None = None):
         """
         Initializes the TradeExecutor.
 
         Args:
             kraken_api: An instance of the KrakenAPI client.
+            execution_algo: 'market' (default), 'twap', 'participation' or 'passive' (env TRADE_EXECUTION_ALGO).
+                            With an algorithm, large orders are sliced into timed limit children, or
+                            in 'passive' mode chased with post-only limits to pay maker fees.
+            algo_min_order_usd: Smallest order the algorithm works (env ALGO_MIN_ORDER_USD);
+                                smaller orders still go out as market orders.
         """
         self.kraken_api = kraken_api
+        self.execution_algo = (execution_algo or os.getenv("TRADE_EXECUTION_ALGO", "market")).lower()
+        if self.execution_algo != 'market' and self.execution_algo not in EXECUTION_MODES:
+            logger.warning(f"Unknown execution algorithm '{self.execution_algo}'; using market orders")
+            self.execution_algo = 'market'
+        self.algo_min_order_usd = float(
+            algo_min_order_usd if algo_min_order_usd is not None
+            else os.getenv("ALGO_MIN_ORDER_USD", DEFAULT_ALGO_MIN_ORDER_USD)
+        )
+        # Taker fee deducted from expected sell proceeds before they fund buys
+        self.fee_rate = DEFAULT_FEE_RATE
+        # Plan-level quote table: {pair: {'price': float, 'ts': epoch seconds}}, filled once per execution
+        self._quotes: dict[str, dict] = {}
+
+    def _price_plan(self, trades: list) -> dict:
+        """
+        Price every pair referenced by the plan through KrakenAPI.get_plan_prices (one Ticker
+        request, per-pair fallback) and cache the quotes for the rest of the execution.
+
+        Returns:
+            The quote table {pair: {'price': float, 'ts': float}}
+        """
+        self._quotes = {}
+        pairs = []
+        for trade in trades:
+            try:
+                pair = self._normalize_pair(trade['pair'])
+            except Exception:
+                continue
+            if pair and pair not in pairs:
+                pairs.append(pair)
+        if not pairs:
+            return self._quotes
+
+        self._store_quotes(self.kraken_api.get_plan_prices(pairs))
+        # Record misses so later checks don't re-request unpriceable pairs
+        now = time.time()
+        for pair in pairs:
+            self._quotes.setdefault(pair, {'price': 0.0, 'ts': now})
+        return self._quotes
+
+    def _store_quotes(self, prices: dict):
+        """Merge a get_ticker_prices() response into the plan quote table."""
+        now = time.time()
+        for pair, info in (prices or {}).items():
+            price = float(info.get('price') or 0.0)
+            if price > 0:
+                self._quotes[pair] = {'price': price, 'ts': now}
+
+    def _refresh_stale_quotes(self, trades: list):
+        """
+        Re-quote the pairs of trades whose plan quote is older than the price feed's max_age,
+        so BUYs released late in the pipeline are sized and cash-checked at current prices.
+        Pairs that cannot be re-quoted are marked unpriced, which rejects their orders.
+        """
+        max_age = self.kraken_api.market_data_max_age
+        now = time.time()
+        stale = []
+        for trade in trades:
+            try:
+                pair = self._normalize_pair(trade['pair'])
+            except Exception:
+                continue
+            quote = self._quotes.get(pair)
+            if pair and pair not in stale and quote is not None and now - quote['ts'] > max_age:
+                stale.append(pair)
+        if not stale:
+            return
+
+        logger.info(f"Re-quoting {len(stale)} pair(s) with plan prices older than {max_age:.0f}s: {stale}")
+        for pair in stale:
+            del self._quotes[pair]
+        try:
+            self._store_quotes(self.kraken_api.get_plan_prices(stale))
+        except Exception as e:
+            logger.warning(f"Could not re-quote {stale}: {e}")
+        now = time.time()
+        for pair in stale:
+            if pair not in self._quotes:
+                logger.warning(f"Rejecting stale quote for {pair}; no current price available")
+                self._quotes[pair] = {'price': 0.0, 'ts': now}
+
+    def _get_price(self, pair: str) -> float:
+        """
+        Return the plan quote for a pair, fetching (and caching) it on a miss.
+        Returns 0.0 when no price can be obtained.
+        """
+        quote = self._quotes.get(pair)
+        if quote is None:
+            try:
+                self._store_quotes(self.kraken_api.get_ticker_prices([pair]))
+            except Exception:
+                pass
+            # Remember misses too so one unpriceable pair doesn't cost a request per check
+            quote = self._quotes.setdefault(pair, {'price': 0.0, 'ts': time.time()})
+        return quote['price']
 
     def _consolidate_trades(self, trades: list, portfolio_value: float) -> tuple[list, list]:
         """
@@ -32,35 +153,25 @@ class TradeExecutor:
         net_by_pair: dict[str, dict] = {}
         price_by_pair: dict[str, float] = {}
 
-        for trade in trades:
-            try:
-                # Determine normalized pair and volume
-                if 'allocation_percentage' in trade:
-                    converted = self._convert_percentage_to_volume(trade, portfolio_value)
-                    pair = self._normalize_pair(converted['pair'])
-                    volume = float(converted['volume'])
-                    est_price = float(converted.get('estimated_price') or 0.0)
-                else:
-                    pair = self._normalize_pair(trade['pair'])
-                    volume = float(trade['volume'])
-                    volume = self._round_volume_for_pair(pair, volume)
-                    # Try to fetch a price for approximate USD computations later
-                    try:
-                        px = self.kraken_api.get_ticker_prices([pair]).get(pair, {}).get('price', 0.0)
-                        est_price = float(px or 0.0)
-                    except Exception:
-                        est_price = 0.0
-
-                action = str(trade.get('action', '')).lower()
-                signed = volume if action == 'buy' else (-volume if action == 'sell' else 0.0)
-                if pair not in net_by_pair:
-                    net_by_pair[pair] = {'net_volume': 0.0}
-                net_by_pair[pair]['net_volume'] += signed
-                if est_price and est_price > 0:
-                    price_by_pair[pair] = est_price
-            except Exception:
-                # Skip malformed trade entries; downstream validation will handle plan integrity
+        # Skip malformed trade entries; downstream validation will handle plan integrity
+        sizable = [trade for trade in trades if self._is_sizable(trade)]
+        sizing = self._size_plan(sizable, portfolio_value)
+        for i, trade in enumerate(sizable):
+            row = sizing.row(i)
+            pair = row['pair']
+            if 'allocation_percentage' in trade and not row['priced']:
+                logger.error(f"Cannot get price for pair: {pair} (original pair: {trade['pair']}); dropping trade")
                 continue
+            logger.info(f"Sized {trade.get('action', '')} {trade['pair']} -> {row['volume']:.8f} {pair} (${row['notional']:.2f})")
+
+            action = str(trade.get('action', '')).lower()
+            volume = row['volume']
+            signed = volume if action == 'buy' else (-volume if action == 'sell' else 0.0)
+            if pair not in net_by_pair:
+                net_by_pair[pair] = {'net_volume': 0.0}
+            net_by_pair[pair]['net_volume'] += signed
+            if row['priced']:
+                price_by_pair[pair] = row['price']
 
         # Build consolidated lists
         sells: list = []
@@ -76,29 +187,51 @@ class TradeExecutor:
 
         return sells, buys
 
+    @staticmethod
+    def _is_sizable(trade: dict) -> bool:
+        """True if a plan entry has a pair and a usable allocation or volume."""
+        try:
+            if not trade.get('pair'):
+                return False
+            if 'allocation_percentage' in trade:
+                return float(trade['allocation_percentage']) > 0
+            float(trade['volume'])
+            return True
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return False
+
+    def _size_plan(self, trades: list, portfolio_value: float, available_cash: float = 0.0) -> PlanSizing:
+        """
+        Size allocation- and volume-based trades in one vectorized pass using the plan quote
+        table and pre-parsed pair rules.
+        """
+        pairs = [self._normalize_pair(trade['pair']) for trade in trades]
+        return size_trades(
+            pairs,
+            [trade.get('action', '') for trade in trades],
+            [self._pair_spec(pair) for pair in pairs],
+            [self._get_price(pair) for pair in pairs],
+            portfolio_value,
+            allocations=[trade.get('allocation_percentage') for trade in trades],
+            volumes=[trade.get('volume') for trade in trades],
+            available_cash=available_cash,
+        )
+
     def _round_volume_for_pair(self, pair: str, volume: float) -> float:
         """
         Round the volume to meet Kraken's precision rules for the given pair.
-        Uses lot_decimals when available and rounds down to avoid exceeding limits.
+        Truncates to lot_decimals (8 when unknown) so the result never exceeds the input.
         """
-        try:
-            details = self.kraken_api.get_pair_details(pair) or {}
-            # Kraken typically provides 'lot_decimals' for volume precision
-            lot_decimals = int(details.get('lot_decimals', 8))
-            if lot_decimals < 0 or lot_decimals > 10:
-                lot_decimals = 8
-            # Round down by formatting, avoiding floating issues
-            fmt = f"{{:.{lot_decimals}f}}"
-            rounded = float(fmt.format(volume))
-            # Ensure non-negative
-            return max(0.0, rounded)
-        except Exception:
-            return float(f"{volume:.8f}")
+        return float(quantize_volume(volume, spec_lot_decimals(self._pair_spec(pair))))
+
+    def _pair_spec(self, pair: str) -> PairSpec | None:
+        """Pre-parsed trading rules for a pair, or None if unknown."""
+        return self.kraken_api.get_pair_spec(pair)
 
     def _normalize_pair(self, pair: str) -> str:
         """
         Cleans and standardizes a trading pair string.
-        Example: "BTC/USD" -> "XBTUSD", "ETHUSD" -> "XETHZUSD"
+        Example: "BTC/USD" -> "XXBTZUSD", "ETHUSD" -> "XETHZUSD"
 
         Args:
             pair: The trading pair string from the AI's plan.
@@ -106,28 +239,17 @@ class TradeExecutor:
         Returns:
             A standardized pair string compatible with the Kraken API.
         """
-        # Clean the input
-        clean_pair = pair.upper().replace('/', '').replace('-', '')
-        
-        # Handle specific asset mappings
-        clean_pair = clean_pair.replace('BTC', 'XBT')
-        
-        # For pairs ending in USD, try to find the exact Kraken pair name
-        if clean_pair.endswith('USD'):
-            base_asset = clean_pair[:-3]  # Remove 'USD'
-            
-            # Check if we have a direct mapping in our asset_to_usd_pair_map
-            if hasattr(self.kraken_api, 'asset_to_usd_pair_map'):
-                if base_asset in self.kraken_api.asset_to_usd_pair_map:
-                    return self.kraken_api.asset_to_usd_pair_map[base_asset]
-                
-                # Also try with common Kraken prefixes
-                for prefix in ['X', 'Z', '']:
-                    prefixed_asset = prefix + base_asset if prefix else base_asset
-                    if prefixed_asset in self.kraken_api.asset_to_usd_pair_map:
-                        return self.kraken_api.asset_to_usd_pair_map[prefixed_asset]
-        
-        # Fallback to the original logic if no mapping found
+        # One lookup in the shared alias index (pairs, altnames, wsnames, BTC/DOGE symbols)
+        resolved = self.kraken_api.normalize_pair(pair)
+        if resolved:
+            return resolved
+
+        # Unknown to the index: return a cleaned Kraken-style spelling and let the API decide
+        clean_pair = alias_key(pair)
+        for common, kraken in COMMON_TO_KRAKEN_SYMBOLS.items():
+            if clean_pair.startswith(common):
+                clean_pair = kraken + clean_pair[len(common):]
+                break
         return clean_pair
     
     def _calculate_portfolio_value(self) -> float:
@@ -169,16 +291,14 @@ class TradeExecutor:
                 return True, "Buy orders don't require balance validation", trade
             
             # Extract base asset from pair using official pair details
-            pair_details = self.kraken_api.get_pair_details(pair)
-            if not pair_details:
+            spec = self._pair_spec(pair)
+            if not spec:
                 return False, f"Could not get pair details for {pair} to validate holdings", trade
             
-            base_asset = pair_details.get('base')
-            if not base_asset:
+            # Cleaned the same way as balance keys (Kraken's X/Z prefixes removed)
+            clean_base_asset = spec.clean_base
+            if not clean_base_asset:
                 return False, f"Could not determine base asset for {pair}", trade
-
-            # Clean asset name (remove Kraken's X/Z prefixes)
-            clean_base_asset = base_asset[1:] if base_asset.startswith(('X', 'Z')) and len(base_asset) > 1 else base_asset
             
             # Get current portfolio
             portfolio_data = self.kraken_api.get_comprehensive_portfolio_context()
@@ -264,33 +384,29 @@ class TradeExecutor:
             # Calculate USD amount to allocate
             usd_amount = portfolio_value * allocation_percentage
             
-            # Get current price for the pair
-            normalized_pair = self._normalize_pair(trade['pair'])
+            # Same sizing path as whole-plan consolidation
+            sized = self._size_plan([trade], portfolio_value).row(0)
+            normalized_pair = sized['pair']
             logger.info(f"Converting pair '{trade['pair']}' -> '{normalized_pair}'")
             
-            prices = self.kraken_api.get_ticker_prices([normalized_pair])
+            current_price = sized['price']
             
-            if normalized_pair not in prices:
+            if current_price <= 0:
                 # Try to find alternative pair names
-                available_pairs = list(self.kraken_api.asset_pairs.keys())
-                similar_pairs = [p for p in available_pairs if trade['pair'].replace('/', '').upper() in p]
+                similar_pairs = self.kraken_api.suggest_pairs(trade['pair'])
                 logger.error(f"Cannot get price for pair: {normalized_pair}")
                 logger.error(f"Original pair: {trade['pair']}")
                 logger.error(f"Similar available pairs: {similar_pairs[:5]}")
                 raise ValueError(f"Cannot get price for pair: {normalized_pair}")
             
-            current_price = prices[normalized_pair]['price']
-            
-            # Calculate volume (asset amount to buy/sell)
-            volume = usd_amount / current_price if current_price > 0 else 0.0
-            
-            # Round volume to meet Kraken precision constraints
-            volume = self._round_volume_for_pair(normalized_pair, volume)
+            # Volume (asset amount to buy/sell), rounded to Kraken precision by the sizing engine
+            volume = sized['volume']
 
             # Create new trade dict with volume
             new_trade = trade.copy()
             new_trade['volume'] = volume
             new_trade['calculated_usd_amount'] = usd_amount
+            new_trade['estimated_price'] = current_price
             
             logger.info(f"Converted {allocation_percentage*100:.1f}% allocation to {volume:.8f} {normalized_pair.replace('USD', '').replace('ZUSD', '')} (${usd_amount:.2f})")
             
@@ -309,64 +425,230 @@ class TradeExecutor:
             trade_plan: A dictionary from the DecisionEngine, containing a list of trades.
                         New format: {'trades': [{'pair': 'ETHUSD', 'action': 'buy', 'allocation_percentage': 0.25, 'confidence_score': 0.8}, ...]}
                         Legacy format: {'trades': [{'pair': 'XBT/USD', 'action': 'buy', 'volume': 0.01}, ...]}
+                        Optional 'target_weights': {'XBTUSD': 0.4, 'ETHUSD': 0.2} adds the minimal orders
+                        that bring those pairs within tolerance of their target share of equity.
 
         Returns:
             A list of dictionaries, each detailing the outcome of a trade.
         """
         results = []
-        all_trades = trade_plan.get('trades', [])
+        all_trades = list(trade_plan.get('trades', []))
+        target_weights = trade_plan.get('target_weights') or {}
 
-        if not all_trades:
+        if not all_trades and not target_weights:
             logger.info("Trade plan is empty. No trades to execute.")
             return results
+        # Price the whole plan once; sizing and guards below read from this quote table
+        self._price_plan(all_trades + [{'pair': pair} for pair in target_weights])
+        if target_weights:
+            all_trades.extend(self._rebalance_to_targets(target_weights))
+            if not all_trades:
+                logger.info("Portfolio already within tolerance of target weights. No trades to execute.")
+                return results
+
         # Consolidate opposing actions for the same pair to minimize fee churn
         portfolio_value = self._calculate_portfolio_value()
         sell_trades, buy_trades = self._consolidate_trades(all_trades, portfolio_value)
 
+        # Cash on hand before any sell; buys up to this amount never wait on sells
+        try:
+            cash_ledger = CashLedger.from_portfolio(self.kraken_api.get_comprehensive_portfolio_context())
+        except Exception:
+            cash_ledger = CashLedger(0.0)
+
         # --- Phase 1: Execute Sell Orders First ---
-        sell_txids: list[str] = []
+        sell_proceeds: dict[str, float] = {}
         if sell_trades:
             logger.info(f"🔥 Phase 1: Executing {len(sell_trades)} SELL order(s) to free up capital...")
+            # Order events are pushed once the stream is live; until then sell waits poll QueryOrders
+            self.kraken_api.start_executions_feed()
             sell_results = self._process_trades(sell_trades, 'sell')
             results.extend(sell_results)
-            # Collect txids for successful sells
+            # Expected USD proceeds net of fees per successful sell, credited to buys as each one closes
             for r in sell_results:
                 if r.get('status') == 'success' and r.get('txid'):
-                    sell_txids.append(r['txid'])
-            if sell_txids:
-                logger.info(f"Waiting for {len(sell_txids)} sell order(s) to close before buying...")
-                final_status = self.kraken_api.wait_for_orders_closed(sell_txids, timeout_seconds=60, poll_interval=2.0)
-                logger.info(f"Sell order final statuses: {final_status}")
-            else:
+                    sold = r['trade']
+                    sell_proceeds[r['txid']] = float(sold['volume']) * self._get_price(sold['pair']) * (1 - self.fee_rate)
+            if not sell_proceeds:
                 logger.info("No successful sell txids to wait on.")
         else:
             logger.info("Phase 1: No SELL orders to execute.")
-
-        # Refresh balances after sells regardless of status to reflect any partial/closed orders
-        try:
-            portfolio_after_sells = self.kraken_api.get_comprehensive_portfolio_context()
-            logger.info(f"Post-sell balances: Cash ${portfolio_after_sells.get('cash_balance', 0):,.2f}")
-        except Exception:
-            logger.warning("Failed to refresh portfolio after sells; proceeding with buy validation using live queries")
         
         # --- Phase 2: Execute Buy Orders ---
         if buy_trades:
             logger.info(f"💰 Phase 2: Executing {len(buy_trades)} BUY order(s) with available capital...")
-            buy_results = self._process_trades(buy_trades, 'buy')
-            results.extend(buy_results)
+            results.extend(self._pipeline_buys(buy_trades, sell_proceeds, cash_ledger, portfolio_value))
         else:
+            if sell_proceeds:
+                final_status = self.kraken_api.wait_for_orders_closed(list(sell_proceeds), timeout_seconds=60, poll_interval=2.0)
+                logger.info(f"Sell order final statuses: {final_status}")
             logger.info("Phase 2: No BUY orders to execute.")
             
         logger.info("✅ Trade execution cycle complete.")
+        self._log_transport_stats()
         return results
 
-    def _process_trades(self, trades_to_process: list, trade_type: str) -> list:
+    def _estimate_trade_usd(self, trade: dict, portfolio_value: float) -> float:
+        """Plan-time USD size of a trade, from its allocation or its volume at the plan quote."""
+        try:
+            if 'allocation_percentage' in trade:
+                return float(trade['allocation_percentage']) * portfolio_value
+            return float(trade['volume']) * self._get_price(self._normalize_pair(trade['pair']))
+        except (KeyError, TypeError, ValueError):
+            # Malformed trades are released immediately and reported by _process_trades
+            return 0.0
+
+    def _pipeline_buys(self, buy_trades: list, sell_proceeds: dict, cash_ledger: CashLedger,
+                       portfolio_value: float, timeout_seconds: float = 60.0) -> list:
+        """
+        Release buys as soon as they are funded instead of after every sell has closed.
+
+        Buys are released in plan order while their estimated cost fits in the ledger: cash on
+        hand plus the proceeds of sells that have closed so far, minus what earlier buys spent.
+        Between releases this blocks until any pending sell closes. If waiting stops (timeout,
+        or order status unavailable) while sells are still unsettled, the ledger is reseeded
+        from a live Balance read so sells that did fill still fund the remaining buys, which
+        are then released against it.
+
+        Args:
+            buy_trades: Consolidated BUY trades in plan order.
+            sell_proceeds: txid -> expected USD proceeds of each sell placed in Phase 1.
+            cash_ledger: Ledger seeded with the cash balance before any sell was placed.
+            portfolio_value: Total equity used to size allocation-based buys.
+            timeout_seconds: Longest time to hold buys back waiting on sells.
+
+        Returns:
+            Results of all buys, in the order they were processed.
+        """
+        results = []
+        pending_sells = dict(sell_proceeds)
+        queue = [(trade, self._estimate_trade_usd(trade, portfolio_value)) for trade in buy_trades]
+        deadline = time.monotonic() + timeout_seconds
+        reseeded = False
+
+        while queue:
+            waiting_allowed = bool(pending_sells) and time.monotonic() < deadline
+            if pending_sells and not waiting_allowed and not reseeded:
+                self._reseed_cash(cash_ledger)
+                reseeded = True
+            budget = cash_ledger.available
+            released = []
+            while queue and (not waiting_allowed or queue[0][1] <= budget * (1 + cash_ledger.tolerance)):
+                trade, cost = queue.pop(0)
+                budget -= cost
+                released.append((trade, cost))
+
+            if released:
+                logger.info(
+                    f"Releasing {len(released)} BUY order(s); funded ${cash_ledger.available:,.2f}, "
+                    f"{len(pending_sells)} sell(s) still pending"
+                )
+                results.extend(self._process_trades([trade for trade, _ in released], 'buy', cash_ledger))
+
+            if not queue or not waiting_allowed:
+                continue
+
+            logger.info(f"Waiting for a sell to close to fund {len(queue)} BUY order(s)...")
+            statuses = self.kraken_api.wait_for_orders_closed(
+                list(pending_sells), timeout_seconds=max(0.0, deadline - time.monotonic()), poll_interval=2.0, any_closed=True
+            )
+            settled = [txid for txid, status in statuses.items() if status in TERMINAL_STATUSES and txid in pending_sells]
+            for txid in settled:
+                proceeds = pending_sells.pop(txid)
+                # Canceled/expired sells free nothing
+                if statuses[txid] == 'closed':
+                    cash_ledger.credit(proceeds)
+            logger.info(f"Sell order statuses: {statuses}")
+            if not settled:
+                # Timed out or status unavailable; stop holding buys back
+                deadline = time.monotonic()
+
+        if pending_sells:
+            logger.info(f"{len(pending_sells)} sell order(s) still open after buys were released")
+        return results
+
+    def _reseed_cash(self, cash_ledger: CashLedger):
+        """Reset the ledger to the live cash balance (snapshot cache bypassed); kept as is on failure."""
+        try:
+            cash = self.kraken_api.get_portfolio_snapshot(max_age=0).cash_balance
+        except Exception as e:
+            logger.warning(f"Could not re-read cash after sells; buys use estimated proceeds: {e}")
+            return
+        logger.info(f"Cash re-read after sells: ${cash:,.2f} (ledger had ${cash_ledger.cash:,.2f})")
+        cash_ledger.reseed(cash)
+
+    def _rebalance_to_targets(self, target_weights: dict) -> list:
+        """
+        Turn {pair: target weight} into the minimal order set reaching it (see bot/rebalance.py),
+        using the plan quote table and one portfolio snapshot. Weights are fractions of total
+        equity; holdings not named in the targets are left as they are.
+        """
+        try:
+            portfolio = self.kraken_api.get_comprehensive_portfolio_context()
+        except Exception as e:
+            logger.error(f"Cannot rebalance to targets without a portfolio snapshot: {e}")
+            return []
+        balances = portfolio.get('raw_balances', {})
+
+        pairs, weights, specs = [], [], []
+        for key, weight in target_weights.items():
+            pair = self._normalize_pair(key)
+            spec = self._pair_spec(pair)
+            if not spec:
+                logger.warning(f"Skipping target for unknown pair '{key}'")
+                continue
+            try:
+                weights.append(float(weight))
+            except (TypeError, ValueError):
+                logger.warning(f"Skipping target '{key}': invalid weight {weight!r}")
+                continue
+            pairs.append(pair)
+            specs.append(spec)
+        if not pairs:
+            return []
+
+        plan = plan_rebalance(
+            pairs,
+            holdings=[float(balances.get(spec.clean_base, 0.0)) for spec in specs],
+            prices=[self._get_price(pair) for pair in pairs],
+            target_weights=weights,
+            cash=float(portfolio.get('cash_balance', 0.0)),
+            lot_decimals=[spec.lot_decimals for spec in specs],
+            ordermin=[spec.ordermin for spec in specs],
+            costmin=[spec.costmin for spec in specs],
+            equity=float(portfolio.get('total_equity', 0.0)),
+        )
+        trades = plan.trades()
+        logger.info(
+            f"Rebalance to {len(pairs)} target(s) on ${plan.equity:,.2f} equity: {len(trades)} order(s)"
+            + (f", buys scaled to {plan.buy_scale:.0%} of drift to fit cash" if plan.buy_scale < 1 else "")
+        )
+        return trades
+
+    def _log_transport_stats(self):
+        """Log connection reuse and average latency of the Kraken HTTP transport for this cycle."""
+        try:
+            stats = self.kraken_api.get_transport_stats()
+            for kind in ('public', 'private'):
+                s = stats.get(kind, {})
+                if s.get('requests'):
+                    logger.info(
+                        f"Kraken {kind} transport: {s['requests']} request(s), "
+                        f"{s['reuse_ratio']:.0%} on reused connections, avg {s['avg_ms']:.0f}ms"
+                    )
+        except Exception:
+            # Diagnostics only
+            pass
+
+    def _process_trades(self, trades_to_process: list, trade_type: str, cash_ledger: CashLedger | None = None) -> list:
         """
         Helper function to process a list of either buy or sell trades.
         
         Args:
             trades_to_process: A list of trades of the same type (buy or sell).
             trade_type: A string, either 'buy' or 'sell'.
+            cash_ledger: Cash reservations for BUYs; seeded from this batch's portfolio
+                         snapshot when omitted.
             
         Returns:
             A list of dictionaries with the results of the processed trades.
@@ -374,7 +656,7 @@ class TradeExecutor:
         results = []
         # --- Validation Loop ---
         logger.info(f"Validating {len(trades_to_process)} {trade_type.upper()} trades...")
-        validated_trades = []
+        prechecked_trades = []
         
         # Always get the latest portfolio value for this batch
         portfolio_value = self._calculate_portfolio_value()
@@ -382,14 +664,12 @@ class TradeExecutor:
         logger.info(f"🏦 Portfolio Status for {trade_type.upper()}s: Total Value ${portfolio_value:,.2f}, Cash ${portfolio_data['cash_balance']:,.2f}")
 
         # For BUY validation, reserve cash progressively to avoid oversubscription within the same batch
-        reserved_cash = 0.0
-        available_cash_live = 0.0
         if trade_type == 'buy':
-            try:
-                available_cash_live = float(self.kraken_api.get_comprehensive_portfolio_context().get('cash_balance', 0.0))
-            except Exception:
-                available_cash_live = float(portfolio_data.get('cash_balance', 0.0))
-            logger.info(f"Available cash for BUY reservations: ${available_cash_live:,.2f}")
+            # Buys can run up to the pipeline deadline after planning; don't size them on old quotes
+            self._refresh_stale_quotes(trades_to_process)
+            if cash_ledger is None:
+                cash_ledger = CashLedger.from_portfolio(portfolio_data)
+            logger.info(f"Available cash for BUY reservations: ${cash_ledger.available:,.2f}")
 
         for trade in trades_to_process:
             try:
@@ -409,12 +689,7 @@ class TradeExecutor:
                     logger.info(f"Validating: {action.capitalize()} {allocation_pct:.1f}% ({volume:.8f}) of {pair} (Confidence: {confidence}) - {reasoning}")
                     
                     # Add estimated price for impact logging
-                    try:
-                        prices = self.kraken_api.get_ticker_prices([pair])
-                        if pair in prices:
-                            converted_trade['estimated_price'] = prices[pair]['price']
-                    except:
-                        converted_trade['estimated_price'] = 0
+                    converted_trade['estimated_price'] = self._get_price(pair)
                     
                     trade_to_validate = converted_trade
                 else:
@@ -427,6 +702,7 @@ class TradeExecutor:
                     trade_to_validate = trade.copy()
                     trade_to_validate['pair'] = pair
                     trade_to_validate['volume'] = volume
+                    trade_to_validate['estimated_price'] = self._get_price(pair)
                 
                 # PORTFOLIO VALIDATION: Check holdings for sell orders
                 is_valid, validation_msg, adjusted_trade = self._validate_trade_against_holdings(trade_to_validate)
@@ -457,60 +733,39 @@ class TradeExecutor:
                     continue
 
                 # PRE-VALIDATION: Check minimum order size and effective cost minimum
-                pair_details = self.kraken_api.get_pair_details(pair)
-                if pair_details:
-                    ordermin = float(pair_details.get('ordermin', 0))
-                    costmin = float(pair_details.get('costmin', 0) or 0.0)
-                    # Fetch a price once for both impact & effective USD minimum
-                    try:
-                        prices = self.kraken_api.get_ticker_prices([pair])
-                        price = prices.get(pair, {}).get('price', trade_to_validate.get('estimated_price', 0) or 0)
-                    except Exception:
-                        price = trade_to_validate.get('estimated_price', 0) or 0
-                    
+                spec = self._pair_spec(pair)
+                if spec:
+                    # Same sizing rules (plan quote, minimums, micro threshold, uplift cap) as plan consolidation
+                    sizing = self._size_plan(
+                        [{'pair': pair, 'action': action, 'volume': volume}],
+                        portfolio_value,
+                        available_cash=cash_ledger.available if trade_type == 'buy' else 0.0,
+                    )
+                    sized = sizing.row(0)
+                    ordermin = sized['ordermin']
+                    price = sized['price']
+                    trade_usd = sized['notional']
+
                     # Units minimum check (ordermin) with optional uplift for BUY
-                    if volume < ordermin:
+                    if sized['below_ordermin']:
                         original_pair = trade.get('pair', pair)
-                        if trade_type == 'buy':
-                            # attempt uplift to meet minimums if within caps and cash
-                            required_usd = max(costmin, ordermin * price if price else 0.0)
-                            try:
-                                live_ctx = self.kraken_api.get_comprehensive_portfolio_context()
-                                available_cash = float(live_ctx.get('cash_balance', 0.0))
-                            except Exception:
-                                available_cash = float(portfolio_data.get('cash_balance', 0.0))
-                            effective_available = max(0.0, available_cash - reserved_cash)
-                            # Cap reflects cash buffer policy (small portfolios < $50: 95%; otherwise allow up to 99%)
-                            cap_pct = 0.95 if portfolio_value < 50 else 0.99
-                            cap_usd = cap_pct * portfolio_value
-                            if required_usd > 0 and required_usd <= effective_available * 1.001 and required_usd <= cap_usd * 1.001:
-                                uplifted_volume = ordermin
-                                trade_to_validate['volume'] = uplifted_volume
-                                volume = uplifted_volume
-                                # reserve delta cash
-                                # trade_usd may not be computed yet; compute from uplift
-                                trade_usd_uplift = uplifted_volume * price if price else required_usd
-                                delta_usd = max(0.0, trade_usd_uplift - reserved_cash)
-                                reserved_cash += delta_usd
-                                logger.info(f"⬆️ Uplifted BUY for {pair}: set volume to {uplifted_volume:.8f} to satisfy minimum; reserved +${delta_usd:.2f} (total reserved ${reserved_cash:.2f})")
-                            else:
-                                error_msg = f"Volume {volume:.8f} below minimum order size {ordermin:.8f} for {pair}"
-                                user_friendly_msg = f"Volume {volume:.8f} below minimum order size {ordermin:.8f} for {original_pair}"
-                                logger.warning(f"⚠️ Skipping trade: {error_msg}")
-                                results.append({'status': 'volume_too_small', 'trade': trade, 'error': user_friendly_msg})
-                                continue
+                        uplifted_volume = ordermin
+                        trade_usd_uplift = uplifted_volume * price if price else sized['effective_min_usd']
+                        if (trade_type == 'buy' and sized['upliftable']
+                                and cash_ledger.reserve(id(trade), max(sized['effective_min_usd'], trade_usd_uplift))):
+                            trade_to_validate['volume'] = uplifted_volume
+                            volume = uplifted_volume
+                            trade_usd = trade_usd_uplift if price else 0.0
+                            logger.info(f"⬆️ Uplifted BUY for {pair}: set volume to {uplifted_volume:.8f} to satisfy minimum; reserved ${trade_usd_uplift:.2f} (total reserved ${cash_ledger.reserved:.2f})")
                         else:
                             error_msg = f"Volume {volume:.8f} below minimum order size {ordermin:.8f} for {pair}"
                             user_friendly_msg = f"Volume {volume:.8f} below minimum order size {ordermin:.8f} for {original_pair}"
                             logger.warning(f"⚠️ Skipping trade: {error_msg}")
                             results.append({'status': 'volume_too_small', 'trade': trade, 'error': user_friendly_msg})
                             continue
-                    
+
                     # MICRO-TRADE GUARD: Block trades smaller than max($25, 5% of equity)
-                    trade_usd = volume * price if price else 0.0
-                    micro_abs = 25.0
-                    micro_pct = 0.05 * portfolio_value
-                    micro_threshold = max(micro_abs, micro_pct)
+                    micro_threshold = sizing.micro_threshold
                     if trade_usd < micro_threshold:
                         original_pair = trade.get('pair', pair)
                         logger.warning(
@@ -524,7 +779,7 @@ class TradeExecutor:
                         continue
 
                     # Effective USD minimum check (costmin or ordermin * price)
-                    effective_min_usd = max(costmin, ordermin * price if price else 0.0)
+                    effective_min_usd = sized['effective_min_usd']
                     if effective_min_usd > 0 and trade_usd < effective_min_usd:
                         original_pair = trade.get('pair', pair)
                         logger.warning(
@@ -539,13 +794,10 @@ class TradeExecutor:
 
                     # CASH AVAILABILITY CHECK for BUY orders (guard against buy-before-sell & oversubscription)
                     if trade_type == 'buy':
-                        try:
-                            live_ctx = self.kraken_api.get_comprehensive_portfolio_context()
-                            available_cash = float(live_ctx.get('cash_balance', 0.0))
-                        except Exception:
-                            available_cash = float(portfolio_data.get('cash_balance', 0.0))
-                        effective_available = max(0.0, available_cash - reserved_cash)
-                        if trade_usd > effective_available * 1.001:  # small tolerance
+                        # Resizes any uplift hold for this trade to its final cost
+                        if not cash_ledger.reserve(id(trade), trade_usd):
+                            cash_ledger.release(id(trade))
+                            effective_available = cash_ledger.available
                             original_pair = trade.get('pair', pair)
                             logger.warning(
                                 f"⚠️ Skipping trade: insufficient cash. Needed ${trade_usd:.2f}, available ${effective_available:.2f} (after reservations) for {pair}"
@@ -556,23 +808,14 @@ class TradeExecutor:
                                 'error': f"Insufficient cash. Needed ${trade_usd:.2f}, available ${effective_available:.2f} for {original_pair}"
                             })
                             continue
-                        # Reserve cash for this validated BUY
-                        reserved_cash += trade_usd
-                        logger.info(f"Reserved ${trade_usd:.2f} for {pair}. Reserved total=${reserved_cash:.2f}; Live cash=${available_cash:.2f}")
+                        logger.info(f"Reserved ${trade_usd:.2f} for {pair}. Reserved total=${cash_ledger.reserved:.2f}; Cash=${cash_ledger.cash:.2f}")
                     
                     logger.info(f"✅ Volume check passed: {volume:.8f} >= {ordermin:.8f} minimum for {pair}")
                 else:
                     logger.warning(f"⚠️ Could not verify minimum order size for {pair} - proceeding")
                 
-                self.kraken_api.place_order(
-                    pair=pair,
-                    order_type=action,
-                    volume=volume,
-                    validate=True
-                )
-                
-                validated_trades.append({'pair': pair, 'action': action, 'volume': volume, 'original_trade': trade})
-                logger.info(f"Validation successful for {pair}.")
+                # Kraken-side validate=true happens below, batched per pair
+                prechecked_trades.append({'pair': pair, 'action': action, 'volume': volume, 'original_trade': trade})
 
             except KrakenAPIError as e:
                 error_message = f"Validation failed for trade {trade}: {e}"
@@ -585,44 +828,199 @@ class TradeExecutor:
                 results.append({'status': 'invalid_format', 'trade': trade, 'error': str(e)})
                 continue
 
+        validated_trades = self._validate_orders(prechecked_trades, results)
         logger.info(f"Validation Complete: {len(validated_trades)} {trade_type.upper()} trade(s) ready for execution.")
 
         # --- Execution Loop ---
-        if not validated_trades:
-            return results
-            
-        logger.info(f"Executing {len(validated_trades)} {trade_type.upper()} trade(s)...")
-        txids: list[str] = []
-        for trade in validated_trades:
+        if validated_trades:
+            logger.info(f"Executing {len(validated_trades)} {trade_type.upper()} trade(s)...")
+            self._submit_orders(validated_trades, results)
+            logger.info(f"Execution of {trade_type.upper()} trades complete.")
+
+        if cash_ledger is not None:
+            self._settle_reservations(trades_to_process, results, cash_ledger)
+        return results
+
+    @staticmethod
+    def _settle_reservations(trades: list, results: list, cash_ledger: CashLedger):
+        """Spend the holds of submitted BUYs and release those of skipped or rejected ones."""
+        placed = {id(r['trade']['original_trade']) for r in results if r.get('status') == 'success'}
+        for trade in trades:
+            if id(trade) in placed:
+                cash_ledger.commit(id(trade))
+            else:
+                cash_ledger.release(id(trade))
+
+    def _order_groups(self, trades: list) -> list[list]:
+        """
+        Group orders by pair, in first-seen order, into chunks Kraken accepts in one
+        AddOrderBatch request. Single-order groups are sent with plain AddOrder.
+        """
+        by_pair: dict[str, list] = {}
+        for trade in trades:
+            by_pair.setdefault(trade['pair'], []).append(trade)
+        groups = []
+        for pair_trades in by_pair.values():
+            for i in range(0, len(pair_trades), MAX_BATCH_ORDERS):
+                groups.append(pair_trades[i:i + MAX_BATCH_ORDERS])
+        return groups
+
+    def _validate_orders(self, trades: list, results: list) -> list:
+        """
+        Kraken-side dry run (validate=true) of pre-checked orders, one request per pair group.
+        Failures are appended to results; returns the orders that passed.
+        """
+        validated_trades = []
+        for group in self._order_groups(trades):
+            pair = group[0]['pair']
+            if len(group) == 1:
+                trade = group[0]
+                try:
+                    self.kraken_api.place_order(
+                        pair=pair,
+                        order_type=trade['action'],
+                        volume=trade['volume'],
+                        validate=True
+                    )
+                except KrakenAPIError as e:
+                    logger.error(f"Validation failed for trade {trade['original_trade']}: {e}")
+                    results.append({'status': 'validation_failed', 'trade': trade['original_trade'], 'error': str(e)})
+                    continue
+                validated_trades.append(trade)
+                logger.info(f"Validation successful for {pair}.")
+                continue
+
             try:
-                pair = trade['pair']
-                action = trade['action']
-                volume = trade['volume']
+                responses = self.kraken_api.place_order_batch(pair, self._batch_orders(group), validate=True)
+            except KrakenAPIError as e:
+                responses = [{'error': [str(e)]}] * len(group)
+            for trade, response in zip(group, responses):
+                if response.get('error'):
+                    error = '; '.join(response['error'])
+                    logger.error(f"Validation failed for trade {trade['original_trade']}: {error}")
+                    results.append({'status': 'validation_failed', 'trade': trade['original_trade'], 'error': error})
+                else:
+                    validated_trades.append(trade)
+            logger.info(f"Batch validation for {pair}: {sum(1 for r in responses if not r.get('error'))}/{len(group)} order(s) passed.")
+        return validated_trades
 
-                logger.info(f"Executing: {action.capitalize()} {volume:.8f} of {pair}")
+    def _submit_orders(self, trades: list, results: list) -> list[str]:
+        """
+        Place validated orders live, one AddOrderBatch per pair group (plain AddOrder for single
+        orders). Appends one result dict per order and returns the txids placed.
+        """
+        txids: list[str] = []
+        sliced = [trade for trade in trades if self._use_execution_algo(trade)]
+        if sliced:
+            txids.extend(self._submit_sliced(sliced, results))
+            sliced_ids = {id(trade) for trade in sliced}
+            trades = [trade for trade in trades if id(trade) not in sliced_ids]
+        for group in self._order_groups(trades):
+            pair = group[0]['pair']
+            if len(group) == 1:
+                trade = group[0]
+                try:
+                    action = trade['action']
+                    volume = trade['volume']
 
-                response = self.kraken_api.place_order(
-                    pair=pair,
-                    order_type=action,
-                    volume=volume,
-                    validate=False # This is a live order
-                )
-                
-                txid = response.get('txid', ['N/A'])[0]
-                success_message = f"Successfully executed {action} of {pair}. TxID: {txid}"
-                logger.info(success_message)
-                results.append({'status': 'success', 'trade': trade, 'txid': txid})
-                txids.append(txid)
+                    logger.info(f"Executing: {action.capitalize()} {volume:.8f} of {pair}")
+
+                    response = self.kraken_api.place_order(
+                        pair=pair,
+                        order_type=action,
+                        volume=volume,
+                        validate=False # This is a live order
+                    )
+                    
+                    txid = response.get('txid', ['N/A'])[0]
+                    success_message = f"Successfully executed {action} of {pair}. TxID: {txid}"
+                    logger.info(success_message)
+                    results.append({'status': 'success', 'trade': trade, 'txid': txid})
+                    txids.append(txid)
 
+                except KrakenAPIError as e:
+                    error_message = f"Live execution failed for trade {trade}: {e}"
+                    logger.error(error_message)
+                    results.append({'status': 'execution_failed', 'trade': trade, 'error': str(e)})
+                except Exception as e:
+                    error_message = f"An unexpected error occurred during execution of {trade}: {e}"
+                    logger.error(error_message, exc_info=True)
+                    results.append({'status': 'unexpected_error', 'trade': trade, 'error': str(e)})
+                continue
+
+            logger.info(f"Executing batch of {len(group)} order(s) for {pair}")
+            try:
+                responses = self.kraken_api.place_order_batch(pair, self._batch_orders(group), validate=False)
             except KrakenAPIError as e:
-                error_message = f"Live execution failed for trade {trade}: {e}"
-                logger.error(error_message)
-                results.append({'status': 'execution_failed', 'trade': trade, 'error': str(e)})
+                logger.error(f"Live batch execution failed for {pair}: {e}")
+                results.extend({'status': 'execution_failed', 'trade': trade, 'error': str(e)} for trade in group)
                 continue
             except Exception as e:
-                error_message = f"An unexpected error occurred during execution of {trade}: {e}"
-                logger.error(error_message, exc_info=True)
-                results.append({'status': 'unexpected_error', 'trade': trade, 'error': str(e)})
+                logger.error(f"An unexpected error occurred during batch execution for {pair}: {e}", exc_info=True)
+                results.extend({'status': 'unexpected_error', 'trade': trade, 'error': str(e)} for trade in group)
+                continue
+            for trade, response in zip(group, responses):
+                if response.get('error'):
+                    error = '; '.join(response['error'])
+                    logger.error(f"Live execution failed for trade {trade}: {error}")
+                    results.append({'status': 'execution_failed', 'trade': trade, 'error': error})
+                    continue
+                txid = (response.get('txid') or ['N/A'])[0]
+                logger.info(f"Successfully executed {trade['action']} of {pair}. TxID: {txid}")
+                results.append({'status': 'success', 'trade': trade, 'txid': txid})
+                txids.append(txid)
+        return txids
 
-        logger.info(f"Execution of {trade_type.upper()} trades complete.")
-        return results
+    def _use_execution_algo(self, trade: dict) -> bool:
+        if self.execution_algo == 'market':
+            return False
+        return float(trade['volume']) * self._get_price(trade['pair']) >= self.algo_min_order_usd
+
+    def _submit_sliced(self, trades: list, results: list) -> list[str]:
+        """
+        Work large orders with the configured execution algorithm, all parents concurrently.
+        Each parent reports as one result whose trade volume is what actually filled.
+        """
+        duration = DEFAULT_CHASE_DEADLINE_SECONDS if self.execution_algo == 'passive' else DEFAULT_DURATION_SECONDS
+        parents = [
+            ParentOrder(pair=trade['pair'], side=trade['action'], volume=float(trade['volume']),
+                        mode=self.execution_algo, duration_seconds=duration)
+            for trade in trades
+        ]
+        logger.info(f"Working {len(parents)} order(s) with {self.execution_algo.upper()} execution")
+        try:
+            outcomes = asyncio.run(self._run_parents(parents))
+        except Exception as e:
+            logger.error(f"Sliced execution failed: {e}", exc_info=True)
+            outcomes = [ParentResult(parent, error=str(e)) for parent in parents]
+
+        txids = []
+        for trade, outcome in zip(trades, outcomes):
+            if outcome.filled_volume <= 0:
+                results.append({'status': 'execution_failed', 'trade': trade, 'error': outcome.error or 'No child order filled'})
+                continue
+            txid = outcome.txids[-1]
+            logger.info(f"{trade['action'].capitalize()} of {trade['pair']} {outcome.status}: "
+                        f"{outcome.filled_volume} of {trade['volume']} in {len(outcome.txids)} order(s)")
+            results.append({
+                'status': 'success',
+                'trade': dict(trade, volume=outcome.filled_volume),
+                'txid': txid,
+                'txids': outcome.txids,
+                'execution': outcome.status,
+            })
+            txids.append(txid)
+        return txids
+
+    async def _run_parents(self, parents: list[ParentOrder]) -> list[ParentResult]:
+        async with AsyncKrakenAPI(self.kraken_api) as api:
+            if self.execution_algo == 'passive':
+                # Track fills from the executions stream; the chaser polls QueryOrders without it
+                live = self.kraken_api.start_executions_feed()
+                order_states = self.kraken_api.executions_feed.table if live else None
+                return await PostOnlyChaser(api, order_states=order_states).run(parents)
+            return await SlicedOrderScheduler(api).run(parents)
+
+    @staticmethod
+    def _batch_orders(group: list) -> list[dict]:
+        return [{'type': trade['action'], 'volume': trade['volume'], 'ordertype': 'market'} for trade in group]
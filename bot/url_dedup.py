@@ -0,0 +1,121 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from bot.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Headlines older than the research recency window (48h) are filtered out anyway, so
+# remembering their URLs any longer buys nothing
+DEFAULT_TTL_SECONDS = float(os.getenv("RESEARCH_DEDUP_TTL_HOURS", "48")) * 3600
+# Expired rows are deleted every this many inserts (and on open), keeping the table bounded
+EVICT_EVERY_ADDS = 500
+# Query parameters that only track the click, not the article
+TRACKING_PARAM_PREFIXES = ('utm_',)
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form for dedup: lower-case scheme/host, no fragment, no tracking parameters."""
+    parts = urlsplit(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not k.lower().startswith(TRACKING_PARAM_PREFIXES)]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(query), ''))
+
+
+def url_key(url: str) -> int:
+    """Signed 64-bit hash of the normalized URL: 8 bytes per row instead of the URL text."""
+    digest = hashlib.blake2b(normalize_url(url).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class UrlDedupStore:
+    """
+    Sliding-window "seen URL" set backed by SQLite.
+
+    Each URL is stored as a 64-bit hash with the time it was first seen; it counts as seen for
+    `ttl_seconds` afterwards and is evicted once older. Memory and disk stay bounded by the
+    number of URLs seen within one window, however long the process runs. add() is an atomic
+    check-and-insert, so concurrent fetchers never both claim the same URL; WAL mode lets
+    several processes share one file.
+
+    Supports the set operations ResearchAgent uses: `url in store`, store.add(url), len(store).
+    """
+    def __init__(self, path: str | None, ttl_seconds: float = DEFAULT_TTL_SECONDS, clock=time.time):
+        """
+        Args:
+            path: SQLite file (None keeps the store in memory).
+            ttl_seconds: How long a URL counts as seen after it was first seen.
+            clock: Wall time source (injectable for tests).
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._adds_since_evict = 0
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path or ':memory:', timeout=10, check_same_thread=False, isolation_level=None)
+        if path:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS seen_urls (key INTEGER PRIMARY KEY, first_seen REAL NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS seen_urls_first_seen ON seen_urls (first_seen)')
+        self.evict()
+
+    def _cutoff(self) -> float:
+        return self._clock() - self.ttl_seconds
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            row = self._conn.execute('SELECT 1 FROM seen_urls WHERE key = ? AND first_seen >= ?',
+                                     (url_key(url), self._cutoff())).fetchone()
+        return row is not None
+
+    def add(self, url: str, seen_at: float | None = None) -> bool:
+        """
+        Mark `url` as seen. Returns True if it was new (never seen, or its entry had expired)
+        and False if it was already seen within the window, in which case first_seen is kept.
+        """
+        now = self._clock() if seen_at is None else seen_at
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT INTO seen_urls (key, first_seen) VALUES (?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET first_seen = excluded.first_seen WHERE seen_urls.first_seen < ?',
+                (url_key(url), now, self._cutoff()))
+            is_new = cursor.rowcount == 1
+            self._adds_since_evict += 1
+            evict_due = self._adds_since_evict >= EVICT_EVERY_ADDS
+        if evict_due:
+            self.evict()
+        return is_new
+
+    def first_seen(self, url: str) -> float | None:
+        """When `url` was first seen within the window, or None."""
+        with self._lock:
+            row = self._conn.execute('SELECT first_seen FROM seen_urls WHERE key = ? AND first_seen >= ?',
+                                     (url_key(url), self._cutoff())).fetchone()
+        return row[0] if row else None
+
+    def evict(self) -> int:
+        """Delete entries older than the window; returns how many were removed."""
+        with self._lock:
+            removed = self._conn.execute('DELETE FROM seen_urls WHERE first_seen < ?', (self._cutoff(),)).rowcount
+            self._adds_since_evict = 0
+        if removed:
+            logger.debug(f"Evicted {removed} expired URLs from the dedup store")
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM seen_urls WHERE first_seen >= ?', (self._cutoff(),)).fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM seen_urls')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
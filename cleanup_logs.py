@@ -33,8 +33,15 @@ TARGETS: Dict[str, TargetSpec] = {
     "equity": TargetSpec(name="equity", files=[Path("logs/equity.csv")]),
     "trades": TargetSpec(name="trades", files=[Path("logs/trades.csv")]),
     "rejected": TargetSpec(name="rejected", files=[Path("logs/rejected_trades.csv")]),
-    "cache": TargetSpec(name="cache", files=[Path("logs/research_cache.json")]),
+    "cache": TargetSpec(name="cache", files=[
+        Path("logs/research_urls.sqlite3"),
+        Path("logs/research_urls.sqlite3-wal"),
+        Path("logs/research_urls.sqlite3-shm"),
+        Path("logs/research_cache.json"),  # pre-SQLite store, migrated on first run
+    ]),
+    "feeds": TargetSpec(name="feeds", files=[Path("logs/rss_feed_cache.json")]),
     "coingecko": TargetSpec(name="coingecko", files=[Path("logs/coingecko_cache.json")]),
+    "pairs": TargetSpec(name="pairs", files=[Path("logs/kraken_asset_pairs_cache.json")]),
     "report": TargetSpec(name="report", files=[Path("logs/daily_research_report.md")]),
     "thesis": TargetSpec(name="thesis", files=[Path("logs/thesis_log.md")]),
     "sched_logs": TargetSpec(name="sched_logs", files=[Path("logs/scheduler_multiagent.log"), Path("logs/scheduler.log")]),
@@ -334,7 +341,7 @@ def main():
 
     # Intro warning
     print("\n== ChatGPT-Kraken-Bot Log Cleanup ==\n")
-    print("Targets managed in this script include: agent transcripts, prompts, equity/trades CSVs, research caches, scheduler logs, thesis, CoinGecko cache, research report.")
+    print("Targets managed in this script include: agent transcripts, prompts, equity/trades CSVs, research caches, RSS feed cache, scheduler logs, thesis, CoinGecko cache, research report.")
 
     selected = resolve_selection(args)
 
@@ -58,6 +58,8 @@ def run_trading_cycle():
         except Exception as e:
             logger.warning(f"Unexpected error in research agent: {e}")
             daily_research_report = "Market research temporarily unavailable."
+        finally:
+            research_agent.close()
 
         # 3. Get AI-powered trading strategy with market context
         logger.info("Generating AI trading strategy with market intelligence...")
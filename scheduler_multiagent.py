@@ -12,6 +12,8 @@ import threading
 # Import the multi-agent system
 from agents import SupervisorAgent
 from bot.kraken_api import KrakenAPI, KrakenAPIError
+from bot.paper_kraken_api import PaperKrakenAPI
+from bot.cycle_tape import CycleTape
 from bot.logger import setup_colored_logging, get_logger
 from bot.telegram_alerter import notify_dev_of_error
 from bot.telegram_alerter import notify_trade_update, TELEGRAM_TRADE_ALERTS, TELEGRAM_ALERTS_PARSE_MODE, TELEGRAM_ALERTS_SILENT
@@ -228,6 +230,24 @@ def run_multiagent_demo():
         logger.error(f"❌ Demo run failed during initialization: {e}", exc_info=True)
 
 
+def run_taped_cycle(mode: str, path: str):
+    """
+    Run one trading cycle under a CycleTape: 'record' captures every outbound HTTP/LLM call
+    into the bundle at `path`, 'replay' re-runs the cycle offline from that bundle.
+
+    The WebSocket feeds are turned off and the AssetPairs disk cache is bypassed so prices and
+    pair metadata come over REST and end up on the tape. Replays write their logs to logs/replay.
+    """
+    logger.info(f"📼 {mode.capitalize()}ing a trading cycle: {path}")
+    with CycleTape(path, mode):
+        kraken_api = KrakenAPI(pair_cache_path='')
+        kraken_api.executions_ws_enabled = False
+        kraken_api.market_data_enabled = False
+        logs_dir = os.path.join("logs", "replay") if mode == "replay" else "logs"
+        supervisor = SupervisorAgent(kraken_api, logs_dir=logs_dir)
+        run_multiagent_trading_cycle(supervisor)
+
+
 def handle_user_input(input_queue):
     """
     Handle user input in a separate thread (Windows compatible).
@@ -266,6 +286,10 @@ def main():
     # --- FIX: Pass the single supervisor instance to the scheduled job ---
     try:
         kraken_api = KrakenAPI()
+        # Live prices for held/candidate pairs; pairs are added as they are first priced
+        kraken_api.start_market_data()
+        # Order fills pushed over WebSocket; runs (and reconnects) in the background from now on
+        kraken_api.start_executions_feed()
         supervisor = SupervisorAgent(kraken_api)
         logger.info("✅ Supervisor Agent initialized for continuous monitoring and scheduled runs.")
         
@@ -481,58 +505,40 @@ def main():
                         logger.error(f"   ❌ Error reading trades: {e}", exc_info=True)
                     logger.info("")
 
-                elif user_input == "d":  # $10 simulation dry-run
+                elif user_input == "d":  # $10 simulation on the paper exchange
                     logger.info("")
-                    logger.info("🧪 SIMULATION: Running full decision pipeline with $10 capped context (no live orders)...")
+                    logger.info("🧪 SIMULATION: Running full decision pipeline against a $10 paper account (no live orders)...")
                     try:
-                        # Build a simulated KrakenAPI view by wrapping the portfolio context
-                        class SimKrakenAPI(KrakenAPI):
-                            def __init__(self, real_api: KrakenAPI):
-                                # Do not call super().__init__ to avoid new nonce/API session; reuse real
-                                self.__dict__ = real_api.__dict__
-                            def get_comprehensive_portfolio_context(self):
-                                ctx = super(SimKrakenAPI, self).get_comprehensive_portfolio_context()
-                                # Cap total equity to $10 by scaling cash; keep crypto at $0 to avoid live sells
-                                capped = dict(ctx)
-                                capped['total_equity'] = 10.0
-                                capped['cash_balance'] = 10.0
-                                capped['crypto_value'] = 0.0
-                                capped['usd_values'] = {'USD': {'amount': 10.0, 'price': 1.0, 'value': 10.0}}
-                                capped['allocation_percentages'] = {'USD': 100.0}
-                                capped['portfolio_summary'] = "Current cash balance: $10.00 USD.\n\nTotal Portfolio Value: $10.00 USD\nAllocation: 100.0% Cash, 0.0% Crypto"
-                                capped['tradeable_assets'] = ['USD']
-                                return capped
-                            def place_order(self, *args, **kwargs):
-                                # Prevent any live trading in simulation
-                                raise RuntimeError("Simulation mode: place_order disabled")
-                        sim_api = SimKrakenAPI(kraken_api)
-                        sim_supervisor = SupervisorAgent(sim_api)
+                        # Live pair rules and public prices; balances, fills and order status are simulated in-process
+                        sim_api = PaperKrakenAPI(kraken_api.asset_pairs, balances={'USD': 10.0}, price_source=kraken_api.get_ticker_prices)
+                        # Paper trades and equity go to their own logs so live performance history stays clean
+                        sim_supervisor = SupervisorAgent(sim_api, logs_dir=os.path.join("logs", "paper"))
                         # Inputs flag to indicate simulate for downstream logging if needed
                         sim_inputs = {
                             "cycle_trigger": "simulated_usd10_run",
                             "execution_mode": "simulation",
                             "cycle_timestamp": datetime.now().isoformat(),
                         }
-                        # Run pipeline; execution will fail at place_order due to simulation guard, but we catch it
                         try:
                             result = sim_supervisor.run(sim_inputs)
                         except Exception as sim_err:
-                            logger.info(f"Simulation ended before live trading (expected): {sim_err}")
+                            logger.error(f"Simulated cycle failed: {sim_err}", exc_info=True)
                             result = sim_supervisor.get_execution_summary()
+                        logger.info(f"Paper balances after run: {sim_api.get_balances()} (fees paid: ${sim_api.fees_paid:.4f})")
 
                         # Build and send a short Telegram preview if enabled
                         try:
                             if TELEGRAM_TRADE_ALERTS:
                                 msg = (
                                     f"🧪 Trade Preview — {datetime.utcnow().isoformat(timespec='seconds')}Z\n"
-                                    f"Mode: Simulation ($10) — No live orders placed\n"
+                                    f"Mode: Simulation ($10 paper account) — No live orders placed\n"
                                     f"Decision pipeline executed successfully."
                                 )
                                 notify_trade_update(msg, silent=TELEGRAM_ALERTS_SILENT, parse_mode=TELEGRAM_ALERTS_PARSE_MODE)
                         except Exception:
                             pass
 
-                        logger.info("✅ Simulation complete (no live trades).")
+                        logger.info("✅ Simulation complete (paper fills only, no live trades).")
                     except Exception as e:
                         logger.error(f"❌ Simulation run failed: {e}", exc_info=True)
                     logger.info("")
@@ -554,5 +560,7 @@ if __name__ == "__main__":
     
     if len(sys.argv) > 1 and sys.argv[1] == "demo":
         run_multiagent_demo()
+    elif len(sys.argv) > 2 and sys.argv[1] in ("record", "replay"):
+        run_taped_cycle(sys.argv[1], sys.argv[2])
     else:
         main()
\ No newline at end of file